@@ -0,0 +1,63 @@
+"""add submission_queue
+
+Revision ID: 5e1c7a9d2b40
+Revises: 4bab0f30f698
+Create Date: 2026-10-17 10:12:31.284410
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5e1c7a9d2b40"
+down_revision: Union[str, Sequence[str], None] = "4bab0f30f698"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+submissionstate = postgresql.ENUM(
+    "pending", "dispatched", "failed", "cancelled", name="submissionstate"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "submission_queue",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("job_id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("priority", sa.Integer(), nullable=False),
+        sa.Column("state", submissionstate, nullable=False),
+        sa.Column("transfer_mode", sa.String(length=10), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("enqueued_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("dispatched_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["job_id"], ["jobs.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("job_id"),
+    )
+    op.create_index(
+        op.f("ix_submission_queue_id"), "submission_queue", ["id"], unique=False
+    )
+    op.create_index(
+        op.f("ix_submission_queue_user_id"), "submission_queue", ["user_id"], unique=False
+    )
+    op.create_index(
+        op.f("ix_submission_queue_state"), "submission_queue", ["state"], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_submission_queue_state"), table_name="submission_queue")
+    op.drop_index(op.f("ix_submission_queue_user_id"), table_name="submission_queue")
+    op.drop_index(op.f("ix_submission_queue_id"), table_name="submission_queue")
+    op.drop_table("submission_queue")
+    submissionstate.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,41 @@
+"""add job_resource_samples
+
+Revision ID: 8f3b2d6a1c57
+Revises: 5e1c7a9d2b40
+Create Date: 2026-10-17 19:20:04.518233
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8f3b2d6a1c57"
+down_revision: Union[str, Sequence[str], None] = "5e1c7a9d2b40"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "job_resource_samples",
+        sa.Column("job_id", sa.Integer(), nullable=False),
+        sa.Column("sampled_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("walltime_s", sa.Integer(), nullable=True),
+        sa.Column("cput_s", sa.Integer(), nullable=True),
+        sa.Column("mem_kb", sa.BigInteger(), nullable=True),
+        sa.Column("vmem_kb", sa.BigInteger(), nullable=True),
+        sa.Column("ncpus", sa.SmallInteger(), nullable=True),
+        sa.Column("mem_limit_kb", sa.BigInteger(), nullable=True),
+        sa.ForeignKeyConstraint(["job_id"], ["jobs.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("job_id", "sampled_at"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("job_resource_samples")
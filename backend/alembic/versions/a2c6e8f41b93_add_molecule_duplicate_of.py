@@ -0,0 +1,52 @@
+"""add molecules.duplicate_of_id and molecules.duplicate_rmsd
+
+Revision ID: a2c6e8f41b93
+Revises: f1a7d3e5c920
+Create Date: 2026-10-18 03:12:45.208116
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a2c6e8f41b93"
+down_revision: Union[str, Sequence[str], None] = "f1a7d3e5c920"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("molecules", sa.Column("duplicate_of_id", sa.Integer(), nullable=True))
+    op.add_column(
+        "molecules",
+        sa.Column(
+            "duplicate_rmsd",
+            sa.Float(),
+            nullable=True,
+            comment="代表の分子との RMSD [Å]",
+        ),
+    )
+    op.create_foreign_key(
+        "fk_molecules_duplicate_of_id",
+        "molecules",
+        "molecules",
+        ["duplicate_of_id"],
+        ["id"],
+        ondelete="SET NULL",
+    )
+    op.create_index(
+        op.f("ix_molecules_duplicate_of_id"), "molecules", ["duplicate_of_id"], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_molecules_duplicate_of_id"), table_name="molecules")
+    op.drop_constraint("fk_molecules_duplicate_of_id", "molecules", type_="foreignkey")
+    op.drop_column("molecules", "duplicate_rmsd")
+    op.drop_column("molecules", "duplicate_of_id")
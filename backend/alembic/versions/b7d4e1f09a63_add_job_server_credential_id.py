@@ -0,0 +1,67 @@
+"""add server_credential_id to jobs and submission_queue, server_credentials.max_jobs
+
+Revision ID: b7d4e1f09a63
+Revises: 8f3b2d6a1c57
+Create Date: 2026-10-17 20:02:47.913604
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b7d4e1f09a63"
+down_revision: Union[str, Sequence[str], None] = "8f3b2d6a1c57"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("jobs", sa.Column("server_credential_id", sa.Integer(), nullable=True))
+    op.create_index(
+        op.f("ix_jobs_server_credential_id"), "jobs", ["server_credential_id"], unique=False
+    )
+    op.create_foreign_key(
+        "jobs_server_credential_id_fkey",
+        "jobs",
+        "server_credentials",
+        ["server_credential_id"],
+        ["id"],
+        ondelete="SET NULL",
+    )
+    op.add_column(
+        "submission_queue", sa.Column("server_credential_id", sa.Integer(), nullable=True)
+    )
+    op.create_foreign_key(
+        "submission_queue_server_credential_id_fkey",
+        "submission_queue",
+        "server_credentials",
+        ["server_credential_id"],
+        ["id"],
+        ondelete="SET NULL",
+    )
+    op.add_column(
+        "server_credentials",
+        sa.Column(
+            "max_jobs",
+            sa.Integer(),
+            nullable=True,
+            comment="同時に投入しておけるジョブ数の上限（未設定なら既定値）",
+        ),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("server_credentials", "max_jobs")
+    op.drop_constraint(
+        "submission_queue_server_credential_id_fkey", "submission_queue", type_="foreignkey"
+    )
+    op.drop_column("submission_queue", "server_credential_id")
+    op.drop_constraint("jobs_server_credential_id_fkey", "jobs", type_="foreignkey")
+    op.drop_index(op.f("ix_jobs_server_credential_id"), table_name="jobs")
+    op.drop_column("jobs", "server_credential_id")
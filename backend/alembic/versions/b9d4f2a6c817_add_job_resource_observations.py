@@ -0,0 +1,51 @@
+"""add job_resource_observations and jobs.estimated_walltime_s
+
+Revision ID: b9d4f2a6c817
+Revises: a2c6e8f41b93
+Create Date: 2026-10-17 05:41:09.553902
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b9d4f2a6c817"
+down_revision: Union[str, Sequence[str], None] = "a2c6e8f41b93"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "job_resource_observations",
+        sa.Column("job_id", sa.Integer(), nullable=False),
+        sa.Column("model_key", sa.String(length=100), nullable=False),
+        sa.Column("features", sa.LargeBinary(), nullable=False),
+        sa.Column("walltime_s", sa.Integer(), nullable=True),
+        sa.Column("mem_kb", sa.BigInteger(), nullable=True),
+        sa.Column("ncpus", sa.SmallInteger(), nullable=False),
+        sa.Column("observed_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["job_id"], ["jobs.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("job_id"),
+    )
+    op.create_index(
+        op.f("ix_job_resource_observations_model_key"),
+        "job_resource_observations",
+        ["model_key"],
+        unique=False,
+    )
+    op.add_column("jobs", sa.Column("estimated_walltime_s", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("jobs", "estimated_walltime_s")
+    op.drop_index(
+        op.f("ix_job_resource_observations_model_key"), table_name="job_resource_observations"
+    )
+    op.drop_table("job_resource_observations")
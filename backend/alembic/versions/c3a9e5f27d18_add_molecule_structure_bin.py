@@ -0,0 +1,41 @@
+"""add molecules.structure_bin
+
+Revision ID: c3a9e5f27d18
+Revises: b7d4e1f09a63
+Create Date: 2026-10-17 21:14:05.382716
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c3a9e5f27d18"
+down_revision: Union[str, Sequence[str], None] = "b7d4e1f09a63"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "molecules",
+        sa.Column(
+            "structure_bin",
+            sa.LargeBinary(),
+            nullable=True,
+            comment="原子番号 uint8 と座標 float64 (N,3) のバイナリ",
+        ),
+    )
+    op.alter_column("molecules", "structure_xyz", existing_type=sa.Text(), nullable=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # バイナリのみで登録された分子はテキストを持たないため、ダウングレード前に
+    # structure_xyz を埋めておく必要がある
+    op.alter_column("molecules", "structure_xyz", existing_type=sa.Text(), nullable=False)
+    op.drop_column("molecules", "structure_bin")
@@ -0,0 +1,37 @@
+"""add jobs.input_hash
+
+Revision ID: d58f0b3c6e21
+Revises: c3a9e5f27d18
+Create Date: 2026-10-17 22:31:48.120954
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d58f0b3c6e21"
+down_revision: Union[str, Sequence[str], None] = "c3a9e5f27d18"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "jobs",
+        sa.Column(
+            "input_hash",
+            sa.String(length=64),
+            nullable=True,
+            comment="入力生成時の計算設定と分子構造のハッシュ",
+        ),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("jobs", "input_hash")
@@ -0,0 +1,98 @@
+"""add job_results and job_result_arrays
+
+Revision ID: e4b8c2d91f07
+Revises: d58f0b3c6e21
+Create Date: 2026-10-17 23:48:12.602117
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e4b8c2d91f07"
+down_revision: Union[str, Sequence[str], None] = "d58f0b3c6e21"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXED_COLUMNS = (
+    "molecule_id",
+    "bundle_id",
+    "final_energy",
+    "zpe",
+    "enthalpy",
+    "gibbs_free_energy",
+    "homo",
+    "lumo",
+    "dipole_moment",
+    "imaginary_frequencies",
+    "walltime_s",
+    "termination",
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "job_results",
+        sa.Column("job_id", sa.Integer(), nullable=False),
+        sa.Column("molecule_id", sa.Integer(), nullable=False),
+        sa.Column("bundle_id", sa.Integer(), nullable=False),
+        sa.Column("final_energy", sa.Float(), nullable=True),
+        sa.Column("zpe", sa.Float(), nullable=True),
+        sa.Column("enthalpy", sa.Float(), nullable=True),
+        sa.Column("gibbs_free_energy", sa.Float(), nullable=True),
+        sa.Column("homo", sa.Float(), nullable=True),
+        sa.Column("lumo", sa.Float(), nullable=True),
+        sa.Column("dipole_moment", sa.Float(), nullable=True),
+        sa.Column("imaginary_frequencies", sa.SmallInteger(), nullable=True),
+        sa.Column("walltime_s", sa.Integer(), nullable=True),
+        sa.Column("n_atoms", sa.SmallInteger(), nullable=True),
+        sa.Column("optimization_converged", sa.Boolean(), nullable=False),
+        sa.Column("termination", sa.String(length=10), nullable=True),
+        sa.Column("error_link", sa.String(length=10), nullable=True),
+        sa.Column("parsed_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["job_id"], ["jobs.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["molecule_id"], ["molecules.id"]),
+        sa.ForeignKeyConstraint(["bundle_id"], ["job_bundles.id"]),
+        sa.PrimaryKeyConstraint("job_id"),
+    )
+    for column in INDEXED_COLUMNS:
+        op.create_index(
+            op.f(f"ix_job_results_{column}"), "job_results", [column], unique=False
+        )
+    op.create_index(
+        "ix_job_results_bundle_molecule_gibbs",
+        "job_results",
+        ["bundle_id", "molecule_id", "gibbs_free_energy"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_job_results_bundle_molecule_energy",
+        "job_results",
+        ["bundle_id", "molecule_id", "final_energy"],
+        unique=False,
+    )
+    op.create_table(
+        "job_result_arrays",
+        sa.Column("job_id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(length=40), nullable=False),
+        sa.Column("dtype", sa.String(length=8), nullable=False),
+        sa.Column("shape", sa.String(length=64), nullable=False),
+        sa.Column("data", sa.LargeBinary(), nullable=False),
+        sa.ForeignKeyConstraint(["job_id"], ["jobs.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("job_id", "name"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("job_result_arrays")
+    op.drop_index("ix_job_results_bundle_molecule_energy", table_name="job_results")
+    op.drop_index("ix_job_results_bundle_molecule_gibbs", table_name="job_results")
+    for column in reversed(INDEXED_COLUMNS):
+        op.drop_index(op.f(f"ix_job_results_{column}"), table_name="job_results")
+    op.drop_table("job_results")
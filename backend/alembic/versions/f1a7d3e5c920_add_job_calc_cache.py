@@ -0,0 +1,54 @@
+"""add jobs.calc_key and jobs.cached_from_job_id
+
+Revision ID: f1a7d3e5c920
+Revises: e4b8c2d91f07
+Create Date: 2026-10-18 01:06:37.914250
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f1a7d3e5c920"
+down_revision: Union[str, Sequence[str], None] = "e4b8c2d91f07"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "jobs",
+        sa.Column(
+            "calc_key",
+            sa.String(length=64),
+            nullable=True,
+            comment="正規化した構造・電荷・多重度・ルートのハッシュ",
+        ),
+    )
+    op.add_column("jobs", sa.Column("cached_from_job_id", sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        "fk_jobs_cached_from_job_id",
+        "jobs",
+        "jobs",
+        ["cached_from_job_id"],
+        ["id"],
+        ondelete="SET NULL",
+    )
+    op.create_index(op.f("ix_jobs_calc_key"), "jobs", ["calc_key"], unique=False)
+    op.create_index(
+        op.f("ix_jobs_cached_from_job_id"), "jobs", ["cached_from_job_id"], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_jobs_cached_from_job_id"), table_name="jobs")
+    op.drop_index(op.f("ix_jobs_calc_key"), table_name="jobs")
+    op.drop_constraint("fk_jobs_cached_from_job_id", "jobs", type_="foreignkey")
+    op.drop_column("jobs", "cached_from_job_id")
+    op.drop_column("jobs", "calc_key")
@@ -1,27 +1,58 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from typing import List
+from typing import List, Optional
 
 from app.dependencies import get_db, get_current_user
 from app.schemas.job import JobCreate, JobResponse, JobUpdate
+from app.schemas.job_resource import JobResourceSampleResponse, ResourceModelSummary
 from app.crud import job as crud
+from app.crud.server_credential import get_credential_for_job
 from app.models import Job, User
-from app.utils.encryption import decrypt_text
+from app.models.job import JobStatus
 
+import asyncio
 import os
 
 router = APIRouter()
 
+# JobStatus → 画面表示用のスケジューラ状態コード
+SYSTEM_STATUS_CODES = {
+    "queued": "Q",
+    "running": "R",
+    "done": "C",
+    "error": "C",
+    "cancelled": "C",
+}
+
 
 @router.post("/", response_model=JobResponse)
 async def create_job(
     data: JobCreate,
+    use_cache: bool = Query(True),
     db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user),
 ):
-    # molecule 所有者確認など必要ならここで
-    return await crud.create_job(db, data)
+    """ジョブを登録する。同じ計算内容の完了ジョブがあればその結果を引き継いで完了にする
+    （use_cache=false で無効）"""
+    from app.crud.job_bundle import get_bundle_by_id
+    from app.crud.molecule import get_molecule
+    from app.services import gjf_generator
+    from app.services.calc_cache import calc_cache
+
+    molecule = await get_molecule(db, data.molecule_id)
+    bundle = await get_bundle_by_id(db, molecule.bundle_id) if molecule else None  # type: ignore
+    if not bundle or bundle.user_id != user.id:  # type: ignore
+        raise HTTPException(status_code=404, detail="Molecule not found")
+
+    job = await crud.create_job(db, data)
+    await gjf_generator.assign_calc_keys(db, bundle, [job])
+    if await calc_cache.resolve(db, user.id, bundle.id, [job], use_cache):  # type: ignore
+        await db.commit()
+        await db.refresh(job)
+    elif job.calc_key is not None:
+        await db.commit()
+    return job
 
 
 @router.get("/", response_model=List[JobResponse])
@@ -31,6 +62,27 @@ async def list_jobs(
     return await crud.get_jobs_by_user(db, user.id)  # type: ignore
 
 
+@router.get("/cache/stats")
+async def get_calc_cache_stats(
+    db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)
+):
+    """計算キャッシュのヒット・ミス数（プロセス起動後の累計）と結果を引き継いだジョブ数"""
+    from app.services.calc_cache import calc_cache
+
+    return await calc_cache.stats(db, user.id)  # type: ignore
+
+
+@router.get("/resource-models", response_model=List[ResourceModelSummary])
+async def get_resource_models(
+    db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)
+):
+    """リソース推定のモデル（method/basis ごとと全体）の学習データ数・残差・係数"""
+    from app.services.resource_estimator import resource_estimator
+
+    await resource_estimator.ensure_loaded(db)
+    return resource_estimator.models()
+
+
 @router.get("/{id}", response_model=JobResponse)
 async def get_job(
     id: int, db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)
@@ -52,6 +104,15 @@ async def update_job(
     if not job or job.molecule.job_bundle.user_id != user.id:
         raise HTTPException(status_code=404, detail="Job not found")
     if data.status:
+        if data.status != JobStatus.done and (
+            job.status == JobStatus.done
+            or data.status in (JobStatus.error, JobStatus.cancelled)
+        ):
+            from app.services.calc_cache import calc_cache
+
+            # 完了でなくなった・結果を出さずに終わるジョブの結果を引き継いだ（待っていた）
+            # ジョブは、自分で計算するよう投入キューへ登録する
+            await calc_cache.invalidate_sources(db, [job.id])  # type: ignore
         job = await crud.update_job_status(db, job, data.status)
     return job
 
@@ -67,6 +128,10 @@ async def delete_job(
         raise HTTPException(
             status_code=400, detail="Cannot delete running or finished job"
         )
+    from app.services.calc_cache import calc_cache
+
+    # 再実行したジョブの結果を待っていたジョブは、自分で計算するよう投入キューへ登録する
+    await calc_cache.invalidate_sources(db, [job.id])  # type: ignore
     await crud.delete_job(db, job)
 
 
@@ -74,9 +139,12 @@ async def delete_job(
 async def cancel_job(
     id: int, db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)
 ):
-    from services.job_execution import JobExecutionController
-    from crud.job import update_job_status
-    from models import ServerCredential
+    from app.services import remote
+    from app.services.job_execution import JobExecutionController
+    from app.crud.job import update_job_status
+    from app.crud.submission_queue import get_entry_by_job
+    from app.models.submission_queue import SubmissionState
+    from app.services.calc_cache import calc_cache
 
     job = await crud.get_job(db, id)
     if not job or job.molecule.job_bundle.user_id != user.id:
@@ -86,17 +154,25 @@ async def cancel_job(
         raise HTTPException(status_code=400, detail="このジョブはキャンセルできません")
 
     if not job.remote_job_id:  # type: ignore
-        raise HTTPException(status_code=400, detail="remote_job_id が未登録です")
+        # まだ投入キューで待機中ならローカルで取り消すだけでよい
+        entry = await get_entry_by_job(db, id)
+        if entry is None or entry.state != SubmissionState.pending:
+            raise HTTPException(status_code=400, detail="remote_job_id が未登録です")
+        entry.state = SubmissionState.cancelled  # type: ignore
+        # このジョブの結果を待っていたジョブは、自分で計算するよう投入キューへ登録する
+        await calc_cache.invalidate_sources(db, [job.id])  # type: ignore
+        await update_job_status(db, job, "cancelled")
+        return {"result": "cancelled"}
 
-    # 接続情報の取得（1件しか使わない前提）
-    result = await db.execute(select(ServerCredential).limit(1))
-    credential = result.scalars().first()
+    # ジョブを投入したホストの接続情報で取り消す
+    credential = await get_credential_for_job(db, job)
     if not credential:
         raise HTTPException(status_code=500, detail="ServerCredential が未登録です")
 
     try:
         controller = JobExecutionController(credential)
-        controller.cancel_job(job.remote_job_id)  # type: ignore
+        await remote.call(credential, controller.cancel_job, job.remote_job_id)
+        await calc_cache.invalidate_sources(db, [job.id])  # type: ignore
         await update_job_status(db, job, "cancelled")
         return {"result": "cancelled"}
     except Exception as e:
@@ -107,11 +183,14 @@ async def cancel_job(
 
 @router.post("/{id}/relaunch", response_model=JobResponse)
 async def relaunch_job(
-    id: int, db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)
+    id: int,
+    priority: int = Query(0),
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
 ):
-    from services.job_execution import JobExecutionController
-    from crud.job import create_job, update_job_status
-    from models import ServerCredential
+    from app.crud.job import create_job
+    from app.crud.submission_queue import enqueue_jobs
+    from app.services.submission_dispatcher import submission_dispatcher
 
     old_job = await crud.get_job(db, id)
     if not old_job or old_job.molecule.job_bundle.user_id != user.id:
@@ -130,72 +209,196 @@ async def relaunch_job(
         parent_job_id=old_job.id,  # type: ignore
     )
     new_job = await create_job(db, new_job_data)
+    from app.services import gjf_generator
+    from app.services.calc_cache import calc_cache
 
-    # 接続情報取得
-    result = await db.execute(select(ServerCredential).limit(1))
-    credential = result.scalars().first()
-    if not credential:
-        raise HTTPException(status_code=500, detail="ServerCredential が未登録です")
+    # 再実行するジョブの結果を引き継いだジョブは cached_from_job_id を新しいジョブに付け替えて
+    # 未完了に戻し、新しいジョブの結果を取り込んだとき（job_results.ingest_log）に引き継がせる。
+    # 再実行は明示的な指示なのでキャッシュは引かないが、新しいジョブは以後の引き継ぎ元になる
+    await calc_cache.invalidate_sources(db, [old_job.id], replacement=new_job)  # type: ignore
+    await gjf_generator.assign_calc_keys(db, old_job.molecule.job_bundle, [new_job])
+    await db.commit()
 
-    try:
-        controller = JobExecutionController(credential)
-        job_id = controller.submit_job(
-            local_gjf_path=old_job.gjf_path,  # type: ignore
-            remote_dir=os.path.dirname(
-                old_job.log_path  # type: ignore
-            ),  # log_path もしくは molecule/job_id で構成可
-            filename="input.gjf",
-        )
-        new_job.remote_job_id = job_id  # type: ignore
-        new_job.status = "running"  # type: ignore
-        await db.commit()
-        await db.refresh(new_job)
-        return new_job
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"再投入に失敗しました: {str(e)}")
+    # クラスタへは直接投げず、投入キュー経由で空きができ次第投入する
+    await enqueue_jobs(db, [new_job], user.id, priority)  # type: ignore
+    submission_dispatcher.wake()
+    await db.refresh(new_job)
+    return new_job
 
 
 @router.get("/{id}/log")
 async def get_job_log(
-    id: int, db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)
+    id: int,
+    since_offset: Optional[int] = Query(None, ge=0),
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
 ):
-    from services.job_monitor import get_log_tail_via_ssh, get_job_status_via_qstat
-    from services.job_execution import JobExecutionController
-    from models import ServerCredential
+    from app.services import log_mirror
+    from app.services.job_monitor import get_job_snapshot
 
     job = await crud.get_job(db, id)
     if not job or job.molecule.job_bundle.user_id != user.id:
         raise HTTPException(status_code=404, detail="ジョブが見つかりません")
 
-    result = await db.execute(select(ServerCredential).limit(1))
-    credential = result.scalars().first()
+    if not job.log_path:  # type: ignore
+        raise HTTPException(status_code=400, detail="log_path が未登録です")
+
+    credential = await get_credential_for_job(db, job)
     if not credential:
         raise HTTPException(status_code=500, detail="接続情報が未設定です")
 
-    host = credential.host
-    usernm = credential.username
-    password = decrypt_text(credential.password_encrypted)  # type: ignore
-    log_path = job.log_path
+    local_path = log_mirror.mirror_path(user, job)
 
     try:
-        # ログ末尾取得
-        log_tail = await get_log_tail_via_ssh(host, usernm, password, log_path)  # type: ignore
-        is_complete = (
-            "Normal termination" in log_tail or "Error termination" in log_tail
+        # ログの stat とジョブディレクトリの一覧を1往復で取得し、
+        # サイズが変わっているときだけ差分をミラーへ追記する
+        snapshot = await get_job_snapshot(credential, job.log_path, tail_lines=0)  # type: ignore
+        log_size = await log_mirror.sync_log(
+            credential, job.log_path, local_path, snapshot.log_size  # type: ignore
         )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"ログ取得に失敗しました: {str(e)}")
+
+    if since_offset is None:
+        log_content, next_offset = log_mirror.read_tail(local_path)
+    else:
+        log_content, next_offset = log_mirror.read_delta(local_path, since_offset)
+
+    return {
+        "log_content": log_content,
+        "is_complete": log_mirror.termination_state(local_path) is not None,
+        # 状態はバックグラウンドの qstat ポーラーが更新した DB の値を返す
+        "system_status": SYSTEM_STATUS_CODES.get(job.status, "?"),  # type: ignore
+        "job_id": id,
+        "remote_job_id": job.remote_job_id,
+        "offset": since_offset,
+        "next_offset": next_offset,
+        "log_size": log_size,
+        "files": snapshot.files,
+    }
+
+
+@router.get("/{id}/remote")
+async def get_job_remote_detail(
+    id: int, db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)
+):
+    """ログ末尾・qstat・ログの stat・ジョブディレクトリ一覧を1往復で取得"""
+    from app.services.job_monitor import get_job_snapshot
+
+    job = await crud.get_job(db, id)
+    if not job or job.molecule.job_bundle.user_id != user.id:
+        raise HTTPException(status_code=404, detail="ジョブが見つかりません")
+
+    if not job.log_path:  # type: ignore
+        raise HTTPException(status_code=400, detail="log_path が未登録です")
+
+    credential = await get_credential_for_job(db, job)
+    if not credential:
+        raise HTTPException(status_code=500, detail="接続情報が未設定です")
 
-        # qstatから状態取得
-        remote_status = await get_job_status_via_qstat(
-            host, usernm, password, job.remote_job_id or ""  # type: ignore
+    try:
+        snapshot = await get_job_snapshot(
+            credential, job.log_path, job.remote_job_id  # type: ignore
         )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"ジョブ情報の取得に失敗しました: {str(e)}")
+
+    return {
+        "job_id": id,
+        "remote_job_id": job.remote_job_id,
+        "status": job.status,
+        "qstat_state": snapshot.qstat_state,
+        "log_tail": snapshot.log_tail,
+        "log_size": snapshot.log_size,
+        "log_mtime": snapshot.log_mtime,
+        "files": snapshot.files,
+    }
+
+
+@router.get("/{id}/log/stream")
+async def stream_job_log(
+    id: int,
+    since_offset: Optional[int] = Query(None, ge=0),
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """ログ差分と状態遷移を Server-Sent Events で配信（ジョブごとにリモート読み出しは1本）"""
+    from app.services import log_mirror
+    from app.services.log_stream import log_stream_hub, LOG_STREAM_INTERVAL
+
+    job = await crud.get_job(db, id)
+    if not job or job.molecule.job_bundle.user_id != user.id:
+        raise HTTPException(status_code=404, detail="ジョブが見つかりません")
+
+    if not job.log_path:  # type: ignore
+        raise HTTPException(status_code=400, detail="log_path が未登録です")
+
+    credential = await get_credential_for_job(db, job)
+    if not credential:
+        raise HTTPException(status_code=500, detail="接続情報が未設定です")
 
-        return {
-            "log_content": log_tail,
-            "is_complete": is_complete,
-            "system_status": remote_status,
-            "job_id": id,
-            "remote_job_id": job.remote_job_id,
-        }
+    queue = log_stream_hub.subscribe(
+        job.id,  # type: ignore
+        credential,
+        job.log_path,  # type: ignore
+        log_mirror.mirror_path(user, job),
+        job.status,  # type: ignore
+        since_offset,
+    )
+    # ストリーム中に DB 接続を握り続けないよう先に解放する
+    await db.close()
+
+    async def event_source():
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(
+                        queue.get(), timeout=LOG_STREAM_INTERVAL * 10
+                    )
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is None:
+                    break
+                yield event.to_sse()
+        finally:
+            log_stream_hub.unsubscribe(job.id, queue)  # type: ignore
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/{id}/resources", response_model=List[JobResourceSampleResponse])
+async def get_job_resources(
+    id: int, db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)
+):
+    """qstat -x から記録した使用リソース（walltime・cput・mem）の時系列"""
+    from app.crud.job_resource import get_resource_samples
+
+    job = await crud.get_job(db, id)
+    if not job or job.molecule.job_bundle.user_id != user.id:
+        raise HTTPException(status_code=404, detail="ジョブが見つかりません")
+    return await get_resource_samples(db, id)
 
+
+@router.post("/{id}/retrieve")
+async def retrieve_job_outputs(
+    id: int, db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)
+):
+    """完了ジョブの出力ファイル (.log/.chk/.fchk) をローカルへ取得（途中からの再開可）"""
+    from app.services.output_retrieval import output_retriever
+
+    job = await crud.get_job(db, id)
+    if not job or job.molecule.job_bundle.user_id != user.id:
+        raise HTTPException(status_code=404, detail="ジョブが見つかりません")
+    if job.status != "done":
+        raise HTTPException(status_code=400, detail="完了したジョブのみ取得できます")
+
+    try:
+        files = await output_retriever.retrieve(id)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"ログ取得に失敗しました: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"出力の取得に失敗しました: {str(e)}")
+    return {"files": [file.local_path for file in files]}
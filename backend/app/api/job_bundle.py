@@ -1,14 +1,50 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 from typing import List
+import asyncio
+import base64
+import os
 
-from app.schemas.job_bundle import JobBundleCreate, JobBundleUpdate, JobBundleResponse
+from app.schemas.job_bundle import (
+    JobBundleCreate,
+    JobBundleUpdate,
+    JobBundleResponse,
+    BundleSubmitResult,
+    BundleSubmitFailure,
+    DedupResult,
+    InputGenerationResult,
+    TransferMode,
+)
+from app.schemas.upload import DedupMode, GJFUploadResult, StructureCheckResult
+from app.schemas.job_resource import (
+    BundleResourceUsage,
+    MoleculeResourceEstimate,
+    ResourceEstimateResponse,
+)
 from app.models.job_bundle import JobBundle
 from app.models.user import User
 from app.dependencies import get_db, get_current_user
 from app.crud import job_bundle as crud
+from app.crud import job as crud_job
+from app.crud import molecule as crud_mol
+from app.crud import submission_queue as crud_queue
+from app.crud import job_resource as crud_resource
+from app.services import conformer_dedup, gjf_generator
+from app.services.calc_cache import calc_cache
+from app.services.resource_estimator import resource_estimator
+from app.services.resource_usage import summarize_bundle_usage
+from app.services.structure_validation import (
+    STRUCTURE_CHECK_ON_SUBMIT,
+    check_job_structures,
+    check_many,
+)
+from app.services.submission_dispatcher import submission_dispatcher
+from app.utils.geometry import encode_geometry
+from app.utils.gjf_parser import GJFParseError, molecule_fields, parse_gjf_file
+from app.utils.zmatrix import cartesian_geometries
 
 router = APIRouter()
 
@@ -69,3 +105,308 @@ async def delete_bundle(
             status_code=400, detail="分子が登録されているバンドルは削除できません"
         )
     await crud.delete_bundle(db, bundle)
+
+
+async def _drop_invalid_structures(
+    db: AsyncSession, jobs: list, failed: list[BundleSubmitFailure]
+) -> list:
+    """構造の検査でエラーになったジョブを failed に移し、残りを返す"""
+    checks = await check_job_structures(db, jobs)
+    valid = []
+    for job in jobs:
+        check = checks.get(job.id)
+        if check is not None and check.errors:
+            failed.append(BundleSubmitFailure(job_id=job.id, error="; ".join(check.errors)))
+        else:
+            valid.append(job)
+    return valid
+
+
+@router.post("/{id}/submit", response_model=BundleSubmitResult)
+async def submit_bundle(
+    id: int,
+    transfer_mode: TransferMode = Query(TransferMode.auto),
+    priority: int = Query(0),
+    use_cache: bool = Query(True),
+    check_structure: bool = Query(STRUCTURE_CHECK_ON_SUBMIT),
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """バンドル内の未投入ジョブを投入キューへ登録（ディスパッチャがまとめて一括投入する）。
+    同じ計算内容の完了ジョブがあるものは投入せずその結果を引き継ぐ（use_cache=false で無効）。
+    構造の検査でエラーになったジョブは投入しない（check_structure=false で検査しない）"""
+    bundle = await crud.get_bundle_by_id(db, id)
+    if not bundle or bundle.user_id != user.id:  # type: ignore
+        raise HTTPException(status_code=404, detail="JobBundle not found")
+
+    jobs = await crud_job.get_unsubmitted_jobs_by_bundle(db, id)
+    duplicates = await crud_mol.get_duplicate_molecule_ids(db, id)
+    failed: list[BundleSubmitFailure] = []
+    targets = []
+    skipped = 0
+    for job in jobs:
+        if job.molecule_id in duplicates:
+            skipped += 1
+            continue
+        if not os.path.exists(job.gjf_path):  # type: ignore
+            failed.append(
+                BundleSubmitFailure(job_id=job.id, error=".gjf ファイルが存在しません")  # type: ignore
+            )
+            continue
+        targets.append(job)
+    if check_structure:
+        targets = await _drop_invalid_structures(db, targets, failed)
+
+    await gjf_generator.assign_calc_keys(db, bundle, targets)
+    cached = await calc_cache.resolve(db, user.id, id, targets, use_cache)  # type: ignore
+    if cached:
+        await db.commit()
+        targets = [job for job in targets if job not in cached]
+
+    if targets:
+        # 生成後に増えた学習データで、推定値で埋めた %Mem・%NProcShared を書き直す
+        await gjf_generator.refresh_resources(db, bundle, user, targets)
+        await crud_queue.enqueue_jobs(
+            db, targets, user.id, priority, transfer_mode.value  # type: ignore
+        )
+        submission_dispatcher.wake()
+
+    return BundleSubmitResult(
+        enqueued=len(targets), failed=failed, cached=len(cached), duplicates=skipped
+    )
+
+
+@router.get("/{id}/resource-usage", response_model=BundleResourceUsage)
+async def get_bundle_resource_usage(
+    id: int, db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)
+):
+    """バンドル内ジョブのピーク使用量と CPU・メモリ効率"""
+    bundle = await crud.get_bundle_by_id(db, id)
+    if not bundle or bundle.user_id != user.id:  # type: ignore
+        raise HTTPException(status_code=404, detail="JobBundle not found")
+    peaks = await crud_resource.get_bundle_resource_peaks(db, id)
+    return summarize_bundle_usage(id, peaks)
+
+
+@router.get("/{id}/resource-estimates", response_model=List[MoleculeResourceEstimate])
+async def get_bundle_resource_estimates(
+    id: int, db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)
+):
+    """分子ごとの %Mem・%NProcShared・walltime の推定値と信頼度（完了ジョブから学習）"""
+    bundle = await crud.get_bundle_by_id(db, id)
+    if not bundle or bundle.user_id != user.id:  # type: ignore
+        raise HTTPException(status_code=404, detail="JobBundle not found")
+    await resource_estimator.ensure_loaded(db)
+    templates = gjf_generator.bundle_templates(bundle)
+    estimates = []
+    for molecule in await gjf_generator.load_bundle_molecules(db, id):
+        estimate = gjf_generator.estimate_resources(templates.for_molecule(molecule.name), molecule)
+        estimates.append(
+            MoleculeResourceEstimate(
+                molecule_id=molecule.id,
+                name=molecule.name,
+                estimate=ResourceEstimateResponse.from_orm(estimate) if estimate else None,
+            )
+        )
+    return estimates
+
+
+@router.get("/{id}/inputs.zip")
+async def download_bundle_inputs(
+    id: int, db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)
+):
+    """calc_settings から全分子の .gjf を生成し、zip にしながら返す"""
+    bundle = await crud.get_bundle_by_id(db, id)
+    if not bundle or bundle.user_id != user.id:  # type: ignore
+        raise HTTPException(status_code=404, detail="JobBundle not found")
+    templates = gjf_generator.bundle_templates(bundle)
+    molecules = await gjf_generator.load_bundle_molecules(db, id)
+    return StreamingResponse(
+        gjf_generator.stream_zip(gjf_generator.bundle_zip_entries(id, templates, molecules)),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="bundle_{id}_inputs.zip"'},
+    )
+
+
+@router.post("/{id}/inputs", response_model=InputGenerationResult)
+async def generate_bundle_inputs(
+    id: int,
+    submit: bool = Query(False),
+    transfer_mode: TransferMode = Query(TransferMode.auto),
+    priority: int = Query(0),
+    use_cache: bool = Query(True),
+    check_structure: bool = Query(STRUCTURE_CHECK_ON_SUBMIT),
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """calc_settings から入力を生成してジョブに登録する（設定・構造が変わった分子だけ書き直す）。
+    submit=true なら生成したジョブのうち構造の検査を通ったものを投入キューへ登録する。
+    同じ計算内容の完了ジョブがある分子はその結果を引き継ぐ（use_cache=false で無効）"""
+    bundle = await crud.get_bundle_by_id(db, id)
+    if not bundle or bundle.user_id != user.id:  # type: ignore
+        raise HTTPException(status_code=404, detail="JobBundle not found")
+
+    outcome = await gjf_generator.generate_bundle_inputs(db, bundle, user, use_cache)
+    enqueued = 0
+    failed: list[BundleSubmitFailure] = []
+    targets = outcome.written
+    if submit and check_structure:
+        targets = await _drop_invalid_structures(db, targets, failed)
+    if submit and targets:
+        await crud_queue.enqueue_jobs(
+            db, targets, user.id, priority, transfer_mode.value  # type: ignore
+        )
+        submission_dispatcher.wake()
+        enqueued = len(targets)
+
+    return InputGenerationResult(
+        generated=len(outcome.written),
+        unchanged=outcome.unchanged,
+        created_jobs=outcome.created,
+        enqueued=enqueued,
+        cached=outcome.cached,
+        failed=failed,
+    )
+
+
+@router.post("/{id}/dedup", response_model=DedupResult)
+async def dedup_bundle_conformers(
+    id: int,
+    threshold: float = Query(conformer_dedup.DEDUP_RMSD_THRESHOLD, ge=0),
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """バンドル内の配座を重ね合わせて RMSD が threshold [Å] 未満のものに重複の印を付け直す。
+    重複とした分子は入力の生成・投入の対象から外れる（threshold=0 で印をすべて外す）"""
+    bundle = await crud.get_bundle_by_id(db, id)
+    if not bundle or bundle.user_id != user.id:  # type: ignore
+        raise HTTPException(status_code=404, detail="JobBundle not found")
+    outcome = await conformer_dedup.dedup_bundle(db, id, threshold)
+    return DedupResult(
+        molecules=outcome.molecules,
+        duplicates=outcome.duplicates,
+        representatives=outcome.representatives,
+        threshold=outcome.threshold,
+    )
+
+
+@router.post("/{bundle_id}/upload-gjf", response_model=List[GJFUploadResult])
+async def upload_gjf_files(
+    bundle_id: int,
+    files: List[UploadFile] = File(...),
+    dedup: DedupMode = Query(DedupMode.off),
+    rmsd_threshold: float = Query(conformer_dedup.DEDUP_RMSD_THRESHOLD, gt=0),
+    allow_invalid: bool = Query(False),
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """GJF を分子として登録する。
+
+    構造（原子の重なり・電子数と電荷・多重度の整合・断片）を検査して結果を check に入れ、
+    エラーのあるファイルは allow_invalid=true でなければ登録しない。
+    dedup=mark|skip なら既存の分子・先のファイルと RMSD が rmsd_threshold [Å] 未満の
+    配座に重複の印を付ける／登録しない"""
+    bundle = await crud.get_bundle_by_id(db, bundle_id)
+    if not bundle or bundle.user_id != user.id:  # type: ignore
+        raise HTTPException(status_code=404, detail="JobBundle not found")
+
+    results = []
+    filenames = set()
+    parsed_files = []  # (result, GJFFile)
+
+    for file in files:
+        result = {"name": file.filename, "status": "success"}
+        results.append(result)
+        if file.filename in filenames:
+            result["status"] = "error"
+            result["error_message"] = "ファイル名が重複しています"
+            continue
+        filenames.add(file.filename)
+
+        content = await file.read()
+        try:
+            gjf = parse_gjf_file(content.decode())
+            result.update(molecule_fields(gjf))
+            parsed_files.append((result, gjf))
+        except GJFParseError as e:
+            result["status"] = "error"
+            result["error_message"] = str(e)
+            result["error_line"] = e.line_no
+        except Exception as e:
+            result["status"] = "error"
+            result["error_message"] = str(e)
+
+    # Z-matrix を含めて全ファイルの Cartesian 座標をまとめて求める
+    geometries = cartesian_geometries(
+        [(gjf.first.molecule, gjf.first.route) for _, gjf in parsed_files]
+    )
+    checks = await asyncio.to_thread(
+        check_many,
+        [
+            (*geometry, result["charge"], result["multiplicity"])
+            for (result, _), geometry in zip(parsed_files, geometries)
+        ],
+    )
+    for (result, _), check in zip(parsed_files, checks):
+        result["check"] = StructureCheckResult.from_orm(check)
+        if check.errors and not allow_invalid:  # type: ignore
+            result["status"] = "error"
+            result["error_message"] = "; ".join(check.errors)  # type: ignore
+    # 登録しないファイルは重複の照合にも使わない
+    geometries = [
+        geometry if result["status"] == "success" else None
+        for (result, _), geometry in zip(parsed_files, geometries)
+    ]
+
+    matches = [None] * len(parsed_files)
+    if dedup != DedupMode.off:
+        matches = await conformer_dedup.match_uploaded_conformers(
+            db,
+            bundle_id,
+            [
+                (result["name"], result["charge"], result["multiplicity"], geometry)
+                for (result, _), geometry in zip(parsed_files, geometries)
+            ],
+            rmsd_threshold,
+        )
+
+    created_ids: list[int | None] = []
+    for (result, _), geometry, match in zip(parsed_files, geometries, matches):
+        created_ids.append(None)
+        if geometry is None:
+            continue
+        representative_id = None
+        if match is not None:
+            representative_id = (
+                match.molecule_id
+                if match.upload_index is None
+                else created_ids[match.upload_index]
+            )
+        if representative_id is not None:
+            result["duplicate_of"] = match.name  # type: ignore
+            result["duplicate_rmsd"] = match.rmsd  # type: ignore
+            if dedup == DedupMode.skip:
+                result["status"] = "duplicate"
+                continue
+        try:
+            molecule = await crud_mol.create_molecule(
+                db,
+                crud_mol.MoleculeCreate(
+                    name=result["name"],
+                    charge=result["charge"],
+                    multiplicity=result["multiplicity"],
+                    structure_xyz=result["structure_xyz"],
+                    structure_bin=base64.b64encode(encode_geometry(*geometry)).decode(),
+                    bundle_id=bundle_id,
+                ),
+            )
+            created_ids[-1] = molecule.id  # type: ignore
+            if representative_id is not None:
+                molecule.duplicate_of_id = representative_id  # type: ignore
+                molecule.duplicate_rmsd = match.rmsd  # type: ignore
+                await db.commit()
+        except Exception as e:
+            result["status"] = "error"
+            result["error_message"] = str(e)
+
+    return results
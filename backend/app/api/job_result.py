@@ -0,0 +1,115 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+
+from app.dependencies import get_db, get_current_user
+from app.schemas.job_result import (
+    JobResultResponse,
+    ResultArrayInfo,
+    ResultArrayResponse,
+    ResultColumn,
+)
+from app.crud import job as crud_job
+from app.crud import job_result as crud
+from app.models import User
+
+router = APIRouter()
+
+
+def _array_info(row) -> ResultArrayInfo:
+    return ResultArrayInfo(
+        name=row.name, dtype=row.dtype, shape=[int(n) for n in row.shape.split(",") if n]
+    )
+
+
+async def _get_owned_job(db: AsyncSession, job_id: int, user: User):
+    job = await crud_job.get_job(db, job_id)
+    if not job or job.molecule.job_bundle.user_id != user.id:
+        raise HTTPException(status_code=404, detail="ジョブが見つかりません")
+    return job
+
+
+@router.get("/", response_model=List[JobResultResponse])
+async def search_results(
+    bundle_id: Optional[List[int]] = Query(None),
+    molecule_id: Optional[int] = Query(None),
+    has_imaginary: Optional[bool] = Query(None),
+    termination: Optional[str] = Query(None, regex="^(normal|error)$"),
+    order_by: ResultColumn = Query(ResultColumn.final_energy),
+    descending: bool = Query(False),
+    best_per_molecule: bool = Query(False),
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """バンドルをまたいだ結果の検索（例: ?bundle_id=3&order_by=gibbs_free_energy&best_per_molecule=true、
+    ?has_imaginary=true）。配列は含めない"""
+    return await crud.query_results(
+        db,
+        user.id,  # type: ignore
+        bundle_ids=bundle_id,
+        molecule_id=molecule_id,
+        has_imaginary=has_imaginary,
+        termination=termination,
+        order_by=order_by,
+        descending=descending,
+        best_per_molecule=best_per_molecule,
+        limit=limit,
+        offset=offset,
+    )
+
+
+@router.get("/{job_id}", response_model=JobResultResponse)
+async def get_job_result(
+    job_id: int, db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)
+):
+    job = await _get_owned_job(db, job_id, user)
+    result = await crud.get_job_result(db, job_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="結果がまだありません")
+    # 計算キャッシュで結果を引き継いだジョブの配列は元ジョブのものを返す
+    array_job_id = job.cached_from_job_id or job_id
+    response = JobResultResponse.from_orm(result)
+    response.arrays = [
+        _array_info(row) for row in await crud.get_result_array_infos(db, array_job_id)
+    ]
+    return response
+
+
+@router.get("/{job_id}/arrays/{name}", response_model=ResultArrayResponse)
+async def get_job_result_array(
+    job_id: int,
+    name: str,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    job = await _get_owned_job(db, job_id, user)
+    row = await crud.get_result_array(db, job.cached_from_job_id or job_id, name)
+    if row is None:
+        raise HTTPException(status_code=404, detail=f"配列 {name} はありません")
+    info = _array_info(row)
+    return ResultArrayResponse(**info.dict(), data=crud.decode_array(row).tolist())
+
+
+@router.post("/{job_id}/parse", response_model=JobResultResponse)
+async def reparse_job_result(
+    job_id: int, db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)
+):
+    """取得済みのログを解析し直して結果を置き換える"""
+    from app.services import job_results
+    from app.services.output_retrieval import output_dir
+
+    await _get_owned_job(db, job_id, user)
+    log_path = job_results.find_log_in_dir(output_dir(user.local_base_dir, job_id))  # type: ignore
+    if log_path is None:
+        raise HTTPException(status_code=400, detail="ログが未取得です（先に /jobs/{id}/retrieve）")
+    try:
+        result = await job_results.ingest_log(job_id, log_path)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"ログの解析に失敗しました: {str(e)}")
+    if result is None:
+        raise HTTPException(status_code=404, detail="ジョブが見つかりません")
+    response = JobResultResponse.from_orm(result)
+    response.arrays = [_array_info(row) for row in await crud.get_result_array_infos(db, job_id)]
+    return response
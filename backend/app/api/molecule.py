@@ -1,48 +1,89 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
 from app.models.molecule import Molecule
 from app.models.user import User
 from app.schemas.molecule import MoleculeCreate, MoleculeUpdate, MoleculeResponse
+from app.schemas.upload import StructureCheckResult
 from app.crud import molecule as crud_mol, job_bundle as crud_bundle
 from app.dependencies import get_db, get_current_user
+from app.utils.geometry import decode_geometry, format_xyz
+from app.utils.structure_check import check_structure
 
 router = APIRouter()
 
+# 応答に含める構造の形式: xyz（テキスト）/ binary（base64 のバイナリ）/ both
+StructureFormat = Query("xyz", regex="^(xyz|binary|both)$")
+
+
+def to_response(molecule: Molecule, format: str = "xyz") -> MoleculeResponse:
+    response = MoleculeResponse.from_orm(molecule)
+    if format != "binary" and response.structure_xyz is None and molecule.structure_bin:
+        response.structure_xyz = format_xyz(*decode_geometry(molecule.structure_bin))  # type: ignore
+    if format == "xyz":
+        response.structure_bin = None
+    elif format == "binary":
+        response.structure_xyz = None
+    return response
+
 
 @router.post("/", response_model=MoleculeResponse)
 async def create_molecule(
     data: MoleculeCreate,
+    format: str = StructureFormat,
     db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user),
 ):
     # 所有バンドルの確認など行うならここでチェック
-    return await crud_mol.create_molecule(db, data)
+    return to_response(await crud_mol.create_molecule(db, data), format)
 
 
 @router.get("/", response_model=List[MoleculeResponse])
 async def list_molecules(
-    db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)
+    format: str = StructureFormat,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
 ):
-    return await crud_mol.get_all_molecules_by_user(db, user.id)  # type: ignore
+    molecules = await crud_mol.get_all_molecules_by_user(db, user.id)  # type: ignore
+    return [to_response(m, format) for m in molecules]
 
 
 @router.get("/{id}", response_model=MoleculeResponse)
 async def get_molecule(
+    id: int,
+    format: str = StructureFormat,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    molecule = await crud_mol.get_molecule(db, id)
+    bundle = await crud_bundle.get_bundle_by_id(db, molecule.bundle_id)  # type: ignore
+    if not molecule or bundle.user_id != user.id:  # type: ignore
+        raise HTTPException(status_code=404, detail="Molecule not found")
+    return to_response(molecule, format)
+
+
+@router.get("/{id}/check", response_model=StructureCheckResult)
+async def check_molecule_structure(
     id: int, db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)
 ):
+    """構造を検査する（原子の重なり・結合・断片、電子数と電荷・多重度の整合）"""
     molecule = await crud_mol.get_molecule(db, id)
     bundle = await crud_bundle.get_bundle_by_id(db, molecule.bundle_id)  # type: ignore
     if not molecule or bundle.user_id != user.id:  # type: ignore
         raise HTTPException(status_code=404, detail="Molecule not found")
-    return molecule
+    if molecule.structure_bin is None:
+        raise HTTPException(status_code=400, detail="構造を読めない分子です")
+    numbers, coordinates = decode_geometry(molecule.structure_bin)  # type: ignore
+    check = check_structure(numbers, coordinates, molecule.charge, molecule.multiplicity)  # type: ignore
+    return StructureCheckResult.from_orm(check)
 
 
 @router.patch("/{id}", response_model=MoleculeResponse)
 async def update_molecule(
     id: int,
     data: MoleculeUpdate,
+    format: str = StructureFormat,
     db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user),
 ):
@@ -51,7 +92,7 @@ async def update_molecule(
 
     if not molecule or bundle.user_id != user.id:  # type: ignore
         raise HTTPException(status_code=404, detail="Molecule not found")
-    return await crud_mol.update_molecule(db, molecule, data)
+    return to_response(await crud_mol.update_molecule(db, molecule, data), format)
 
 
 @router.delete("/{id}", status_code=204)
@@ -62,4 +103,15 @@ async def delete_molecule(
     bundle = await crud_bundle.get_bundle_by_id(db, molecule.bundle_id)  # type: ignore
     if not molecule or bundle.user_id != user.id:  # type: ignore
         raise HTTPException(status_code=404, detail="Molecule not found")
+    from sqlalchemy import select
+    from app.models import Job
+    from app.services.calc_cache import calc_cache
+    from app.services.resource_estimator import resource_estimator
+
+    # 削除される分子のジョブから結果を引き継いだジョブは未投入に戻す
+    result = await db.execute(select(Job.id).where(Job.molecule_id == molecule.id))
+    job_ids = list(result.scalars().all())
+    await calc_cache.invalidate_sources(db, job_ids)
     await crud_mol.delete_molecule(db, molecule)
+    # 学習データの行は ON DELETE CASCADE で消えるので、推定モデルからも外す
+    resource_estimator.forget(job_ids)
@@ -1,4 +1,3 @@
-from io import StringIO
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 import paramiko
@@ -17,6 +16,8 @@ from app.crud.server_credential import (
 )
 from app.dependencies import get_db
 from app.models.server_credential import AuthMethod
+from app.services.credential_cache import load_private_key
+from app.services import remote
 
 
 router = APIRouter()
@@ -127,13 +128,19 @@ async def test_connection(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="ssh_key is required for auth_method=ssh_key",
             )
-        # 文字列から RSAKey をロード
-        pkey = paramiko.RSAKey.from_private_key(StringIO(data.ssh_key))
+        # 文字列から秘密鍵をロード（RSA / Ed25519 / ECDSA）
+        pkey = load_private_key(data.ssh_key)
         conn_kwargs["pkey"] = pkey
 
+    def _connect():
+        try:
+            client.connect(**conn_kwargs)
+        finally:
+            client.close()
+
     try:
-        client.connect(**conn_kwargs)
-        client.close()
+        # 接続処理はブロッキングなのでイベントループ外で実行
+        await remote.offload(data.host, _connect, timeout=conn_kwargs["timeout"] * 3)
         return {"result": "接続成功"}
     except Exception as e:
         raise HTTPException(
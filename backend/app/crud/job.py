@@ -1,7 +1,8 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update, case, cast, func
 from sqlalchemy.orm import selectinload
-from app.models import Job, Molecule, JobBundle
+from app.models import Job, Molecule, JobBundle, SubmissionQueueEntry
+from app.models.job import JobStatus
 from app.schemas.job import JobCreate
 from datetime import datetime, timezone
 import uuid
@@ -19,7 +20,7 @@ async def create_job(db: AsyncSession, data: JobCreate) -> Job:
 async def get_job(db: AsyncSession, job_id: int) -> Job:
     result = await db.execute(
         select(Job)
-        .options(selectinload(Job.molecule).selectinload(Job.molecule.job_bundle))
+        .options(selectinload(Job.molecule).selectinload(Molecule.job_bundle))
         .where(Job.id == job_id)
     )
     return result.scalars().first()
@@ -54,6 +55,63 @@ async def update_job_status(db: AsyncSession, job: Job, status: str) -> Job:
     return job
 
 
+async def get_unsubmitted_jobs_by_bundle(db: AsyncSession, bundle_id: int) -> list[Job]:
+    """バンドル内でまだクラスタへ投入も投入待ち登録もしていないジョブを取得
+    （再実行したジョブの結果を待っているジョブは除く）"""
+    result = await db.execute(
+        select(Job)
+        .join(Molecule, Job.molecule_id == Molecule.id)
+        .outerjoin(SubmissionQueueEntry, SubmissionQueueEntry.job_id == Job.id)
+        .where(
+            Molecule.bundle_id == bundle_id,
+            Job.status == JobStatus.queued,
+            Job.remote_job_id.is_(None),
+            Job.cached_from_job_id.is_(None),
+            SubmissionQueueEntry.id.is_(None),
+        )
+        .order_by(Job.id)
+    )
+    return list(result.scalars().all())
+
+
+async def get_active_jobs(db: AsyncSession) -> list[Job]:
+    """クラスタ上で待機中・実行中のジョブを取得"""
+    result = await db.execute(
+        select(Job).where(
+            Job.status.in_([JobStatus.queued, JobStatus.running]),
+            Job.remote_job_id.isnot(None),
+        )
+    )
+    return list(result.scalars().all())
+
+
+async def count_active_jobs_by_credential(db: AsyncSession) -> dict[int | None, int]:
+    """投入先の接続情報ごとに、クラスタ上で待機中・実行中のジョブ数を集計"""
+    result = await db.execute(
+        select(Job.server_credential_id, func.count(Job.id))
+        .where(
+            Job.status.in_([JobStatus.queued, JobStatus.running]),
+            Job.remote_job_id.isnot(None),
+        )
+        .group_by(Job.server_credential_id)
+    )
+    return {credential_id: count for credential_id, count in result.all()}
+
+
+async def bulk_update_job_status(db: AsyncSession, statuses: dict[int, str]) -> int:
+    """複数ジョブのステータスを1回の UPDATE 文で更新"""
+    if not statuses:
+        return 0
+    result = await db.execute(
+        update(Job)
+        .where(Job.id.in_(list(statuses)))
+        .values(status=cast(case(statuses, value=Job.id), Job.status.type))
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount
+
+
 async def delete_job(db: AsyncSession, job: Job):
     await db.delete(job)
     await db.commit()
@@ -0,0 +1,64 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, insert, func
+from app.models import Job, Molecule, JobResourceSample
+
+
+async def add_resource_samples(db: AsyncSession, samples: list[dict]) -> int:
+    """ポーリング1回分のサンプルを1回の INSERT でまとめて記録"""
+    if not samples:
+        return 0
+    await db.execute(insert(JobResourceSample), samples)
+    await db.commit()
+    return len(samples)
+
+
+async def get_resource_samples(db: AsyncSession, job_id: int) -> list[JobResourceSample]:
+    result = await db.execute(
+        select(JobResourceSample)
+        .where(JobResourceSample.job_id == job_id)
+        .order_by(JobResourceSample.sampled_at)
+    )
+    return list(result.scalars().all())
+
+
+async def get_bundle_resource_peaks(db: AsyncSession, bundle_id: int) -> list:
+    """バンドル内の各ジョブについて使用量のピーク値を集計"""
+    result = await db.execute(
+        select(
+            JobResourceSample.job_id,
+            func.max(JobResourceSample.walltime_s).label("walltime_s"),
+            func.max(JobResourceSample.cput_s).label("cput_s"),
+            func.max(JobResourceSample.mem_kb).label("max_mem_kb"),
+            func.max(JobResourceSample.ncpus).label("ncpus"),
+            func.max(JobResourceSample.mem_limit_kb).label("mem_limit_kb"),
+        )
+        .join(Job, JobResourceSample.job_id == Job.id)
+        .join(Molecule, Job.molecule_id == Molecule.id)
+        .where(Molecule.bundle_id == bundle_id)
+        .group_by(JobResourceSample.job_id)
+        .order_by(JobResourceSample.job_id)
+    )
+    return list(result.all())
+
+
+async def get_peak_walltime(db: AsyncSession, job_id: int) -> int | None:
+    """qstat で記録した walltime の最大値（ログに Elapsed time が無いときの代わり）"""
+    result = await db.execute(
+        select(func.max(JobResourceSample.walltime_s)).where(JobResourceSample.job_id == job_id)
+    )
+    return result.scalar()
+
+
+async def get_job_resource_peak(db: AsyncSession, job_id: int):
+    """ジョブの使用量のピーク値（サンプルが無ければ None）"""
+    result = await db.execute(
+        select(
+            func.max(JobResourceSample.walltime_s).label("walltime_s"),
+            func.max(JobResourceSample.cput_s).label("cput_s"),
+            func.max(JobResourceSample.mem_kb).label("max_mem_kb"),
+            func.max(JobResourceSample.ncpus).label("ncpus"),
+            func.count().label("samples"),
+        ).where(JobResourceSample.job_id == job_id)
+    )
+    row = result.first()
+    return row if row is not None and row.samples else None
@@ -0,0 +1,178 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, insert
+import numpy as np
+
+from app.models import JobBundle, JobResult, JobResultArray
+from app.schemas.job_result import ResultColumn
+from app.utils.gaussian_log import GaussianLog
+
+# job_result_arrays に保存する GaussianLog の配列
+RESULT_ARRAYS = (
+    "scf_energies",
+    "scf_cycle_energies",
+    "scf_cycle_offsets",
+    "numbers",
+    "geometries",
+    "forces",
+    "convergence",
+    "convergence_flags",
+    "frequencies",
+    "ir_intensities",
+    "excitation_energies",
+    "excitation_wavelengths",
+    "oscillator_strengths",
+    "mulliken_charges",
+    "nbo_charges",
+    "dipole",
+)
+
+
+def encode_array(array: np.ndarray) -> dict:
+    array = np.ascontiguousarray(array)
+    dtype = array.dtype.newbyteorder("<") if array.dtype.byteorder == ">" else array.dtype
+    return {
+        "dtype": dtype.str,
+        "shape": ",".join(str(n) for n in array.shape),
+        "data": array.astype(dtype, copy=False).tobytes(),
+    }
+
+
+def decode_array(row: JobResultArray) -> np.ndarray:
+    shape = tuple(int(n) for n in row.shape.split(",") if n)  # type: ignore
+    return np.frombuffer(row.data, dtype=np.dtype(row.dtype)).reshape(shape)  # type: ignore
+
+
+def result_values(log: GaussianLog) -> dict:
+    """job_results の1行分のスカラー値"""
+    thermo = log.thermochemistry
+    return {
+        "final_energy": log.final_energy,
+        "zpe": thermo.zpe,
+        "enthalpy": thermo.enthalpy,
+        "gibbs_free_energy": thermo.gibbs_free_energy,
+        "homo": log.homo,
+        "lumo": log.lumo,
+        "dipole_moment": log.dipole_moment,
+        # 振動解析をしていないジョブは虚振動の有無が分からないので NULL
+        "imaginary_frequencies": log.imaginary_frequencies if len(log.frequencies) else None,
+        "walltime_s": int(log.elapsed_seconds) if log.elapsed_seconds is not None else None,
+        "n_atoms": len(log.numbers) or None,
+        "optimization_converged": log.optimization_converged,
+        "termination": log.termination,
+        "error_link": log.error_link,
+    }
+
+
+def copy_job_result(
+    source: JobResult, job_id: int, molecule_id: int, bundle_id: int
+) -> JobResult:
+    """計算キャッシュで結果を引き継ぐジョブ用に、スカラー値の行を複製する"""
+    values = {
+        column.name: getattr(source, column.name)
+        for column in JobResult.__table__.columns
+        if column.name not in ("job_id", "molecule_id", "bundle_id")
+    }
+    return JobResult(job_id=job_id, molecule_id=molecule_id, bundle_id=bundle_id, **values)
+
+
+async def save_job_result(
+    db: AsyncSession,
+    job_id: int,
+    molecule_id: int,
+    bundle_id: int,
+    values: dict,
+    arrays: dict[str, np.ndarray],
+) -> JobResult:
+    """ジョブの結果を置き換える（再解析しても1行のまま）"""
+    await db.execute(delete(JobResultArray).where(JobResultArray.job_id == job_id))
+    await db.execute(delete(JobResult).where(JobResult.job_id == job_id))
+    result = JobResult(job_id=job_id, molecule_id=molecule_id, bundle_id=bundle_id, **values)
+    db.add(result)
+    await db.flush()
+    rows = [
+        {"job_id": job_id, "name": name, **encode_array(array)}
+        for name, array in arrays.items()
+        if array.size
+    ]
+    if rows:
+        await db.execute(insert(JobResultArray), rows)
+    await db.commit()
+    await db.refresh(result)
+    return result
+
+
+async def get_job_result(db: AsyncSession, job_id: int) -> JobResult | None:
+    result = await db.execute(select(JobResult).where(JobResult.job_id == job_id))
+    return result.scalars().first()
+
+
+async def get_result_array_infos(db: AsyncSession, job_id: int) -> list:
+    """配列の名前・dtype・shape だけを読む（data は読まない）"""
+    result = await db.execute(
+        select(JobResultArray.name, JobResultArray.dtype, JobResultArray.shape)
+        .where(JobResultArray.job_id == job_id)
+        .order_by(JobResultArray.name)
+    )
+    return list(result.all())
+
+
+async def get_result_array(db: AsyncSession, job_id: int, name: str) -> JobResultArray | None:
+    result = await db.execute(
+        select(JobResultArray).where(
+            JobResultArray.job_id == job_id, JobResultArray.name == name
+        )
+    )
+    return result.scalars().first()
+
+
+async def query_results(
+    db: AsyncSession,
+    user_id: int,
+    bundle_ids: list[int] | None = None,
+    molecule_id: int | None = None,
+    has_imaginary: bool | None = None,
+    termination: str | None = None,
+    order_by: ResultColumn = ResultColumn.final_energy,
+    descending: bool = False,
+    best_per_molecule: bool = False,
+    limit: int = 100,
+    offset: int = 0,
+) -> list[JobResult]:
+    """ユーザーのバンドルをまたいで結果を検索する（1回の SQL）。
+
+    best_per_molecule のときは分子ごとに order_by が最良（昇順なら最小）のジョブだけを返す。
+    """
+    column = getattr(JobResult, order_by.value)
+    ordering = column.desc().nulls_last() if descending else column.asc().nulls_last()
+
+    query = (
+        select(JobResult)
+        .join(JobBundle, JobResult.bundle_id == JobBundle.id)
+        .where(JobBundle.user_id == user_id)
+    )
+    if bundle_ids:
+        query = query.where(JobResult.bundle_id.in_(bundle_ids))
+    if molecule_id is not None:
+        query = query.where(JobResult.molecule_id == molecule_id)
+    if has_imaginary is not None:
+        query = query.where(
+            JobResult.imaginary_frequencies > 0
+            if has_imaginary
+            else JobResult.imaginary_frequencies == 0
+        )
+    if termination is not None:
+        query = query.where(JobResult.termination == termination)
+
+    if best_per_molecule:
+        # PostgreSQL の DISTINCT ON で分子ごとの先頭行を選び、外側で並べ直す
+        best = (
+            query.with_only_columns(JobResult.job_id)
+            .distinct(JobResult.molecule_id)
+            .order_by(JobResult.molecule_id, ordering)
+        )
+        query = select(JobResult).where(JobResult.job_id.in_(best.scalar_subquery()))
+
+    result = await db.execute(
+        query.order_by(ordering, JobResult.job_id).limit(limit).offset(offset)
+    )
+    return list(result.scalars().all())
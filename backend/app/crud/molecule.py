@@ -1,15 +1,32 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.orm import selectinload
 from app.models import Molecule, JobBundle
 from app.schemas.molecule import MoleculeCreate, MoleculeUpdate
+from app.utils.geometry import encode_geometry
+from app.utils.zmatrix import geometry_from_text
+import base64
 import uuid
 from datetime import datetime
 from typing import Any
 
 
+def structure_columns(structure_xyz: str | None, structure_bin: str | None) -> dict:
+    """API で受け取ったテキスト・base64 のバイナリから structure_xyz / structure_bin 列の値を作る。
+    バイナリが無ければテキスト（Z-matrix は Cartesian に変換）から作る。読めなければ NULL"""
+    if structure_bin is not None:
+        return {"structure_xyz": structure_xyz, "structure_bin": base64.b64decode(structure_bin)}
+    arrays = geometry_from_text(structure_xyz) if structure_xyz else None
+    return {
+        "structure_xyz": structure_xyz,
+        "structure_bin": encode_geometry(*arrays) if arrays is not None else None,
+    }
+
+
 async def create_molecule(db: AsyncSession, data: MoleculeCreate) -> Molecule:
-    mol = Molecule(**data.dict())
+    values = data.dict()
+    values.update(structure_columns(values.pop("structure_xyz"), values.pop("structure_bin")))
+    mol = Molecule(**values)
     db.add(mol)
     await db.commit()
     await db.refresh(mol)
@@ -27,6 +44,34 @@ async def get_molecules_by_bundle(db: AsyncSession, bundle_id: int) -> list[Mole
     return list(mols)
 
 
+async def get_bundle_geometries(db: AsyncSession, bundle_id: int) -> list[tuple[int, bytes]]:
+    """バンドル内の分子の (ID, バイナリ構造) を返す（構造を読めない分子は除く）。
+    バイナリ列が無い古い行はテキストから作る"""
+    result = await db.execute(
+        select(Molecule.id, Molecule.structure_bin, Molecule.structure_xyz)
+        .where(Molecule.bundle_id == bundle_id)
+        .order_by(Molecule.id)
+    )
+    geometries = []
+    for mol_id, structure_bin, structure_xyz in result.all():
+        if structure_bin is None and structure_xyz:
+            arrays = geometry_from_text(structure_xyz)
+            structure_bin = encode_geometry(*arrays) if arrays is not None else None
+        if structure_bin is not None:
+            geometries.append((mol_id, bytes(structure_bin)))
+    return geometries
+
+
+async def get_duplicate_molecule_ids(db: AsyncSession, bundle_id: int) -> set[int]:
+    """配座の重複とされた分子の ID"""
+    result = await db.execute(
+        select(Molecule.id).where(
+            Molecule.bundle_id == bundle_id, Molecule.duplicate_of_id.is_not(None)
+        )
+    )
+    return set(result.scalars().all())
+
+
 async def get_all_molecules_by_user(db: AsyncSession, user_id: int):
     result = await db.execute(
         select(Molecule)
@@ -39,7 +84,21 @@ async def get_all_molecules_by_user(db: AsyncSession, user_id: int):
 async def update_molecule(
     db: AsyncSession, molecule: Molecule, data: MoleculeUpdate
 ) -> Molecule:
-    for field, value in data.dict(exclude_unset=True).items():
+    values = data.dict(exclude_unset=True)
+    if "structure_xyz" in values or "structure_bin" in values:
+        # 片方だけ更新された場合、もう片方は古い構造のまま残さない
+        values.update(
+            structure_columns(values.pop("structure_xyz", None), values.pop("structure_bin", None))
+        )
+    if values.keys() & {"structure_bin", "charge", "multiplicity"}:
+        # 構造が変わったら配座の重複判定は無効（この分子を代表とする分子も含めて外す）
+        values.update(duplicate_of_id=None, duplicate_rmsd=None)
+        await db.execute(
+            update(Molecule)
+            .where(Molecule.duplicate_of_id == molecule.id)
+            .values(duplicate_of_id=None, duplicate_rmsd=None)
+        )
+    for field, value in values.items():
         setattr(molecule, field, value)
     await db.commit()
     await db.refresh(molecule)
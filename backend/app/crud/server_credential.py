@@ -1,9 +1,13 @@
 from fastapi import HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, delete
+from sqlalchemy import select, update, delete, func, or_
 from app.models.server_credential import ServerCredential, AuthMethod
+from app.models.job import Job, JobStatus
+from app.models.submission_queue import SubmissionQueueEntry, SubmissionState
 from app.schemas.server_credential import ServerCredentialCreate, ServerCredentialUpdate
 from app.utils.encryption import encrypt_text, decrypt_text
+from app.services.ssh_pool import ssh_pool
+from app.services.credential_cache import credential_cache
 
 
 async def create_credential(
@@ -15,6 +19,7 @@ async def create_credential(
         port=data.port,
         username=data.username,
         auth_method=data.auth_method,
+        max_jobs=data.max_jobs,
     )
 
     # 認証方式に応じて暗号化してセット
@@ -40,10 +45,16 @@ async def create_credential(
 
 
 async def get_all_credentials(db: AsyncSession) -> list[ServerCredential]:
-    result = await db.execute(select(ServerCredential))
+    result = await db.execute(select(ServerCredential).order_by(ServerCredential.id))
     return list(result.scalars().all())
 
 
+def legacy_credential(credentials: list[ServerCredential]) -> ServerCredential | None:
+    """投入先を記録する前に投入されたジョブの接続情報（ID の最も小さいもの）。
+    get_credential_for_job・状態の取得・投入先の空き枠の計算で同じものを使う"""
+    return min(credentials, key=lambda c: c.id, default=None)  # type: ignore
+
+
 async def get_credential_by_id(
     db: AsyncSession, credential_id: int
 ) -> ServerCredential | None:
@@ -53,6 +64,17 @@ async def get_credential_by_id(
     return result.scalars().first()
 
 
+async def get_credential_for_job(db: AsyncSession, job: Job) -> ServerCredential | None:
+    """ジョブを投入した接続情報を取得"""
+    if job.server_credential_id is not None:
+        return await get_credential_by_id(db, job.server_credential_id)  # type: ignore
+    # 投入先を記録する前に投入されたジョブは、従来どおり最初の接続情報（legacy_credential）を使う
+    result = await db.execute(
+        select(ServerCredential).order_by(ServerCredential.id).limit(1)
+    )
+    return result.scalars().first()
+
+
 async def update_credential(
     db: AsyncSession, credential: ServerCredential, data: ServerCredentialUpdate
 ) -> ServerCredential:
@@ -63,6 +85,8 @@ async def update_credential(
         credential.port = data.port  # type: ignore
     if data.username is not None:
         credential.username = data.username  # type: ignore
+    if data.max_jobs is not None:
+        credential.max_jobs = data.max_jobs  # type: ignore
     if data.auth_method is not None:
         credential.auth_method = data.auth_method  # type: ignore
         # 認証方式を切り替えた場合、関連フィールドをクリアして再設定
@@ -77,9 +101,45 @@ async def update_credential(
 
     await db.commit()
     await db.refresh(credential)
+    # 接続先・認証情報が変わった可能性があるためキャッシュとプール済み接続を破棄
+    credential_cache.invalidate(credential.id)  # type: ignore
+    ssh_pool.invalidate(credential.id)  # type: ignore
     return credential
 
 
+async def count_jobs_using_credential(db: AsyncSession, credential: ServerCredential) -> int:
+    """この接続情報で状態の取得・キャンセルを行う、待機中・実行中のジョブと再投入待ちのエントリの数"""
+    owns_job = Job.server_credential_id == credential.id
+    if credential is legacy_credential(await get_all_credentials(db)):
+        owns_job = or_(owns_job, Job.server_credential_id.is_(None))  # 投入先未記録の旧ジョブ
+    jobs = await db.scalar(
+        select(func.count(Job.id)).where(
+            owns_job,
+            Job.status.in_([JobStatus.queued, JobStatus.running]),
+            Job.remote_job_id.isnot(None),
+        )
+    )
+    entries = await db.scalar(
+        select(func.count(SubmissionQueueEntry.id)).where(
+            SubmissionQueueEntry.server_credential_id == credential.id,
+            SubmissionQueueEntry.state == SubmissionState.pending,
+        )
+    )
+    return (jobs or 0) + (entries or 0)
+
+
 async def delete_credential(db: AsyncSession, credential: ServerCredential) -> None:
+    """接続情報を削除する。終わったジョブの投入先は NULL になる（ON DELETE SET NULL）。
+    クラスタ上に残っているジョブがあるうちは、その状態を追えなくなるので削除しない"""
+    in_use = await count_jobs_using_credential(db, credential)
+    if in_use:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST,
+            f"この接続情報で投入したジョブが {in_use} 件、待機中・実行中または再投入待ちのため"
+            "削除できません（完了・キャンセル後に削除してください）",
+        )
+    credential_id = credential.id
     await db.delete(credential)
     await db.commit()
+    credential_cache.invalidate(credential_id)  # type: ignore
+    ssh_pool.invalidate(credential_id)  # type: ignore
@@ -0,0 +1,87 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func
+from sqlalchemy.orm import selectinload
+from app.models import Job, Molecule, JobBundle, SubmissionQueueEntry
+from app.models.job import JobStatus
+from app.models.submission_queue import SubmissionState
+
+
+async def enqueue_jobs(
+    db: AsyncSession,
+    jobs: list[Job],
+    user_id: int,
+    priority: int = 0,
+    transfer_mode: str = "auto",
+) -> list[SubmissionQueueEntry]:
+    entries = [
+        SubmissionQueueEntry(
+            job_id=job.id,
+            user_id=user_id,
+            priority=priority,
+            transfer_mode=transfer_mode,
+        )
+        for job in jobs
+    ]
+    db.add_all(entries)
+    await db.commit()
+    return entries
+
+
+async def get_pending_entries(
+    db: AsyncSession, per_user: int
+) -> list[SubmissionQueueEntry]:
+    """ユーザーごとに優先度の高い順・投入の古い順で先頭 per_user 件の未送信エントリを取得
+
+    全体の先頭から取ると、大量に投入待ちのあるユーザーだけで候補が埋まり、
+    後から登録した他のユーザーが選ばれなくなるため、ユーザー単位で切り出す。
+    """
+    ordering = (
+        SubmissionQueueEntry.priority.desc(),
+        SubmissionQueueEntry.enqueued_at,
+        SubmissionQueueEntry.id,
+    )
+    heads = (
+        select(
+            SubmissionQueueEntry.id,
+            func.row_number()
+            .over(partition_by=SubmissionQueueEntry.user_id, order_by=ordering)
+            .label("rank"),
+        )
+        .where(SubmissionQueueEntry.state == SubmissionState.pending)
+        .subquery()
+    )
+    result = await db.execute(
+        select(SubmissionQueueEntry)
+        .options(
+            selectinload(SubmissionQueueEntry.job).selectinload(Job.molecule),
+            selectinload(SubmissionQueueEntry.user),
+        )
+        .join(heads, heads.c.id == SubmissionQueueEntry.id)
+        .where(heads.c.rank <= per_user)
+        .order_by(*ordering)
+    )
+    return list(result.scalars().all())
+
+
+async def count_in_flight_by_user(db: AsyncSession) -> dict[int, int]:
+    """クラスタ上で待機中・実行中のジョブ数をユーザーごとに集計"""
+    result = await db.execute(
+        select(JobBundle.user_id, func.count(Job.id))
+        .join(Molecule, Job.molecule_id == Molecule.id)
+        .join(JobBundle, Molecule.bundle_id == JobBundle.id)
+        .where(
+            Job.status.in_([JobStatus.queued, JobStatus.running]),
+            Job.remote_job_id.isnot(None),
+        )
+        .group_by(JobBundle.user_id)
+    )
+    return {user_id: count for user_id, count in result.all()}
+
+
+async def get_entry_by_job(
+    db: AsyncSession, job_id: int
+) -> SubmissionQueueEntry | None:
+    result = await db.execute(
+        select(SubmissionQueueEntry).where(SubmissionQueueEntry.job_id == job_id)
+    )
+    return result.scalars().first()
@@ -2,7 +2,11 @@ from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from supabase.client import create_client, Client
 from dotenv import load_dotenv
-from app.api import user, auth, molecule, job_bundle, job, server_credential
+from app.api import user, auth, molecule, job_bundle, job, job_result, server_credential
+from app.services.ssh_pool import ssh_pool
+from app.services.status_poller import status_poller
+from app.services.submission_dispatcher import submission_dispatcher
+import asyncio
 import uvicorn
 import os
 
@@ -25,6 +29,7 @@ app.include_router(user.router, prefix="/users", tags=["users"])
 app.include_router(molecule.router, prefix="/molecules", tags=["molecules"])
 app.include_router(job_bundle.router, prefix="/bundles", tags=["job_bundles"])
 app.include_router(job.router, prefix="/jobs", tags=["jobs"])
+app.include_router(job_result.router, prefix="/results", tags=["job_results"])
 app.include_router(
     server_credential.router, prefix="/credentials", tags=["server_credentials"]
 )
@@ -41,6 +46,27 @@ app.add_middleware(
 )
 
 
+async def _evict_idle_ssh_connections():
+    while True:
+        await asyncio.sleep(ssh_pool.keepalive_interval)
+        ssh_pool.evict_idle()
+
+
+@app.on_event("startup")
+async def start_background_tasks():
+    app.state.ssh_evictor = asyncio.create_task(_evict_idle_ssh_connections())
+    app.state.status_poller = asyncio.create_task(status_poller.run())
+    app.state.submission_dispatcher = asyncio.create_task(submission_dispatcher.run())
+
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    app.state.ssh_evictor.cancel()
+    app.state.status_poller.cancel()
+    app.state.submission_dispatcher.cancel()
+    ssh_pool.close_all()
+
+
 @app.get("/")
 async def read_root():
     return {"message": "Hello World"}
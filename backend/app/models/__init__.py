@@ -4,3 +4,6 @@ from .server_credential import ServerCredential
 from .job_bundle import JobBundle
 from .molecule import Molecule
 from .job import Job
+from .submission_queue import SubmissionQueueEntry
+from .job_resource import JobResourceObservation, JobResourceSample
+from .job_result import JobResult, JobResultArray
@@ -21,14 +21,34 @@ class Job(Base):
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     molecule_id = Column(Integer, ForeignKey("molecules.id"), nullable=False)
     gjf_path = Column(String(512), nullable=False)
+    # 入力を生成したときの設定と分子構造のハッシュ（変わっていなければ再生成しない）
+    input_hash = Column(String(64), nullable=True)
+    # 計算内容（正規化した構造・電荷・多重度・ルート）のキー。同じキーの完了ジョブがあれば再計算しない
+    calc_key = Column(String(64), nullable=True, index=True)
+    # キャッシュから結果を引き継いだ元のジョブ（自分で計算したジョブは NULL）
+    cached_from_job_id = Column(
+        Integer, ForeignKey("jobs.id", ondelete="SET NULL"), nullable=True, index=True
+    )
+    # 入力の生成・投入時にリソース推定器が見積もった walltime（秒、見積もらなかったら NULL）
+    estimated_walltime_s = Column(Integer, nullable=True)
     log_path = Column(String(512), nullable=True)
     job_type = Column(String(20), nullable=False)
-    status = Column(Enum(JobStatus), nullable=False)
+    status = Column(Enum(JobStatus), nullable=False, default=JobStatus.queued)
     submitted_at = Column(DateTime, nullable=False, default=datetime.now(timezone.utc))
     remote_job_id = Column(String(100), nullable=True)
     parent_job_id = Column(Integer, ForeignKey("jobs.id"), nullable=True)
+    # 投入先クラスタ（キャンセル・ログ取得もこの接続情報で行う）
+    server_credential_id = Column(
+        Integer,
+        ForeignKey("server_credentials.id", ondelete="SET NULL"),
+        nullable=True,
+        index=True,
+    )
 
     molecule = relationship(
         "Molecule", foreign_keys=[molecule_id], back_populates="jobs", uselist=False
     )
-    parent_job = relationship("Job", remote_side=[id], backref="child_jobs")
+    parent_job = relationship(
+        "Job", remote_side=[id], foreign_keys=[parent_job_id], backref="child_jobs"
+    )
+    server_credential = relationship("ServerCredential")
@@ -0,0 +1,61 @@
+from sqlalchemy import (
+    Column,
+    DateTime,
+    ForeignKey,
+    Integer,
+    BigInteger,
+    LargeBinary,
+    SmallInteger,
+    String,
+)
+from sqlalchemy.orm import backref, relationship
+from datetime import datetime, timezone
+
+from .base import Base
+
+
+class JobResourceSample(Base):
+    """qstat -x の resources_used をポーリングごとに記録した時系列"""
+
+    __tablename__ = "job_resource_samples"
+
+    job_id = Column(Integer, ForeignKey("jobs.id", ondelete="CASCADE"), primary_key=True)
+    sampled_at = Column(
+        DateTime(timezone=True),
+        primary_key=True,
+        default=lambda: datetime.now(timezone.utc),
+    )
+    walltime_s = Column(Integer, nullable=True)
+    cput_s = Column(Integer, nullable=True)
+    mem_kb = Column(BigInteger, nullable=True)
+    vmem_kb = Column(BigInteger, nullable=True)
+    ncpus = Column(SmallInteger, nullable=True)
+    mem_limit_kb = Column(BigInteger, nullable=True)
+
+    # ジョブの削除時は DB 側の ON DELETE CASCADE に任せる
+    job = relationship(
+        "Job",
+        backref=backref("resource_samples", cascade="all, delete-orphan", passive_deletes=True),
+    )
+
+
+class JobResourceObservation(Base):
+    """完了ジョブ1件分の、リソース推定（app.services.resource_estimator）の学習データ。
+
+    特徴量は float64 の生バイト列。推定器は起動後に全行を1回読んで正規方程式を組み、
+    以後はジョブが終わるたびにその1行分だけを足し込む。
+    """
+
+    __tablename__ = "job_resource_observations"
+
+    job_id = Column(Integer, ForeignKey("jobs.id", ondelete="CASCADE"), primary_key=True)
+    model_key = Column(String(100), nullable=False, index=True)  # "b3lyp/6-31g(d)" など
+    features = Column(LargeBinary, nullable=False)
+    walltime_s = Column(Integer, nullable=True)
+    mem_kb = Column(BigInteger, nullable=True)
+    ncpus = Column(SmallInteger, nullable=False)
+    observed_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        default=lambda: datetime.now(timezone.utc),
+    )
@@ -0,0 +1,76 @@
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    SmallInteger,
+    String,
+)
+from sqlalchemy.orm import backref, relationship
+from datetime import datetime, timezone
+
+from .base import Base
+
+
+class JobResult(Base):
+    """完了ジョブのログから取り出したスカラー値（1ジョブ1行、値ごとに索引を張る）
+
+    バンドル・分子をまたいだ検索を結合なしで済ませるため molecule_id・bundle_id も持つ。
+    """
+
+    __tablename__ = "job_results"
+
+    job_id = Column(Integer, ForeignKey("jobs.id", ondelete="CASCADE"), primary_key=True)
+    molecule_id = Column(Integer, ForeignKey("molecules.id"), nullable=False, index=True)
+    bundle_id = Column(Integer, ForeignKey("job_bundles.id"), nullable=False, index=True)
+    # エネルギーは Hartree
+    final_energy = Column(Float, nullable=True, index=True)
+    zpe = Column(Float, nullable=True, index=True)
+    enthalpy = Column(Float, nullable=True, index=True)
+    gibbs_free_energy = Column(Float, nullable=True, index=True)
+    homo = Column(Float, nullable=True, index=True)
+    lumo = Column(Float, nullable=True, index=True)
+    dipole_moment = Column(Float, nullable=True, index=True)  # Debye
+    imaginary_frequencies = Column(SmallInteger, nullable=True, index=True)
+    walltime_s = Column(Integer, nullable=True, index=True)
+    n_atoms = Column(SmallInteger, nullable=True)
+    optimization_converged = Column(Boolean, nullable=False, default=False)
+    termination = Column(String(10), nullable=True, index=True)  # normal / error
+    error_link = Column(String(10), nullable=True)
+    parsed_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        default=lambda: datetime.now(timezone.utc),
+    )
+
+    # ジョブの削除時は DB 側の ON DELETE CASCADE に任せる
+    job = relationship(
+        "Job",
+        backref=backref("result", uselist=False, cascade="all, delete-orphan", passive_deletes=True),
+    )
+
+    __table_args__ = (
+        # 「バンドル内の分子ごとに最小の G / E」を索引だけで引くための複合索引
+        Index("ix_job_results_bundle_molecule_gibbs", "bundle_id", "molecule_id", "gibbs_free_energy"),
+        Index("ix_job_results_bundle_molecule_energy", "bundle_id", "molecule_id", "final_energy"),
+    )
+
+
+class JobResultArray(Base):
+    """配列の値（振動数・励起エネルギー・構造の軌跡など）。
+
+    dtype と shape を別列に持ち、data は C 順のリトルエンディアンの生バイト列。
+    スカラーの検索では読まず、名前を指定されたときだけ読み出す。
+    """
+
+    __tablename__ = "job_result_arrays"
+
+    job_id = Column(Integer, ForeignKey("jobs.id", ondelete="CASCADE"), primary_key=True)
+    name = Column(String(40), primary_key=True)
+    dtype = Column(String(8), nullable=False)  # "<f8" など
+    shape = Column(String(64), nullable=False)  # "120,60,3"
+    data = Column(LargeBinary, nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Text, ForeignKey
+from sqlalchemy import Column, Float, String, Integer, Text, ForeignKey, LargeBinary
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
@@ -12,9 +12,18 @@ class Molecule(Base):
     name = Column(String(100), nullable=False)
     charge = Column(Integer, nullable=False)
     multiplicity = Column(Integer, nullable=False)
-    structure_xyz = Column(Text, nullable=False)
+    # 入力されたテキスト（バイナリのみで登録された場合は NULL）
+    structure_xyz = Column(Text, nullable=True)
+    # 原子番号と Cartesian 座標のバイナリ（app.utils.geometry、Z-matrix は変換して保存。読めない構造は NULL）
+    structure_bin = Column(LargeBinary, nullable=True)
     bundle_id = Column(Integer, ForeignKey("job_bundles.id"), nullable=False)
     latest_job_id = Column(Integer, ForeignKey("jobs.id"), nullable=True)
+    # 配座の重複判定（app.services.conformer_dedup）で同じとみなした代表の分子と RMSD [Å]。
+    # 重複とされた分子は入力の生成・投入の対象から外す
+    duplicate_of_id = Column(
+        Integer, ForeignKey("molecules.id", ondelete="SET NULL"), nullable=True, index=True
+    )
+    duplicate_rmsd = Column(Float, nullable=True)
 
     jobs = relationship(
         "Job",
@@ -26,6 +26,9 @@ class ServerCredential(Base):
     auth_method = Column(
         Enum(AuthMethod), nullable=False, comment="認証方式(`password` or `ssh_key`)"
     )
+    max_jobs = Column(
+        Integer, nullable=True, comment="同時に投入しておけるジョブ数の上限（未設定なら既定値）"
+    )
     created_at = Column(
         DateTime(timezone=True),
         nullable=False,
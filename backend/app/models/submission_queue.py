@@ -0,0 +1,50 @@
+from sqlalchemy import Column, String, DateTime, Enum, ForeignKey, Integer, Text
+from sqlalchemy.orm import backref, relationship
+from datetime import datetime, timezone
+import enum
+
+from .base import Base
+
+
+class SubmissionState(str, enum.Enum):
+    pending = "pending"
+    dispatched = "dispatched"
+    failed = "failed"
+    cancelled = "cancelled"
+
+
+class SubmissionQueueEntry(Base):
+    __tablename__ = "submission_queue"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    job_id = Column(
+        Integer, ForeignKey("jobs.id", ondelete="CASCADE"), nullable=False, unique=True
+    )
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    priority = Column(Integer, nullable=False, default=0)
+    state = Column(
+        Enum(SubmissionState), nullable=False, default=SubmissionState.pending, index=True
+    )
+    transfer_mode = Column(String(10), nullable=False, default="auto")
+    # 最初に投入を試みたホスト。qsub の結果が分からないまま失敗しても、投入済みの印
+    # （job_execution.QSUB_MARKER_NAME）はそのホストにしか無いので、再試行も同じホストへ送る
+    server_credential_id = Column(
+        Integer, ForeignKey("server_credentials.id", ondelete="SET NULL"), nullable=True
+    )
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    enqueued_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        default=lambda: datetime.now(timezone.utc),
+    )
+    dispatched_at = Column(DateTime(timezone=True), nullable=True)
+
+    # ジョブの削除時は DB 側の ON DELETE CASCADE に任せる
+    job = relationship(
+        "Job",
+        backref=backref(
+            "submission_entry", uselist=False, cascade="all, delete-orphan", passive_deletes=True
+        ),
+    )
+    user = relationship("User")
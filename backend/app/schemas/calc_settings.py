@@ -0,0 +1,88 @@
+from pydantic import BaseModel, Field, validator
+from typing import Dict, List, Optional
+import re
+
+from app.utils.gjf_parser import GJFParseError, parse_route
+
+# タイトルのパターンで使える置換フィールド
+TITLE_FIELDS = ("name", "molecule_id", "bundle_id", "charge", "multiplicity", "index")
+_MEMORY_PATTERN = re.compile(r"^\d+(\.\d+)?\s*([KMGT][BW])?$", re.IGNORECASE)
+
+
+class CalcSettings(BaseModel):
+    """JobBundle.calc_settings の内容（バンドル内の全分子に共通する計算条件）"""
+
+    job_type: str = Field("Opt", max_length=20)  # Job.job_type にも使う
+    method: str = "B3LYP"
+    basis: str = "6-31G(d)"
+    route_keywords: List[str] = []  # "Freq" や "SCRF=(PCM,Solvent=Water)" など
+    print_level: str = Field("", regex="^[pnt]?$")
+    route: Optional[str] = None  # 指定時はルート全体をこの文字列にする
+    mem: Optional[str] = None  # %Mem（"4GB" など）
+    nprocshared: Optional[int] = Field(None, ge=1)
+    # mem・nprocshared を指定していなければ、完了ジョブから学習した推定値で埋める
+    auto_resources: bool = False
+    checkpoint: bool = True  # %Chk を出力するか
+    link0: Dict[str, str] = {}  # その他の Link 0 コマンド（"%" は不要）
+    title: str = "{name}"
+    additional_input: List[str] = []  # 分子指定の後ろに空行区切りで置くセクション
+    # 分子名 → その分子だけ上書きする設定（上書き分だけが再生成される）
+    overrides: Dict[str, dict] = {}
+
+    class Config:
+        # 知らないキーを黙って捨てると、既存の設定の意味が変わったことに気付けない
+        extra = "forbid"
+
+    @validator("mem")
+    def validate_mem(cls, v):
+        if v is not None and not _MEMORY_PATTERN.match(v.strip()):
+            raise ValueError(f"%Mem の指定が不正です: {v}")
+        return v
+
+    @validator("title")
+    def validate_title(cls, v):
+        try:
+            v.format(**{field: "" for field in TITLE_FIELDS})
+        except (KeyError, IndexError, ValueError) as e:
+            raise ValueError(
+                f"タイトルのパターンが不正です（使えるのは {', '.join(TITLE_FIELDS)}）: {e}"
+            )
+        if not v.strip() or "\n" in v:
+            raise ValueError("タイトルは空でない1行にしてください")
+        return v
+
+    @validator("route", always=True)
+    def validate_route(cls, v, values):
+        try:
+            parse_route(v if v is not None else compose_route(values))
+        except GJFParseError as e:
+            raise ValueError(f"ルートが不正です: {e}")
+        return v
+
+    @validator("overrides")
+    def validate_overrides(cls, v, values):
+        base = {key: value for key, value in values.items() if key != "overrides"}
+        for name, override in v.items():
+            if "overrides" in override:
+                raise ValueError("overrides は入れ子にできません")
+            CalcSettings(**{**base, **override})
+        return v
+
+    def for_molecule(self, name: str) -> "CalcSettings":
+        override = self.overrides.get(name)
+        if not override:
+            return self
+        return CalcSettings(**{**self.dict(exclude={"overrides"}), **override})
+
+
+def compose_route(values: dict) -> str:
+    """method/basis・ジョブタイプ・追加キーワードからルート行を組み立てる"""
+    parts = [
+        "#" + values.get("print_level", ""),
+        f"{values.get('method', 'B3LYP')}/{values.get('basis', '6-31G(d)')}",
+    ]
+    job_type = values.get("job_type", "Opt")
+    if job_type and job_type.lower() != "sp":
+        parts.append(job_type)
+    parts.extend(values.get("route_keywords", []))
+    return " ".join(parts)
@@ -24,6 +24,10 @@ class JobResponse(JobBase):
     submitted_at: datetime
     remote_job_id: Optional[str]
     parent_job_id: Optional[str]
+    server_credential_id: Optional[int]
+    calc_key: Optional[str]
+    cached_from_job_id: Optional[int]  # 計算キャッシュで結果を引き継いだ元ジョブ
+    estimated_walltime_s: Optional[int]  # 入力生成・投入時のリソース推定による walltime
 
     class Config:
         orm_mode = True
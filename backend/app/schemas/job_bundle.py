@@ -1,21 +1,37 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, validator
+from enum import Enum
+from typing import List, Optional
 from datetime import datetime
 
+from app.schemas.calc_settings import CalcSettings
+
+
+def validate_calc_settings(v: Optional[dict]) -> Optional[dict]:
+    """CalcSettings として検証し、既定値を補った dict にして保存する"""
+    if v is None:
+        return v
+    return CalcSettings(**v).dict()
+
 
 class JobBundleBase(BaseModel):
     name: str
-    calc_settings: Optional[dict] = None  # JSON型
+    calc_settings: Optional[dict] = None  # JSON型（内容は CalcSettings）
 
 
 class JobBundleCreate(JobBundleBase):
-    pass
+    @validator("calc_settings")
+    def validate_calc_settings_field(cls, v):
+        return validate_calc_settings(v)
 
 
 class JobBundleUpdate(BaseModel):
     name: Optional[str] = None
     calc_settings: Optional[dict] = None
 
+    @validator("calc_settings")
+    def validate_calc_settings_field(cls, v):
+        return validate_calc_settings(v)
+
 
 class JobBundleResponse(JobBundleBase):
     id: int
@@ -24,3 +40,37 @@ class JobBundleResponse(JobBundleBase):
 
     class Config:
         orm_mode = True
+
+
+class TransferMode(str, Enum):
+    auto = "auto"  # ファイル数に応じて自動選択
+    sftp = "sftp"
+    tar = "tar"
+
+
+class BundleSubmitFailure(BaseModel):
+    job_id: int
+    error: str
+
+
+class BundleSubmitResult(BaseModel):
+    enqueued: int
+    failed: List[BundleSubmitFailure] = []
+    cached: int = 0  # 計算済みの結果を引き継いで投入しなかった数
+    duplicates: int = 0  # 重複した配座として投入しなかった数
+
+
+class InputGenerationResult(BaseModel):
+    generated: int  # 書き出した（書き直した）入力の数
+    unchanged: int  # 設定・構造が変わっておらず書き出さなかった数
+    created_jobs: int
+    enqueued: int = 0
+    cached: int = 0  # 計算済みの結果を引き継いで完了にした数
+    failed: List[BundleSubmitFailure] = []  # submit=true で投入しなかったジョブ（構造のエラー）
+
+
+class DedupResult(BaseModel):
+    molecules: int
+    duplicates: int  # 重複とした分子の数（入力の生成・投入の対象から外れる）
+    representatives: int  # 重複を1つ以上持つ代表の数
+    threshold: float  # Å
@@ -0,0 +1,64 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import List, Optional
+
+
+class JobResourceSampleResponse(BaseModel):
+    sampled_at: datetime
+    walltime_s: Optional[int]
+    cput_s: Optional[int]
+    mem_kb: Optional[int]
+    vmem_kb: Optional[int]
+    ncpus: Optional[int]
+    mem_limit_kb: Optional[int]
+
+    class Config:
+        orm_mode = True
+
+
+class JobResourceUsage(BaseModel):
+    job_id: int
+    walltime_s: Optional[int]
+    cput_s: Optional[int]
+    max_mem_kb: Optional[int]
+    ncpus: Optional[int]
+    mem_limit_kb: Optional[int]
+    cpu_efficiency: Optional[float]  # cput / (walltime × ncpus)
+    mem_efficiency: Optional[float]  # 最大使用メモリ / 要求メモリ
+
+
+class BundleResourceUsage(BaseModel):
+    bundle_id: int
+    jobs: List[JobResourceUsage] = []
+    cpu_efficiency: Optional[float]
+    mem_efficiency: Optional[float]
+
+
+class ResourceEstimateResponse(BaseModel):
+    model_key: str  # 使ったモデル（method/basis。データが足りなければ全体の "*"）
+    samples: int
+    confidence: float  # 0〜1。exp(-予測の対数標準偏差)
+    usable: bool  # 入力の Link 0 を埋めるのに使えるか
+    nprocshared: int
+    walltime_s: int
+    walltime_low_s: int  # 80% 区間
+    walltime_high_s: int
+    mem_mb: Optional[int]  # 推奨する %Mem
+    mem_observed_mb: Optional[int]  # 予測される最大使用メモリ
+
+    class Config:
+        orm_mode = True
+
+
+class MoleculeResourceEstimate(BaseModel):
+    molecule_id: int
+    name: str
+    estimate: Optional[ResourceEstimateResponse]  # 学習データが無い・構造を読めなければ null
+
+
+class ResourceModelSummary(BaseModel):
+    model_key: str
+    samples: int
+    ncpus: List[int]  # 学習データで観測した並列数
+    walltime: Optional[dict]  # samples・residual_log_std・coefficients
+    memory: Optional[dict]
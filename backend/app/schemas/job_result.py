@@ -0,0 +1,52 @@
+from pydantic import BaseModel
+from datetime import datetime
+from enum import Enum
+from typing import List, Optional
+
+
+class ResultColumn(str, Enum):
+    """検索・並べ替えに使えるスカラー値（すべて索引あり）"""
+
+    final_energy = "final_energy"
+    zpe = "zpe"
+    enthalpy = "enthalpy"
+    gibbs_free_energy = "gibbs_free_energy"
+    homo = "homo"
+    lumo = "lumo"
+    dipole_moment = "dipole_moment"
+    imaginary_frequencies = "imaginary_frequencies"
+    walltime_s = "walltime_s"
+
+
+class ResultArrayInfo(BaseModel):
+    name: str
+    dtype: str
+    shape: List[int]
+
+
+class ResultArrayResponse(ResultArrayInfo):
+    data: list
+
+
+class JobResultResponse(BaseModel):
+    job_id: int
+    molecule_id: int
+    bundle_id: int
+    final_energy: Optional[float]  # Hartree
+    zpe: Optional[float]
+    enthalpy: Optional[float]
+    gibbs_free_energy: Optional[float]
+    homo: Optional[float]
+    lumo: Optional[float]
+    dipole_moment: Optional[float]  # Debye
+    imaginary_frequencies: Optional[int]
+    walltime_s: Optional[int]
+    n_atoms: Optional[int]
+    optimization_converged: bool
+    termination: Optional[str]
+    error_link: Optional[str]
+    parsed_at: datetime
+    arrays: List[ResultArrayInfo] = []  # 個別に GET /results/{job_id}/arrays/{name} で取得
+
+    class Config:
+        orm_mode = True
@@ -1,18 +1,33 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, root_validator, validator
 from typing import Optional
 from datetime import datetime
+import base64
+
+from app.utils.validators import validate_structure_bin
 
 
 class MoleculeBase(BaseModel):
     name: str
     charge: int
     multiplicity: int
-    structure_xyz: str
+    structure_xyz: Optional[str] = None
+    # 原子番号 uint8 と座標 float64 (N,3) のバイナリ（app.utils.geometry）を base64 にしたもの
+    structure_bin: Optional[str] = None
     bundle_id: int
 
 
 class MoleculeCreate(MoleculeBase):
-    pass
+    @validator("structure_bin")
+    def validate_structure_bin_field(cls, v):
+        if v is not None:
+            return validate_structure_bin(v)
+        return v
+
+    @root_validator(skip_on_failure=True)
+    def require_structure(cls, values):
+        if not values.get("structure_xyz") and not values.get("structure_bin"):
+            raise ValueError("structure_xyz か structure_bin のどちらかを指定してください")
+        return values
 
 
 class MoleculeUpdate(BaseModel):
@@ -20,11 +35,26 @@ class MoleculeUpdate(BaseModel):
     charge: Optional[int] = None
     multiplicity: Optional[int] = None
     structure_xyz: Optional[str] = None
+    structure_bin: Optional[str] = None
+
+    @validator("structure_bin")
+    def validate_structure_bin_field(cls, v):
+        if v is not None:
+            return validate_structure_bin(v)
+        return v
 
 
 class MoleculeResponse(MoleculeBase):
     id: int
     latest_job_id: Optional[str]
+    duplicate_of_id: Optional[int]  # 同じ配座とみなした代表の分子
+    duplicate_rmsd: Optional[float]  # Å
+
+    @validator("structure_bin", pre=True)
+    def encode_structure_bin(cls, v):
+        if isinstance(v, (bytes, bytearray, memoryview)):
+            return base64.b64encode(v).decode()
+        return v
 
     class Config:
         orm_mode = True
@@ -14,6 +14,7 @@ class ServerCredentialBase(BaseModel):
     port: int = Field(22, ge=1, le=65535)
     username: str
     auth_method: AuthMethod
+    max_jobs: Optional[int] = Field(None, ge=1)
 
 
 class ServerCredentialCreate(ServerCredentialBase):
@@ -52,6 +53,7 @@ class ServerCredentialUpdate(BaseModel):
     auth_method: Optional[AuthMethod] = None
     password: Optional[str] = None
     ssh_key: Optional[str] = None
+    max_jobs: Optional[int] = Field(None, ge=1)
 
     @root_validator
     def check_update_consistency(cls, values):
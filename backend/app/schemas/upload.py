@@ -1,11 +1,47 @@
 from pydantic import BaseModel
+from enum import Enum
 from typing import List
 
 
+class DedupMode(str, Enum):
+    """アップロード時の配座の重複の扱い"""
+
+    off = "off"
+    mark = "mark"  # 登録して重複の印を付ける（入力の生成・投入の対象外）
+    skip = "skip"  # 登録しない
+
+
+class StructureClash(BaseModel):
+    i: int  # 原子の番号（0 始まり）
+    j: int
+    distance: float  # Å
+
+    class Config:
+        orm_mode = True
+
+
+class StructureCheckResult(BaseModel):
+    """構造の検査結果（app.utils.structure_check）。errors があれば投入しても失敗する"""
+
+    n_atoms: int
+    n_bonds: int
+    n_fragments: int
+    clashes: List[StructureClash] = []
+    errors: List[str] = []
+    warnings: List[str] = []
+
+    class Config:
+        orm_mode = True
+
+
 class GJFUploadResult(BaseModel):
     name: str
-    charge: int
-    multiplicity: int
-    structure_xyz: str
-    status: str  # success or error
+    charge: int | None = None
+    multiplicity: int | None = None
+    structure_xyz: str | None = None
+    status: str  # success, error または duplicate（dedup=skip で登録しなかった）
     error_message: str | None = None
+    error_line: int | None = None  # GJF の解析エラーが起きた行
+    duplicate_of: str | None = None  # 同じ配座とみなした分子の名前
+    duplicate_rmsd: float | None = None  # Å
+    check: StructureCheckResult | None = None
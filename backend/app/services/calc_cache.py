@@ -0,0 +1,293 @@
+import hashlib
+import logging
+import os
+import threading
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+import numpy as np
+from dotenv import load_dotenv
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud import job_result as crud_result
+from app.models import Job, JobBundle, JobResult, Molecule, SubmissionQueueEntry
+from app.models.job import JobStatus
+from app.utils.geometry import decode_geometry
+from app.utils.gjf_parser import GJFParseError, parse_gjf_file, parse_route
+from app.utils.zmatrix import cartesian_geometries, geometry_from_text
+
+if TYPE_CHECKING:  # gjf_generator がこのモジュールを使うため実行時には読み込まない
+    from app.services.gjf_generator import GJFTemplate, MoleculeInput
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+CALC_CACHE_ENABLED = os.getenv("CALC_CACHE_ENABLED", "true").lower() == "true"
+# 構造を同一とみなす座標の丸め桁数（Å）
+CALC_CACHE_GEOMETRY_DECIMALS = int(os.getenv("CALC_CACHE_GEOMETRY_DECIMALS", "4"))
+
+# 出力の量・形式だけを変え、計算結果には影響しないルートキーワード
+_OUTPUT_ONLY_KEYWORDS = frozenset(
+    {"test", "gfinput", "gfprint", "punch", "formcheck", "fchk", "maxdisk", "output"}
+)
+
+
+def geometry_key(numbers: np.ndarray, coords: np.ndarray) -> bytes:
+    """原子の並び順に依らない構造の表現（原子番号 → 丸めた座標の順に並べ替える）"""
+    rounded = np.round(np.asarray(coords, dtype=np.float64), CALC_CACHE_GEOMETRY_DECIMALS) + 0.0
+    numbers = np.asarray(numbers, dtype=np.uint8)
+    order = np.lexsort((rounded[:, 2], rounded[:, 1], rounded[:, 0], numbers))
+    return numbers[order].tobytes() + rounded[order].astype("<f8").tobytes()
+
+
+@lru_cache(maxsize=256)
+def normalized_route(route_text: str, trailer: str) -> str | None:
+    """大文字小文字・キーワードとオプションの順序・出力指定の差を除いたルート。
+
+    構造をチェックポイントから読む（Geom=Check など）場合は分子の構造で計算内容が
+    決まらないので None（キャッシュしない）。
+    """
+    try:
+        route = parse_route(route_text)
+    except GJFParseError:
+        return None
+    if {v.lower() for v in route.option_values("geom")} & {
+        "check", "checkpoint", "allcheck", "allcheckpoint"
+    }:
+        return None
+    parts = [f"{(route.method or '').lower()}/{(route.basis or '').lower()}"]
+    for key in sorted(route.options):
+        if key in _OUTPUT_ONLY_KEYWORDS:
+            continue
+        values = sorted(v.lower() for v in route.options[key])
+        parts.append(key + ("=" + ",".join(values) if values else ""))
+    parts.append(" ".join(trailer.split()).lower())
+    return " ".join(parts)
+
+
+def _key(
+    numbers: np.ndarray, coords: np.ndarray, charge: int, multiplicity: int, route: str
+) -> str:
+    digest = hashlib.sha256(geometry_key(numbers, coords))
+    digest.update(f"|{charge}|{multiplicity}|{route}".encode())
+    return digest.hexdigest()
+
+
+def calc_key(template: "GJFTemplate", molecule: "MoleculeInput") -> str | None:
+    """生成する入力の計算内容のキー（構造が読めない・チェックポイント依存なら None）"""
+    route = normalized_route(template.route, template.trailer)
+    if route is None:
+        return None
+    if molecule.structure_bin is not None:
+        geometry = decode_geometry(molecule.structure_bin)
+    else:
+        geometry = geometry_from_text(molecule.structure_xyz or "")
+    if geometry is None or len(geometry[0]) == 0:
+        return None
+    return _key(*geometry, molecule.charge, molecule.multiplicity, route)
+
+
+def gjf_calc_key(content: str) -> str | None:
+    """.gjf の内容（ルート・追加入力・電荷・多重度・構造）から計算内容のキー。
+
+    Link1 で複数ステップを含む・構造を読めない・チェックポイント依存なら None。
+    """
+    try:
+        gjf = parse_gjf_file(content)
+    except GJFParseError:
+        return None
+    if len(gjf.steps) != 1:
+        return None
+    step = gjf.first
+    if step.molecule is None or not step.molecule.atoms:
+        return None
+    trailer = "".join(section.strip() + "\n\n" for section in step.additional_input)
+    route = normalized_route(step.route.raw, trailer)
+    if route is None:
+        return None
+    try:
+        numbers, coords = cartesian_geometries([(step.molecule, step.route)])[0]
+    except (GJFParseError, ValueError):
+        return None
+    return _key(numbers, coords, step.molecule.charge, step.molecule.multiplicity, route)
+
+
+class CalcCache:
+    """同じ計算内容（calc_key）の正常終了済みジョブの結果を新しいジョブに引き継ぐ
+
+    エントリは jobs.calc_key そのもので、元ジョブが削除されればそれ以降は引けなくなる。
+    引き継いだジョブは cached_from_job_id で元ジョブを指し、スカラーの結果は
+    job_results に複製する（配列は元ジョブのものを参照）。元ジョブを再実行すると、
+    引き継いだジョブは未完了のまま再実行するジョブを指し、その結果を待つ。
+    """
+
+    def __init__(self, enabled: bool = CALC_CACHE_ENABLED):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.invalidated = 0
+        self.saved_walltime_s = 0
+
+    def _count(self, **deltas: int):
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+
+    async def _find_sources(
+        self, db: AsyncSession, user_id: int, keys: set[str]
+    ) -> dict[str, tuple[Job, JobResult]]:
+        result = await db.execute(
+            select(Job, JobResult)
+            .join(JobResult, JobResult.job_id == Job.id)
+            .join(JobBundle, JobResult.bundle_id == JobBundle.id)
+            .where(
+                Job.calc_key.in_(keys),
+                Job.status == JobStatus.done,
+                Job.cached_from_job_id.is_(None),
+                JobResult.termination == "normal",
+                JobBundle.user_id == user_id,
+            )
+            .order_by(Job.id)
+        )
+        return {job.calc_key: (job, job_result) for job, job_result in result.all()}  # type: ignore
+
+    async def resolve(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        bundle_id: int,
+        jobs: list[Job],
+        use_cache: bool = True,
+    ) -> list[Job]:
+        """キャッシュに当たったジョブを完了扱いにして返す（コミットは呼び出し側）。
+
+        jobs は ID と calc_key が確定していること。当たらなかったジョブはそのまま。
+        """
+        if not jobs:
+            return []
+        if not (self.enabled and use_cache):
+            self._count(bypassed=len(jobs))
+            return []
+        keys = {job.calc_key for job in jobs if job.calc_key}
+        sources = await self._find_sources(db, user_id, keys) if keys else {}  # type: ignore
+
+        hits = []
+        saved = 0
+        for job in jobs:
+            found = sources.get(job.calc_key)  # type: ignore
+            if found is None or found[0].id == job.id:
+                continue
+            source, source_result = found
+            job.status = JobStatus.done  # type: ignore
+            job.cached_from_job_id = source.id
+            # ログの閲覧・出力の取得は元ジョブのファイルをそのまま使う
+            job.log_path = source.log_path
+            job.server_credential_id = source.server_credential_id
+            job.remote_job_id = None  # type: ignore
+            db.add(
+                crud_result.copy_job_result(
+                    source_result, job.id, job.molecule_id, bundle_id  # type: ignore
+                )
+            )
+            hits.append(job)
+            saved += source_result.walltime_s or 0  # type: ignore
+        self._count(hits=len(hits), misses=len(jobs) - len(hits), saved_walltime_s=saved)
+        if hits:
+            logger.info(f"{len(hits)} 件のジョブを計算済みの結果で完了にしました (bundle={bundle_id})")
+        return hits
+
+    async def invalidate_sources(
+        self, db: AsyncSession, source_ids: list[int], replacement: Job | None = None
+    ) -> int:
+        """元ジョブ（削除・再実行・結果が使えなくなったもの）から結果を引き継いだジョブ、
+        その結果を待っているジョブを未完了に戻す（コミットは呼び出し側）。
+
+        replacement（元ジョブを再実行するジョブ）を渡すとその結果を待たせ、完了したら
+        refresh_dependents が引き継ぐ。渡さなければ自分で計算するよう投入キューへ登録する。
+        """
+        if not source_ids:
+            return 0
+        result = await db.execute(select(Job).where(Job.cached_from_job_id.in_(source_ids)))
+        dependents = [job for job in result.scalars().all() if job.id not in source_ids]
+        if not dependents:
+            return 0
+        await db.execute(
+            delete(JobResult).where(JobResult.job_id.in_([job.id for job in dependents]))
+        )
+        for job in dependents:
+            job.status = JobStatus.queued  # type: ignore
+            job.cached_from_job_id = replacement.id if replacement is not None else None
+            job.log_path = None  # type: ignore
+            job.server_credential_id = None  # type: ignore
+        if replacement is None:
+            await self._enqueue(db, dependents)
+        self._count(invalidated=len(dependents))
+        return len(dependents)
+
+    async def _enqueue(self, db: AsyncSession, jobs: list[Job]):
+        """投入キューへ登録する（ディスパッチャは次の周期で拾う）"""
+        result = await db.execute(
+            select(Job.id, JobBundle.user_id)
+            .join(Molecule, Job.molecule_id == Molecule.id)
+            .join(JobBundle, Molecule.bundle_id == JobBundle.id)
+            .outerjoin(SubmissionQueueEntry, SubmissionQueueEntry.job_id == Job.id)
+            .where(Job.id.in_([job.id for job in jobs]), SubmissionQueueEntry.id.is_(None))
+        )
+        db.add_all(
+            SubmissionQueueEntry(job_id=job_id, user_id=user_id) for job_id, user_id in result.all()
+        )
+
+    async def refresh_dependents(
+        self, db: AsyncSession, source_id: int, source_result: JobResult
+    ) -> int:
+        """元ジョブの結果を保存・置き換えたとき、引き継いだジョブ・結果を待っていたジョブに
+        その複製を置いて完了にする（正常終了でなければ自分で計算するよう投入キューへ登録する。
+        コミットは呼び出し側）"""
+        if source_result.termination != "normal":
+            return await self.invalidate_sources(db, [source_id])
+        result = await db.execute(
+            select(Job, Molecule.bundle_id)
+            .join(Molecule, Job.molecule_id == Molecule.id)
+            .where(Job.cached_from_job_id == source_id, Job.id != source_id)
+        )
+        dependents = result.all()
+        if not dependents:
+            return 0
+        source = await db.get(Job, source_id)
+        await db.execute(
+            delete(JobResult).where(JobResult.job_id.in_([job.id for job, _ in dependents]))
+        )
+        for job, bundle_id in dependents:
+            db.add(
+                crud_result.copy_job_result(source_result, job.id, job.molecule_id, bundle_id)
+            )
+            job.status = JobStatus.done
+            job.log_path = source.log_path  # type: ignore
+            job.server_credential_id = source.server_credential_id  # type: ignore
+        return len(dependents)
+
+    async def stats(self, db: AsyncSession, user_id: int) -> dict:
+        result = await db.execute(
+            select(func.count(Job.id))
+            .join(Molecule, Job.molecule_id == Molecule.id)
+            .join(JobBundle, Molecule.bundle_id == JobBundle.id)
+            .where(JobBundle.user_id == user_id, Job.cached_from_job_id.is_not(None))
+        )
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "invalidated": self.invalidated,
+            "hit_rate": self.hits / lookups if lookups else None,
+            "saved_walltime_s": self.saved_walltime_s,
+            "cached_jobs": result.scalar() or 0,  # このユーザーの結果を引き継いだジョブ数
+        }
+
+
+calc_cache = CalcCache()
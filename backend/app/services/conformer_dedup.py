@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import os
+from dataclasses import dataclass
+
+import numpy as np
+from dotenv import load_dotenv
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Molecule
+from app.utils.conformers import find_duplicate_conformers
+from app.utils.geometry import decode_geometry
+from app.utils.zmatrix import geometry_from_text
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# 同じ配座とみなす RMSD の上限（Å）
+DEDUP_RMSD_THRESHOLD = float(os.getenv("DEDUP_RMSD_THRESHOLD", "0.125"))
+
+Geometry = tuple[np.ndarray, np.ndarray]
+
+
+@dataclass
+class BundleConformer:
+    id: int
+    name: str
+    charge: int
+    multiplicity: int
+    geometry: Geometry | None
+
+
+@dataclass
+class DuplicateMatch:
+    """アップロードされた構造が重複していた相手（既存の分子か、同じアップロードの先のファイル）"""
+
+    rmsd: float
+    name: str
+    molecule_id: int | None = None
+    upload_index: int | None = None
+
+
+@dataclass
+class DedupOutcome:
+    molecules: int
+    duplicates: int
+    representatives: int  # 重複を1つ以上持つ代表の数
+    threshold: float
+
+
+def _geometry(structure_bin: bytes | None, structure_xyz: str | None) -> Geometry | None:
+    if structure_bin is not None:
+        return decode_geometry(structure_bin)
+    return geometry_from_text(structure_xyz) if structure_xyz else None
+
+
+async def load_bundle_conformers(
+    db: AsyncSession, bundle_id: int, representatives_only: bool = False
+) -> list[BundleConformer]:
+    query = select(
+        Molecule.id,
+        Molecule.name,
+        Molecule.charge,
+        Molecule.multiplicity,
+        Molecule.structure_bin,
+        Molecule.structure_xyz,
+    ).where(Molecule.bundle_id == bundle_id)
+    if representatives_only:
+        query = query.where(Molecule.duplicate_of_id.is_(None))
+    result = await db.execute(query.order_by(Molecule.id))
+    return [
+        BundleConformer(mol_id, name, charge, multiplicity, _geometry(structure_bin, structure_xyz))
+        for mol_id, name, charge, multiplicity, structure_bin, structure_xyz in result.all()
+    ]
+
+
+async def match_uploaded_conformers(
+    db: AsyncSession,
+    bundle_id: int,
+    uploads: list[tuple[str, int, int, Geometry | None]],
+    threshold: float = DEDUP_RMSD_THRESHOLD,
+) -> list[DuplicateMatch | None]:
+    """アップロードされた (名前, 電荷, 多重度, 構造) を、バンドルの既存の分子（重複と
+    されたものを除く）と、並びで前にあるアップロードとに対して照合する"""
+    existing = await load_bundle_conformers(db, bundle_id, representatives_only=True)
+    conformers = [(c.charge, c.multiplicity, c.geometry) for c in existing]
+    conformers += [(charge, multiplicity, geometry) for _, charge, multiplicity, geometry in uploads]
+    matches = await asyncio.to_thread(find_duplicate_conformers, conformers, threshold)
+
+    results: list[DuplicateMatch | None] = []
+    for match in matches[len(existing) :]:
+        if match is None:
+            results.append(None)
+        elif match.representative < len(existing):
+            representative = existing[match.representative]
+            results.append(DuplicateMatch(match.rmsd, representative.name, molecule_id=representative.id))
+        else:
+            index = match.representative - len(existing)
+            results.append(DuplicateMatch(match.rmsd, uploads[index][0], upload_index=index))
+    return results
+
+
+async def dedup_bundle(
+    db: AsyncSession, bundle_id: int, threshold: float = DEDUP_RMSD_THRESHOLD
+) -> DedupOutcome:
+    """バンドル全体の重複判定をやり直し、duplicate_of_id を付け替える（ID の小さい分子を代表にする）"""
+    conformers = await load_bundle_conformers(db, bundle_id)
+    matches = await asyncio.to_thread(
+        find_duplicate_conformers,
+        [(c.charge, c.multiplicity, c.geometry) for c in conformers],
+        threshold,
+    )
+    rows = [
+        {
+            "id": conformer.id,
+            "duplicate_of_id": conformers[match.representative].id,
+            "duplicate_rmsd": match.rmsd,
+        }
+        for conformer, match in zip(conformers, matches)
+        if match is not None
+    ]
+    await db.execute(
+        update(Molecule)
+        .where(Molecule.bundle_id == bundle_id)
+        .values(duplicate_of_id=None, duplicate_rmsd=None)
+    )
+    if rows:
+        await db.execute(update(Molecule), rows)
+    await db.commit()
+    outcome = DedupOutcome(
+        molecules=len(conformers),
+        duplicates=len(rows),
+        representatives=len({row["duplicate_of_id"] for row in rows}),
+        threshold=threshold,
+    )
+    logger.info(
+        f"バンドル {bundle_id}: {outcome.molecules} 分子中 {outcome.duplicates} 件を重複とした"
+        f" (RMSD < {threshold} Å)"
+    )
+    return outcome
@@ -0,0 +1,118 @@
+import hashlib
+import os
+import threading
+import time
+from dataclasses import dataclass
+from io import StringIO
+
+import paramiko
+from dotenv import load_dotenv
+
+from app.models.server_credential import AuthMethod, ServerCredential
+from app.utils.encryption import decrypt_text
+
+load_dotenv()
+
+CREDENTIAL_CACHE_TTL = float(os.getenv("CREDENTIAL_CACHE_TTL", "300"))
+
+_KEY_CLASSES = (paramiko.RSAKey, paramiko.Ed25519Key, paramiko.ECDSAKey)
+
+
+def load_private_key(key_text: str) -> paramiko.PKey:
+    """PEM/OpenSSH 形式の秘密鍵文字列を paramiko の鍵オブジェクトに変換"""
+    last_error: Exception | None = None
+    for key_class in _KEY_CLASSES:
+        try:
+            return key_class.from_private_key(StringIO(key_text))
+        except paramiko.SSHException as e:
+            last_error = e
+    raise paramiko.SSHException(f"秘密鍵を読み込めません: {last_error}")
+
+
+def credential_version(credential: ServerCredential) -> str:
+    """登録日時と暗号化済みの認証情報から、更新のたびに変わる版数を作る"""
+    digest = hashlib.sha256()
+    for value in (
+        credential.created_at,
+        credential.auth_method,
+        credential.username,
+        credential.password_encrypted,
+        credential.ssh_key_encrypted,
+    ):
+        digest.update(str(value).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+@dataclass
+class AuthMaterial:
+    """復号済みパスワード、または読み込み済みの秘密鍵（メモリ上にのみ保持）"""
+
+    username: str
+    password: str | None = None
+    pkey: paramiko.PKey | None = None
+
+    def connect_kwargs(self) -> dict:
+        if self.pkey is not None:
+            return {"username": self.username, "pkey": self.pkey}
+        return {"username": self.username, "password": self.password}
+
+
+@dataclass
+class _CacheEntry:
+    version: str
+    material: AuthMaterial
+    expires_at: float
+
+
+class CredentialCache:
+    """ServerCredential ごとに復号・鍵の読み込み結果を短時間キャッシュする
+
+    キーは (credential.id, 版数) で、TTL を過ぎるか更新・削除で明示的に
+    無効化されるまで Fernet の復号と秘密鍵のパースを省略する。
+    """
+
+    def __init__(self, ttl: float = CREDENTIAL_CACHE_TTL):
+        self.ttl = ttl
+        self._entries: dict[int, _CacheEntry] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _build(self, credential: ServerCredential) -> AuthMaterial:
+        if credential.auth_method == AuthMethod.ssh_key:
+            return AuthMaterial(
+                username=credential.username,  # type: ignore
+                pkey=load_private_key(decrypt_text(credential.ssh_key_encrypted)),  # type: ignore
+            )
+        return AuthMaterial(
+            username=credential.username,  # type: ignore
+            password=decrypt_text(credential.password_encrypted),  # type: ignore
+        )
+
+    def get(self, credential: ServerCredential) -> AuthMaterial:
+        credential_id: int = credential.id  # type: ignore
+        version = credential_version(credential)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(credential_id)
+            if entry is not None and entry.version == version and entry.expires_at > now:
+                self.hits += 1
+                return entry.material
+        # 復号・鍵のパースはロックの外で行う
+        material = self._build(credential)
+        with self._lock:
+            self.misses += 1
+            self._entries[credential_id] = _CacheEntry(version, material, now + self.ttl)
+        return material
+
+    def invalidate(self, credential_id: int):
+        with self._lock:
+            self._entries.pop(credential_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+credential_cache = CredentialCache()
@@ -0,0 +1,521 @@
+import asyncio
+import functools
+import hashlib
+import json
+import os
+import re
+import string
+import time
+import zipfile
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+
+import pydantic
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud import job as crud_job
+from app.models import Job, JobBundle, Molecule, SubmissionQueueEntry, User
+from app.models.job import JobStatus
+from app.models.submission_queue import SubmissionState
+from app.schemas.calc_settings import CalcSettings, compose_route
+from app.services.calc_cache import calc_cache, calc_key, gjf_calc_key
+from app.services.resource_estimator import ResourceEstimate, resource_estimator
+from app.utils.exceptions import ValidationError
+from app.utils.geometry import decode_geometry, format_xyz
+from app.utils.gjf_parser import Route, parse_route
+from app.utils.zmatrix import geometry_from_text
+
+INPUTS_DIRNAME = "inputs"
+# クラスタ上の入力ファイル名（input.gjf）に合わせたチェックポイント名
+REMOTE_CHECKPOINT_STEM = "input"
+ZIP_CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class GJFTemplate:
+    """calc_settings を1回だけ検証・展開したもの（分子ごとに変わる部分だけを後で埋める）"""
+
+    job_type: str
+    route: str
+    header: str  # %Chk 以外の Link 0 とルート、タイトル前の空行
+    checkpoint: bool
+    title: str  # str.format のパターン
+    trailer: str  # 分子指定の後ろの追加入力
+    fingerprint: str
+    # 推定値で埋める Link 0（推定値は入力ごとに変わりうるので fingerprint には含めない）
+    auto_mem: bool = False
+    auto_nprocshared: bool = False
+
+    @property
+    def uses_index(self) -> bool:
+        """タイトルに分子の並び順（{index}）を使うか"""
+        return any(name == "index" for _, name, _, _ in string.Formatter().parse(self.title))
+
+    @property
+    def auto_resources(self) -> bool:
+        return self.auto_mem or self.auto_nprocshared
+
+
+@dataclass
+class MoleculeInput:
+    id: int
+    name: str
+    charge: int
+    multiplicity: int
+    structure_bin: bytes | None
+    structure_xyz: str | None
+
+
+def compile_template(settings: CalcSettings) -> GJFTemplate:
+    link0 = []
+    if settings.mem:
+        link0.append(f"%Mem={settings.mem}")
+    if settings.nprocshared:
+        link0.append(f"%NProcShared={settings.nprocshared}")
+    for key, value in settings.link0.items():
+        link0.append(f"%{key}={value}" if value else f"%{key}")
+    extra = {key.lower() for key in settings.link0}
+    route = settings.route or compose_route(settings.dict())
+    header = "".join(line + "\n" for line in link0) + route + "\n\n"
+    trailer = "".join(section.strip() + "\n\n" for section in settings.additional_input)
+    fingerprint = hashlib.sha256(
+        json.dumps([header, settings.checkpoint, settings.title, trailer]).encode()
+    ).hexdigest()
+    return GJFTemplate(
+        job_type=settings.job_type,
+        route=route,
+        header=header,
+        checkpoint=settings.checkpoint,
+        title=settings.title,
+        trailer=trailer,
+        fingerprint=fingerprint,
+        auto_mem=settings.auto_resources and not settings.mem and "mem" not in extra,
+        auto_nprocshared=(
+            settings.auto_resources and not settings.nprocshared and "nprocshared" not in extra
+        ),
+    )
+
+
+class BundleTemplates:
+    """バンドルの既定テンプレートと、overrides のある分子用のテンプレート"""
+
+    def __init__(self, settings: CalcSettings):
+        self.settings = settings
+        self.default = compile_template(settings)
+        self._overridden: dict[str, GJFTemplate] = {}
+
+    def for_molecule(self, name: str) -> GJFTemplate:
+        if name not in self.settings.overrides:
+            return self.default
+        if name not in self._overridden:
+            self._overridden[name] = compile_template(self.settings.for_molecule(name))
+        return self._overridden[name]
+
+
+def input_key(template: GJFTemplate, molecule: MoleculeInput, index: int) -> str:
+    """生成される入力の内容を決めるもの（設定・分子）のハッシュ。
+
+    並び順はタイトルで {index} を使うときだけ含める（分子の追加・削除で後ろの分子の
+    入力まで作り直さないため）。
+    """
+    digest = hashlib.sha256(template.fingerprint.encode())
+    position = index if template.uses_index else ""
+    digest.update(
+        f"|{molecule.name}|{molecule.charge}|{molecule.multiplicity}|{position}|".encode()
+    )
+    digest.update(molecule.structure_bin or (molecule.structure_xyz or "").encode())
+    return digest.hexdigest()
+
+
+def render_input(
+    template: GJFTemplate,
+    molecule: MoleculeInput,
+    index: int,
+    bundle_id: int,
+    checkpoint_stem: str,
+    resources: Iterable[str] = (),
+) -> str:
+    """resources は推定値による Link 0 の行（%Chk の直後に置く）"""
+    if molecule.structure_bin is not None:
+        coordinates = format_xyz(*decode_geometry(molecule.structure_bin))
+    else:
+        coordinates = (molecule.structure_xyz or "").strip()
+    title = template.title.format(
+        name=molecule.name,
+        molecule_id=molecule.id,
+        bundle_id=bundle_id,
+        charge=molecule.charge,
+        multiplicity=molecule.multiplicity,
+        index=index,
+    )
+    return "".join(
+        (
+            f"%Chk={checkpoint_stem}.chk\n" if template.checkpoint else "",
+            "".join(line + "\n" for line in resources),
+            template.header,
+            title,
+            "\n\n",
+            f"{molecule.charge} {molecule.multiplicity}\n",
+            coordinates,
+            "\n\n",
+            template.trailer,
+        )
+    )
+
+
+def molecule_numbers(molecule: MoleculeInput):
+    """分子の原子番号の並び（構造を読めなければ None）"""
+    if molecule.structure_bin is not None:
+        return decode_geometry(molecule.structure_bin)[0]
+    geometry = geometry_from_text(molecule.structure_xyz or "")
+    return geometry[0] if geometry is not None else None
+
+
+def estimate_resources(template: GJFTemplate, molecule: MoleculeInput) -> ResourceEstimate | None:
+    numbers = molecule_numbers(molecule)
+    if numbers is None or len(numbers) == 0:
+        return None
+    return resource_estimator.estimate(numbers, _parsed_route(template.route))
+
+
+@functools.lru_cache(maxsize=256)
+def _parsed_route(route: str) -> Route:
+    return parse_route(route)
+
+
+def apply_resources(content: str, lines: list[str]) -> str:
+    """入力先頭の Link 0 のうち lines と同じコマンドの行を置き換える（無ければ %Chk の後に足す）"""
+    existing = content.split("\n")
+    link0_end = 0
+    while link0_end < len(existing) and existing[link0_end].startswith("%"):
+        link0_end += 1
+    positions = {existing[i].split("=", 1)[0].strip().lower(): i for i in range(link0_end)}
+    insert_at = 1 if link0_end and existing[0].lower().startswith("%chk") else 0
+    added = []
+    for line in lines:
+        command = line.split("=", 1)[0].strip().lower()
+        if command in positions:
+            existing[positions[command]] = line
+        else:
+            added.append(line)
+    existing[insert_at:insert_at] = added
+    return "\n".join(existing)
+
+
+def input_filenames(molecules: list[MoleculeInput]) -> list[str]:
+    """zip 内のファイル名（分子名から作り、重複したら分子IDを付ける）"""
+    names = []
+    used = set()
+    for molecule in molecules:
+        stem = re.sub(r"[^\w.-]", "_", molecule.name).strip(".") or f"molecule_{molecule.id}"
+        if stem.lower().endswith(".gjf"):
+            stem = stem[:-4]
+        if stem in used:
+            stem = f"{stem}_{molecule.id}"
+        used.add(stem)
+        names.append(stem)
+    return names
+
+
+async def load_bundle_molecules(db: AsyncSession, bundle_id: int) -> list[MoleculeInput]:
+    """入力を作る分子（配座の重複とされた分子は除く）"""
+    result = await db.execute(
+        select(
+            Molecule.id,
+            Molecule.name,
+            Molecule.charge,
+            Molecule.multiplicity,
+            Molecule.structure_bin,
+            Molecule.structure_xyz,
+        )
+        .where(Molecule.bundle_id == bundle_id, Molecule.duplicate_of_id.is_(None))
+        .order_by(Molecule.id)
+    )
+    return [MoleculeInput(*row) for row in result.all()]
+
+
+class _ZipBuffer:
+    """シークできない書き込み先（zipfile はデータディスクリプタ付きで書き出す）"""
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def write(self, b) -> int:
+        self.data += b
+        return len(b)
+
+    def flush(self):
+        pass
+
+    def take(self) -> bytes:
+        chunk = bytes(self.data)
+        self.data.clear()
+        return chunk
+
+
+def stream_zip(entries: Iterable[tuple[str, str]]) -> Iterator[bytes]:
+    """(ファイル名, 内容) を zip にしながら、ある程度溜まるごとに返す"""
+    buffer = _ZipBuffer()
+    date_time = time.localtime()[:6]
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=1) as zf:  # type: ignore
+        for name, content in entries:
+            zf.writestr(zipfile.ZipInfo(name, date_time), content, zipfile.ZIP_DEFLATED, 1)
+            if len(buffer.data) >= ZIP_CHUNK_SIZE:
+                yield buffer.take()
+    yield buffer.take()
+
+
+def bundle_zip_entries(
+    bundle_id: int, templates: BundleTemplates, molecules: list[MoleculeInput]
+) -> Iterator[tuple[str, str]]:
+    for index, (molecule, stem) in enumerate(zip(molecules, input_filenames(molecules))):
+        template = templates.for_molecule(molecule.name)
+        yield f"{stem}.gjf", render_input(template, molecule, index, bundle_id, stem)
+
+
+def bundle_templates(bundle: JobBundle) -> BundleTemplates:
+    try:
+        settings = CalcSettings(**(bundle.calc_settings or {}))  # type: ignore
+    except pydantic.ValidationError as e:
+        # 検証の導入前に保存された自由形式の calc_settings など
+        raise ValidationError(f"バンドルの calc_settings が不正です（設定し直してください）: {e}")
+    return BundleTemplates(settings)
+
+
+def _write_files(directory: str, files: list[tuple[str, str]]):
+    os.makedirs(directory, exist_ok=True)
+    for path, content in files:
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+
+async def _latest_jobs(db: AsyncSession, bundle_id: int) -> dict[int, Job]:
+    result = await db.execute(
+        select(Job)
+        .join(Molecule, Job.molecule_id == Molecule.id)
+        .where(Molecule.bundle_id == bundle_id)
+        .order_by(Job.id)
+    )
+    return {job.molecule_id: job for job in result.scalars().all()}  # type: ignore
+
+
+def _read_gjf_calc_keys(paths: list[str]) -> list[str | None]:
+    keys = []
+    for path in paths:
+        try:
+            with open(path) as f:
+                keys.append(gjf_calc_key(f.read()))
+        except (OSError, UnicodeDecodeError):
+            keys.append(None)
+    return keys
+
+
+async def assign_calc_keys(db: AsyncSession, bundle: JobBundle, jobs: list[Job]):
+    """calc_key の無いジョブにキーを付ける。
+
+    この生成器が書いた入力（input_hash あり）はバンドルの計算設定と分子構造から、
+    それ以外（POST /jobs で登録した .gjf など）はファイルの内容から求める。
+    """
+    missing = [job for job in jobs if job.calc_key is None]
+    if not missing:
+        return
+    generated = [job for job in missing if job.input_hash is not None]
+    if generated:
+        templates = bundle_templates(bundle)
+        molecules = {m.id: m for m in await load_bundle_molecules(db, bundle.id)}  # type: ignore
+        for job in generated:
+            molecule = molecules.get(job.molecule_id)  # type: ignore
+            if molecule is not None:
+                job.calc_key = calc_key(templates.for_molecule(molecule.name), molecule)  # type: ignore
+    supplied = [job for job in missing if job.input_hash is None]
+    if supplied:
+        keys = await asyncio.to_thread(_read_gjf_calc_keys, [job.gjf_path for job in supplied])
+        for job, key in zip(supplied, keys):
+            job.calc_key = key  # type: ignore
+
+
+def _estimated_link0(job: Job, template: GJFTemplate, molecule: MoleculeInput) -> list[str]:
+    """推定値で埋める Link 0 の行（推定値を使えなければ空）。推定 walltime はジョブに記録する"""
+    estimate = estimate_resources(template, molecule) if template.auto_resources else None
+    if estimate is None or not estimate.usable:
+        job.estimated_walltime_s = None  # type: ignore
+        return []
+    job.estimated_walltime_s = estimate.walltime_s  # type: ignore
+    return estimate.link0(template.auto_mem, template.auto_nprocshared)
+
+
+def _rewrite_files(files: list[tuple[str, list[str]]]) -> int:
+    changed = []
+    for path, lines in files:
+        with open(path) as f:
+            content = f.read()
+        updated = apply_resources(content, lines)
+        if updated != content:
+            changed.append((path, updated))
+    for path, content in changed:
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    return len(changed)
+
+
+def bundle_inputs_dir(user: User, bundle_id: int) -> str:
+    """生成した入力を書き出すディレクトリ"""
+    return os.path.join(user.local_base_dir, INPUTS_DIRNAME, f"bundle_{bundle_id}")  # type: ignore
+
+
+async def refresh_resources(
+    db: AsyncSession, bundle: JobBundle, user: User, jobs: list[Job]
+) -> int:
+    """投入直前に、推定値で埋めた Link 0 を最新の推定値で書き直す（書き直したファイル数）。
+
+    入力の生成後に学習データが増えていれば推定値が変わっている。書き直すのはこの生成器が
+    今の設定で書いた入力（input_hash が一致し、入力ディレクトリにあるもの）だけで、
+    アップロード・POST /jobs で登録された入力や、推定値を使えなくなったジョブはそのままにする。
+    """
+    templates = bundle_templates(bundle)
+    if not templates.default.auto_resources and not templates.settings.overrides:
+        return 0
+    directory = bundle_inputs_dir(user, bundle.id)  # type: ignore
+    generated = [
+        job
+        for job in jobs
+        if job.input_hash is not None
+        and os.path.dirname(os.path.abspath(job.gjf_path)) == os.path.abspath(directory)  # type: ignore
+    ]
+    if not generated:
+        return 0
+    await resource_estimator.ensure_loaded(db)
+    molecules = {
+        m.id: (index, m)
+        for index, m in enumerate(await load_bundle_molecules(db, bundle.id))  # type: ignore
+    }
+    files = []
+    for job in generated:
+        if job.molecule_id not in molecules:
+            continue
+        index, molecule = molecules[job.molecule_id]  # type: ignore
+        template = templates.for_molecule(molecule.name)
+        if not template.auto_resources or job.input_hash != input_key(template, molecule, index):
+            continue
+        estimate = estimate_resources(template, molecule)
+        if estimate is None or not estimate.usable:
+            continue
+        job.estimated_walltime_s = estimate.walltime_s  # type: ignore
+        files.append((job.gjf_path, estimate.link0(template.auto_mem, template.auto_nprocshared)))
+    if not files:
+        return 0
+    rewritten = await asyncio.to_thread(_rewrite_files, files)
+    await db.commit()
+    return rewritten
+
+
+def _awaiting_submission(job: Job) -> bool:
+    """投入キューで待機中か、再実行したジョブの結果を待っていて、まだクラスタへ投入していないか"""
+    return job.status == JobStatus.queued and job.remote_job_id is None
+
+
+async def _cancel_superseded(db: AsyncSession, jobs: list[Job]):
+    """入力を作り直して置き換えたジョブを取り消す（投入キューのエントリも取り消す）"""
+    if not jobs:
+        return
+    ids = [job.id for job in jobs]
+    # このジョブの結果を待っていたジョブは、自分で計算するよう投入キューへ登録する
+    await calc_cache.invalidate_sources(db, ids)  # type: ignore
+    for job in jobs:
+        job.status = JobStatus.cancelled  # type: ignore
+    await db.flush()
+    await db.execute(
+        update(SubmissionQueueEntry)
+        .where(
+            SubmissionQueueEntry.job_id.in_(ids),
+            SubmissionQueueEntry.state == SubmissionState.pending,
+        )
+        .values(state=SubmissionState.cancelled)
+    )
+
+
+@dataclass
+class GenerationOutcome:
+    written: list[Job]  # 入力を書き出した（書き直した）うち、投入が必要なジョブ
+    unchanged: int
+    created: int
+    cached: int = 0  # 計算済みの結果を引き継いで完了にしたジョブ
+
+
+async def generate_bundle_inputs(
+    db: AsyncSession, bundle: JobBundle, user: User, use_cache: bool = True
+) -> GenerationOutcome:
+    """バンドルの全分子の入力を生成してジョブに結び付ける。
+
+    分子ごとの最新ジョブの input_hash が今回の設定・構造と一致し、ファイルも残っていれば
+    何もしない。未投入のジョブがあればその入力を書き直し、投入済みなら新しいジョブを作る。
+    投入待ち（投入キューに登録済み・再実行の結果待ち）のジョブは古い入力のまま投入されない
+    よう取り消し、新しいジョブに置き換える。
+    同じ計算内容の完了ジョブがあれば（use_cache=False でなければ）その結果を引き継ぐ。
+    """
+    templates = bundle_templates(bundle)
+    molecules = await load_bundle_molecules(db, bundle.id)  # type: ignore
+    latest = await _latest_jobs(db, bundle.id)  # type: ignore
+    unsubmitted = {
+        job.id for job in await crud_job.get_unsubmitted_jobs_by_bundle(db, bundle.id)  # type: ignore
+    }
+
+    pending: list[tuple[Job, GJFTemplate, MoleculeInput, int]] = []
+    superseded: list[Job] = []
+    unchanged = 0
+    created = 0
+    for index, molecule in enumerate(molecules):
+        template = templates.for_molecule(molecule.name)
+        key = input_key(template, molecule, index)
+        job = latest.get(molecule.id)
+        if job is not None and job.input_hash == key and os.path.exists(job.gjf_path):  # type: ignore
+            unchanged += 1
+            continue
+        if job is not None and job.id not in unsubmitted and _awaiting_submission(job):
+            superseded.append(job)
+        if job is None or job.id not in unsubmitted:
+            job = Job(molecule_id=molecule.id, gjf_path="", status=JobStatus.queued)
+            db.add(job)
+            created += 1
+        job.job_type = template.job_type  # type: ignore
+        job.input_hash = key  # type: ignore
+        job.calc_key = calc_key(template, molecule)  # type: ignore
+        pending.append((job, template, molecule, index))
+
+    await db.flush()  # 新しいジョブの ID を確定させてからファイル名を決める
+    await _cancel_superseded(db, superseded)
+    directory = bundle_inputs_dir(user, bundle.id)  # type: ignore
+    if any(template.auto_resources for _, template, _, _ in pending):
+        await resource_estimator.ensure_loaded(db)
+    files = []
+    for job, template, molecule, index in pending:
+        job.gjf_path = os.path.join(directory, f"job_{job.id}.gjf")  # type: ignore
+        files.append(
+            (
+                job.gjf_path,
+                render_input(
+                    template,
+                    molecule,
+                    index,
+                    bundle.id,  # type: ignore
+                    REMOTE_CHECKPOINT_STEM,
+                    _estimated_link0(job, template, molecule),
+                ),
+            )
+        )
+    if files:
+        await asyncio.to_thread(_write_files, directory, files)
+    written = [job for job, _, _, _ in pending]
+    cached = await calc_cache.resolve(db, user.id, bundle.id, written, use_cache)  # type: ignore
+    await db.commit()
+    return GenerationOutcome(
+        written=[job for job in written if job not in cached],
+        unchanged=unchanged,
+        created=created,
+        cached=len(cached),
+    )
@@ -0,0 +1,132 @@
+import os
+import time
+from dataclasses import dataclass, replace
+
+from dotenv import load_dotenv
+
+from app.utils.qstat_parser import QstatJobRecord
+
+load_dotenv()
+
+# 直近この秒数以内に実行開始したジョブの待ち時間から混み具合を推定する
+HOST_WAIT_WINDOW = float(os.getenv("HOST_WAIT_WINDOW", "3600"))
+# 待ち時間の実績が無いホストに仮定する待ち時間（秒）
+HOST_DEFAULT_WAIT = float(os.getenv("HOST_DEFAULT_WAIT", "60"))
+HOST_WAIT_SMOOTHING = 0.3
+
+
+@dataclass
+class HostLoad:
+    """qstat -x から求めたホストの混み具合"""
+
+    queue_depth: int = 0  # 全ユーザー分の待機中ジョブ数
+    running: int = 0
+    recent_wait: float | None = None  # 直近の平均待ち時間（秒、指数移動平均）
+    updated_at: float = 0.0
+
+
+@dataclass
+class HostCapacity:
+    """投入先の候補となるホストと、今回の投入で使える枠"""
+
+    credential_id: int
+    free_slots: int
+    load: HostLoad
+
+
+def recent_queue_wait(
+    records: list[QstatJobRecord], window: float = HOST_WAIT_WINDOW
+) -> float | None:
+    """直近に実行開始したジョブの待ち時間（start_time - qtime）の平均"""
+    started = [r for r in records if r.start_time is not None and r.qtime is not None]
+    if not started:
+        return None
+    # リモートとローカルの時計のずれを避けるため、最新の開始時刻を基準にする
+    latest = max(r.start_time for r in started)  # type: ignore
+    waits = [
+        r.start_time - r.qtime  # type: ignore
+        for r in started
+        if latest - r.start_time <= window  # type: ignore
+    ]
+    return sum(waits) / len(waits) if waits else None
+
+
+def expected_wait(load: HostLoad, free_slots: int, assigned: int) -> float:
+    """これまでに割り当てた件数を積んだときの推定待ち時間（小さいほど空いている）"""
+    base = load.recent_wait if load.recent_wait is not None else HOST_DEFAULT_WAIT
+    return base * (1 + (load.queue_depth + assigned) / max(free_slots, 1))
+
+
+def assign_hosts(count: int, hosts: list[HostCapacity]) -> list[int]:
+    """count 件のジョブを1件ずつ推定待ち時間が最小のホストへ割り当て、
+    投入順に対応する credential_id のリストを返す（枠が尽きた分は含めない）"""
+    assigned = {host.credential_id: 0 for host in hosts}
+    result: list[int] = []
+    for _ in range(count):
+        candidates = [
+            host for host in hosts if assigned[host.credential_id] < host.free_slots
+        ]
+        if not candidates:
+            break
+        best = min(
+            candidates,
+            key=lambda h: (
+                expected_wait(h.load, h.free_slots, assigned[h.credential_id]),
+                h.credential_id,
+            ),
+        )
+        assigned[best.credential_id] += 1
+        result.append(best.credential_id)
+    return result
+
+
+def place_jobs(pins: list[int | None], hosts: list[HostCapacity]) -> list[int | None]:
+    """ジョブごとの投入先の credential_id を返す（今回は投入しないジョブは None）
+
+    pins は以前に投入を試みたホスト（無ければ None）。そのとき qsub が済んでいたかも
+    しれないので同じホストに固定し、空きが無ければ見送る。残りは固定した分を差し引いた
+    空き枠で assign_hosts と同じく推定待ち時間の短いホストへ割り当てる。
+    """
+    free = {host.credential_id: host.free_slots for host in hosts}
+    result: list[int | None] = [None] * len(pins)
+    unpinned = []
+    for i, pinned in enumerate(pins):
+        if pinned is None:
+            unpinned.append(i)
+        elif free.get(pinned, 0) > 0:
+            free[pinned] -= 1
+            result[i] = pinned
+    remaining = [replace(host, free_slots=free[host.credential_id]) for host in hosts]
+    for i, credential_id in zip(unpinned, assign_hosts(len(unpinned), remaining)):
+        result[i] = credential_id
+    return result
+
+
+class HostLoadRegistry:
+    """ステータスポーラーが更新し、ディスパッチャが投入先の選択に使う"""
+
+    def __init__(self):
+        self._loads: dict[int, HostLoad] = {}
+
+    def get(self, credential_id: int) -> HostLoad:
+        return self._loads.get(credential_id) or HostLoad()
+
+    def update(self, credential_id: int, records: list[QstatJobRecord]):
+        previous = self._loads.get(credential_id)
+        wait = recent_queue_wait(records)
+        if wait is not None and previous is not None and previous.recent_wait is not None:
+            wait = HOST_WAIT_SMOOTHING * wait + (1 - HOST_WAIT_SMOOTHING) * previous.recent_wait
+        elif wait is None and previous is not None:
+            wait = previous.recent_wait
+        self._loads[credential_id] = HostLoad(
+            queue_depth=sum(1 for r in records if r.state in ("Q", "qw", "H")),
+            running=sum(1 for r in records if r.state in ("R", "r")),
+            recent_wait=wait,
+            updated_at=time.time(),
+        )
+
+    def discard(self, credential_id: int):
+        self._loads.pop(credential_id, None)
+
+
+host_load = HostLoadRegistry()
@@ -1,16 +1,70 @@
-import paramiko
+import hashlib
+import io
 import os
-from models import ServerCredential
-from utils.encryption import decrypt_text
-from typing import Any
+import posixpath
+import shlex
+import tarfile
+from dataclasses import dataclass
+from typing import Callable
+from dotenv import load_dotenv
+from app.models import ServerCredential
+from app.services.ssh_pool import ssh_pool
+
+load_dotenv()
+
+# 投入ファイル数がこの値以上なら tar ストリーム転送を自動選択する
+TAR_TRANSFER_THRESHOLD = int(os.getenv("TAR_TRANSFER_THRESHOLD", "50"))
+TAR_MANIFEST_NAME = ".qcc_manifest.sha256"
+
+# 投入に成功した qsub の出力を残すファイル（ジョブディレクトリ内）
+QSUB_MARKER_NAME = ".qcc_qsub"
+
+# 標準入力で受け取ったディレクトリごとに qsubg16 を実行し、
+# "ディレクトリ<TAB>qsub 出力" を1行ずつ返すリモートスクリプト。
+# 投入に成功したら出力を QSUB_MARKER_NAME に残し、すでに残っているディレクトリでは
+# qsub せずにその内容を返す（タイムアウト後の再試行で二重に投入しないため）
+BULK_SUBMIT_SCRIPT = r"""
+while IFS= read -r d; do
+  if [ -s "$d/$1" ]; then
+    out=$(cat "$d/$1")
+  else
+    out=$(cd "$d" && qsubg16 "$0" 2>&1 | tr '\n' ' ')
+    case "$out" in *job*) printf '%s' "$out" > "$d/$1" ;; esac
+  fi
+  printf '%s\t%s\n' "$d" "$out"
+done
+"""
+
+
+@dataclass
+class SubmissionResult:
+    remote_dir: str
+    remote_job_id: str | None = None
+    error: str | None = None
+
+
+def remote_job_dir(remote_base_dir: str, bundle_id: int, job_id: int) -> str:
+    """ジョブの入出力を置くリモートディレクトリ"""
+    return posixpath.join(remote_base_dir, f"bundle_{bundle_id}", f"job_{job_id}")
+
+
+def parse_qsub_output(output: str) -> str:
+    # qsub 出力例: "Your job 12345 ("input.gjf") has been submitted"
+    if "job" not in output:
+        raise RuntimeError(f"qsub失敗: {output}")
+    return output.split("job")[1].split("(")[0].strip()
+
+
+def _add_bytes(tar: tarfile.TarFile, arcname: str, data: bytes):
+    info = tarfile.TarInfo(arcname)
+    info.size = len(data)
+    info.mode = 0o644
+    tar.addfile(info, io.BytesIO(data))
 
 
 class JobExecutionController:
     def __init__(self, credential: ServerCredential):
-        self.host = credential.host
-        self.username = credential.username
-        self.auth_method = credential.auth_method
-        self.password = decrypt_text(credential.password_encrypted)  # type: ignore
+        self.credential = credential
 
     def submit_job(self, local_gjf_path: str, remote_dir: str, filename: str) -> str:
         remote_gjf_path = os.path.join(remote_dir, filename)
@@ -22,40 +76,125 @@ class JobExecutionController:
         job_id = self._submit_qsub(remote_gjf_path)
         return job_id
 
+    def submit_jobs(
+        self,
+        entries: list[tuple[str, str]],
+        filename: str = "input.gjf",
+        transfer_mode: str = "auto",
+        on_result: Callable[[SubmissionResult], None] | None = None,
+    ) -> list[SubmissionResult]:
+        """(ローカル gjf パス, リモートディレクトリ) の組をまとめて投入
+
+        転送は1つの SFTP セッション（sftp）か、1本の SSH チャネル上の
+        tar ストリーム（tar）で行い、qsub は1回のリモート呼び出しで行う。
+        on_result は qsub の結果が1件返るたびに（このスレッドから）呼ばれる。
+        """
+        if transfer_mode == "auto":
+            transfer_mode = "tar" if len(entries) >= TAR_TRANSFER_THRESHOLD else "sftp"
+
+        if transfer_mode == "tar":
+            self.upload_files_tar(entries, filename)
+        else:
+            self.upload_files_sftp(entries, filename)
+
+        return self._submit_qsub_bulk([d for _, d in entries], filename, on_result)
+
+    def upload_files_sftp(self, entries: list[tuple[str, str]], filename: str):
+        self._make_remote_dirs([remote_dir for _, remote_dir in entries])
+        with ssh_pool.sftp(self.credential) as sftp:
+            for local_path, remote_dir in entries:
+                sftp.put(local_path, posixpath.join(remote_dir, filename))
+
+    def upload_files_tar(self, entries: list[tuple[str, str]], filename: str):
+        """圧縮 tar をその場で生成して1本のチャネルでリモートの tar -x に流し込む
+
+        チェックサムのマニフェストを同梱し、展開後に sha256sum -c で検証する。
+        """
+        root = posixpath.commonpath([remote_dir for _, remote_dir in entries])
+        cmd = (
+            f"mkdir -p {shlex.quote(root)} && cd {shlex.quote(root)} && "
+            f"tar -xzf - && sha256sum -c --quiet {TAR_MANIFEST_NAME} && "
+            f"rm -f {TAR_MANIFEST_NAME}"
+        )
+        with ssh_pool.channel(self.credential) as chan:
+            chan.set_combine_stderr(True)
+            chan.exec_command(cmd)
+            stream = chan.makefile("wb")
+            manifest = []
+            with tarfile.open(fileobj=stream, mode="w|gz") as tar:
+                for local_path, remote_dir in entries:
+                    arcname = posixpath.join(
+                        posixpath.relpath(remote_dir, root), filename
+                    )
+                    with open(local_path, "rb") as f:
+                        data = f.read()
+                    manifest.append(f"{hashlib.sha256(data).hexdigest()}  {arcname}\n")
+                    _add_bytes(tar, arcname, data)
+                _add_bytes(tar, TAR_MANIFEST_NAME, "".join(manifest).encode())
+            stream.flush()
+            chan.shutdown_write()
+            output = chan.makefile("rb").read().decode()
+            exit_status = chan.recv_exit_status()
+        if exit_status != 0:
+            raise RuntimeError(f"tar 転送の検証に失敗しました: {output}")
+
+    def _make_remote_dirs(self, remote_dirs: list[str]):
+        stdin = "".join(f"{d}\n" for d in remote_dirs).encode()
+        _, error, exit_status = ssh_pool.exec_command(
+            self.credential, "xargs -d '\\n' mkdir -p", stdin=stdin
+        )
+        if exit_status != 0:
+            raise RuntimeError(f"リモートディレクトリの作成に失敗しました: {error}")
+
+    def _submit_qsub_bulk(
+        self,
+        remote_dirs: list[str],
+        filename: str,
+        on_result: Callable[[SubmissionResult], None] | None = None,
+    ) -> list[SubmissionResult]:
+        stdin = "".join(f"{d}\n" for d in remote_dirs).encode()
+        cmd = (
+            f"sh -c {shlex.quote(BULK_SUBMIT_SCRIPT)} "
+            f"{shlex.quote(filename)} {shlex.quote(QSUB_MARKER_NAME)}"
+        )
+        results = {d: SubmissionResult(remote_dir=d) for d in remote_dirs}
+        # 途中で切断・タイムアウトしても投入済みの分を取りこぼさないよう、1行ずつ読む
+        with ssh_pool.channel(self.credential) as chan:
+            chan.exec_command(cmd)
+            chan.sendall(stdin)
+            chan.shutdown_write()
+            for raw in chan.makefile("rb"):
+                remote_dir, _, qsub_output = raw.decode().rstrip("\n").partition("\t")
+                result = results.get(remote_dir)
+                if result is None:
+                    continue
+                try:
+                    result.remote_job_id = parse_qsub_output(qsub_output)
+                except RuntimeError as e:
+                    result.error = str(e)
+                if on_result is not None:
+                    on_result(result)
+            chan.recv_exit_status()
+        for result in results.values():
+            if result.remote_job_id is None and result.error is None:
+                result.error = "qsub の結果を取得できませんでした"
+        return [results[d] for d in remote_dirs]
+
     def _upload_file(self, local_path: str, remote_path: str):
-        transport = paramiko.Transport((self.host, 22))  # type: ignore
-        transport.connect(username=self.username, password=self.password)  # type: ignore
-        sftp = paramiko.SFTPClient.from_transport(transport)
-        sftp.put(local_path, remote_path)  # type: ignore
-        sftp.close()  # type: ignore
-        transport.close()
+        with ssh_pool.sftp(self.credential) as sftp:
+            sftp.put(local_path, remote_path)
 
     def _submit_qsub(self, remote_gjf_path: str) -> str:
-        ssh = paramiko.SSHClient()
-        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        ssh.connect(hostname=self.host, username=self.username, password=self.password)  # type: ignore
-
-        cmd = f"cd {os.path.dirname(remote_gjf_path)} && qsubg16 {os.path.basename(remote_gjf_path)}"
-        stdin, stdout, stderr = ssh.exec_command(cmd)
-        output = stdout.read().decode()
-        ssh.close()
-
-        # qsub 出力例: "Your job 12345 ("input.gjf") has been submitted"
-        if "job" not in output:
-            raise RuntimeError(f"qsub失敗: {output}")
-        job_id = output.split("job")[1].split("(")[0].strip()
-        return job_id
+        cmd = (
+            f"cd {shlex.quote(os.path.dirname(remote_gjf_path))} && "
+            f"qsubg16 {shlex.quote(os.path.basename(remote_gjf_path))}"
+        )
+        output, _, _ = ssh_pool.exec_command(self.credential, cmd)
+        return parse_qsub_output(output)
 
     def cancel_job(self, job_id: str):
-        ssh = paramiko.SSHClient()
-        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        ssh.connect(hostname=self.host, username=self.username, password=self.password)  # type: ignore
-
-        cmd = f"qdel {job_id}"
-        stdin, stdout, stderr = ssh.exec_command(cmd)
-        output = stdout.read().decode()
-        error = stderr.read().decode()
-        ssh.close()
+        cmd = f"qdel {shlex.quote(job_id)}"
+        output, error, _ = ssh_pool.exec_command(self.credential, cmd)
 
         if "has been deleted" not in output and error:
             raise RuntimeError(f"キャンセル失敗: {error or output}")
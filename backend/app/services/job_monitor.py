@@ -1,43 +1,190 @@
-import paramiko
-from datetime import datetime
-import os
-
-
-def get_log_tail_via_ssh(
-    host: str, username: str, password: str, log_path: str, lines: int = 30
-):
-    ssh = paramiko.SSHClient()
-    ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-    ssh.connect(hostname=host, username=username, password=password)
-
-    cmd = f"tail -n {lines} {log_path}"
-    stdin, stdout, stderr = ssh.exec_command(cmd)
-    out = stdout.read().decode()
-    err = stderr.read().decode()
-    ssh.close()
-
-    if err:
-        raise RuntimeError(err)
-    return out
-
-
-def get_job_status_via_qstat(
-    host: str, username: str, password: str, remote_job_id: str
-) -> str:
-    ssh = paramiko.SSHClient()
-    ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-    ssh.connect(hostname=host, username=username, password=password, timeout=10)
-
-    cmd = f"qstat -x {remote_job_id}"
-    stdin, stdout, stderr = ssh.exec_command(cmd)
-    output = stdout.read().decode()
-    ssh.close()
-
-    if remote_job_id not in output:
-        return "C"  # Completed or no longer listed
-    elif " R " in output:
-        return "R"
-    elif " Q " in output:
-        return "Q"
-    else:
-        return "?"  # Unknown
+import posixpath
+import shlex
+from dataclasses import dataclass
+
+from app.models import ServerCredential
+from app.services import remote
+from app.utils.qstat_parser import QstatJobRecord, parse_qstat_xml
+
+
+def normalize_job_id(job_id: str) -> str:
+    # PBS は "12345.server" 形式で表示するため数値部分で突き合わせる
+    return job_id.split(".")[0].strip()
+
+
+def parse_qstat_listing(output: str) -> dict[str, str]:
+    """`qstat` の一覧出力をジョブID → 状態文字 の辞書に変換
+
+    PBS (Job id ... S Queue) と SGE (job-ID prior name user state ...) の
+    両形式に対応する。
+    """
+    statuses: dict[str, str] = {}
+    state_col: int | None = None
+    for line in output.splitlines():
+        fields = line.split()
+        if not fields or set(line.strip()) <= {"-", " "}:
+            continue
+        header = line.lower()
+        if header.startswith("job id") or header.startswith("job-id"):
+            # SGE は state が5列目、PBS は末尾から2列目
+            state_col = 4 if header.startswith("job-id") else -2
+            continue
+        if state_col is None or len(fields) < 3:
+            continue
+        statuses[normalize_job_id(fields[0])] = fields[state_col]
+    return statuses
+
+
+def qstat_state_to_job_status(state: str | None) -> str:
+    """スケジューラの状態文字を JobStatus の値に変換（一覧に無い場合は完了扱い）"""
+    if state is None or state == "C":
+        return "done"
+    if "E" in state and state != "E":
+        return "error"  # SGE の Eqw など
+    if state in ("R", "E", "r", "t", "Rr", "Rt"):
+        return "running"
+    return "queued"
+
+
+def qstat_record_to_job_status(record: QstatJobRecord | None) -> str:
+    """`qstat -x` のレコードを JobStatus の値に変換（終了コードが非0なら error）"""
+    if record is not None and record.state == "C" and record.exit_status:
+        return "error"
+    return qstat_state_to_job_status(record.state if record is not None else None)
+
+
+# ログ末尾のこのバイト数に終了メッセージが含まれるかで終了状態を判定する
+TERMINATION_SCAN_BYTES = 4096
+
+
+@dataclass
+class LogSweepEntry:
+    path: str
+    mtime: float
+    size: int
+    termination: str | None  # normal / error / None（未終了）
+
+
+def log_sweep_command(roots: list[str], since: int | None = None) -> str:
+    """roots 以下の .log のうち since（リモートの UNIX 時刻）以降に更新されたものについて、
+    mtime・サイズ・終了状態を1行ずつ出力するコマンド（先頭行はリモートの現在時刻）"""
+    newer = f" -newermt @{int(since)}" if since is not None else ""
+    quoted_roots = " ".join(shlex.quote(root) for root in roots)
+    return (
+        "date +%s; "
+        f"find {quoted_roots} -type f -name '*.log'{newer} "
+        "-printf '%T@\\t%s\\t%p\\n' 2>/dev/null | "
+        "while IFS=\"$(printf '\\t')\" read -r m s p; do "
+        f't=$(tail -c {TERMINATION_SCAN_BYTES} "$p"); '
+        'case "$t" in *"Error termination"*) st=error;; '
+        '*"Normal termination"*) st=normal;; *) st=;; esac; '
+        "printf '%s\\t%s\\t%s\\t%s\\n' \"$m\" \"$s\" \"$st\" \"$p\"; "
+        "done"
+    )
+
+
+def parse_log_sweep(output: str) -> tuple[int | None, dict[str, LogSweepEntry]]:
+    """log_sweep_command の出力を (リモート時刻, パス → エントリ) に変換"""
+    lines = output.splitlines()
+    if not lines:
+        return None, {}
+    remote_now = int(lines[0]) if lines[0].strip().isdigit() else None
+    entries: dict[str, LogSweepEntry] = {}
+    for line in lines[1:]:
+        fields = line.split("\t", 3)
+        if len(fields) != 4:
+            continue
+        mtime, size, termination, path = fields
+        entries[path] = LogSweepEntry(
+            path=path,
+            mtime=float(mtime),
+            size=int(size),
+            termination=termination or None,
+        )
+    return remote_now, entries
+
+
+async def poll_host_state(
+    credential: ServerCredential, roots: list[str], since: int | None = None
+) -> tuple[dict[str, QstatJobRecord] | None, int | None, dict[str, LogSweepEntry]]:
+    """`qstat -x` とログの一括走査を1往復で実行する（ステータスポーラー用）。
+
+    qstat が何も出力しなかったときはレコードを None で返す（ジョブが1件も無いのか、
+    取得に失敗したのかを区別できない）。終了コードが 0 でなければ例外にする。
+    """
+    commands = {"qstat": "qstat -x"}
+    if roots:
+        commands["logs"] = log_sweep_command(roots, since)
+    results = await remote.run_batch(credential, commands)
+    qstat = results["qstat"]
+    if not qstat.ok:
+        raise RuntimeError(qstat.stderr or f"qstat が終了コード {qstat.exit_status} で失敗しました")
+    remote_now, entries = (
+        parse_log_sweep(results["logs"].stdout) if "logs" in results else (None, {})
+    )
+    records = parse_qstat_xml(qstat.stdout) if qstat.stdout.strip() else None
+    return records, remote_now, entries
+
+
+@dataclass
+class JobRemoteSnapshot:
+    log_tail: str
+    log_size: int | None
+    log_mtime: float | None
+    qstat_state: str | None
+    files: list[str]
+
+
+def job_snapshot_commands(
+    log_path: str, remote_job_id: str | None = None, tail_lines: int = 30
+) -> dict[str, str]:
+    """ジョブ詳細の取得に使うコマンド群（remote.run_batch にそのまま渡せる）"""
+    quoted_log = shlex.quote(log_path)
+    commands = {
+        "stat": f"stat -c '%s %Y' {quoted_log}",
+        "ls": f"ls -1 {shlex.quote(posixpath.dirname(log_path))}",
+    }
+    if tail_lines > 0:
+        commands["tail"] = f"tail -n {int(tail_lines)} {quoted_log}"
+    if remote_job_id:
+        commands["qstat"] = f"qstat {shlex.quote(remote_job_id)}"
+    return commands
+
+
+def parse_job_snapshot(
+    results: dict[str, remote.RemoteResult], remote_job_id: str | None = None
+) -> JobRemoteSnapshot:
+    log_size = log_mtime = None
+    stat = results.get("stat")
+    if stat is not None and stat.ok and stat.stdout.strip():
+        size, mtime = stat.stdout.split()
+        log_size, log_mtime = int(size), float(mtime)
+
+    qstat_state = None
+    if remote_job_id and "qstat" in results:
+        qstat_state = parse_qstat_listing(results["qstat"].stdout).get(
+            normalize_job_id(remote_job_id)
+        )
+
+    ls = results.get("ls")
+    tail = results.get("tail")
+    return JobRemoteSnapshot(
+        log_tail=tail.stdout if tail is not None else "",
+        log_size=log_size,
+        log_mtime=log_mtime,
+        qstat_state=qstat_state,
+        files=ls.stdout.split() if ls is not None and ls.ok else [],
+    )
+
+
+async def get_job_snapshot(
+    credential: ServerCredential,
+    log_path: str,
+    remote_job_id: str | None = None,
+    tail_lines: int = 30,
+) -> JobRemoteSnapshot:
+    """ログ末尾・qstat・ログの stat・ジョブディレクトリの一覧を1往復で取得"""
+    results = await remote.run_batch(
+        credential, job_snapshot_commands(log_path, remote_job_id, tail_lines)
+    )
+    return parse_job_snapshot(results, remote_job_id)
@@ -0,0 +1,64 @@
+import asyncio
+import logging
+import os
+
+from app.crud import job as crud_job
+from app.crud import job_result as crud_result
+from app.crud.job_resource import get_peak_walltime
+from app.database import AsyncSessionLocal
+from app.models import JobResult
+from app.services.calc_cache import calc_cache
+from app.services.resource_estimator import resource_estimator
+from app.utils.gaussian_log import parse_gaussian_log
+
+logger = logging.getLogger(__name__)
+
+LOG_SUFFIXES = (".log", ".log.zst")
+
+
+def find_log(paths: list[str]) -> str | None:
+    """取得した出力ファイルのうち Gaussian のログ（圧縮済みを含む）"""
+    for path in paths:
+        if path.endswith(LOG_SUFFIXES):
+            return path
+    return None
+
+
+def find_log_in_dir(directory: str) -> str | None:
+    if not os.path.isdir(directory):
+        return None
+    return find_log(sorted(os.path.join(directory, name) for name in os.listdir(directory)))
+
+
+async def ingest_log(job_id: int, log_path: str) -> JobResult | None:
+    """ログを解析して job_results / job_result_arrays に保存する（既存の結果は置き換え）"""
+    log = await asyncio.to_thread(parse_gaussian_log, log_path)
+    values = crud_result.result_values(log)
+    arrays = {name: getattr(log, name) for name in crud_result.RESULT_ARRAYS}
+    async with AsyncSessionLocal() as db:
+        job = await crud_job.get_job(db, job_id)
+        if job is None:
+            return None
+        if values["walltime_s"] is None:
+            values["walltime_s"] = await get_peak_walltime(db, job_id)
+        result = await crud_result.save_job_result(
+            db,
+            job_id,
+            job.molecule_id,  # type: ignore
+            job.molecule.bundle_id,  # type: ignore
+            values,
+            arrays,
+        )
+        # 置き換えた結果を引き継いでいたジョブの複製も置き換える（正常終了でなければ未投入に戻す）
+        if await calc_cache.refresh_dependents(db, job_id, result):
+            await db.commit()
+        # 正常終了なら使用リソースをリソース推定の学習データに加える（失敗しても結果の保存は続ける）
+        try:
+            await resource_estimator.observe(db, job_id)
+        except Exception:
+            logger.exception(f"ジョブ {job_id} の使用リソースを学習データに加えられませんでした")
+    logger.info(
+        f"ジョブ {job_id} の結果を保存しました: E={values['final_energy']} "
+        f"({log.termination or '未終了'})"
+    )
+    return result
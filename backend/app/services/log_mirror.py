@@ -0,0 +1,135 @@
+import os
+import threading
+
+from dotenv import load_dotenv
+
+from app.models import Job, ServerCredential, User
+from app.services import remote
+from app.services.job_monitor import TERMINATION_SCAN_BYTES
+from app.services.ssh_pool import ssh_pool
+
+load_dotenv()
+
+LOG_MIRROR_DIRNAME = "job_logs"
+LOG_FETCH_CHUNK = int(os.getenv("LOG_FETCH_CHUNK", str(1024 * 1024)))
+LOG_MAX_RESPONSE_BYTES = int(os.getenv("LOG_MAX_RESPONSE_BYTES", str(1024 * 1024)))
+
+_mirror_locks: dict[str, threading.Lock] = {}
+_mirror_locks_guard = threading.Lock()
+
+
+def mirror_path(user: User, job: Job) -> str:
+    """ジョブのログミラーのローカルパス"""
+    return os.path.join(user.local_base_dir, LOG_MIRROR_DIRNAME, f"{job.id}.log")  # type: ignore
+
+
+def _lock_for(local_path: str) -> threading.Lock:
+    with _mirror_locks_guard:
+        lock = _mirror_locks.get(local_path)
+        if lock is None:
+            lock = _mirror_locks[local_path] = threading.Lock()
+        return lock
+
+
+def _sync_blocking(credential: ServerCredential, remote_path: str, local_path: str) -> int:
+    with _lock_for(local_path):
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+        offset = os.path.getsize(local_path) if os.path.exists(local_path) else 0
+
+        with ssh_pool.sftp(credential) as sftp:
+            remote_size = sftp.stat(remote_path).st_size or 0
+            if remote_size < offset:
+                # リモートのログが作り直された場合はミラーを最初から取り直す
+                offset = 0
+                open(local_path, "wb").close()
+            if remote_size == offset:
+                return offset
+
+            with sftp.open(remote_path, "rb") as rf, open(local_path, "ab") as lf:
+                rf.seek(offset)
+                rf.prefetch(remote_size)
+                remaining = remote_size - offset
+                while remaining > 0:
+                    chunk = rf.read(min(LOG_FETCH_CHUNK, remaining))
+                    if not chunk:
+                        break
+                    lf.write(chunk)
+                    remaining -= len(chunk)
+        return os.path.getsize(local_path)
+
+
+async def sync_log(
+    credential: ServerCredential,
+    remote_path: str,
+    local_path: str,
+    remote_size: int | None = None,
+) -> int:
+    """前回取得位置以降の差分のみを SFTP で取得してミラーに追記し、ミラーのサイズを返す
+
+    remote_size が既知でミラーと同じサイズなら SFTP を開かずに済ませる。
+    """
+    if remote_size is not None and os.path.exists(local_path):
+        local_size = os.path.getsize(local_path)
+        if local_size == remote_size:
+            return local_size
+    return await remote.call(
+        credential,
+        _sync_blocking,
+        credential,
+        remote_path,
+        local_path,
+        timeout=remote.REMOTE_TRANSFER_TIMEOUT,
+    )
+
+
+def read_delta(
+    local_path: str, since_offset: int, max_bytes: int = LOG_MAX_RESPONSE_BYTES
+) -> tuple[str, int]:
+    """ミラーの since_offset 以降を読み出し、(内容, 次回オフセット) を返す"""
+    if not os.path.exists(local_path):
+        return "", 0
+    with open(local_path, "rb") as f:
+        f.seek(since_offset)
+        data = f.read(max_bytes)
+    return data.decode(errors="replace"), since_offset + len(data)
+
+
+def read_range(local_path: str, start: int, end: int) -> str:
+    """ミラーの [start, end) の範囲を読み出す"""
+    if end <= start or not os.path.exists(local_path):
+        return ""
+    with open(local_path, "rb") as f:
+        f.seek(start)
+        return f.read(end - start).decode(errors="replace")
+
+
+def read_tail(local_path: str, lines: int = 30) -> tuple[str, int]:
+    """ミラーの末尾 lines 行を読み出し、(内容, ファイルサイズ) を返す"""
+    if not os.path.exists(local_path):
+        return "", 0
+    size = os.path.getsize(local_path)
+    window = 8192
+    with open(local_path, "rb") as f:
+        while True:
+            start = max(0, size - window)
+            f.seek(start)
+            data = f.read(size - start)
+            if start == 0 or data.count(b"\n") > lines:
+                break
+            window *= 2
+    tail = b"\n".join(data.splitlines()[-lines:])
+    return tail.decode(errors="replace"), size
+
+
+def termination_state(local_path: str) -> str | None:
+    """ログ末尾から Gaussian の終了状態を判定（未終了なら None）"""
+    if not os.path.exists(local_path):
+        return None
+    with open(local_path, "rb") as f:
+        f.seek(max(0, os.path.getsize(local_path) - TERMINATION_SCAN_BYTES))
+        data = f.read()
+    if b"Normal termination" in data:
+        return "normal"
+    if b"Error termination" in data:
+        return "error"
+    return None
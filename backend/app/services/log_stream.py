@@ -0,0 +1,191 @@
+import asyncio
+import json
+import logging
+import os
+from dataclasses import dataclass
+
+from dotenv import load_dotenv
+
+from app.crud.job import get_job_by_id
+from app.database import AsyncSessionLocal
+from app.models import ServerCredential
+from app.services import log_mirror
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+LOG_STREAM_INTERVAL = float(os.getenv("LOG_STREAM_INTERVAL", "2"))
+LOG_STREAM_QUEUE_SIZE = int(os.getenv("LOG_STREAM_QUEUE_SIZE", "256"))
+# 購読開始時のスナップショットと、配信開始時に既存のログから送る末尾のバイト数
+LOG_STREAM_INITIAL_BYTES = log_mirror.LOG_MAX_RESPONSE_BYTES // 16
+
+
+def _close_queue(queue: asyncio.Queue):
+    """購読者に配信終了 (None) を通知する。溢れている場合は古いイベントを捨てる"""
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(None)
+
+
+@dataclass
+class LogEvent:
+    event: str  # log / status / end
+    data: dict
+
+    def to_sse(self) -> str:
+        return f"event: {self.event}\ndata: {json.dumps(self.data, ensure_ascii=False)}\n\n"
+
+
+class JobLogTailer:
+    """1ジョブにつき1つだけ起動し、ログ差分と状態遷移を全購読者へ配信する"""
+
+    def __init__(
+        self,
+        hub: "LogStreamHub",
+        job_id: int,
+        credential: ServerCredential,
+        remote_path: str,
+        local_path: str,
+        status: str,
+    ):
+        self.hub = hub
+        self.job_id = job_id
+        self.credential = credential
+        self.remote_path = remote_path
+        self.local_path = local_path
+        self.status = status
+        self.offset = (
+            os.path.getsize(local_path) if os.path.exists(local_path) else 0
+        )
+        self.subscribers: set[asyncio.Queue] = set()
+        self.finished = False
+        self.task: asyncio.Task | None = None
+        self._caught_up = False
+        self._wakeup = asyncio.Event()
+
+    def broadcast(self, event: LogEvent):
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # 受信が追いつかない購読者は切断する
+                logger.warning(f"ログ配信キューが溢れたため購読者を切断します: job={self.job_id}")
+                self.subscribers.discard(queue)
+                _close_queue(queue)
+
+    async def _poll_status(self):
+        async with AsyncSessionLocal() as db:
+            job = await get_job_by_id(db, self.job_id)
+        if job is not None and job.status != self.status:
+            self.status = job.status  # type: ignore
+            self.broadcast(LogEvent("status", {"status": self.status}))
+
+    async def _poll_log(self):
+        size = await log_mirror.sync_log(
+            self.credential, self.remote_path, self.local_path
+        )
+        if size < self.offset:
+            self.offset = 0
+        if not self._caught_up:
+            # ミラーが無い・古い状態で起動したとき、既存のログ全体を一度に配信すると
+            # 購読者のキューが溢れて切断されるので、末尾だけを送る
+            self._caught_up = True
+            self.offset = max(self.offset, size - LOG_STREAM_INITIAL_BYTES)
+        while self.offset < size:
+            content, next_offset = log_mirror.read_delta(self.local_path, self.offset)
+            self.broadcast(
+                LogEvent(
+                    "log",
+                    {"content": content, "offset": self.offset, "next_offset": next_offset},
+                )
+            )
+            self.offset = next_offset
+
+    async def run(self):
+        try:
+            while self.subscribers:
+                try:
+                    await self._poll_log()
+                    await self._poll_status()
+                except Exception as e:
+                    logger.warning(f"ログ配信中にエラーが発生しました (job={self.job_id}): {e}")
+                termination = log_mirror.termination_state(self.local_path)
+                if termination is not None:
+                    self.broadcast(
+                        LogEvent("end", {"termination": termination, "status": self.status})
+                    )
+                    break
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), LOG_STREAM_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+        finally:
+            # 購読者がいないのを確かめてから終了済みにするまでに await を挟まないので、
+            # ここに来た後の購読は新しい配信になり、閉じられることはない
+            self.finished = True
+            for queue in list(self.subscribers):
+                _close_queue(queue)
+            self.hub._discard(self)
+
+
+class LogStreamHub:
+    """ジョブごとの JobLogTailer を管理し、購読者を振り分ける"""
+
+    def __init__(self):
+        self.tailers: dict[int, JobLogTailer] = {}
+
+    def subscribe(
+        self,
+        job_id: int,
+        credential: ServerCredential,
+        remote_path: str,
+        local_path: str,
+        status: str,
+        since_offset: int | None = None,
+    ) -> asyncio.Queue:
+        tailer = self.tailers.get(job_id)
+        if tailer is None or tailer.finished:
+            tailer = JobLogTailer(self, job_id, credential, remote_path, local_path, status)
+            self.tailers[job_id] = tailer
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=LOG_STREAM_QUEUE_SIZE)
+        # 共有配信に合流する前に、購読者ごとの初期スナップショットを積む
+        if since_offset is None:
+            start = max(0, tailer.offset - LOG_STREAM_INITIAL_BYTES)
+        else:
+            start = max(since_offset, tailer.offset - log_mirror.LOG_MAX_RESPONSE_BYTES)
+        queue.put_nowait(
+            LogEvent(
+                "log",
+                {
+                    "content": log_mirror.read_range(local_path, start, tailer.offset),
+                    "offset": start,
+                    "next_offset": tailer.offset,
+                },
+            )
+        )
+        queue.put_nowait(LogEvent("status", {"status": tailer.status}))
+        tailer.subscribers.add(queue)
+
+        if tailer.task is None:
+            tailer.task = asyncio.create_task(tailer.run())
+        return queue
+
+    def unsubscribe(self, job_id: int, queue: asyncio.Queue):
+        tailer = self.tailers.get(job_id)
+        if tailer is None:
+            return
+        tailer.subscribers.discard(queue)
+        if not tailer.subscribers:
+            # 最後の購読者が離れたら配信ループを起こして停止させる。取り消しはしない
+            # （止まるまでに再び購読されたら、同じ配信がそのまま続ける）
+            tailer._wakeup.set()
+
+    def _discard(self, tailer: JobLogTailer):
+        if self.tailers.get(tailer.job_id) is tailer:
+            del self.tailers[tailer.job_id]
+
+
+log_stream_hub = LogStreamHub()
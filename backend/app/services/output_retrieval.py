@@ -0,0 +1,199 @@
+import asyncio
+import hashlib
+import logging
+import os
+import posixpath
+import shlex
+from dataclasses import dataclass
+
+from dotenv import load_dotenv
+
+from app.crud import job as crud_job
+from app.crud.user import get_user_by_id
+from app.crud.server_credential import get_credential_for_job
+from app.database import AsyncSessionLocal
+from app.models import ServerCredential
+from app.services import job_results, remote
+from app.services.ssh_pool import ssh_pool
+
+try:
+    import zstandard
+except ImportError:  # zstd 圧縮は任意機能
+    zstandard = None
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_DIRNAME = "outputs"
+OUTPUT_EXTENSIONS = (".log", ".chk", ".fchk")
+OUTPUT_RETRIEVAL_CONCURRENCY = int(os.getenv("OUTPUT_RETRIEVAL_CONCURRENCY", "4"))
+OUTPUT_CHUNK_SIZE = int(os.getenv("OUTPUT_CHUNK_SIZE", str(4 * 1024 * 1024)))
+OUTPUT_RETRIEVAL_TIMEOUT = float(os.getenv("OUTPUT_RETRIEVAL_TIMEOUT", "3600"))
+OUTPUT_COMPRESS_LOGS = os.getenv("OUTPUT_COMPRESS_LOGS", "false").lower() == "true"
+
+
+@dataclass
+class RetrievedFile:
+    remote_path: str
+    local_path: str
+    size: int
+    sha256: str
+
+
+def output_dir(local_base_dir: str, job_id: int) -> str:
+    """ジョブの出力ファイルを置くローカルディレクトリ"""
+    return os.path.join(local_base_dir, OUTPUT_DIRNAME, f"job_{job_id}")
+
+
+def _sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(OUTPUT_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _remote_checksums(credential: ServerCredential, paths: list[str]) -> dict[str, str]:
+    """存在するリモートファイルの sha256 を1回のコマンドでまとめて取得"""
+    cmd = "sha256sum " + " ".join(shlex.quote(p) for p in paths) + " 2>/dev/null"
+    output, _, _ = ssh_pool.exec_command(credential, cmd)
+    checksums = {}
+    for line in output.splitlines():
+        digest, _, path = line.partition("  ")
+        if path:
+            checksums[path] = digest
+    return checksums
+
+
+def _download_resumable(
+    credential: ServerCredential, remote_path: str, local_path: str
+) -> int:
+    """`.part` ファイルの末尾から再開しつつ、チャンク単位でディスクへ書き出す"""
+    part_path = local_path + ".part"
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+
+    with ssh_pool.sftp(credential) as sftp:
+        remote_size = sftp.stat(remote_path).st_size or 0
+        if offset > remote_size:
+            offset = 0
+            open(part_path, "wb").close()
+        if offset < remote_size:
+            with sftp.open(remote_path, "rb") as rf, open(part_path, "ab") as lf:
+                rf.seek(offset)
+                rf.prefetch(remote_size)
+                remaining = remote_size - offset
+                while remaining > 0:
+                    chunk = rf.read(min(OUTPUT_CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    lf.write(chunk)
+                    remaining -= len(chunk)
+    return remote_size
+
+
+def _compress_zstd(path: str) -> str:
+    compressed_path = path + ".zst"
+    compressor = zstandard.ZstdCompressor(level=10)  # type: ignore
+    with open(path, "rb") as src, open(compressed_path, "wb") as dst:
+        compressor.copy_stream(src, dst, read_size=OUTPUT_CHUNK_SIZE)
+    os.remove(path)
+    return compressed_path
+
+
+def retrieve_outputs_blocking(
+    credential: ServerCredential,
+    remote_dir: str,
+    stem: str,
+    local_dir: str,
+    compress_logs: bool = OUTPUT_COMPRESS_LOGS,
+) -> list[RetrievedFile]:
+    """リモートの出力ファイル群を取得し、サイズとチェックサムを検証する"""
+    os.makedirs(local_dir, exist_ok=True)
+    remote_paths = [posixpath.join(remote_dir, stem + ext) for ext in OUTPUT_EXTENSIONS]
+    checksums = _remote_checksums(credential, remote_paths)
+
+    retrieved = []
+    for remote_path in remote_paths:
+        if remote_path not in checksums:
+            continue  # 生成されていない出力（.fchk など）は飛ばす
+        local_path = os.path.join(local_dir, posixpath.basename(remote_path))
+        remote_size = _download_resumable(credential, remote_path, local_path)
+
+        part_path = local_path + ".part"
+        local_size = os.path.getsize(part_path)
+        if local_size != remote_size:
+            raise RuntimeError(
+                f"サイズが一致しません: {remote_path} ({local_size} != {remote_size})"
+            )
+        digest = _sha256_file(part_path)
+        if digest != checksums[remote_path]:
+            # 破損した途中ファイルは次回最初から取り直す
+            os.remove(part_path)
+            raise RuntimeError(f"チェックサムが一致しません: {remote_path}")
+        os.replace(part_path, local_path)
+
+        if compress_logs and local_path.endswith(".log"):
+            if zstandard is None:
+                logger.warning("zstandard が未インストールのためログを圧縮しません")
+            else:
+                local_path = _compress_zstd(local_path)
+        retrieved.append(RetrievedFile(remote_path, local_path, remote_size, digest))
+    return retrieved
+
+
+class OutputRetriever:
+    """done になったジョブの出力を並列数を制限しつつ取得する"""
+
+    def __init__(self, concurrency: int = OUTPUT_RETRIEVAL_CONCURRENCY):
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._tasks: dict[int, asyncio.Task] = {}
+
+    def schedule(self, job_id: int):
+        if job_id in self._tasks:
+            return
+        task = asyncio.create_task(self._run(job_id))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+
+    async def _run(self, job_id: int):
+        async with self._semaphore:
+            try:
+                files = await self.retrieve(job_id)
+                logger.info(f"出力ファイルを {len(files)} 件取得しました: job={job_id}")
+            except Exception as e:
+                logger.error(f"出力ファイルの取得に失敗しました (job={job_id}): {e}")
+
+    async def retrieve(self, job_id: int) -> list[RetrievedFile]:
+        async with AsyncSessionLocal() as db:
+            job = await crud_job.get_job(db, job_id)
+            if job is None or not job.log_path:  # type: ignore
+                return []
+            user = await get_user_by_id(db, job.molecule.job_bundle.user_id)
+            credential = await get_credential_for_job(db, job)
+        if user is None or credential is None:
+            return []
+
+        remote_dir = posixpath.dirname(job.log_path)  # type: ignore
+        stem = posixpath.splitext(posixpath.basename(job.log_path))[0]  # type: ignore
+        # 長時間の転送が API 用のホスト同時実行枠を占有しないよう別枠で実行
+        files = await remote.offload(
+            ("output", credential.id),
+            retrieve_outputs_blocking,
+            credential,
+            remote_dir,
+            stem,
+            output_dir(user.local_base_dir, job_id),  # type: ignore
+            timeout=OUTPUT_RETRIEVAL_TIMEOUT,
+        )
+        # 取得したログを解析して結果ストアへ登録（失敗しても取得自体は成功扱い）
+        log_path = job_results.find_log([file.local_path for file in files])
+        if log_path:
+            try:
+                await job_results.ingest_log(job_id, log_path)
+            except Exception as e:
+                logger.error(f"ログの解析に失敗しました (job={job_id}): {e}")
+        return files
+
+
+output_retriever = OutputRetriever()
@@ -0,0 +1,211 @@
+import asyncio
+import os
+import secrets
+import shlex
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Callable, TypeVar
+
+from dotenv import load_dotenv
+
+from app.models import ServerCredential
+from app.services.ssh_pool import ssh_pool
+
+load_dotenv()
+
+REMOTE_MAX_WORKERS = int(os.getenv("REMOTE_MAX_WORKERS", "16"))
+REMOTE_MAX_PER_HOST = int(os.getenv("REMOTE_MAX_PER_HOST", "4"))
+REMOTE_TIMEOUT = float(os.getenv("REMOTE_TIMEOUT", "30"))
+REMOTE_TRANSFER_TIMEOUT = float(os.getenv("REMOTE_TRANSFER_TIMEOUT", "600"))
+
+T = TypeVar("T")
+
+# paramiko はブロッキング API のため、専用の有界スレッドプールで実行して
+# イベントループを止めないようにする
+_executor = ThreadPoolExecutor(
+    max_workers=REMOTE_MAX_WORKERS, thread_name_prefix="remote-ssh"
+)
+_host_semaphores: dict[Any, asyncio.Semaphore] = {}
+
+
+@dataclass
+class RemoteResult:
+    stdout: str
+    stderr: str
+    exit_status: int
+
+    @property
+    def ok(self) -> bool:
+        return self.exit_status == 0
+
+
+class RemoteTimeoutError(RuntimeError):
+    pass
+
+
+def _semaphore_for(key: Any) -> asyncio.Semaphore:
+    sem = _host_semaphores.get(key)
+    if sem is None:
+        sem = _host_semaphores[key] = asyncio.Semaphore(REMOTE_MAX_PER_HOST)
+    return sem
+
+
+def _release_slot(semaphore: asyncio.Semaphore, future: asyncio.Future):
+    semaphore.release()
+    # 待ち手がいなくなった（タイムアウトした）処理の例外を未回収の警告にしない
+    if not future.cancelled():
+        future.exception()
+
+
+async def offload(
+    key: Any, fn: Callable[..., T], *args, timeout: float | None = None, **kwargs
+) -> T:
+    """ブロッキング関数をホスト単位の同時実行数制限付きで専用スレッドプールで実行"""
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphore_for(key)
+    await semaphore.acquire()
+    try:
+        future = loop.run_in_executor(_executor, partial(fn, *args, **kwargs))
+    except BaseException:
+        semaphore.release()
+        raise
+    # タイムアウトしてもスレッド側の paramiko 呼び出しは止まらないので、
+    # ホストの枠は待つのをやめた時点ではなく処理が実際に終わった時点で返す
+    future.add_done_callback(partial(_release_slot, semaphore))
+    try:
+        return await asyncio.wait_for(asyncio.shield(future), timeout or REMOTE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise RemoteTimeoutError(f"リモート処理がタイムアウトしました ({key})")
+
+
+async def call(
+    credential: ServerCredential,
+    fn: Callable[..., T],
+    *args,
+    timeout: float | None = None,
+    **kwargs,
+) -> T:
+    """接続先 credential に対する任意のブロッキング処理を非同期に実行"""
+    return await offload(credential.id, fn, *args, timeout=timeout, **kwargs)
+
+
+def _run_sync(credential: ServerCredential, cmd: str, timeout: float) -> RemoteResult:
+    stdout, stderr, exit_status = ssh_pool.exec_command(credential, cmd, timeout=timeout)
+    return RemoteResult(stdout=stdout, stderr=stderr, exit_status=exit_status)
+
+
+def _put_sync(credential: ServerCredential, local_path: str, remote_path: str):
+    with ssh_pool.sftp(credential) as sftp:
+        sftp.put(local_path, remote_path)
+
+
+def _get_sync(credential: ServerCredential, remote_path: str, local_path: str):
+    with ssh_pool.sftp(credential) as sftp:
+        sftp.get(remote_path, local_path)
+
+
+async def run(
+    credential: ServerCredential, cmd: str, timeout: float | None = None
+) -> RemoteResult:
+    """リモートでコマンドを実行"""
+    timeout = timeout or REMOTE_TIMEOUT
+    return await call(credential, _run_sync, credential, cmd, timeout, timeout=timeout)
+
+
+async def put(
+    credential: ServerCredential,
+    local_path: str,
+    remote_path: str,
+    timeout: float | None = None,
+):
+    """ローカルファイルをリモートへ転送"""
+    await call(
+        credential,
+        _put_sync,
+        credential,
+        local_path,
+        remote_path,
+        timeout=timeout or REMOTE_TRANSFER_TIMEOUT,
+    )
+
+
+async def get(
+    credential: ServerCredential,
+    remote_path: str,
+    local_path: str,
+    timeout: float | None = None,
+):
+    """リモートファイルをローカルへ転送"""
+    await call(
+        credential,
+        _get_sync,
+        credential,
+        remote_path,
+        local_path,
+        timeout=timeout or REMOTE_TRANSFER_TIMEOUT,
+    )
+
+
+async def tail(
+    credential: ServerCredential, path: str, lines: int = 30, timeout: float | None = None
+) -> str:
+    """リモートファイルの末尾を取得"""
+    result = await run(credential, f"tail -n {int(lines)} {shlex.quote(path)}", timeout=timeout)
+    if result.stderr:
+        raise RuntimeError(result.stderr)
+    return result.stdout
+
+
+def _batch_script(token: str, commands: dict[str, str]) -> str:
+    # 各コマンドの stdout/stderr をトークン付きの区切り行で囲み、終了コードも出力する
+    parts = []
+    for name, cmd in commands.items():
+        parts.append(
+            f"echo '{token} BEGIN {name}'; echo '{token} BEGIN {name}' >&2; "
+            f"{{ {cmd}\n}}; rc=$?; "
+            f"printf '\\n{token} END {name} %d\\n' $rc; printf '\\n{token} END {name}\\n' >&2"
+        )
+    return "\n".join(parts)
+
+
+def _split_frames(token: str, output: str) -> dict[str, tuple[str, int | None]]:
+    frames: dict[str, tuple[str, int | None]] = {}
+    current: str | None = None
+    lines: list[str] = []
+    for line in output.split("\n"):
+        if line.startswith(token):
+            _, marker, *rest = line.split(" ")
+            if marker == "BEGIN":
+                current, lines = rest[0], []
+            elif marker == "END" and current is not None:
+                # 区切り行の直前に付け足した改行は行分割で吸収される
+                exit_status = int(rest[1]) if len(rest) > 1 else None
+                frames[current] = ("\n".join(lines), exit_status)
+                current = None
+            continue
+        if current is not None:
+            lines.append(line)
+    return frames
+
+
+async def run_batch(
+    credential: ServerCredential,
+    commands: dict[str, str],
+    timeout: float | None = None,
+) -> dict[str, RemoteResult]:
+    """複数コマンドを1本のチャネル・1往復で実行し、コマンドごとの結果を返す"""
+    token = f"__QCC_{secrets.token_hex(8)}__"
+    result = await run(credential, _batch_script(token, commands), timeout=timeout)
+    stdout_frames = _split_frames(token, result.stdout)
+    stderr_frames = _split_frames(token, result.stderr)
+    results = {}
+    for name in commands:
+        stdout, exit_status = stdout_frames.get(name, ("", None))
+        stderr, _ = stderr_frames.get(name, ("", None))
+        results[name] = RemoteResult(
+            stdout=stdout,
+            stderr=stderr,
+            exit_status=exit_status if exit_status is not None else -1,
+        )
+    return results
@@ -0,0 +1,338 @@
+import asyncio
+import logging
+import math
+import os
+from dataclasses import dataclass, field
+
+import numpy as np
+from dotenv import load_dotenv
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud import job as crud_job
+from app.crud.job_resource import get_job_resource_peak
+from app.models import Job, JobResourceObservation, JobResult
+from app.utils.geometry import decode_geometry, real_atom_mask
+from app.utils.gjf_parser import GJFParseError, Route, parse_gjf_file
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# 推定値で Link 0 を埋めるのに必要な学習データ数と信頼度
+RESOURCE_MIN_SAMPLES = int(os.getenv("RESOURCE_MIN_SAMPLES", "8"))
+RESOURCE_MIN_CONFIDENCE = float(os.getenv("RESOURCE_MIN_CONFIDENCE", "0.3"))
+# %NProcShared の上限と、並列数を決めるときに目指す walltime（秒）
+RESOURCE_MAX_NPROCS = int(os.getenv("RESOURCE_MAX_NPROCS", "32"))
+RESOURCE_TARGET_WALLTIME_S = int(os.getenv("RESOURCE_TARGET_WALLTIME_S", str(24 * 3600)))
+# %Mem は予測の上側（80%）にこの倍率を掛け、この値 [MB] 以上にする
+RESOURCE_MEM_HEADROOM = 1.2
+RESOURCE_MIN_MEM_MB = 512
+
+# method/basis ごとのモデルにデータが足りないときに使う、全ジョブをまとめたモデル
+POOLED_KEY = "*"
+_RIDGE = 1e-2
+_Z80 = 1.2816  # 標準正規分布の 90% 点（両側 80% 区間）
+_EXCITED_KEYWORDS = ("td", "tda", "cis", "cis(d)", "eom-ccsd", "eomccsd")
+FEATURE_NAMES = (
+    "intercept",
+    "log_atoms",
+    "log1p_heavy_atoms",  # H 以外
+    "log1p_row3_atoms",  # Na 以降
+    "log1p_row4_atoms",  # K 以降（ECP を使うことが多い）
+    "opt",
+    "freq",
+    "excited",
+    "log_ncpus",  # 学習・予測時に付け足す
+)
+
+
+def model_key(route: Route) -> str:
+    return f"{(route.method or '').lower()}/{(route.basis or '').lower()}"[:100]
+
+
+def input_features(numbers: np.ndarray, route: Route) -> np.ndarray:
+    """入力（原子の構成とルート）の特徴量。並列数は含めない"""
+    z = np.asarray(numbers)
+    z = z[real_atom_mask(z)]
+    keywords = set(route.options) | {t.lower() for t in route.job_types}
+    return np.array(
+        [
+            1.0,
+            math.log(max(len(z), 1)),
+            math.log1p(int((z > 1).sum())),
+            math.log1p(int((z > 10).sum())),
+            math.log1p(int((z > 18).sum())),
+            float("opt" in keywords),
+            float("freq" in keywords),
+            float(any(k in keywords for k in _EXCITED_KEYWORDS)),
+        ]
+    )
+
+
+def _design(features: np.ndarray, ncpus: int) -> np.ndarray:
+    return np.append(features, math.log(max(ncpus, 1)))
+
+
+@dataclass
+class _Regression:
+    """対数をとった目的変数のリッジ回帰。正規方程式の和だけを持ち、1件ずつ足し引きできる"""
+
+    xtx: np.ndarray = field(default_factory=lambda: np.zeros((len(FEATURE_NAMES),) * 2))
+    xty: np.ndarray = field(default_factory=lambda: np.zeros(len(FEATURE_NAMES)))
+    yty: float = 0.0
+    n: int = 0
+    _solved: tuple | None = None
+
+    def add(self, x: np.ndarray, y: float, sign: int = 1):
+        self.xtx += sign * np.outer(x, x)
+        self.xty += sign * x * y
+        self.yty += sign * y * y
+        self.n += sign
+        self._solved = None
+
+    def solve(self) -> tuple[np.ndarray, np.ndarray, float]:
+        """(係数, (XᵀX + λI)⁻¹, 残差分散)"""
+        if self._solved is None:
+            penalty = np.full(len(self.xty), _RIDGE)
+            penalty[0] = 0.0  # 切片には罰則を掛けない
+            inverse = np.linalg.pinv(self.xtx + np.diag(penalty))
+            beta = inverse @ self.xty
+            sse = self.yty - 2 * beta @ self.xty + beta @ self.xtx @ beta
+            dof = max(self.n - len(beta), 1)
+            self._solved = (beta, inverse, max(float(sse), 0.0) / dof)
+        return self._solved  # type: ignore
+
+    def predict(self, x: np.ndarray) -> tuple[float, float]:
+        """(予測の平均, 予測の標準偏差)（どちらも対数）"""
+        beta, inverse, variance = self.solve()
+        return float(x @ beta), math.sqrt(variance * (1 + max(float(x @ inverse @ x), 0.0)))
+
+
+@dataclass
+class _Model:
+    walltime: _Regression = field(default_factory=_Regression)  # log(walltime 秒)
+    memory: _Regression = field(default_factory=_Regression)  # log(最大使用メモリ kB)
+    ncpus_seen: dict[int, int] = field(default_factory=dict)  # 並列数 → 件数
+
+    def add(self, features: np.ndarray, walltime_s, mem_kb, ncpus: int, sign: int = 1):
+        x = _design(features, ncpus)
+        if walltime_s:
+            self.walltime.add(x, math.log(walltime_s), sign)
+        if mem_kb:
+            self.memory.add(x, math.log(mem_kb), sign)
+        self.ncpus_seen[ncpus] = self.ncpus_seen.get(ncpus, 0) + sign
+        if self.ncpus_seen[ncpus] <= 0:
+            del self.ncpus_seen[ncpus]
+
+
+@dataclass
+class ResourceEstimate:
+    model_key: str  # 使ったモデル（データが足りなければ POOLED_KEY）
+    samples: int
+    confidence: float  # 0〜1。exp(-予測の対数標準偏差)
+    nprocshared: int
+    walltime_s: int
+    walltime_low_s: int  # 80% 区間
+    walltime_high_s: int
+    mem_mb: int | None  # 推奨する %Mem（メモリのデータが無ければ None）
+    mem_observed_mb: int | None  # 予測される最大使用メモリ
+
+    @property
+    def usable(self) -> bool:
+        """Link 0 を埋めてよいほどデータと信頼度があるか"""
+        return self.samples >= RESOURCE_MIN_SAMPLES and self.confidence >= RESOURCE_MIN_CONFIDENCE
+
+    def link0(self, mem: bool = True, nprocshared: bool = True) -> list[str]:
+        lines = []
+        if mem and self.mem_mb is not None:
+            lines.append(f"%Mem={self.mem_mb}MB")
+        if nprocshared:
+            lines.append(f"%NProcShared={self.nprocshared}")
+        return lines
+
+
+class ResourceEstimator:
+    """完了ジョブの使用リソースから、入力ごとの %Mem・%NProcShared・walltime を推定する。
+
+    method/basis ごとと全体とで、walltime と最大使用メモリの対数を原子数・元素の構成・
+    ジョブの種類・並列数の線形モデルで回帰する。学習データは job_resource_observations に
+    保存し、プロセスで最初に使うときに全件から正規方程式を組み、以後は observe のたびに
+    その1件分だけ更新する（再観測したジョブは古い分を引いてから足す）。
+    """
+
+    def __init__(self):
+        self._models: dict[str, _Model] = {}
+        self._rows: dict[int, tuple[str, np.ndarray, int | None, int | None, int]] = {}
+        self._loaded = False
+        self._load_lock = asyncio.Lock()
+
+    def _add(self, job_id: int, key: str, features, walltime_s, mem_kb, ncpus: int):
+        previous = self._rows.pop(job_id, None)
+        if previous is not None:
+            for k in (previous[0], POOLED_KEY):
+                self._models[k].add(*previous[1:], sign=-1)
+        for k in (key, POOLED_KEY):
+            self._models.setdefault(k, _Model()).add(features, walltime_s, mem_kb, ncpus)
+        self._rows[job_id] = (key, features, walltime_s, mem_kb, ncpus)
+
+    async def ensure_loaded(self, db: AsyncSession):
+        if self._loaded:
+            return
+        async with self._load_lock:
+            if self._loaded:
+                return
+            result = await db.execute(select(JobResourceObservation))
+            for row in result.scalars().all():
+                self._add(
+                    row.job_id,  # type: ignore
+                    row.model_key,  # type: ignore
+                    np.frombuffer(row.features, dtype="<f8"),  # type: ignore
+                    row.walltime_s,
+                    row.mem_kb,
+                    row.ncpus,  # type: ignore
+                )
+            self._loaded = True
+            logger.info(f"リソース推定の学習データを {len(self._rows)} 件読み込みました")
+
+    async def observe(self, db: AsyncSession, job_id: int) -> bool:
+        """正常終了したジョブの使用リソースを学習データに加える（コミットまで行う）"""
+        await self.ensure_loaded(db)
+        job = await crud_job.get_job(db, job_id)
+        if job is None or job.cached_from_job_id is not None or not job.gjf_path:
+            return False
+        job_result = await db.get(JobResult, job_id)
+        if job_result is None or job_result.termination != "normal":
+            return False
+        try:
+            content = await asyncio.to_thread(_read_text, job.gjf_path)
+            step = parse_gjf_file(content).first
+        except (OSError, GJFParseError):
+            return False
+        if job.molecule.structure_bin is not None:
+            numbers = decode_geometry(job.molecule.structure_bin)[0]
+        elif step.molecule is not None:
+            numbers = np.array([atom.atomic_number for atom in step.molecule.atoms])
+        else:
+            return False
+
+        peak = await get_job_resource_peak(db, job_id)
+        walltime_s = job_result.walltime_s or (peak.walltime_s if peak else None)
+        mem_kb = peak.max_mem_kb if peak else None
+        ncpus = (peak.ncpus if peak else None) or _link0_int(step.link0, "nprocshared") or 1
+        if not walltime_s and not mem_kb:
+            return False
+
+        key = model_key(step.route)
+        features = input_features(numbers, step.route)
+        await db.merge(
+            JobResourceObservation(
+                job_id=job_id,
+                model_key=key,
+                features=features.astype("<f8").tobytes(),
+                walltime_s=walltime_s,
+                mem_kb=mem_kb,
+                ncpus=ncpus,
+            )
+        )
+        await db.commit()
+        self._add(job_id, key, features, walltime_s, mem_kb, ncpus)  # type: ignore
+        return True
+
+    def forget(self, job_ids: list[int]):
+        """削除されたジョブの分を外す（DB の行は ON DELETE CASCADE で消える）"""
+        for job_id in job_ids:
+            previous = self._rows.pop(job_id, None)
+            if previous is not None:
+                for k in (previous[0], POOLED_KEY):
+                    self._models[k].add(*previous[1:], sign=-1)
+
+    def _model_for(self, key: str) -> tuple[str, _Model] | None:
+        specific = self._models.get(key)
+        if specific is not None and specific.walltime.n >= RESOURCE_MIN_SAMPLES:
+            return key, specific
+        pooled = self._models.get(POOLED_KEY)
+        if pooled is None or pooled.walltime.n == 0:
+            return None
+        return POOLED_KEY, pooled
+
+    def estimate(self, numbers: np.ndarray, route: Route) -> ResourceEstimate | None:
+        """入力の推定値（学習データが1件も無ければ None）"""
+        found = self._model_for(model_key(route))
+        if found is None:
+            return None
+        key, model = found
+        features = input_features(numbers, route)
+
+        # 観測した並列数の範囲で、目標の walltime に収まる最小の並列数を選ぶ
+        # （1種類しか観測していなければ並列数の効果は分からないのでその値）
+        seen = sorted(model.ncpus_seen)
+        candidates = [n for n in _powers_of_two(RESOURCE_MAX_NPROCS) if seen[0] <= n <= seen[-1]]
+        candidates = sorted(set(candidates + seen)) if len(seen) > 1 else seen
+        for nprocs in candidates:
+            mean, sigma = model.walltime.predict(_design(features, nprocs))
+            if math.exp(mean) <= RESOURCE_TARGET_WALLTIME_S:
+                break
+
+        mem_mb = mem_observed_mb = None
+        sigmas = [sigma]
+        if model.memory.n:
+            mem_mean, mem_sigma = model.memory.predict(_design(features, nprocs))
+            sigmas.append(mem_sigma)
+            mem_observed_mb = math.ceil(math.exp(mem_mean) / 1024)
+            upper = math.exp(mem_mean + _Z80 * mem_sigma) / 1024 * RESOURCE_MEM_HEADROOM
+            # 256MB 単位に切り上げる
+            mem_mb = max(RESOURCE_MIN_MEM_MB, 256 * math.ceil(upper / 256))
+
+        return ResourceEstimate(
+            model_key=key,
+            samples=model.walltime.n,
+            confidence=round(math.exp(-max(sigmas)), 3),
+            nprocshared=nprocs,
+            walltime_s=max(1, round(math.exp(mean))),
+            walltime_low_s=max(1, round(math.exp(mean - _Z80 * sigma))),
+            walltime_high_s=max(1, round(math.exp(mean + _Z80 * sigma))),
+            mem_mb=mem_mb,
+            mem_observed_mb=mem_observed_mb,
+        )
+
+    def models(self) -> list[dict]:
+        """学習済みのモデルの概要（データ数・残差の標準偏差・係数）"""
+        summaries = []
+        for key, model in sorted(self._models.items()):
+            summary = {"model_key": key, "samples": model.walltime.n, "ncpus": sorted(model.ncpus_seen)}
+            for name, regression in (("walltime", model.walltime), ("memory", model.memory)):
+                if regression.n:
+                    beta, _, variance = regression.solve()
+                    summary[name] = {
+                        "samples": regression.n,
+                        "residual_log_std": math.sqrt(variance),
+                        "coefficients": dict(zip(FEATURE_NAMES, beta.round(4).tolist())),
+                    }
+            summaries.append(summary)
+        return summaries
+
+
+def _read_text(path: str) -> str:
+    with open(path) as f:
+        return f.read()
+
+
+def _link0_int(link0: dict[str, str | None], key: str) -> int | None:
+    value = link0.get(key)
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+def _powers_of_two(limit: int) -> list[int]:
+    values = []
+    n = 1
+    while n <= limit:
+        values.append(n)
+        n *= 2
+    return values
+
+
+resource_estimator = ResourceEstimator()
@@ -0,0 +1,62 @@
+from datetime import datetime
+
+from app.schemas.job_resource import BundleResourceUsage, JobResourceUsage
+from app.utils.qstat_parser import QstatJobRecord
+
+
+def sample_from_record(
+    job_id: int, record: QstatJobRecord, sampled_at: datetime
+) -> dict | None:
+    """qstat -x のレコードを job_resource_samples の1行に変換（未実行なら None）"""
+    if record.walltime_used is None and record.mem_used_kb is None:
+        return None
+    return {
+        "job_id": job_id,
+        "sampled_at": sampled_at,
+        "walltime_s": record.walltime_used,
+        "cput_s": record.cput_used,
+        "mem_kb": record.mem_used_kb,
+        "vmem_kb": record.vmem_used_kb,
+        "ncpus": record.ncpus,
+        "mem_limit_kb": record.mem_limit_kb,
+    }
+
+
+def _ratio(numerator: float | None, denominator: float | None) -> float | None:
+    if not numerator or not denominator:
+        return None
+    return numerator / denominator
+
+
+def summarize_bundle_usage(bundle_id: int, peaks: list) -> BundleResourceUsage:
+    """ジョブごとのピーク値から CPU・メモリ効率を求め、バンドル全体でも集計する"""
+    jobs = []
+    cput_total = core_seconds_total = 0
+    mem_used_total = mem_limit_total = 0
+    for row in peaks:
+        core_seconds = (row.walltime_s or 0) * (row.ncpus or 1)
+        jobs.append(
+            JobResourceUsage(
+                job_id=row.job_id,
+                walltime_s=row.walltime_s,
+                cput_s=row.cput_s,
+                max_mem_kb=row.max_mem_kb,
+                ncpus=row.ncpus,
+                mem_limit_kb=row.mem_limit_kb,
+                cpu_efficiency=_ratio(row.cput_s, core_seconds),
+                mem_efficiency=_ratio(row.max_mem_kb, row.mem_limit_kb),
+            )
+        )
+        if row.cput_s and core_seconds:
+            cput_total += row.cput_s
+            core_seconds_total += core_seconds
+        if row.max_mem_kb and row.mem_limit_kb:
+            mem_used_total += row.max_mem_kb
+            mem_limit_total += row.mem_limit_kb
+
+    return BundleResourceUsage(
+        bundle_id=bundle_id,
+        jobs=jobs,
+        cpu_efficiency=_ratio(cput_total, core_seconds_total),
+        mem_efficiency=_ratio(mem_used_total, mem_limit_total),
+    )
@@ -0,0 +1,191 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterator
+
+import paramiko
+from dotenv import load_dotenv
+
+from app.models.server_credential import ServerCredential
+from app.services.credential_cache import credential_cache
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+SSH_CONNECT_TIMEOUT = float(os.getenv("SSH_CONNECT_TIMEOUT", "10"))
+SSH_KEEPALIVE_INTERVAL = int(os.getenv("SSH_KEEPALIVE_INTERVAL", "30"))
+SSH_IDLE_TIMEOUT = float(os.getenv("SSH_IDLE_TIMEOUT", "300"))
+
+
+@dataclass
+class PooledConnection:
+    """認証済み Transport と最終利用時刻の組"""
+
+    credential_id: int
+    transport: paramiko.Transport
+    last_used: float = field(default_factory=time.monotonic)
+    in_use: int = 0
+
+    def is_alive(self) -> bool:
+        return self.transport.is_active() and self.transport.is_authenticated()
+
+    def close(self):
+        self.transport.close()
+
+
+class SSHConnectionPool:
+    """ServerCredential.id ごとに認証済み Transport を保持するコネクションプール
+
+    SSH チャネル・SFTP セッションは同一 Transport 上に多重化して払い出す。
+    切断されていれば次回取得時に透過的に再接続する。
+    """
+
+    def __init__(
+        self,
+        idle_timeout: float = SSH_IDLE_TIMEOUT,
+        keepalive_interval: int = SSH_KEEPALIVE_INTERVAL,
+        connect_timeout: float = SSH_CONNECT_TIMEOUT,
+    ):
+        self.idle_timeout = idle_timeout
+        self.keepalive_interval = keepalive_interval
+        self.connect_timeout = connect_timeout
+        self._connections: dict[int, PooledConnection] = {}
+        self._locks: dict[int, threading.Lock] = {}
+        self._global_lock = threading.Lock()
+        self.connections_opened = 0
+
+    def _lock_for(self, credential_id: int) -> threading.Lock:
+        with self._global_lock:
+            lock = self._locks.get(credential_id)
+            if lock is None:
+                lock = self._locks[credential_id] = threading.Lock()
+            return lock
+
+    def _connect(self, credential: ServerCredential) -> PooledConnection:
+        transport = paramiko.Transport(
+            (credential.host, credential.port or 22)  # type: ignore
+        )
+        transport.banner_timeout = self.connect_timeout
+        transport.auth_timeout = self.connect_timeout
+        try:
+            transport.connect(**credential_cache.get(credential).connect_kwargs())
+        except Exception:
+            transport.close()
+            raise
+        transport.set_keepalive(self.keepalive_interval)
+        self.connections_opened += 1
+        logger.info(
+            f"SSH 接続を確立しました: credential_id={credential.id} host={credential.host}"
+        )
+        return PooledConnection(credential_id=credential.id, transport=transport)  # type: ignore
+
+    def _acquire(self, credential: ServerCredential) -> PooledConnection:
+        credential_id: int = credential.id  # type: ignore
+        with self._lock_for(credential_id):
+            conn = self._connections.get(credential_id)
+            if conn is not None and not conn.is_alive():
+                logger.info(f"SSH 接続が切断されていたため再接続します: {credential_id}")
+                conn.close()
+                conn = None
+            if conn is None:
+                conn = self._connections[credential_id] = self._connect(credential)
+            conn.last_used = time.monotonic()
+            conn.in_use += 1
+            return conn
+
+    def _release(self, conn: PooledConnection):
+        with self._lock_for(conn.credential_id):
+            conn.in_use -= 1
+            conn.last_used = time.monotonic()
+
+    @contextmanager
+    def channel(self, credential: ServerCredential) -> Iterator[paramiko.Channel]:
+        """プール済み Transport 上で新しいセッションチャネルを開く"""
+        conn = self._acquire(credential)
+        try:
+            chan = conn.transport.open_session(timeout=self.connect_timeout)
+            try:
+                yield chan
+            finally:
+                chan.close()
+        finally:
+            self._release(conn)
+
+    @contextmanager
+    def sftp(self, credential: ServerCredential) -> Iterator[paramiko.SFTPClient]:
+        """プール済み Transport 上で SFTP セッションを開く"""
+        conn = self._acquire(credential)
+        try:
+            client = paramiko.SFTPClient.from_transport(conn.transport)
+            if client is None:
+                raise RuntimeError("SFTP セッションを開始できませんでした")
+            try:
+                yield client
+            finally:
+                client.close()
+        finally:
+            self._release(conn)
+
+    def exec_command(
+        self,
+        credential: ServerCredential,
+        cmd: str,
+        timeout: float | None = None,
+        stdin: bytes | None = None,
+    ) -> tuple[str, str, int]:
+        """コマンドを実行して (stdout, stderr, 終了コード) を返す"""
+        with self.channel(credential) as chan:
+            if timeout is not None:
+                chan.settimeout(timeout)
+            chan.exec_command(cmd)
+            if stdin is not None:
+                chan.sendall(stdin)
+                chan.shutdown_write()
+            stdout = chan.makefile("rb").read().decode()
+            stderr = chan.makefile_stderr("rb").read().decode()
+            exit_status = chan.recv_exit_status()
+        return stdout, stderr, exit_status
+
+    def evict_idle(self) -> int:
+        """アイドル時間が閾値を超えた接続を閉じる"""
+        now = time.monotonic()
+        evicted = 0
+        with self._global_lock:
+            idle_ids = [
+                cid
+                for cid, conn in self._connections.items()
+                if now - conn.last_used > self.idle_timeout or not conn.is_alive()
+            ]
+        for cid in idle_ids:
+            with self._lock_for(cid):
+                conn = self._connections.get(cid)
+                if conn is None or conn.in_use > 0:
+                    continue
+                if conn.is_alive() and now - conn.last_used <= self.idle_timeout:
+                    continue
+                del self._connections[cid]
+                conn.close()
+                evicted += 1
+        if evicted:
+            logger.info(f"アイドル SSH 接続を {evicted} 件閉じました")
+        return evicted
+
+    def invalidate(self, credential_id: int):
+        """認証情報の変更・削除時に該当接続を破棄する"""
+        with self._lock_for(credential_id):
+            conn = self._connections.pop(credential_id, None)
+            if conn is not None:
+                conn.close()
+
+    def close_all(self):
+        with self._global_lock:
+            ids = list(self._connections)
+        for cid in ids:
+            self.invalidate(cid)
+
+
+ssh_pool = SSHConnectionPool()
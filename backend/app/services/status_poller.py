@@ -0,0 +1,190 @@
+import asyncio
+import logging
+import os
+import posixpath
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+
+from app.crud import job as crud_job
+from app.crud.job_resource import add_resource_samples
+from app.crud.server_credential import get_all_credentials, legacy_credential
+from app.database import AsyncSessionLocal
+from app.models import Job, ServerCredential
+from app.services.output_retrieval import output_retriever
+from app.services.resource_usage import sample_from_record
+from app.services.host_load import host_load
+from app.services.job_monitor import (
+    LogSweepEntry,
+    normalize_job_id,
+    poll_host_state,
+    qstat_record_to_job_status,
+)
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+STATUS_POLL_INTERVAL = float(os.getenv("STATUS_POLL_INTERVAL", "30"))
+STATUS_POLL_MIN_INTERVAL = float(os.getenv("STATUS_POLL_MIN_INTERVAL", "10"))
+STATUS_POLL_MAX_INTERVAL = float(os.getenv("STATUS_POLL_MAX_INTERVAL", "300"))
+# アクティブジョブがこの数増えるごとにポーリング間隔を基準値ぶん延ばす
+STATUS_POLL_JOBS_PER_STEP = int(os.getenv("STATUS_POLL_JOBS_PER_STEP", "500"))
+
+
+def next_interval(active_jobs: int) -> float:
+    """アクティブジョブ数に応じて次回ポーリングまでの間隔を決める"""
+    if active_jobs == 0:
+        return STATUS_POLL_MAX_INTERVAL
+    interval = STATUS_POLL_INTERVAL * (1 + active_jobs / STATUS_POLL_JOBS_PER_STEP)
+    return max(STATUS_POLL_MIN_INTERVAL, min(interval, STATUS_POLL_MAX_INTERVAL))
+
+
+def log_sweep_roots(jobs: list[Job]) -> list[str]:
+    """アクティブジョブを含むバンドルディレクトリ（remote_base_dir/bundle_*）の一覧"""
+    roots = {
+        posixpath.dirname(posixpath.dirname(job.log_path))  # type: ignore
+        for job in jobs
+        if job.log_path
+    }
+    return sorted(roots)
+
+
+def group_jobs_by_credential(
+    jobs: list[Job], credentials: list[ServerCredential]
+) -> dict[int, list[Job]]:
+    """ジョブを投入先ホストごとに分ける（ジョブの無いホストも混み具合の取得のため含める）"""
+    if not credentials:
+        return {}
+    groups: dict[int, list[Job]] = {c.id: [] for c in credentials}  # type: ignore
+    legacy_id = legacy_credential(credentials).id  # type: ignore
+    for job in jobs:
+        # 投入先未記録の旧ジョブは最初のホストで投入されたものとみなす
+        credential_id = job.server_credential_id or legacy_id
+        if credential_id in groups:
+            groups[credential_id].append(job)  # type: ignore
+    return groups
+
+
+class StatusPoller:
+    """queued/running のジョブ状態をホストごとに1回の qstat -x でまとめて更新し、
+    同じ応答から使用リソースの時系列も記録する
+
+    同じ往復でジョブログも一括走査し、前回の走査以降に更新されたログだけについて
+    終了状態（Normal/Error termination）と更新時刻を取得する。
+    """
+
+    def __init__(self):
+        self.active_jobs = 0
+        self._wakeup = asyncio.Event()
+        # ホストごとの前回走査時刻（リモート時計）と、ジョブごとの最新のログ状態
+        self._sweep_since: dict[int, int] = {}
+        self.log_states: dict[int, LogSweepEntry] = {}
+
+    def wake(self):
+        """新規投入直後などに次回ポーリングを前倒しする"""
+        self._wakeup.set()
+
+    async def poll_host(
+        self, credential: ServerCredential, jobs: list[Job]
+    ) -> tuple[dict[int, str], list[dict]]:
+        records, remote_now, log_entries = await poll_host_state(
+            credential,
+            log_sweep_roots(jobs),
+            self._sweep_since.get(credential.id),  # type: ignore
+        )
+        listed = records is not None
+        if records is None:
+            records = {}
+        else:
+            host_load.update(credential.id, list(records.values()))  # type: ignore
+        if remote_now is not None:
+            # mtime の秒未満切り捨てで取りこぼさないよう 1 秒重ねて走査する
+            self._sweep_since[credential.id] = remote_now - 1  # type: ignore
+        sampled_at = datetime.now(timezone.utc)
+        changes: dict[int, str] = {}
+        samples: list[dict] = []
+        for job in jobs:
+            # 更新の無かったログは走査結果に現れないので前回の状態を使う
+            if job.log_path in log_entries:
+                self.log_states[job.id] = log_entries[job.log_path]  # type: ignore
+            log_state = self.log_states.get(job.id)  # type: ignore
+            if not listed and (log_state is None or log_state.termination is None):
+                # qstat の出力が空のときは一覧に無いことを終了とみなさず、
+                # ログで終了が分かったジョブだけを更新する
+                continue
+            record = records.get(normalize_job_id(job.remote_job_id))  # type: ignore
+            new_status = self._resolve_status(record, log_state)
+            if new_status != job.status:
+                changes[job.id] = new_status  # type: ignore
+            if record is not None:
+                sample = sample_from_record(job.id, record, sampled_at)  # type: ignore
+                if sample is not None:
+                    samples.append(sample)
+        return changes, samples
+
+    @staticmethod
+    def _resolve_status(record, log_state: LogSweepEntry | None) -> str:
+        """qstat で終了が分かったジョブは、ログの終了状態で done / error を確定する"""
+        status = qstat_record_to_job_status(record)
+        if status == "done" and log_state is not None and log_state.termination != "normal":
+            # Error termination、または終了メッセージ無しで消えた（強制終了など）
+            return "error"
+        return status
+
+    async def tick(self) -> int:
+        async with AsyncSessionLocal() as db:
+            jobs = await crud_job.get_active_jobs(db)
+            self.active_jobs = len(jobs)
+            active_ids = {job.id for job in jobs}
+            for job_id in list(self.log_states):
+                if job_id not in active_ids:
+                    del self.log_states[job_id]
+            credentials = {c.id: c for c in await get_all_credentials(db)}
+            groups = group_jobs_by_credential(jobs, list(credentials.values()))
+
+            results = await asyncio.gather(
+                *(self.poll_host(credentials[cid], js) for cid, js in groups.items()),
+                return_exceptions=True,
+            )
+            changes: dict[int, str] = {}
+            samples: list[dict] = []
+            for cid, result in zip(groups, results):
+                if isinstance(result, BaseException):
+                    logger.warning(f"qstat によるステータス取得に失敗しました ({cid}): {result}")
+                    continue
+                changes.update(result[0])
+                samples.extend(result[1])
+
+            try:
+                await add_resource_samples(db, samples)
+            except Exception as e:
+                await db.rollback()
+                logger.warning(f"リソース使用量の記録に失敗しました: {e}")
+            updated = await crud_job.bulk_update_job_status(db, changes)
+            if updated:
+                logger.info(f"{updated} 件のジョブステータスを更新しました")
+            # 完了したジョブの出力ファイルを取得
+            for job_id, new_status in changes.items():
+                if new_status == "done":
+                    output_retriever.schedule(job_id)
+            return updated
+
+    async def run(self):
+        while True:
+            try:
+                await self.tick()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"ステータスポーリングでエラーが発生しました: {e}")
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(), next_interval(self.active_jobs)
+                )
+            except asyncio.TimeoutError:
+                pass
+
+
+status_poller = StatusPoller()
@@ -0,0 +1,59 @@
+import asyncio
+import os
+
+from dotenv import load_dotenv
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Job, Molecule
+from app.utils.geometry import decode_geometry
+from app.utils.structure_check import StructureCheck, check_structure
+from app.utils.zmatrix import geometry_from_text
+
+load_dotenv()
+
+# 投入前に構造を検査し、エラーのあるジョブを投入しない
+STRUCTURE_CHECK_ON_SUBMIT = os.getenv("STRUCTURE_CHECK_ON_SUBMIT", "true").lower() == "true"
+
+
+def check_many(structures: list[tuple]) -> list[StructureCheck | None]:
+    """(原子番号, 座標, 電荷, 多重度) の並びをまとめて検査する（構造が無ければ None）"""
+    return [
+        check_structure(numbers, coordinates, charge, multiplicity)
+        if numbers is not None
+        else None
+        for numbers, coordinates, charge, multiplicity in structures
+    ]
+
+
+async def check_job_structures(db: AsyncSession, jobs: list[Job]) -> dict[int, StructureCheck]:
+    """ジョブの分子の構造を検査する（ジョブ ID → 結果。構造を読めない分子は含めない）"""
+    molecule_ids = {job.molecule_id for job in jobs}
+    if not molecule_ids:
+        return {}
+    result = await db.execute(
+        select(
+            Molecule.id,
+            Molecule.charge,
+            Molecule.multiplicity,
+            Molecule.structure_bin,
+            Molecule.structure_xyz,
+        ).where(Molecule.id.in_(molecule_ids))
+    )
+    ids = []
+    structures = []
+    for mol_id, charge, multiplicity, structure_bin, structure_xyz in result.all():
+        if structure_bin is not None:
+            geometry = decode_geometry(structure_bin)
+        else:
+            geometry = geometry_from_text(structure_xyz) if structure_xyz else None
+        if geometry is None:
+            continue
+        ids.append(mol_id)
+        structures.append((*geometry, charge, multiplicity))
+    checks = dict(zip(ids, await asyncio.to_thread(check_many, structures)))
+    return {
+        job.id: checks[job.molecule_id]  # type: ignore
+        for job in jobs
+        if job.molecule_id in checks
+    }
@@ -0,0 +1,233 @@
+import asyncio
+import logging
+import os
+import posixpath
+from collections import OrderedDict, defaultdict, deque
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+
+from app.crud import job as crud_job
+from app.crud import submission_queue as crud_queue
+from app.crud.server_credential import get_all_credentials, legacy_credential
+from app.database import AsyncSessionLocal
+from app.models import ServerCredential, SubmissionQueueEntry
+from app.models.job import JobStatus
+from app.models.submission_queue import SubmissionState
+from app.services import remote
+from app.services.host_load import HostCapacity, host_load, place_jobs
+from app.services.job_execution import JobExecutionController, SubmissionResult, remote_job_dir
+from app.services.status_poller import status_poller
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+SUBMIT_MAX_IN_FLIGHT_PER_HOST = int(os.getenv("SUBMIT_MAX_IN_FLIGHT_PER_HOST", "500"))
+SUBMIT_MAX_IN_FLIGHT_PER_USER = int(os.getenv("SUBMIT_MAX_IN_FLIGHT_PER_USER", "200"))
+SUBMIT_DISPATCH_INTERVAL = float(os.getenv("SUBMIT_DISPATCH_INTERVAL", "15"))
+SUBMIT_BATCH_SIZE = int(os.getenv("SUBMIT_BATCH_SIZE", "500"))
+SUBMIT_MAX_ATTEMPTS = int(os.getenv("SUBMIT_MAX_ATTEMPTS", "3"))
+
+
+def select_fair_share(
+    entries: list[SubmissionQueueEntry],
+    capacity: int,
+    user_in_flight: dict[int, int],
+    user_limit: int = SUBMIT_MAX_IN_FLIGHT_PER_USER,
+) -> list[SubmissionQueueEntry]:
+    """ユーザー間ラウンドロビンで投入するエントリを選ぶ
+
+    entries は優先度順に並んでいる前提で、各ユーザーの中では優先度順、
+    ユーザー間では1件ずつ交互に取り出す（entries はユーザーごとの先頭を集めたもの）。
+    """
+    queues: OrderedDict[int, deque] = OrderedDict()
+    for entry in entries:
+        queues.setdefault(entry.user_id, deque()).append(entry)  # type: ignore
+
+    in_flight = defaultdict(int, user_in_flight)
+    selected: list[SubmissionQueueEntry] = []
+    while queues and len(selected) < capacity:
+        for user_id in list(queues):
+            if len(selected) >= capacity:
+                break
+            if in_flight[user_id] >= user_limit:
+                del queues[user_id]
+                continue
+            selected.append(queues[user_id].popleft())
+            in_flight[user_id] += 1
+            if not queues[user_id]:
+                del queues[user_id]
+    return selected
+
+
+def host_capacities(
+    credentials: list[ServerCredential], in_flight: dict[int | None, int]
+) -> list[HostCapacity]:
+    """各ホストの空き枠（上限 - 投入済み）と混み具合を集める"""
+    capacities = []
+    legacy = legacy_credential(credentials)
+    for credential in credentials:
+        limit = credential.max_jobs or SUBMIT_MAX_IN_FLIGHT_PER_HOST
+        used = in_flight.get(credential.id, 0)  # type: ignore
+        if credential is legacy:
+            used += in_flight.get(None, 0)  # 投入先未記録の旧ジョブは最初のホスト扱い
+        capacities.append(
+            HostCapacity(
+                credential_id=credential.id,  # type: ignore
+                free_slots=max(0, limit - used),  # type: ignore
+                load=host_load.get(credential.id),  # type: ignore
+            )
+        )
+    return capacities
+
+
+class SubmissionDispatcher:
+    """ローカルの投入待ちキューを、ホスト・ユーザーごとの上限内でクラスタへ流す
+
+    投入先は、ホストごとの空き枠・qstat から求めた待機ジョブ数・直近の待ち時間を
+    もとに、推定待ち時間が最も短いホストを1件ずつ選ぶ。
+    """
+
+    def __init__(self):
+        self._wakeup = asyncio.Event()
+
+    def wake(self):
+        self._wakeup.set()
+
+    async def tick(self) -> int:
+        async with AsyncSessionLocal() as db:
+            credentials = {c.id: c for c in await get_all_credentials(db)}
+            if not credentials:
+                return 0
+
+            hosts = host_capacities(
+                list(credentials.values()),
+                await crud_job.count_active_jobs_by_credential(db),
+            )
+            capacity = min(sum(host.free_slots for host in hosts), SUBMIT_BATCH_SIZE)
+            if capacity <= 0:
+                return 0
+
+            # 1人で capacity 件を超えて選ばれることはないので、ユーザーごとに capacity 件まで
+            entries = await crud_queue.get_pending_entries(db, capacity)
+            user_in_flight = await crud_queue.count_in_flight_by_user(db)
+            selected = select_fair_share(entries, capacity, user_in_flight)
+            if not selected:
+                return 0
+
+            # ホスト・転送方式ごとにまとめ、ホスト単位で一括投入する。投入先は qsub の前に
+            # 記録しておき、結果が分からないまま終わっても再試行を同じホストへ送る
+            groups: dict[tuple[int, str], list[SubmissionQueueEntry]] = defaultdict(list)
+            pins = [entry.server_credential_id for entry in selected]
+            for entry, credential_id in zip(selected, place_jobs(pins, hosts)):  # type: ignore
+                if credential_id is None:
+                    continue  # 固定先のホストに空きが無い・全体の枠が尽きた
+                entry.server_credential_id = credential_id  # type: ignore
+                groups[(credential_id, entry.transfer_mode)].append(entry)  # type: ignore
+            if not groups:
+                return 0
+            await db.commit()
+
+            results = await asyncio.gather(
+                *(
+                    self._dispatch(credentials[credential_id], group, transfer_mode)
+                    for (credential_id, transfer_mode), group in groups.items()
+                )
+            )
+            dispatched = sum(results)
+
+            # 結果をまとめて1トランザクションで記録
+            await db.commit()
+
+        if dispatched:
+            logger.info(f"{dispatched} 件のジョブをクラスタへ投入しました")
+            status_poller.wake()
+        return dispatched
+
+    async def _dispatch(
+        self,
+        credential: ServerCredential,
+        entries: list[SubmissionQueueEntry],
+        transfer_mode: str,
+    ) -> int:
+        targets = []
+        for entry in entries:
+            job = entry.job
+            if not os.path.exists(job.gjf_path):
+                self._record_failure(entry, ".gjf ファイルが存在しません", final=True)
+                continue
+            remote_dir = remote_job_dir(
+                entry.user.remote_base_dir, job.molecule.bundle_id, job.id  # type: ignore
+            )
+            targets.append((entry, remote_dir))
+        if not targets:
+            return 0
+
+        controller = JobExecutionController(credential)
+        # qsub の結果は返るたびに受け取る（スレッドから追記する）。一括投入が途中で
+        # タイムアウト・失敗しても、それまでに投入できたジョブは記録する
+        returned: dict[str, SubmissionResult] = {}
+        try:
+            await remote.call(
+                credential,
+                controller.submit_jobs,
+                [(entry.job.gjf_path, remote_dir) for entry, remote_dir in targets],
+                transfer_mode=transfer_mode,
+                on_result=lambda result: returned.__setitem__(result.remote_dir, result),
+                timeout=remote.REMOTE_TRANSFER_TIMEOUT,
+            )
+            error = None
+        except Exception as e:
+            logger.error(f"ジョブ投入に失敗しました ({credential.host}): {e}")
+            error = str(e)
+
+        dispatched = 0
+        now = datetime.now(timezone.utc)
+        for entry, remote_dir in targets:
+            submission = returned.get(remote_dir)
+            if submission is None or submission.remote_job_id is None:
+                # タイムアウトで qsub が済んでいても、再試行は同じホストへ送られ（place_jobs）、
+                # 投入スクリプトは投入済みのディレクトリでは qsub せず記録した結果を返すので、
+                # 二重に投入することはない
+                self._record_failure(
+                    entry,
+                    (submission.error if submission else None)
+                    or error
+                    or "qsub の結果を取得できませんでした",
+                )
+                continue
+            entry.job.remote_job_id = submission.remote_job_id
+            entry.job.server_credential_id = credential.id
+            entry.job.log_path = posixpath.join(remote_dir, "input.log")
+            entry.state = SubmissionState.dispatched  # type: ignore
+            entry.dispatched_at = now  # type: ignore
+            dispatched += 1
+        return dispatched
+
+    def _record_failure(self, entry: SubmissionQueueEntry, error: str, final: bool = False):
+        entry.attempts += 1  # type: ignore
+        entry.last_error = error  # type: ignore
+        if final or entry.attempts >= SUBMIT_MAX_ATTEMPTS:  # type: ignore
+            entry.state = SubmissionState.failed  # type: ignore
+            entry.job.status = JobStatus.error
+
+    async def run(self):
+        while True:
+            try:
+                dispatched = await self.tick()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"投入キューの処理でエラーが発生しました: {e}")
+                dispatched = 0
+            self._wakeup.clear()
+            if dispatched >= SUBMIT_BATCH_SIZE:
+                continue  # まだ余裕があれば続けて流す
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), SUBMIT_DISPATCH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+
+submission_dispatcher = SubmissionDispatcher()
@@ -0,0 +1,238 @@
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
+
+# 1ブロックで扱う構造の組の数（共分散行列 (組,3,3) float64 で約 75MB）
+PAIR_BLOCK = 1 << 20
+
+
+@dataclass
+class ConformerMatch:
+    """重複と判定された構造の代表（入力の並びでの番号）と RMSD [Å]"""
+
+    representative: int
+    rmsd: float
+
+
+def canonical_order(numbers: np.ndarray, coordinates: np.ndarray) -> np.ndarray:
+    """原子の並べ替え順（原子番号 → 重心からの距離）。回転・並進・入力の原子順に依らない。
+
+    距離は丸めない（丸めの境界で別の原子と入れ替わるため）。重心からの距離がほぼ等しい
+    同じ元素の原子は構造ごとに順序が入れ替わりうる（_match_order で直す）。
+    """
+    centered = coordinates - coordinates.mean(axis=0)
+    return np.lexsort(((centered * centered).sum(axis=1), numbers))
+
+
+def _match_order(
+    numbers: np.ndarray, coordinates: np.ndarray, ref_numbers: np.ndarray, ref_centered: np.ndarray
+) -> np.ndarray:
+    """原子の並びが違う構造を基準の構造と同じ並びにした座標。
+
+    canonical_order で対応を仮に決めて重ね合わせたあと、元素ごとに基準の各原子に
+    最も近い原子を対応させ直す（一対一にならない元素は仮の対応のまま）。
+    """
+    guess = canonical_order(numbers, coordinates)[
+        np.argsort(canonical_order(ref_numbers, ref_centered))
+    ]
+    moved = coordinates[guess] - coordinates[guess].mean(axis=0)
+    u, _, vt = np.linalg.svd(moved.T @ ref_centered)
+    if np.linalg.det(u @ vt) < 0:
+        u[:, 2] *= -1
+    rotated = moved @ (u @ vt)
+    order = guess.copy()
+    for z in np.unique(ref_numbers):
+        atoms = np.flatnonzero(ref_numbers == z)
+        diff = ref_centered[atoms, None, :] - rotated[None, atoms, :]
+        nearest = (diff * diff).sum(axis=2).argmin(axis=1)
+        if len(np.unique(nearest)) == len(atoms):
+            order[atoms] = guess[atoms[nearest]]
+    return coordinates[order]
+
+
+def _stack(geometries: list[tuple[np.ndarray, np.ndarray]]) -> tuple[np.ndarray, np.ndarray]:
+    """同じ組成の構造を (M,N,3) にまとめて重心を原点に移す。
+
+    原子の並びが最初の構造と同じもの（同じ生成元の配座）はそのまま、違うものだけ
+    _match_order で最初の構造の並びに揃える。並べ替えたかどうか (M,) も返す。
+    """
+    ref_numbers, ref_coordinates = geometries[0]
+    ref_centered = ref_coordinates - ref_coordinates.mean(axis=0)
+    stacked = np.empty((len(geometries), len(ref_numbers), 3))
+    reordered = np.zeros(len(geometries), dtype=bool)
+    for i, (numbers, coordinates) in enumerate(geometries):
+        if np.array_equal(numbers, ref_numbers):
+            stacked[i] = coordinates
+        else:
+            stacked[i] = _match_order(numbers, coordinates, ref_numbers, ref_centered)
+            reordered[i] = True
+    stacked -= stacked.mean(axis=1, keepdims=True)
+    return stacked, reordered
+
+
+def _distance_profiles(stacked: np.ndarray, numbers: np.ndarray) -> np.ndarray:
+    """元素ごとに昇順に並べた重心からの距離 (M,N)。原子の並びに依らず、2構造の差の
+    二乗平均平方根はどの対応・回転での RMSD も下回る（並べ替えた構造の照合の絞り込み用）"""
+    distances = np.sqrt((stacked * stacked).sum(axis=2))
+    order = np.lexsort((distances, np.broadcast_to(numbers, distances.shape)), axis=1)
+    return np.take_along_axis(distances, order, axis=1)
+
+
+def _rematcher(
+    geometries: list[tuple[np.ndarray, np.ndarray]],
+    stacked: np.ndarray,
+    reordered: np.ndarray,
+    threshold: float,
+) -> Callable[[int, list[int]], tuple[int, float] | None]:
+    """並べ替えた構造が絡む組を、相手の構造に合わせて原子の対応を取り直して比べる関数"""
+    ref_numbers = geometries[0][0]
+    profiles = _distance_profiles(stacked, ref_numbers)
+
+    def rematch(k: int, representatives: list[int]) -> tuple[int, float] | None:
+        candidates = np.asarray(representatives, dtype=np.intp)
+        if not reordered[k]:
+            candidates = candidates[reordered[candidates]]
+        if len(candidates) == 0:
+            return None
+        diff = profiles[candidates] - profiles[k]
+        lower = np.sqrt((diff * diff).mean(axis=1))
+        best = None
+        for j in candidates[lower < threshold]:
+            aligned = _match_order(*geometries[k], ref_numbers, stacked[j])
+            aligned -= aligned.mean(axis=0)
+            rmsd = float(pairwise_rmsd(aligned[None], stacked[j][None])[0, 0])
+            if rmsd < threshold and (best is None or rmsd < best[1]):
+                best = (int(j), rmsd)
+        return best
+
+    return rematch
+
+
+def _eigvalsh3(k00, k11, k22, k01, k02, k12) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """対称 3x3 行列（要素ごとの配列）の固有値を解析的に求める（降順）"""
+    q = (k00 + k11 + k22) / 3
+    a00, a11, a22 = k00 - q, k11 - q, k22 - q
+    off = k01 * k01 + k02 * k02 + k12 * k12
+    p = np.sqrt((a00 * a00 + a11 * a11 + a22 * a22 + 2 * off) / 6)
+    scale = np.where(p > 0, p, 1.0)
+    b00, b11, b22 = a00 / scale, a11 / scale, a22 / scale
+    b01, b02, b12 = k01 / scale, k02 / scale, k12 / scale
+    det = (
+        b00 * (b11 * b22 - b12 * b12)
+        - b01 * (b01 * b22 - b12 * b02)
+        + b02 * (b01 * b12 - b11 * b02)
+    )
+    phi = np.arccos(np.clip(det / 2, -1.0, 1.0)) / 3
+    e1 = q + 2 * p * np.cos(phi)
+    e3 = q + 2 * p * np.cos(phi + 2 * np.pi / 3)
+    return e1, 3 * q - e1 - e3, e3
+
+
+def pairwise_rmsd(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """重心を原点に移した構造 a (A,N,3)・b (B,N,3) の全組の、最適な回転で重ねたときの RMSD (A,B)。
+
+    Kabsch 法の RMSD は共分散行列 H = aᵀb の特異値 s と det(H) の符号 d から
+    sqrt((|a|² + |b|² - 2(s1 + s2 + d·s3)) / N) で決まるので、回転行列は作らない。
+    H は全組まとめて1回の行列積、特異値は HᵀH の固有値を解析的に求める。
+    """
+    n_a, n_atoms, _ = a.shape
+    n_b = len(b)
+    a_rows = a.transpose(0, 2, 1).reshape(n_a * 3, n_atoms)
+    b_rows = b.transpose(0, 2, 1).reshape(n_b * 3, n_atoms)
+    h = (
+        (a_rows @ b_rows.T)
+        .reshape(n_a, 3, n_b, 3)
+        .transpose(0, 2, 1, 3)
+        .reshape(n_a * n_b, 9)
+    )
+    h00, h01, h02, h10, h11, h12, h20, h21, h22 = h.T
+    det = (
+        h00 * (h11 * h22 - h12 * h21)
+        - h01 * (h10 * h22 - h12 * h20)
+        + h02 * (h10 * h21 - h11 * h20)
+    )
+    e1, e2, e3 = _eigvalsh3(
+        h00 * h00 + h10 * h10 + h20 * h20,
+        h01 * h01 + h11 * h11 + h21 * h21,
+        h02 * h02 + h12 * h12 + h22 * h22,
+        h00 * h01 + h10 * h11 + h20 * h21,
+        h00 * h02 + h10 * h12 + h20 * h22,
+        h01 * h02 + h11 * h12 + h21 * h22,
+    )
+    s = np.sqrt(np.maximum(e1, 0)) + np.sqrt(np.maximum(e2, 0))
+    s += np.copysign(np.sqrt(np.maximum(e3, 0)), det)
+    norm_a = (a * a).sum(axis=(1, 2))
+    norm_b = (b * b).sum(axis=(1, 2))
+    msd = (norm_a[:, None] + norm_b[None, :] - 2 * s.reshape(n_a, n_b)) / n_atoms
+    return np.sqrt(np.maximum(msd, 0))
+
+
+def _cluster(
+    stacked: np.ndarray,
+    threshold: float,
+    rematch: Callable[[int, list[int]], tuple[int, float] | None] | None = None,
+) -> list[ConformerMatch | None]:
+    """並び順に代表を選び、既存の代表のどれかと threshold 未満なら最も近い代表の重複とする。
+    見つからなければ rematch（原子の対応を取り直した照合）も試す"""
+    count = len(stacked)
+    matches: list[ConformerMatch | None] = [None] * count
+    representatives: list[int] = []
+    block = max(1, min(count, PAIR_BLOCK // count, 1024))
+    for start in range(0, count, block):
+        stop = min(start + block, count)
+        # 確定済みの代表との RMSD はまとめて求める
+        if representatives:
+            previous = pairwise_rmsd(stacked[start:stop], stacked[representatives])
+            nearest = previous.argmin(axis=1)
+            nearest_rmsd = previous[np.arange(stop - start), nearest]
+        else:
+            nearest = np.zeros(stop - start, dtype=np.intp)
+            nearest_rmsd = np.full(stop - start, np.inf)
+        within = pairwise_rmsd(stacked[start:stop], stacked[start:stop])
+        local: list[int] = []  # このブロックで代表になった構造（ブロック内の番号）
+        for k in range(stop - start):
+            best = nearest_rmsd[k]
+            representative = representatives[nearest[k]] if representatives else -1
+            if local:
+                candidates = within[k, local]
+                j = int(candidates.argmin())
+                if candidates[j] < best:
+                    best, representative = candidates[j], start + local[j]
+            if best >= threshold and rematch is not None:
+                found = rematch(start + k, representatives + [start + j for j in local])
+                if found is not None:
+                    representative, best = found
+            if best < threshold:
+                matches[start + k] = ConformerMatch(representative, float(best))
+            else:
+                local.append(k)
+        representatives.extend(start + k for k in local)
+    return matches
+
+
+def find_duplicate_conformers(
+    conformers: list[tuple[int, int, tuple[np.ndarray, np.ndarray] | None]],
+    threshold: float,
+) -> list[ConformerMatch | None]:
+    """(電荷, 多重度, (原子番号, 座標)) の並びから、前にある構造と RMSD が threshold [Å] 未満の
+    ものを探す（重複でなければ None）。比べるのは電荷・多重度・組成が同じ構造どうしだけ。
+    構造が無いものは重複にしない"""
+    groups: dict[tuple, list[int]] = {}
+    for index, (charge, multiplicity, geometry) in enumerate(conformers):
+        if geometry is None or len(geometry[0]) == 0:
+            continue
+        composition = np.sort(np.asarray(geometry[0], dtype=np.uint8)).tobytes()
+        groups.setdefault((charge, multiplicity, composition), []).append(index)
+
+    matches: list[ConformerMatch | None] = [None] * len(conformers)
+    for indices in groups.values():
+        if len(indices) < 2:
+            continue
+        geometries = [conformers[i][2] for i in indices]
+        stacked, reordered = _stack(geometries)  # type: ignore
+        rematch = _rematcher(geometries, stacked, reordered, threshold) if reordered.any() else None  # type: ignore
+        for i, match in zip(indices, _cluster(stacked, threshold, rematch)):
+            if match is not None:
+                matches[i] = ConformerMatch(indices[match.representative], match.rmsd)
+    return matches
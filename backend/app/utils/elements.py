@@ -0,0 +1,74 @@
+# 元素記号（インデックス = 原子番号、0 はダミー原子）
+SYMBOLS = (
+    "X",
+    "H", "He",
+    "Li", "Be", "B", "C", "N", "O", "F", "Ne",
+    "Na", "Mg", "Al", "Si", "P", "S", "Cl", "Ar",
+    "K", "Ca", "Sc", "Ti", "V", "Cr", "Mn", "Fe", "Co", "Ni", "Cu", "Zn",
+    "Ga", "Ge", "As", "Se", "Br", "Kr",
+    "Rb", "Sr", "Y", "Zr", "Nb", "Mo", "Tc", "Ru", "Rh", "Pd", "Ag", "Cd",
+    "In", "Sn", "Sb", "Te", "I", "Xe",
+    "Cs", "Ba", "La", "Ce", "Pr", "Nd", "Pm", "Sm", "Eu", "Gd", "Tb", "Dy",
+    "Ho", "Er", "Tm", "Yb", "Lu", "Hf", "Ta", "W", "Re", "Os", "Ir", "Pt",
+    "Au", "Hg", "Tl", "Pb", "Bi", "Po", "At", "Rn",
+    "Fr", "Ra", "Ac", "Th", "Pa", "U", "Np", "Pu", "Am", "Cm", "Bk", "Cf",
+    "Es", "Fm", "Md", "No", "Lr", "Rf", "Db", "Sg", "Bh", "Hs", "Mt", "Ds",
+    "Rg", "Cn", "Nh", "Fl", "Mc", "Lv", "Ts", "Og",
+)
+
+# 共有結合半径 [Å]（Cordero et al., Dalton Trans. 2008。インデックス = 原子番号、Cm まで）。
+# 値の無い元素は DEFAULT_COVALENT_RADIUS
+COVALENT_RADII = (
+    0.0,
+    0.31, 0.28,
+    1.28, 0.96, 0.84, 0.76, 0.71, 0.66, 0.57, 0.58,
+    1.66, 1.41, 1.21, 1.11, 1.07, 1.05, 1.02, 1.06,
+    2.03, 1.76, 1.70, 1.60, 1.53, 1.39, 1.39, 1.32, 1.26, 1.24, 1.32, 1.22,
+    1.22, 1.20, 1.19, 1.20, 1.20, 1.16,
+    2.20, 1.95, 1.90, 1.75, 1.64, 1.54, 1.47, 1.46, 1.42, 1.39, 1.45, 1.44,
+    1.42, 1.39, 1.39, 1.38, 1.39, 1.40,
+    2.44, 2.15, 2.07, 2.04, 2.03, 2.01, 1.99, 1.98, 1.98, 1.96, 1.94, 1.92,
+    1.92, 1.89, 1.90, 1.87, 1.87, 1.75, 1.70, 1.62, 1.51, 1.44, 1.41, 1.36,
+    1.36, 1.32, 1.45, 1.46, 1.48, 1.40, 1.50, 1.50,
+    2.60, 2.21, 2.15, 2.06, 2.00, 1.96, 1.90, 1.87, 1.80, 1.69,
+)
+DEFAULT_COVALENT_RADIUS = 1.5
+
+_NUMBERS = {symbol.lower(): z for z, symbol in enumerate(SYMBOLS)}
+# ゴースト原子の原子番号コード。ダミー原子（X = 0）と区別するため元素の範囲外に置く。
+# 基底関数を持たない "Bq" は GHOST_ATOM、元素の基底関数だけを置く "H-Bq" などは
+# GHOST_OFFSET + 原子番号
+GHOST_OFFSET = 128
+GHOST_ATOM = 255
+_NUMBERS["bq"] = GHOST_ATOM
+
+
+def is_ghost(z: int) -> bool:
+    return z > GHOST_OFFSET
+
+
+def element_symbol(z: int) -> str:
+    """原子番号（ゴースト原子のコードを含む）を元素記号に変換"""
+    if z == GHOST_ATOM:
+        return "Bq"
+    if z > GHOST_OFFSET:
+        return f"{SYMBOLS[z - GHOST_OFFSET]}-Bq"
+    return SYMBOLS[z]
+
+
+def atomic_number(symbol: str) -> int | None:
+    """元素記号（大文字小文字は問わない）または原子番号の文字列を原子番号に変換"""
+    if symbol.isdigit():
+        z = int(symbol)
+        return z if z < len(SYMBOLS) else None
+    return _NUMBERS.get(symbol.lower())
+
+
+def label_atomic_number(label: str) -> int | None:
+    """GJF・XYZ の原子ラベル（"C", "C1", "C-CA--0.1", "O(Fragment=1)", "H-Bq" など）を
+    原子番号に変換（ゴースト原子はそのコード）"""
+    base, _, rest = label.split("(", 1)[0].partition("-")
+    z = atomic_number(base if base.isdigit() else base.rstrip("0123456789"))
+    if z is None or z == 0 or z == GHOST_ATOM or rest.split("-", 1)[0].lower() != "bq":
+        return z
+    return GHOST_OFFSET + z
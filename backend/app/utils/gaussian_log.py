@@ -0,0 +1,517 @@
+import mmap
+import os
+import re
+import shutil
+import tempfile
+from array import array
+from dataclasses import dataclass, field
+
+import numpy as np
+
+try:
+    import zstandard
+except ImportError:  # .log.zst を読むときだけ必要
+    zstandard = None
+
+# 解析済みの範囲をこの間隔でページキャッシュの参照から外し、常駐メモリを抑える
+RELEASE_INTERVAL = 64 * 1024 * 1024
+ZSTD_READ_SIZE = 1024 * 1024
+
+# 1回の前方走査で拾う見出し → ハンドラ名。正規表現の選択（|）は 1 vCPU で数 MB/s と
+# 遅いため、ウィンドウごとに各見出しを bytes.find で探して位置順に処理する
+_MARKERS = (
+    (b"\n E= ", "cycle"),
+    (b"SCF Done:", "scf"),
+    (b"Input orientation:", "input_orientation"),
+    (b"Z-Matrix orientation:", "input_orientation"),
+    (b"Standard orientation:", "standard_orientation"),
+    (b"Forces (Hartrees/Bohr)", "forces"),
+    (b"Value     Threshold  Converged?", "convergence"),
+    (b"Stationary point found", "stationary"),
+    (b"Harmonic frequencies (cm**-1)", "harmonic"),
+    (b" Frequencies -- ", "frequencies"),  # freq=HPModes の "Frequencies ---" は除く
+    (b" IR Inten    -- ", "ir"),
+    (b"- Thermochemistry -", "thermo"),
+    (b"Zero-point correction=", "zpe"),
+    (b"Excited State ", "excited"),
+    (b"Mulliken charges:", "mulliken"),
+    (b"Mulliken atomic charges:", "mulliken"),
+    (b"Mulliken charges and spin densities:", "mulliken"),
+    (b"N A T U R A L   A T O M I C   O R B I T A L", "nbo_start"),
+    (b"spin orbitals", "nbo_spin"),
+    (b"Summary of Natural Population Analysis:", "npa"),
+    (b"Population analysis using the SCF", "orbitals"),
+    (b"Dipole moment (field-independent basis, Debye):", "dipole"),
+    (b"Entering Gaussian System", "entering"),
+    (b"Elapsed time:", "elapsed"),
+    (b"Normal termination", "termination"),
+    (b"Error termination", "termination"),
+)
+SCAN_WINDOW = 8 * 1024 * 1024
+# 軌道エネルギーの一覧（occ → virt）を探す範囲
+ORBITAL_SCAN_LIMIT = 16 * 1024 * 1024
+_DASHES = b"\n ----"
+_EXCITED_STATE = re.compile(
+    rb"Excited State +(\d+): +(\S+) +(-?[\d.]+) eV +(-?[\d.]+) nm +f=(-?[\d.]+)"
+)
+_TEMPERATURE = re.compile(rb"Temperature +([\d.]+) Kelvin\. +Pressure +([\d.]+) Atm\.")
+_ERROR_LINK = re.compile(rb"/(l\d+)\.exe|processed by link (\d+)")
+_THERMO_LABELS = (
+    (b"Zero-point correction=", "zpe"),
+    (b"Thermal correction to Energy=", "thermal_energy_correction"),
+    (b"Thermal correction to Enthalpy=", "enthalpy_correction"),
+    (b"Thermal correction to Gibbs Free Energy=", "gibbs_correction"),
+    (b"Sum of electronic and zero-point Energies=", "energy_zpe"),
+    (b"Sum of electronic and thermal Energies=", "energy_thermal"),
+    (b"Sum of electronic and thermal Enthalpies=", "enthalpy"),
+    (b"Sum of electronic and thermal Free Energies=", "gibbs_free_energy"),
+)
+CONVERGENCE_ITEMS = ("max_force", "rms_force", "max_displacement", "rms_displacement")
+
+
+class GaussianLogError(ValueError):
+    """ログとして読めないファイル"""
+
+
+def _float(token: bytes) -> float:
+    """Fortran の D 指数や桁あふれ（*****）も受け付ける"""
+    try:
+        return float(token.replace(b"D", b"E"))
+    except ValueError:
+        return float("nan")
+
+
+@dataclass
+class Thermochemistry:
+    temperature: float | None = None  # K
+    pressure: float | None = None  # atm
+    zpe: float | None = None  # 以下 Hartree/Particle
+    thermal_energy_correction: float | None = None
+    enthalpy_correction: float | None = None
+    gibbs_correction: float | None = None
+    energy_zpe: float | None = None
+    energy_thermal: float | None = None
+    enthalpy: float | None = None
+    gibbs_free_energy: float | None = None
+
+
+@dataclass
+class GaussianLog:
+    """Gaussian の出力（.log）から取り出した値。配列はすべて NumPy。
+
+    SCF・構造・力・収束判定はステップ順に全件、振動数・励起状態・電荷は最後の計算の分を持つ。
+    """
+
+    scf_energies: np.ndarray  # (S,) SCF Done ごとのエネルギー [Hartree]
+    scf_cycle_energies: np.ndarray  # (ΣC,) SCF の各サイクルのエネルギー（#P のときのみ出力される）
+    scf_cycle_offsets: np.ndarray  # (S+1,) SCF Done ごとのサイクルの区切り
+    numbers: np.ndarray  # (N,) 原子番号
+    geometries: np.ndarray  # (G,N,3) 各ステップの構造 [Å]（Input / Z-Matrix orientation 優先）
+    forces: np.ndarray  # (F,N,3) 各ステップの力 [Hartree/Bohr]
+    convergence: np.ndarray  # (K,4) 最適化ステップごとの Value（CONVERGENCE_ITEMS の順）
+    convergence_thresholds: np.ndarray  # (K,4)
+    convergence_flags: np.ndarray  # (K,4) bool
+    optimization_converged: bool
+    frequencies: np.ndarray  # (M,) [cm^-1]（虚振動は負）
+    ir_intensities: np.ndarray  # (M,) [km/mol]
+    thermochemistry: Thermochemistry
+    excitation_energies: np.ndarray  # (E,) [eV]
+    excitation_wavelengths: np.ndarray  # (E,) [nm]
+    oscillator_strengths: np.ndarray  # (E,)
+    excited_state_labels: list[str]  # "Singlet-A" など
+    mulliken_charges: np.ndarray  # (N,) 最後の Mulliken 電荷（無ければ空）
+    nbo_charges: np.ndarray  # (N,) 最後の NPA 電荷（無ければ空）
+    termination: str | None  # "normal" / "error" / None（実行中・途中で切れた）
+    error_link: str | None  # エラー終了した Link（"l9999" など）
+    normal_terminations: int = 0  # --Link1-- の各ステップの正常終了数
+    homo: float | None = None  # 最後の集団解析の α 軌道エネルギー [Hartree]
+    lumo: float | None = None
+    dipole: np.ndarray = field(default_factory=lambda: np.zeros(0))  # (3,) [Debye]
+    dipole_moment: float | None = None  # [Debye]
+    elapsed_seconds: float | None = None  # 各ステップの Elapsed time の合計
+
+    @property
+    def final_energy(self) -> float | None:
+        return float(self.scf_energies[-1]) if len(self.scf_energies) else None
+
+    @property
+    def final_geometry(self) -> np.ndarray | None:
+        return self.geometries[-1] if len(self.geometries) else None
+
+    @property
+    def imaginary_frequencies(self) -> int:
+        return int((self.frequencies < 0).sum())
+
+
+@dataclass
+class _State:
+    scf: array = field(default_factory=lambda: array("d"))
+    cycles: array = field(default_factory=lambda: array("d"))
+    cycle_offsets: array = field(default_factory=lambda: array("q", [0]))
+    input_geometries: list = field(default_factory=list)
+    standard_geometries: list = field(default_factory=list)
+    numbers: np.ndarray | None = None
+    forces: list = field(default_factory=list)
+    convergence: list = field(default_factory=list)
+    stationary: bool = False
+    frequencies: array = field(default_factory=lambda: array("d"))
+    ir: array = field(default_factory=lambda: array("d"))
+    thermo: Thermochemistry = field(default_factory=Thermochemistry)
+    excited: list = field(default_factory=list)
+    mulliken: np.ndarray | None = None
+    nbo: np.ndarray | None = None
+    nbo_spin: bool = False
+    homo: float | None = None
+    lumo: float | None = None
+    dipole: tuple | None = None
+    elapsed: float | None = None
+    steps: int = 0
+    terminations: list = field(default_factory=list)  # [(state, link)]
+
+
+class _LogScanner:
+    """mmap 上で見出しを順に探し、見つかった箇所だけ行を切り出して読む"""
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.state = _State()
+
+    def line_end(self, pos: int) -> int:
+        end = self.buffer.find(b"\n", pos)
+        return len(self.buffer) if end == -1 else end
+
+    def line(self, pos: int) -> tuple[bytes, int]:
+        """pos を含む行の pos 以降と、次の行の先頭位置"""
+        end = self.line_end(pos)
+        return self.buffer[pos:end], end + 1
+
+    def table(self, pos: int, dashes: int) -> tuple[bytes, int]:
+        """pos から dashes 本目の破線の次の行から、次の破線までの本文"""
+        for _ in range(dashes):
+            pos = self.buffer.find(_DASHES, pos)
+            if pos == -1:
+                return b"", len(self.buffer)
+            pos = self.line_end(pos + 1) + 1
+        end = self.buffer.find(_DASHES, pos - 1)
+        if end == -1:
+            return b"", len(self.buffer)
+        return self.buffer[pos:end], end + 1
+
+    def events(self, start: int, stop: int) -> list[tuple[int, int, str]]:
+        """[start, stop) で始まる見出しの (開始, 終了, ハンドラ名) を位置順に"""
+        find = self.buffer.find
+        found = []
+        for marker, name in _MARKERS:
+            limit = stop + len(marker) - 1
+            pos = find(marker, start, limit)
+            while pos != -1:
+                found.append((pos, pos + len(marker), name))
+                pos = find(marker, pos + 1, limit)
+        found.sort()
+        return found
+
+    def scan(self, release=None) -> _State:
+        handlers = {name: getattr(self, "on_" + name) for _, name in _MARKERS}
+        size = len(self.buffer)
+        pos = 0  # 処理済みの位置（表の途中に出てくる見出しは飛ばす）
+        released = 0
+        for window in range(0, size, SCAN_WINDOW):
+            for start, end, name in self.events(window, min(window + SCAN_WINDOW, size)):
+                if start >= pos:
+                    pos = handlers[name](start, end)
+            if release is not None and pos - released >= RELEASE_INTERVAL:
+                released = release(released, min(pos, window))
+        return self.state
+
+    # --- ハンドラ（(見出しの開始, 終了) を受け取り、処理し終えた位置を返す） ---
+
+    def on_cycle(self, start: int, end: int) -> int:
+        text, pos = self.line(end)
+        self.state.cycles.append(_float(text.split(None, 1)[0]))
+        return pos
+
+    def on_scf(self, start: int, end: int) -> int:
+        text, pos = self.line(end)
+        self.state.scf.append(_float(text.split(b"=", 1)[1].split()[0]))
+        self.state.cycle_offsets.append(len(self.state.cycles))
+        return pos
+
+    def _geometry(self, end: int, target: list) -> int:
+        body, pos = self.table(end, 2)
+        rows = body.split(b"\n")
+        if not rows or not rows[0].strip():
+            return pos
+        columns = len(rows[0].split())  # 古い版は Atomic Type 列が無い
+        values = np.array(body.split(), dtype=np.float64).reshape(-1, columns)
+        numbers = values[:, 1].astype(np.uint8)
+        if self.state.numbers is not None and len(numbers) != len(self.state.numbers):
+            # --Link1-- で別の分子になったら以降の分子の値だけを残す
+            self.state.input_geometries.clear()
+            self.state.standard_geometries.clear()
+            self.state.forces.clear()
+        self.state.numbers = numbers
+        target.append(values[:, -3:])
+        return pos
+
+    def on_input_orientation(self, start: int, end: int) -> int:
+        return self._geometry(end, self.state.input_geometries)
+
+    def on_standard_orientation(self, start: int, end: int) -> int:
+        if self.state.input_geometries:  # Input orientation があればそちらだけを使う
+            return end
+        return self._geometry(end, self.state.standard_geometries)
+
+    def on_forces(self, start: int, end: int) -> int:
+        body, pos = self.table(end, 1)
+        if body.strip():
+            values = np.array(body.split(), dtype=np.float64).reshape(-1, 5)
+            self.state.forces.append(values[:, 2:])
+        return pos
+
+    def on_convergence(self, start: int, end: int) -> int:
+        pos = self.line_end(end) + 1
+        rows = []
+        for _ in CONVERGENCE_ITEMS:
+            text, pos = self.line(pos)
+            tokens = text.split()
+            if len(tokens) < 3:
+                return pos
+            rows.append((_float(tokens[-3]), _float(tokens[-2]), tokens[-1] == b"YES"))
+        self.state.convergence.append(rows)
+        return pos
+
+    def on_stationary(self, start: int, end: int) -> int:
+        self.state.stationary = True
+        return end
+
+    def on_harmonic(self, start: int, end: int) -> int:
+        # 振動解析が複数回あるときは最後のものを残す
+        del self.state.frequencies[:]
+        del self.state.ir[:]
+        return end
+
+    def on_frequencies(self, start: int, end: int) -> int:
+        text, pos = self.line(end)
+        self.state.frequencies.extend(_float(t) for t in text.split())
+        return pos
+
+    def on_ir(self, start: int, end: int) -> int:
+        text, pos = self.line(end)
+        self.state.ir.extend(_float(t) for t in text.split())
+        return pos
+
+    def on_thermo(self, start: int, end: int) -> int:
+        text, pos = self.line(end)
+        found = _TEMPERATURE.search(self.buffer, pos, self.line_end(self.line_end(pos) + 1))
+        if found:
+            self.state.thermo.temperature = float(found.group(1))
+            self.state.thermo.pressure = float(found.group(2))
+            pos = found.end()
+        return pos
+
+    def on_zpe(self, start: int, end: int) -> int:
+        pos = start
+        for label, name in _THERMO_LABELS:
+            text, next_pos = self.line(pos)
+            text = text.strip()
+            if not text.startswith(label):
+                break
+            setattr(self.state.thermo, name, _float(text[len(label):].split()[0]))
+            pos = next_pos
+        return pos
+
+    def on_excited(self, start: int, end: int) -> int:
+        text, pos = self.line(start)
+        found = _EXCITED_STATE.match(text)
+        if found:
+            if found.group(1) == b"1":
+                self.state.excited.clear()  # TD の最適化などで繰り返し出る
+            self.state.excited.append(found.groups()[1:])
+        return pos
+
+    def on_mulliken(self, start: int, end: int) -> int:
+        pos = self.line_end(end) + 1
+        pos = self.line_end(pos) + 1  # 列番号の行
+        body_end = self.buffer.find(b"\n Sum of Mulliken", pos - 1)
+        if body_end == -1:
+            return pos
+        self.state.mulliken = self._charges(self.buffer[pos:body_end])
+        return body_end + 1
+
+    def on_nbo_start(self, start: int, end: int) -> int:
+        self.state.nbo_spin = False
+        return end
+
+    def on_nbo_spin(self, start: int, end: int) -> int:
+        text, pos = self.line(self.buffer.rfind(b"\n", 0, start) + 1)
+        if b"Alpha" in text or b"Beta" in text:
+            self.state.nbo_spin = True
+        return pos
+
+    def on_npa(self, start: int, end: int) -> int:
+        if self.state.nbo_spin:  # 開殻系の α・β スピンごとの表は使わない
+            return end
+        # 本文は破線の次の行から "=====" の行まで
+        body_start = self.buffer.find(_DASHES, end)
+        if body_start == -1:
+            return end
+        body_start = self.line_end(body_start + 1) + 1
+        body_end = self.buffer.find(b"\n =====", body_start - 1)
+        if body_end == -1:
+            return body_start
+        charges = self._charges(self.buffer[body_start:body_end])
+        if len(charges):
+            self.state.nbo = charges
+        return body_end + 1
+
+    @staticmethod
+    def _charges(body: bytes) -> np.ndarray:
+        """"番号 元素 電荷 ..." / "元素 番号 電荷 ..." の行から3列目を取り出す"""
+        return np.array(
+            [_float(row.split()[2]) for row in body.split(b"\n") if row.strip()],
+            dtype=np.float64,
+        )
+
+    def on_orbitals(self, start: int, end: int) -> int:
+        virt = self.buffer.find(b" Alpha virt. eigenvalues --", end, end + ORBITAL_SCAN_LIMIT)
+        if virt == -1:
+            return end
+        occ = self.buffer.rfind(b"\n", end, virt - 1) + 1
+        occ_text, _ = self.line(occ)
+        virt_text, pos = self.line(virt)
+        if b"occ. eigenvalues --" not in occ_text:
+            return pos
+        self.state.homo = _float(occ_text.split(b"--", 1)[1].split()[-1])
+        self.state.lumo = _float(virt_text.split(b"--", 1)[1].split()[0])
+        return pos
+
+    def on_dipole(self, start: int, end: int) -> int:
+        text, pos = self.line(self.line_end(end) + 1)
+        tokens = text.split()  # X= x Y= y Z= z Tot= t
+        if len(tokens) >= 8:
+            self.state.dipole = tuple(_float(t) for t in tokens[1:8:2])
+        return pos
+
+    def on_elapsed(self, start: int, end: int) -> int:
+        text, pos = self.line(end)
+        tokens = text.split()  # d days h hours m minutes s seconds.
+        if len(tokens) >= 7:
+            seconds = (
+                _float(tokens[0]) * 86400
+                + _float(tokens[2]) * 3600
+                + _float(tokens[4]) * 60
+                + _float(tokens[6])
+            )
+            self.state.elapsed = (self.state.elapsed or 0.0) + seconds
+        return pos
+
+    def on_entering(self, start: int, end: int) -> int:
+        self.state.steps += 1
+        return end
+
+    def on_termination(self, start: int, end: int) -> int:
+        text, pos = self.line(start)
+        if text.startswith(b"Normal"):
+            self.state.terminations.append(("normal", None))
+            return pos
+        found = _ERROR_LINK.search(text)
+        link = None
+        if found:
+            link = (found.group(1) or b"l" + found.group(2)).decode()
+        if self.state.terminations and self.state.terminations[-1][0] == "error":
+            # "request processed by link" と "via Lnk1e" の2行で1回のエラー終了
+            link = self.state.terminations[-1][1] or link
+            self.state.terminations[-1] = ("error", link)
+        else:
+            self.state.terminations.append(("error", link))
+        return pos
+
+
+def _to_result(state: _State) -> GaussianLog:
+    numbers = state.numbers if state.numbers is not None else np.zeros(0, dtype=np.uint8)
+    atoms = len(numbers)
+
+    def stack(blocks: list) -> np.ndarray:
+        blocks = [b for b in blocks if len(b) == atoms]
+        return np.stack(blocks) if blocks else np.zeros((0, atoms, 3))
+
+    geometries = stack(state.input_geometries or state.standard_geometries)
+    convergence = np.array(
+        state.convergence, dtype=[("value", "f8"), ("threshold", "f8"), ("converged", "?")]
+    ).reshape(-1, len(CONVERGENCE_ITEMS))
+    excited = state.excited
+    normal = sum(1 for kind, _ in state.terminations if kind == "normal")
+    termination = error_link = None
+    if state.terminations:
+        termination, error_link = state.terminations[-1]
+        if termination == "normal" and len(state.terminations) < state.steps:
+            termination = None  # 次の --Link1-- ステップが実行中
+    return GaussianLog(
+        scf_energies=np.frombuffer(state.scf, dtype=np.float64).copy(),
+        scf_cycle_energies=np.frombuffer(state.cycles, dtype=np.float64).copy(),
+        scf_cycle_offsets=np.frombuffer(state.cycle_offsets, dtype=np.int64).copy(),
+        numbers=numbers,
+        geometries=geometries,
+        forces=stack(state.forces),
+        convergence=convergence["value"],
+        convergence_thresholds=convergence["threshold"],
+        convergence_flags=convergence["converged"],
+        optimization_converged=state.stationary,
+        frequencies=np.frombuffer(state.frequencies, dtype=np.float64).copy(),
+        ir_intensities=np.frombuffer(state.ir, dtype=np.float64).copy(),
+        thermochemistry=state.thermo,
+        excitation_energies=np.array([_float(e[1]) for e in excited], dtype=np.float64),
+        excitation_wavelengths=np.array([_float(e[2]) for e in excited], dtype=np.float64),
+        oscillator_strengths=np.array([_float(e[3]) for e in excited], dtype=np.float64),
+        excited_state_labels=[e[0].decode() for e in excited],
+        mulliken_charges=state.mulliken if state.mulliken is not None else np.zeros(0),
+        nbo_charges=state.nbo if state.nbo is not None else np.zeros(0),
+        termination=termination,
+        error_link=error_link,
+        normal_terminations=normal,
+        homo=state.homo,
+        lumo=state.lumo,
+        dipole=np.array(state.dipole[:3]) if state.dipole else np.zeros(0),
+        dipole_moment=state.dipole[3] if state.dipole else None,
+        elapsed_seconds=state.elapsed,
+    )
+
+
+def parse_gaussian_log_bytes(data: bytes) -> GaussianLog:
+    """メモリ上のログ（ミラーの一部など）を解析"""
+    return _to_result(_LogScanner(data).scan())
+
+
+def _scan_mapped(f) -> GaussianLog:
+    if os.fstat(f.fileno()).st_size == 0:
+        return parse_gaussian_log_bytes(b"")
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if hasattr(mmap, "MADV_SEQUENTIAL"):
+            mm.madvise(mmap.MADV_SEQUENTIAL)
+
+        def release(start: int, end: int) -> int:
+            # 読み終えたページを手放す（開始位置はページ境界に揃える）
+            end -= end % mmap.PAGESIZE
+            if hasattr(mmap, "MADV_DONTNEED") and end > start:
+                mm.madvise(mmap.MADV_DONTNEED, start, end - start)
+            return end
+
+        return _to_result(_LogScanner(mm).scan(release))
+
+
+def parse_gaussian_log(path: str) -> GaussianLog:
+    """Gaussian のログをメモリマップして1回の前方走査で解析する。
+
+    数 GB のログでもファイル全体を読み込まず、解析済みの範囲は順次ページキャッシュの
+    参照から外す。.log.zst は一時ファイルへ展開してから同じように読む。
+    """
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise GaussianLogError("zstandard が未インストールのため .zst のログを読めません")
+        with open(path, "rb") as src, tempfile.TemporaryFile() as tmp:
+            with zstandard.ZstdDecompressor().stream_reader(src) as reader:
+                shutil.copyfileobj(reader, tmp, ZSTD_READ_SIZE)
+            tmp.flush()
+            return _scan_mapped(tmp)
+    with open(path, "rb") as f:
+        return _scan_mapped(f)
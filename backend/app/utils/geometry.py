@@ -0,0 +1,111 @@
+import struct
+from functools import lru_cache
+
+import numpy as np
+
+from app.utils.elements import SYMBOLS, element_symbol, label_atomic_number
+
+# バイナリ形式: マジック(4) + 原子数 uint32(4) + 座標 float64 (N,3) + 原子番号 uint8 (N)
+# 原子番号はダミー原子 X が 0、ゴースト原子が GHOST_ATOM・GHOST_OFFSET + 原子番号（elements）
+# 座標を先に置き、ヘッダを 8 バイトにして float64 の境界に揃える（ゼロコピーで読めるように）
+GEOMETRY_MAGIC = b"QCG1"
+_HEADER = struct.Struct("<4sI")
+_COORD_DTYPE = np.dtype("<f8")
+_NUMBER_DTYPE = np.dtype("u1")
+
+
+def encode_geometry(numbers, coordinates) -> bytes:
+    """原子番号 (N,) と座標 (N,3) [Å] をバイナリに変換"""
+    numbers = np.asarray(numbers, dtype=_NUMBER_DTYPE)
+    coordinates = np.ascontiguousarray(coordinates, dtype=_COORD_DTYPE)
+    if coordinates.shape != (len(numbers), 3):
+        raise ValueError(f"座標の形が不正です: {coordinates.shape}")
+    return b"".join(
+        (_HEADER.pack(GEOMETRY_MAGIC, len(numbers)), coordinates.tobytes(), numbers.tobytes())
+    )
+
+
+def decode_geometry(blob: bytes) -> tuple[np.ndarray, np.ndarray]:
+    """バイナリから (原子番号 (N,), 座標 (N,3)) を返す（コピーせず読み取り専用のビュー）"""
+    if len(blob) < _HEADER.size:
+        raise ValueError("構造データが短すぎます")
+    magic, count = _HEADER.unpack_from(blob)
+    if magic != GEOMETRY_MAGIC or len(blob) != _HEADER.size + count * 25:
+        raise ValueError("構造データの形式が不正です")
+    coordinates = np.frombuffer(
+        blob, dtype=_COORD_DTYPE, count=count * 3, offset=_HEADER.size
+    ).reshape(count, 3)
+    numbers = np.frombuffer(
+        blob, dtype=_NUMBER_DTYPE, count=count, offset=_HEADER.size + count * 24
+    )
+    return numbers, coordinates
+
+
+def real_atom_mask(numbers) -> np.ndarray:
+    """ダミー原子・ゴースト原子を除いた実在の原子なら True"""
+    numbers = np.asarray(numbers)
+    return (numbers > 0) & (numbers < len(SYMBOLS))
+
+
+def parse_xyz_text(text: str) -> tuple[np.ndarray, np.ndarray] | None:
+    """XYZ 形式または GJF の Cartesian 原子行を配列に変換する。
+    Z-matrix など Cartesian として読めない行があれば None"""
+    lines = [line.strip() for line in text.strip().splitlines()]
+    # XYZ ファイルの先頭2行（原子数・コメント）
+    if len(lines) >= 2 and lines[0].isdigit():
+        lines = lines[2:]
+    numbers: list[int] = []
+    coordinates: list[tuple[float, float, float]] = []
+    for line in lines:
+        if not line:
+            continue
+        tokens = line.replace(",", " ").split()
+        if len(tokens) == 4:
+            values = tokens[1:4]
+        elif len(tokens) >= 5 and tokens[1] in ("0", "-1"):
+            values = tokens[2:5]  # GJF の凍結フラグ付き
+        else:
+            return None
+        z = label_atomic_number(tokens[0])
+        if z is None:
+            return None
+        try:
+            coordinates.append((float(values[0]), float(values[1]), float(values[2])))
+        except ValueError:
+            return None
+        numbers.append(z)
+    if not numbers:
+        return None
+    return np.array(numbers, dtype=_NUMBER_DTYPE), np.array(coordinates, dtype=_COORD_DTYPE)
+
+
+_ATOM_LINE = "%-2s %14.8f %14.8f %14.8f"
+
+
+@lru_cache(maxsize=256)
+def _atom_block_format(count: int) -> str:
+    return "\n".join([_ATOM_LINE] * count)
+
+
+def format_xyz(numbers, coordinates) -> str:
+    """原子行（"C  x  y  z"）のテキストに変換（原子数ごとの書式で1回の % にまとめる）"""
+    numbers = np.asarray(numbers).tolist()
+    fmt = _atom_block_format(len(numbers))
+    values = []
+    for z, xyz in zip(numbers, np.asarray(coordinates).tolist()):
+        values.append(element_symbol(z))
+        values.extend(xyz)
+    return fmt % tuple(values)
+
+
+def stack_geometries(blobs: list[bytes]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """複数分子の構造を1つの配列にまとめる。
+    戻り値は (原子番号 (ΣN,), 座標 (ΣN,3), 各分子の先頭位置 (M+1,))"""
+    decoded = [decode_geometry(blob) for blob in blobs]
+    offsets = np.zeros(len(decoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(numbers) for numbers, _ in decoded])
+    if not decoded:
+        return np.empty(0, _NUMBER_DTYPE), np.empty((0, 3), _COORD_DTYPE), offsets
+    numbers = np.concatenate([n for n, _ in decoded])
+    coordinates = np.concatenate([c for _, c in decoded])
+    return numbers, coordinates, offsets
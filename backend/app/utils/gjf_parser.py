@@ -1,33 +1,659 @@
-def parse_gjf(content: str):
-    lines = content.strip().splitlines()
+import functools
+import re
+from dataclasses import dataclass, field
+from typing import Iterable
+
+from app.utils.elements import element_symbol, label_atomic_number
+
+# Gaussian のジョブタイプ（ルートに無ければ SP）
+JOB_TYPES = frozenset(
+    {
+        "sp", "opt", "freq", "irc", "ircmax", "scan", "polar", "admp",
+        "bomd", "force", "stable", "volume", "td",
+    }
+)
+# メソッド・基底関数ではないことが分かっているルートキーワード
+_NON_METHOD_KEYWORDS = frozenset(
+    {
+        "scf", "geom", "guess", "pop", "population", "scrf", "int", "integral",
+        "iop", "nosymm", "symmetry", "empiricaldispersion", "density", "output",
+        "test", "units", "gfinput", "gfprint", "temperature", "pressure",
+        "counterpoise", "nmr", "punch", "maxdisk", "formcheck", "fchk", "charge",
+        "freq", "opt", "sp", "td", "field", "sparse", "window", "transformation",
+        "cphf", "prop", "volume", "nosymmetry", "extrabasis", "gen", "genecp",
+    }
+)
+_BASIS_PREFIXES = (
+    "sto-", "3-", "4-", "6-", "cc-", "aug-", "def2", "lanl", "sdd", "gen",
+    "dgdzvp", "dgtzvp", "ugbs", "mini", "midix", "shc", "cep-", "d95", "tzvp",
+)
+_ROUTE_TOKEN = re.compile(r"(?:[^\s(]+|\([^)]*\))+")
+_NESTED_PAREN = re.compile(r"\([^)]*\(")
+_OPTION_SEPARATOR = re.compile(r"[,\s]+")
+_LINK1 = "--link1--"
+_VARIABLE_LINE = re.compile(r"^(\S+)[ \t]+(\S+)$", re.MULTILINE)
+_FREEZE_FLAGS = ("0", "-1")
+
+
+class GJFParseError(ValueError):
+    """行番号付きの GJF 解析エラー"""
+
+    def __init__(self, message: str, line_no: int | None = None):
+        self.line_no = line_no
+        self.message = message
+        super().__init__(f"{line_no} 行目: {message}" if line_no else message)
+
+
+@dataclass
+class Route:
+    raw: str
+    print_level: str = ""  # "p" / "n" / "t"（"#" のみなら空）
+    method: str | None = None
+    basis: str | None = None
+    job_types: list[str] = field(default_factory=list)
+    options: dict[str, list[str]] = field(default_factory=dict)  # キーワード（小文字） → オプション
+
+    def has(self, keyword: str) -> bool:
+        return keyword.lower() in self.options
+
+    def option_values(self, keyword: str) -> list[str]:
+        return self.options.get(keyword.lower(), [])
+
+
+@dataclass(slots=True)
+class Atom:
+    label: str  # ファイル中の表記（"C1" や "C(Fragment=1)" など）
+    symbol: str
+    atomic_number: int
+    xyz: tuple[float, float, float] | None = None
+    # Z-matrix: (参照原子のインデックス（0 始まり）, 値または変数名)
+    bond: tuple[int, float | str] | None = None
+    angle: tuple[int, float | str] | None = None
+    dihedral: tuple[int, float | str] | None = None
+    frozen: bool = False
+
+
+@dataclass
+class MoleculeSpec:
+    charge: int
+    multiplicity: int
+    fragments: list[tuple[int, int]] = field(default_factory=list)  # Counterpoise 等のフラグメント指定
+    atoms: list[Atom] = field(default_factory=list)
+    variables: dict[str, float] = field(default_factory=dict)
+    constants: dict[str, float] = field(default_factory=dict)
+    lines: list[str] = field(default_factory=list)  # 分子指定部分の元の行（電荷行を除く）
+
+    @property
+    def coordinate_type(self) -> str:
+        if not self.atoms:
+            return "none"
+        return "cartesian" if all(a.xyz is not None for a in self.atoms) else "zmatrix"
+
+    def value(self, ref: float | str) -> float:
+        """Z-matrix の値（数値または符号付き変数名）を数値に解決"""
+        if not isinstance(ref, str):
+            return ref
+        sign = -1.0 if ref.startswith("-") else 1.0
+        name = ref.lstrip("+-")
+        if name in self.variables:
+            return sign * self.variables[name]
+        return sign * self.constants[name]
+
+
+@dataclass
+class GJFStep:
+    link0: dict[str, str | None]
+    route: Route
+    title: str
+    molecule: MoleculeSpec | None
+    additional_input: list[str] = field(default_factory=list)  # 空行区切りのセクション
+
+
+@dataclass
+class GJFFile:
+    steps: list[GJFStep]
 
-    # Gaussianキーワードやタイトル行をスキップし、空行2つの後に現れる
-    sections = []
+    @property
+    def first(self) -> GJFStep:
+        return self.steps[0]
+
+
+def _to_float(token: str) -> float | None:
+    try:
+        return float(token)
+    except ValueError:
+        pass
+    try:
+        return float(token.replace("D", "E").replace("d", "e"))  # Fortran 形式
+    except ValueError:
+        return None
+
+
+def _split_route_tokens(text: str) -> list[str]:
+    """空白区切りでルートを分割（括弧内の空白・カンマでは分割しない）"""
+    if not _NESTED_PAREN.search(text):
+        return _ROUTE_TOKEN.findall(text)  # 括弧の入れ子が無ければ正規表現で済む
+    tokens: list[str] = []
+    depth = 0
+    start = None
+    for i, ch in enumerate(text):
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth = max(0, depth - 1)
+        if ch.isspace() and depth == 0:
+            if start is not None:
+                tokens.append(text[start:i])
+                start = None
+        elif start is None:
+            start = i
+    if start is not None:
+        tokens.append(text[start:])
+    return tokens
+
+
+def _split_options(text: str) -> list[str]:
+    """"(calcfc, ts)" や "tight" をオプションのリストに分割"""
+    text = text.strip()
+    if text.startswith("(") and text.endswith(")"):
+        text = text[1:-1]
+    if "(" not in text:
+        return [o for o in _OPTION_SEPARATOR.split(text) if o]
+    options = []
+    depth = 0
     current = []
-    for line in lines:
-        if not line.strip():
+    for ch in text:
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        if ch in ", " and depth == 0:
             if current:
-                sections.append(current)
+                options.append("".join(current))
                 current = []
-        else:
-            current.append(line)
+            continue
+        current.append(ch)
     if current:
-        sections.append(current)
+        options.append("".join(current))
+    return options
+
+
+def _find_top_level(token: str, char: str) -> int:
+    """括弧の外にある最初の char の位置（無ければ -1）"""
+    depth = 0
+    for i, ch in enumerate(token):
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth = max(0, depth - 1)
+        elif ch == char and depth == 0:
+            return i
+    return -1
+
+
+def _looks_like_basis(token: str) -> bool:
+    return token.lower().startswith(_BASIS_PREFIXES)
+
+
+def parse_route(text: str, line_no: int | None = None) -> Route:
+    """"#p B3LYP/6-31G(d) opt=(calcfc,ts) freq" のようなルートを分解"""
+    try:
+        route = _parse_route(" ".join(text.split()))
+    except GJFParseError as e:
+        raise GJFParseError(e.message, line_no) from None
+    # 解析結果は同じルートの入力どうしで共有するので、呼び出し側には複製を返す
+    return Route(
+        raw=route.raw,
+        print_level=route.print_level,
+        method=route.method,
+        basis=route.basis,
+        job_types=list(route.job_types),
+        options={key: list(values) for key, values in route.options.items()},
+    )
+
+
+@functools.lru_cache(maxsize=256)
+def _parse_route(text: str) -> Route:
+    # 一括アップロードでは同じルートの入力が続くので、空白を正規化したルートごとに覚えておく
+    if not text.startswith("#"):
+        raise GJFParseError("ルート行は # で始まる必要があります")
+    route = Route(raw=text)
+    body = text[1:]
+    if body[:1].lower() in ("p", "n", "t") and (len(body) == 1 or body[1] == " "):
+        route.print_level = body[0].lower()
+        body = body[1:]
+
+    plain: list[str] = []
+    for token in _split_route_tokens(body):
+        if route.method is None and token.lower().startswith("oniom("):
+            # ONIOM(B3LYP/6-31G(d):UFF) は層ごとの method/basis を含めて method とする
+            eq = _find_top_level(token, "=")
+            route.method = token if eq < 0 else token[:eq]
+            route.options["oniom"] = _split_options(token[eq + 1:]) if eq >= 0 else []
+            continue
+        slash = _find_top_level(token, "/")
+        if slash > 0 and "=" not in token[:slash] and route.method is None:
+            route.method, route.basis = token[:slash], token[slash + 1:]
+            continue
+        keyword, sep, rest = token.partition("=")
+        if not sep and _looks_like_basis(token):
+            plain.append(token)  # "6-31G(d)" を括弧付きオプションと誤認しない
+            continue
+        if not sep and "(" in keyword and keyword.endswith(")"):
+            keyword, _, rest = keyword.partition("(")
+            rest = "(" + rest
+        key = keyword.lower()
+        route.options[key] = _split_options(rest) if rest else []
+        if key in JOB_TYPES:
+            route.job_types.append(key)
+        elif not rest and key not in _NON_METHOD_KEYWORDS:
+            plain.append(keyword)
+
+    # "B3LYP 6-31G(d)" のようにスラッシュ無しで書かれた場合
+    if route.method is None and plain:
+        route.method = plain.pop(0)
+    if route.basis is None and plain and _looks_like_basis(plain[0]):
+        route.basis = plain[0]
+    for keyword in (route.method, route.basis):
+        if keyword is not None:
+            route.options.pop(keyword.lower(), None)
+    if not route.job_types:
+        route.job_types.append("sp")
+    return route
+
+
+_ELEMENT_CACHE: dict[str, tuple[str, int]] = {}
+
+
+def _element(label: str, line_no: int) -> tuple[str, int]:
+    cached = _ELEMENT_CACHE.get(label)
+    if cached is not None:
+        return cached
+    z = label_atomic_number(label)
+    if z is None:
+        raise GJFParseError(f"不明な元素です: {label}", line_no)
+    if len(_ELEMENT_CACHE) < 4096:
+        _ELEMENT_CACHE[label] = (element_symbol(z), z)
+    return element_symbol(z), z
+
+
+def _geometry_from_checkpoint(route: Route) -> str | None:
+    geom = {o.lower() for o in route.option_values("geom")}
+    if geom & {"allcheck", "allcheckpoint"}:
+        return "all"  # タイトル・電荷・構造をすべてチェックポイントから読む
+    if geom & {"check", "checkpoint"}:
+        return "geometry"  # 構造のみチェックポイントから読む
+    return None
 
-    if len(sections) < 3:
-        raise ValueError("GJFファイル形式が不正です（セクション数不足）")
 
-    # 電荷・多重度
-    charge_line = sections[2][0].split()
-    if len(charge_line) != 2:
-        raise ValueError("電荷・スピン多重度の行が不正です")
-    charge, multiplicity = map(int, charge_line)
+def _is_link1(line: str) -> bool:
+    return line[:2] == "--" and line.lower() == _LINK1
 
-    # 構造（XYZ）行
-    structure_xyz = "\n".join(sections[2][1:])
+
+def _section_header(line: str) -> str | None:
+    if line[0] in "VvCc" and line[1:2] in "aAoO":
+        lowered = line.lower()
+        if lowered.startswith("variables"):
+            return "variables"
+        if lowered.startswith("constants"):
+            return "constants"
+    return None
+
+
+class _LineReader:
+    """行番号を数えながら前後の空白を除いた行を返す（コメント行は読み飛ばし、1行だけ読み戻し可能）"""
+
+    def __init__(self, lines: Iterable[str]):
+        self._lines = iter(lines)
+        self._pushed: str | None = None
+        self.line_no = 0
+        self.eof = False
+        self.ended_at_blank = False  # 直前の block() が空行で終わったか
+
+    def next(self) -> str | None:
+        if self._pushed is not None:
+            line, self._pushed = self._pushed, None
+            return line
+        for raw in self._lines:
+            self.line_no += 1
+            line = raw.strip()
+            if line[:1] != "!":
+                return line
+        self.eof = True
+        return None
+
+    def block(self) -> tuple[list[str], list[int]]:
+        """空行・--Link1--・入力の終わりまでの行とその行番号をまとめて読む。
+
+        分子指定のように行数の多いセクションを1行ずつ next() で読むより速い。
+        終わりの空行は読み捨て、--Link1-- は読み戻す。
+        """
+        lines: list[str] = []
+        numbers: list[int] = []
+        self.ended_at_blank = False
+        if self._pushed is not None:
+            line, self._pushed = self._pushed, None
+            if not line:
+                self.ended_at_blank = True
+                return lines, numbers
+            if line[0] == "-" and _is_link1(line):
+                self._pushed = line
+                return lines, numbers
+            lines.append(line)
+            numbers.append(self.line_no)
+        line_no = self.line_no
+        try:
+            for raw in self._lines:
+                line_no += 1
+                line = raw.strip()
+                if not line:
+                    self.ended_at_blank = True
+                    return lines, numbers
+                if line[0] == "!":
+                    continue
+                if line[0] == "-" and _is_link1(line):
+                    self._pushed = line
+                    return lines, numbers
+                lines.append(line)
+                numbers.append(line_no)
+            self.eof = True
+            return lines, numbers
+        finally:
+            self.line_no = line_no
+
+    def push(self, line: str):
+        self._pushed = line
+
+    def error(self, message: str) -> GJFParseError:
+        return GJFParseError(message, self.line_no)
+
+
+def _parse_charge_line(reader: _LineReader, line: str) -> MoleculeSpec:
+    try:
+        numbers = [int(v) for v in line.replace(",", " ").split()]
+    except ValueError:
+        numbers = []
+    if len(numbers) < 2 or len(numbers) % 2:
+        raise reader.error(f"電荷・スピン多重度の行が不正です: {line}")
+    pairs = [(numbers[i], numbers[i + 1]) for i in range(0, len(numbers), 2)]
+    return MoleculeSpec(charge=pairs[0][0], multiplicity=pairs[0][1], fragments=pairs[1:])
+
+
+def _parse_variable(line: str, line_no: int) -> tuple[str, float]:
+    tokens = (line.replace("=", " ") if "=" in line else line).split()
+    value = _to_float(tokens[1]) if len(tokens) >= 2 else None
+    if value is None:
+        raise GJFParseError(f"変数定義が不正です: {line}", line_no)
+    return tokens[0], value
+
+
+def _read_variable_block(lines: list[str], target: dict[str, float]) -> bool:
+    """"名前 値" だけが並ぶブロックを正規表現と float でまとめて読む。
+
+    見出し・"=" 区切り・Fortran 形式の数値などを含むときは何もせず False を返す
+    （呼び出し側が1行ずつ読む）。
+    """
+    pairs = _VARIABLE_LINE.findall("\n".join(lines))
+    if len(pairs) != len(lines):
+        return False
+    try:
+        values = [float(value) for _, value in pairs]
+    except ValueError:
+        return False
+    names = [name for name, _ in pairs]
+    if any(name[0] in "VvCc" and _section_header(name) is not None for name in names):
+        return False
+    target.update(zip(names, values))
+    return True
+
+
+class _MoleculeReader:
+    """電荷行に続く原子・変数・定数のセクションを読む"""
+
+    def __init__(self, reader: _LineReader, molecule: MoleculeSpec):
+        self.reader = reader
+        self.molecule = molecule
+        self.labels: dict[str, int] = {}
+        self.references: list[tuple[int, str]] = []  # (行番号, 変数名)
+
+    def read(self):
+        header, lines, numbers = self._read_atoms()
+        if header is None and self.references:
+            self.molecule.lines.append("")
+            header = "variables"
+        if header is not None:
+            self._read_variables(header, lines, numbers)
+        for line_no, name in self.references:
+            if name not in self.molecule.variables and name not in self.molecule.constants:
+                raise GJFParseError(f"未定義の変数です: {name}", line_no)
+
+    def _unresolved(self) -> bool:
+        molecule = self.molecule
+        return any(
+            name not in molecule.variables and name not in molecule.constants
+            for _, name in self.references
+        )
+
+    def _read_atoms(self) -> tuple[str | None, list[str], list[int]]:
+        """原子の行をまとめて読み、続くセクションの見出し（"variables" / "constants"）と、
+        見出しに続けて同じブロックにある行（とその行番号）を返す"""
+        reader = self.reader
+        atoms = self.molecule.atoms
+        text = self.molecule.lines
+        parse_atom = self._parse_atom
+        lines, numbers = reader.block()
+        for i, line in enumerate(lines):
+            text.append(line)
+            if line[0] in "VvCc" and line[1:2] in "aAoO":
+                header = _section_header(line)
+                if header is not None:
+                    if not atoms:
+                        raise GJFParseError("原子が指定されていません", numbers[i])
+                    return header, lines[i + 1:], numbers[i + 1:]
+            atoms.append(parse_atom(line, numbers[i]))
+        if not atoms:
+            raise reader.error("原子が指定されていません")
+        return None, [], []
+
+    def _read_variables(self, header: str, lines: list[str], numbers: list[int]):
+        """変数・定数のセクションを読む（lines は見出しと同じブロックに残っていた行）"""
+        reader = self.reader
+        molecule = self.molecule
+        text = molecule.lines
+        target = molecule.variables if header == "variables" else molecule.constants
+        while True:
+            if lines and _read_variable_block(lines, target):
+                text.extend(lines)
+                lines = numbers = []  # type: ignore
+            for line, line_no in zip(lines, numbers):
+                text.append(line)
+                if line[0] in "VvCc" and line[1:2] in "aAoO":
+                    header = _section_header(line)  # type: ignore
+                    if header is not None:
+                        target = molecule.variables if header == "variables" else molecule.constants
+                        continue
+                tokens = (line.replace("=", " ") if "=" in line else line).split()
+                try:
+                    target[tokens[0]] = float(tokens[1])
+                except (ValueError, IndexError):
+                    name, value = _parse_variable(line, line_no)
+                    target[name] = value
+            if not reader.ended_at_blank:
+                return  # 入力の終わりか --Link1--
+            if not (molecule.variables or molecule.constants):
+                lines, numbers = reader.block()
+                continue
+            # 空行の後は、見出しがあるか未定義の変数が残っていれば定数セクション
+            following = reader.next()
+            if following is None:
+                return
+            header = _section_header(following) if following else None  # type: ignore
+            if header is None and not (following and self._unresolved()):
+                reader.push(following)
+                return
+            text.append("")
+            target = molecule.constants
+            reader.push(following)
+            lines, numbers = reader.block()
+
+    def _parse_atom(self, line: str, line_no: int) -> Atom:
+        tokens = (line.replace(",", " ") if "," in line else line).split()
+        label = tokens[0]
+        symbol, z = _element(label, line_no)
+        index = len(self.molecule.atoms)
+        if label not in self.labels:
+            self.labels[label] = index
+        n = len(tokens)
+
+        # Cartesian: "C x y z" / "C 0 x y z"（凍結フラグ付き。ONIOM では後ろに層指定が続く）
+        if n == 4:
+            try:
+                return Atom(label, symbol, z, (float(tokens[1]), float(tokens[2]), float(tokens[3])))
+            except ValueError:
+                xyz = [_to_float(t) for t in tokens[1:4]]
+                if None in xyz:
+                    raise GJFParseError(f"座標が不正です: {line}", line_no)
+                return Atom(label, symbol, z, tuple(xyz))  # type: ignore
+        if n >= 5 and tokens[1] in _FREEZE_FLAGS:
+            xyz = [_to_float(t) for t in tokens[2:5]]
+            if None not in xyz:
+                return Atom(label, symbol, z, tuple(xyz), frozen=tokens[1] == "-1")  # type: ignore
+
+        # Z-matrix: "C" / "C 1 r" / "C 1 r 2 a" / "C 1 r 2 a 3 d [0]"
+        if n not in (1, 3, 5, 7, 8):
+            raise GJFParseError(f"原子の行が不正です: {line}", line_no)
+        if n == 8 and tokens[7] != "0":
+            raise GJFParseError(f"2つ目の結合角による指定には対応していません: {line}", line_no)
+        # 参照原子と値の組（結合・結合角・二面角）を1つのループで読む
+        specs: list[tuple[int, float | str]] = []
+        labels = self.labels
+        for k in range(1, min(n, 7), 2):
+            token = tokens[k]
+            ref = int(token) - 1 if token.isdigit() else labels.get(token)
+            if ref is None or not 0 <= ref < index:
+                raise GJFParseError(f"Z-matrix の参照原子が不正です: {token}", line_no)
+            token = tokens[k + 1]
+            name = token.lstrip("+-")
+            if name[:1].isalpha():
+                self.references.append((line_no, name))
+                specs.append((ref, token))
+                continue
+            value = _to_float(token)
+            if value is None:
+                raise GJFParseError(f"Z-matrix の値が不正です: {token}", line_no)
+            specs.append((ref, value))
+        specs += [None] * (3 - len(specs))  # type: ignore
+        return Atom(label, symbol, z, None, *specs)  # type: ignore
+
+
+def _read_step(reader: _LineReader) -> GJFStep | None:
+    """1ステップ（--Link1-- で区切られる単位）を読む。入力が尽きていれば None"""
+    # Link 0 コマンドとルート
+    link0: dict[str, str | None] = {}
+    while True:
+        line = reader.next()
+        if line is None:
+            if link0:
+                raise reader.error("ルート行 (#) がありません")
+            return None
+        if not line:
+            continue
+        if line[0] == "%":
+            key, sep, value = line[1:].partition("=")
+            link0[key.strip().lower()] = value.strip() if sep else None
+        elif line[0] == "#":
+            break
+        elif not (_is_link1(line) and not link0):  # 空のステップは無視
+            raise reader.error("ルート行 (#) がありません")
+
+    route_line_no = reader.line_no
+    route_lines = [line]
+    while (line := reader.next()) and not _is_link1(line):
+        route_lines.append(line)
+    if line:
+        reader.push(line)
+    step = GJFStep(
+        link0=link0,
+        route=parse_route(" ".join(route_lines), route_line_no),
+        title="",
+        molecule=None,
+    )
+    geometry = _geometry_from_checkpoint(step.route)
+
+    if geometry != "all":
+        # タイトル（空行まで）
+        title_lines: list[str] = []
+        while True:
+            line = reader.next()
+            if line is None or (line and _is_link1(line)):
+                raise reader.error("電荷・スピン多重度と分子構造がありません")
+            if line:
+                title_lines.append(line)
+            elif title_lines:
+                break
+        step.title = "\n".join(title_lines)
+
+        # 電荷・スピン多重度
+        while (line := reader.next()) == "":
+            pass
+        if line is None or _is_link1(line):
+            raise reader.error("電荷・スピン多重度と分子構造がありません")
+        step.molecule = _parse_charge_line(reader, line)
+        if geometry is None:
+            _MoleculeReader(reader, step.molecule).read()
+
+    # 追加入力（空行区切りのセクション）
+    section: list[str] = []
+    while True:
+        line = reader.next()
+        if line is None or _is_link1(line):
+            break
+        if line:
+            section.append(line)
+        elif section:
+            step.additional_input.append("\n".join(section))
+            section = []
+    if section:
+        step.additional_input.append("\n".join(section))
+    return step
+
+
+def parse_gjf_lines(lines: Iterable[str]) -> GJFFile:
+    """行のイテラブル（ファイルオブジェクトなど）を先頭から1回だけ読んで解析"""
+    reader = _LineReader(lines)
+    steps: list[GJFStep] = []
+    while (step := _read_step(reader)) is not None:
+        steps.append(step)
+    if not steps:
+        raise GJFParseError("ルート行 (#) がありません")
+    return GJFFile(steps=steps)
+
+
+def parse_gjf_file(content: str) -> GJFFile:
+    return parse_gjf_lines(content.splitlines())
+
+
+def parse_molecule_block(text: str) -> MoleculeSpec:
+    """電荷行を除いた分子指定（原子の行と Variables: 等）だけを解析する"""
+    reader = _LineReader(text.strip().splitlines())
+    molecule = MoleculeSpec(charge=0, multiplicity=1)
+    _MoleculeReader(reader, molecule).read()
+    return molecule
+
+
+def molecule_fields(gjf: GJFFile) -> dict:
+    """先頭ステップの電荷・多重度・分子構造（Molecule の列に対応）"""
+    molecule = gjf.first.molecule
+    if molecule is None or not molecule.atoms:
+        raise GJFParseError("先頭ステップに分子構造がありません")
 
     return {
-        "charge": charge,
-        "multiplicity": multiplicity,
-        "structure_xyz": structure_xyz,
+        "charge": molecule.charge,
+        "multiplicity": molecule.multiplicity,
+        "structure_xyz": "\n".join(molecule.lines),
     }
+
+
+def parse_gjf(content: str):
+    """先頭ステップの電荷・多重度・分子構造を返す（アップロード処理用）"""
+    return molecule_fields(parse_gjf_file(content))
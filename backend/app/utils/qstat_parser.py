@@ -0,0 +1,117 @@
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+from xml.etree.ElementTree import XMLPullParser
+
+_SIZE_UNITS_KB = {"b": 1 / 1024, "w": 8 / 1024, "kb": 1, "mb": 1024, "gb": 1024**2, "tb": 1024**3}
+
+
+@dataclass
+class QstatJobRecord:
+    job_id: str
+    name: str | None = None
+    state: str | None = None
+    queue: str | None = None
+    exec_host: str | None = None
+    exit_status: int | None = None
+    ncpus: int | None = None
+    walltime_used: int | None = None  # 秒
+    cput_used: int | None = None  # 秒
+    mem_used_kb: int | None = None
+    vmem_used_kb: int | None = None
+    walltime_limit: int | None = None  # 秒
+    mem_limit_kb: int | None = None
+    qtime: int | None = None  # UNIX 時刻
+    start_time: int | None = None
+    comp_time: int | None = None
+
+    @property
+    def short_id(self) -> str:
+        return self.job_id.split(".")[0]
+
+
+def parse_duration(value: str | None) -> int | None:
+    """"HH:MM:SS"（または秒数）を秒に変換"""
+    if not value:
+        return None
+    seconds = 0
+    for part in value.strip().split(":"):
+        seconds = seconds * 60 + int(part)
+    return seconds
+
+
+def parse_size_kb(value: str | None) -> int | None:
+    """"123456kb" や "8gb" を KB に変換"""
+    if not value:
+        return None
+    value = value.strip().lower()
+    digits = value.rstrip("abcdefghijklmnopqrstuvwxyz")
+    unit = value[len(digits):] or "b"
+    return int(int(digits) * _SIZE_UNITS_KB.get(unit, 1))
+
+
+def _parse_ncpus(resource_list: dict[str, str]) -> int | None:
+    if "ncpus" in resource_list:
+        return int(resource_list["ncpus"])
+    # nodes=1:ppn=8 形式
+    nodes = resource_list.get("nodes")
+    if nodes and "ppn=" in nodes:
+        return int(nodes.split("ppn=")[1].split(":")[0])
+    return None
+
+
+def _int_or_none(value: str | None) -> int | None:
+    return int(value) if value not in (None, "") else None
+
+
+def _record_from_element(job) -> QstatJobRecord:
+    fields: dict[str, str] = {}
+    resource_list: dict[str, str] = {}
+    resources_used: dict[str, str] = {}
+    for child in job:
+        if child.tag == "Resource_List":
+            resource_list = {c.tag: (c.text or "") for c in child}
+        elif child.tag == "resources_used":
+            resources_used = {c.tag: (c.text or "") for c in child}
+        else:
+            fields[child.tag] = child.text or ""
+
+    return QstatJobRecord(
+        job_id=fields.get("Job_Id", ""),
+        name=fields.get("Job_Name"),
+        state=fields.get("job_state"),
+        queue=fields.get("queue"),
+        exec_host=fields.get("exec_host"),
+        exit_status=_int_or_none(fields.get("exit_status")),
+        ncpus=_parse_ncpus(resource_list),
+        walltime_used=parse_duration(resources_used.get("walltime")),
+        cput_used=parse_duration(resources_used.get("cput")),
+        mem_used_kb=parse_size_kb(resources_used.get("mem")),
+        vmem_used_kb=parse_size_kb(resources_used.get("vmem")),
+        walltime_limit=parse_duration(resource_list.get("walltime")),
+        mem_limit_kb=parse_size_kb(resource_list.get("mem")),
+        qtime=_int_or_none(fields.get("qtime")),
+        start_time=_int_or_none(fields.get("start_time")),
+        comp_time=_int_or_none(fields.get("comp_time")),
+    )
+
+
+def iter_qstat_xml(chunks: Iterable[str | bytes]) -> Iterator[QstatJobRecord]:
+    """`qstat -x` の XML をチャンク単位で読み込みながら Job 要素ごとにレコードを返す
+
+    処理済みの要素はすぐに破棄するため、数千件の一覧でもメモリ使用量は一定。
+    """
+    parser = XMLPullParser(events=("end",))
+    for chunk in chunks:
+        parser.feed(chunk)
+        for _, elem in parser.read_events():
+            if elem.tag == "Job":
+                yield _record_from_element(elem)
+                elem.clear()
+    parser.close()
+
+
+def parse_qstat_xml(output: str | bytes) -> dict[str, QstatJobRecord]:
+    """`qstat -x` の出力全体を短縮ジョブID → レコードの辞書に変換"""
+    if not output.strip():
+        return {}
+    return {record.short_id: record for record in iter_qstat_xml([output])}
@@ -0,0 +1,163 @@
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from app.utils.elements import COVALENT_RADII, DEFAULT_COVALENT_RADIUS, SYMBOLS
+from app.utils.exceptions import ValidationError
+from app.utils.geometry import real_atom_mask
+from app.utils.validators import electron_count_error, validate_charge_multiplicity
+
+# 共有結合半径の和にこの値 [Å] を足した距離までを結合とみなす
+BOND_TOLERANCE = 0.4
+# 共有結合半径の和のこの割合より近い原子の組は重なっている
+CLASH_SCALE = 0.6
+# 報告する重なりの組の数の上限
+MAX_REPORTED_CLASHES = 20
+
+_RADII = np.full(256, DEFAULT_COVALENT_RADIUS)
+_RADII[: len(COVALENT_RADII)] = COVALENT_RADII
+_RADII[0] = 0.0
+
+# セルの隣接（自身を含む 27 方向）
+_OFFSETS = np.array(
+    [(dx, dy, dz) for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1)], dtype=np.int64
+)
+
+
+@dataclass
+class Clash:
+    i: int  # 入力の並びでの原子の番号（0 始まり）
+    j: int
+    distance: float  # Å
+
+
+@dataclass
+class StructureCheck:
+    n_atoms: int
+    n_bonds: int = 0
+    n_fragments: int = 0
+    clashes: list[Clash] = field(default_factory=list)
+    errors: list[str] = field(default_factory=list)  # Gaussian が受け付けない・計算が壊れる
+    warnings: list[str] = field(default_factory=list)  # 意図したものかもしれない
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+
+def neighbor_pairs(coordinates: np.ndarray, cutoff: float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """距離が cutoff 以下の原子の組 (i, j, 距離)、i < j。
+
+    一辺 cutoff のセルに原子を振り分け、隣接する 27 セルの原子とだけ距離を測る
+    （密度が有限なら O(N)）。セルの原子はセル番号で並べた配列の二分探索で引く。
+    """
+    count = len(coordinates)
+    empty = np.empty(0, dtype=np.intp)
+    if count < 2 or cutoff <= 0:
+        return empty, empty, np.empty(0)
+    cells = np.floor((coordinates - coordinates.min(axis=0)) / cutoff).astype(np.int64) + 1
+    dims = cells.max(axis=0) + 2  # 両端に空のセルを置いて隣接セルの番号が負・重複にならないようにする
+    strides = np.array([dims[1] * dims[2], dims[2], 1], dtype=np.int64)
+    keys = cells @ strides
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+
+    neighbor_keys = keys[:, None] + (_OFFSETS @ strides)[None, :]  # (N,27)
+    starts = np.searchsorted(sorted_keys, neighbor_keys, side="left")
+    stops = np.searchsorted(sorted_keys, neighbor_keys, side="right")
+    counts = (stops - starts).ravel()
+    total = int(counts.sum())
+    i = np.repeat(np.repeat(np.arange(count), len(_OFFSETS)), counts)
+    # 各 (原子, 隣接セル) の区間 [start, stop) を連番に展開する
+    first = np.repeat(starts.ravel(), counts)
+    within = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    j = order[first + within]
+
+    keep = i < j
+    i, j = i[keep], j[keep]
+    diff = coordinates[i] - coordinates[j]
+    distances = np.sqrt((diff * diff).sum(axis=1))
+    close = distances <= cutoff
+    return i[close], j[close], distances[close]
+
+
+def count_fragments(count: int, i: np.ndarray, j: np.ndarray) -> np.ndarray:
+    """結合 (i, j) でつながった原子の塊の番号（各塊で最小の原子番号）。
+
+    両端の代表のうち大きい方を小さい方へつなぎ、代表を辿り切る、を繰り返す
+    （原子の並びに依らず数回で収束する）。
+    """
+    labels = np.arange(count)
+    while True:
+        li, lj = labels[i], labels[j]
+        differ = li != lj
+        if not differ.any():
+            return labels
+        np.minimum.at(labels, np.maximum(li, lj)[differ], np.minimum(li, lj)[differ])
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels = jumped
+
+
+def check_structure(
+    numbers: np.ndarray, coordinates: np.ndarray, charge: int, multiplicity: int
+) -> StructureCheck:
+    """構造の重なり・結合・断片と、電荷・多重度と電子数の整合を調べる。
+
+    ゴースト原子・ダミー原子は距離の判定から除く。
+    """
+    numbers = np.asarray(numbers, dtype=np.uint8)
+    coordinates = np.asarray(coordinates, dtype=np.float64)
+    check = StructureCheck(n_atoms=len(numbers))
+    try:
+        validate_charge_multiplicity(charge, multiplicity)
+        # 大量のファイルで例外（とそのログ）を出さないよう、電子数の整合は理由だけを受け取る
+        error = electron_count_error(numbers.tolist(), charge, multiplicity)
+        if error is not None:
+            check.errors.append(error)
+    except ValidationError as e:
+        check.errors.append(str(e.detail))
+
+    real = np.flatnonzero(real_atom_mask(numbers))
+    if len(real) == 0:
+        check.errors.append("原子がありません")
+        return check
+    if not np.isfinite(coordinates[real]).all():
+        check.errors.append("座標に数値でない値があります")
+        return check
+
+    z = numbers[real]
+    radii = _RADII[z]
+    cutoff = 2 * radii.max() + BOND_TOLERANCE
+    a, b, distances = neighbor_pairs(coordinates[real], cutoff)
+    radius_sum = radii[a] + radii[b]
+    bonded = distances <= radius_sum + BOND_TOLERANCE
+    clashing = distances < CLASH_SCALE * radius_sum
+
+    check.n_bonds = int(bonded.sum())
+    labels = count_fragments(len(real), a[bonded], b[bonded])
+    check.n_fragments = len(np.unique(labels))
+
+    if clashing.any():
+        worst = np.argsort(distances[clashing] / radius_sum[clashing])[:MAX_REPORTED_CLASHES]
+        ci, cj, cd = real[a[clashing]][worst], real[b[clashing]][worst], distances[clashing][worst]
+        check.clashes = [Clash(int(p), int(q), float(d)) for p, q, d in zip(ci, cj, cd)]
+        first = check.clashes[0]
+        check.errors.append(
+            f"原子が重なっています: {int(clashing.sum())} 組"
+            f"（例: {SYMBOLS[numbers[first.i]]}{first.i + 1}-{SYMBOLS[numbers[first.j]]}{first.j + 1}"
+            f" {first.distance:.3f} Å）"
+        )
+
+    if check.n_fragments > 1:
+        check.warnings.append(f"構造が {check.n_fragments} 個の断片に分かれています")
+    if (z == 6).any() and not (z == 1).any():
+        check.warnings.append("炭素を含むのに水素がありません")
+    else:
+        degree = np.bincount(np.concatenate([a[bonded], b[bonded]]), minlength=len(real))
+        lonely = int(((z == 6) & (degree <= 1)).sum()) if len(real) > 2 else 0
+        if lonely:
+            check.warnings.append(f"結合相手が1つ以下の炭素が {lonely} 個あります（水素の欠落？）")
+    return check
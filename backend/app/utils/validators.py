@@ -1,6 +1,10 @@
+import base64
+import binascii
 import re
-from typing import Any
+from typing import Any, Sequence
+from .elements import is_ghost
 from .exceptions import ValidationError
+from .geometry import decode_geometry
 
 
 def validate_username(username: str) -> str:
@@ -38,8 +42,29 @@ def validate_path(path: str, field_name: str) -> str:
     return path
 
 
-def validate_charge_multiplicity(charge: int, multiplicity: int) -> tuple[int, int]:
-    """電荷とスピン多重度の妥当性検証"""
+def electron_count_error(
+    atomic_numbers: Sequence[int], charge: int, multiplicity: int
+) -> str | None:
+    """電子数と電荷・多重度が整合しなければその理由（整合すれば None）"""
+    electrons = sum(int(z) for z in atomic_numbers if not is_ghost(z)) - charge
+    if electrons < 0:
+        return f"電子数が負になります（電荷 {charge}）"
+    # 不対電子数 = 多重度 - 1 は電子数と偶奇が一致し、電子数を超えない
+    if (electrons - (multiplicity - 1)) % 2 != 0:
+        even = electrons % 2 == 0
+        return (
+            f"電子数 {electrons} と多重度 {multiplicity} の組み合わせはありえません"
+            f"（電子数が{'偶' if even else '奇'}数なら多重度は{'奇' if even else '偶'}数）"
+        )
+    if multiplicity - 1 > electrons:
+        return f"多重度 {multiplicity} に対して電子数 {electrons} が足りません"
+    return None
+
+
+def validate_charge_multiplicity(
+    charge: int, multiplicity: int, atomic_numbers: Sequence[int] | None = None
+) -> tuple[int, int]:
+    """電荷とスピン多重度の妥当性検証。原子番号を渡すと電子数との整合（偶奇）も確かめる"""
     if not isinstance(charge, int):
         raise ValidationError("電荷は整数である必要があります")
     if not isinstance(multiplicity, int):
@@ -48,4 +73,17 @@ def validate_charge_multiplicity(charge: int, multiplicity: int) -> tuple[int, i
         raise ValidationError("スピン多重度は1以上である必要があります")
     if abs(charge) > 10:
         raise ValidationError("電荷の絶対値は10以下である必要があります")
+    if atomic_numbers is not None:
+        error = electron_count_error(atomic_numbers, charge, multiplicity)
+        if error is not None:
+            raise ValidationError(error)
     return charge, multiplicity
+
+
+def validate_structure_bin(encoded: str) -> str:
+    """base64 で送られたバイナリ構造データの妥当性検証（pydantic の validator 用に ValueError を送出）"""
+    try:
+        decode_geometry(base64.b64decode(encoded, validate=True))
+    except (binascii.Error, ValueError):
+        raise ValueError("構造データ (structure_bin) の形式が不正です")
+    return encoded
@@ -0,0 +1,147 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from app.utils.geometry import parse_xyz_text
+from app.utils.gjf_parser import GJFParseError, MoleculeSpec, Route, parse_molecule_block
+
+BOHR_TO_ANGSTROM = 0.529177210903
+
+
+@dataclass
+class ZMatrixArrays:
+    """Z-matrix を数値に解決した配列（長さは Å、角度はラジアン）"""
+
+    numbers: np.ndarray  # (N,) uint8
+    refs: np.ndarray  # (N,3) 結合・角度・二面角の参照原子（無ければ -1）
+    values: np.ndarray  # (N,3) 結合長・結合角・二面角
+    cartesian: np.ndarray  # (N,) Cartesian で直接指定された原子
+    xyz: np.ndarray  # (N,3) Cartesian で指定された原子の座標
+
+
+def route_units(route: Route | None) -> tuple[float, bool]:
+    """ルートの Units= から (長さの換算係数, 角度がラジアンか) を返す"""
+    options = {o.lower() for o in route.option_values("units")} if route else set()
+    scale = BOHR_TO_ANGSTROM if options & {"au", "bohr"} else 1.0
+    return scale, "rad" in options
+
+
+def zmatrix_arrays(molecule: MoleculeSpec, route: Route | None = None) -> ZMatrixArrays:
+    scale, radians = route_units(route)
+    value = molecule.value
+    numbers, refs, values, cartesian, xyz = [], [], [], [], []
+    for atom in molecule.atoms:
+        numbers.append(atom.atomic_number)
+        if atom.xyz is not None:
+            cartesian.append(True)
+            xyz.append(atom.xyz)
+            refs.append((-1, -1, -1))
+            values.append((0.0, 0.0, 0.0))
+            continue
+        cartesian.append(False)
+        xyz.append((0.0, 0.0, 0.0))
+        specs = (atom.bond, atom.angle, atom.dihedral)
+        refs.append(tuple(-1 if spec is None else spec[0] for spec in specs))
+        values.append(tuple(0.0 if spec is None else value(spec[1]) for spec in specs))
+    numbers = np.array(numbers, dtype=np.uint8)
+    refs = np.array(refs, dtype=np.int64).reshape(-1, 3)
+    values = np.array(values, dtype=np.float64).reshape(-1, 3)
+    cartesian = np.array(cartesian, dtype=bool)
+    xyz = np.array(xyz, dtype=np.float64).reshape(-1, 3)
+    values[:, 0] *= scale
+    if not radians:
+        values[:, 1:] = np.radians(values[:, 1:])
+    return ZMatrixArrays(numbers, refs, values, cartesian, xyz * scale)
+
+
+def _normalize(v: np.ndarray) -> np.ndarray:
+    norm = np.linalg.norm(v, axis=-1, keepdims=True)
+    return v / np.where(norm == 0, 1.0, norm)
+
+
+def zmatrix_to_cartesian_batch(
+    refs: np.ndarray, values: np.ndarray, cartesian: np.ndarray, xyz: np.ndarray
+) -> np.ndarray:
+    """同じ原子数の Z-matrix B 個をまとめて Cartesian 座標 (B,N,3) に変換する。
+
+    原子は参照の依存順（ファイル中の順番）に1つずつ置き、各ステップはバッチ方向に
+    ベクトル化する。1・2・3 番目の原子は Gaussian と同様に原点・z 軸上・xz 平面上に置く。
+    """
+    batch, count = refs.shape[:2]
+    coords = np.zeros((batch, count, 3))
+    rows = np.arange(batch)
+    x_axis = np.array([1.0, 0.0, 0.0])
+    y_axis = np.array([0.0, 1.0, 0.0])
+    for i in range(count):
+        if i == 0:
+            coords[:, 0] = np.where(cartesian[:, :1], xyz[:, 0], 0.0)
+            continue
+        c = coords[rows, np.maximum(refs[:, i, 0], 0)]  # 結合の相手
+        b = coords[rows, np.maximum(refs[:, i, 1], 0)]  # 結合角の相手
+        a = coords[rows, np.maximum(refs[:, i, 2], 0)]  # 二面角の相手
+        r, theta, phi = values[:, i, 0], values[:, i, 1], values[:, i, 2]
+
+        # 結合角のみの原子は、b-c と平行でない補助点を二面角の基準にして xz 平面に置く
+        bc = _normalize(c - b)
+        helper = np.where(
+            np.abs(bc @ x_axis)[:, None] > 0.9, b + y_axis, b + x_axis
+        )
+        a = np.where((refs[:, i, 2] < 0)[:, None], helper, a)
+        n = _normalize(np.cross(b - a, bc))
+        m = np.cross(n, bc)
+        placed = (
+            c
+            - (r * np.cos(theta))[:, None] * bc
+            + (r * np.sin(theta) * np.cos(phi))[:, None] * m
+            + (r * np.sin(theta) * np.sin(phi))[:, None] * n
+        )
+        # 結合長のみの原子は結合相手から z 方向に置く
+        placed = np.where(
+            (refs[:, i, 1] < 0)[:, None], c + r[:, None] * np.array([0.0, 0.0, 1.0]), placed
+        )
+        coords[:, i] = np.where(cartesian[:, i : i + 1], xyz[:, i], placed)
+    return coords
+
+
+def zmatrix_to_cartesian(arrays_list: list[ZMatrixArrays]) -> list[np.ndarray]:
+    """複数分子を原子数ごとにまとめて変換し、入力順に (N,3) 座標を返す"""
+    results: list[np.ndarray | None] = [None] * len(arrays_list)
+    groups: dict[int, list[int]] = {}
+    for index, arrays in enumerate(arrays_list):
+        if arrays.cartesian.all():
+            results[index] = arrays.xyz
+        else:
+            groups.setdefault(len(arrays.numbers), []).append(index)
+    for indices in groups.values():
+        members = [arrays_list[i] for i in indices]
+        coords = zmatrix_to_cartesian_batch(
+            np.stack([m.refs for m in members]),
+            np.stack([m.values for m in members]),
+            np.stack([m.cartesian for m in members]),
+            np.stack([m.xyz for m in members]),
+        )
+        for i, c in zip(indices, coords):
+            results[i] = c
+    return results  # type: ignore
+
+
+def cartesian_geometries(
+    molecules: list[tuple[MoleculeSpec, Route | None]]
+) -> list[tuple[np.ndarray, np.ndarray]]:
+    """GJF の分子指定（Cartesian / Z-matrix 混在可）を (原子番号, 座標 [Å]) に変換"""
+    arrays_list = [zmatrix_arrays(molecule, route) for molecule, route in molecules]
+    coordinates = zmatrix_to_cartesian(arrays_list)
+    return [(arrays.numbers, coords) for arrays, coords in zip(arrays_list, coordinates)]
+
+
+def geometry_from_text(text: str) -> tuple[np.ndarray, np.ndarray] | None:
+    """structure_xyz のテキスト（XYZ・Cartesian・Z-matrix）から (原子番号, 座標) を求める。
+    どの形式としても読めなければ None"""
+    arrays = parse_xyz_text(text)
+    if arrays is not None:
+        return arrays
+    try:
+        molecule = parse_molecule_block(text)
+    except GJFParseError:
+        return None
+    return cartesian_geometries([(molecule, None)])[0]
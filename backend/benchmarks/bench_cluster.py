@@ -0,0 +1,269 @@
+"""偽クラスタに対して FastAPI アプリ全体を負荷試験する
+
+localhost の偽 SSH/SFTP サーバ（benchmarks.fake_cluster）を起動し、アプリを
+プロセス内（httpx の ASGI トランスポート）で動かして以下を計測する。
+
+- バンドル投入から全ジョブに remote_job_id が付くまでのスループット
+- ログ取得エンドポイント (/jobs/{id}/log) のレイテンシ p50 / p99
+- アプリが開いた SSH 接続数（偽サーバ側で受け付けた数も併記）
+
+ネットワーク接続は不要だが、DATABASE_URL にはマイグレーション適用済みの
+ローカル DB を指定すること。ジョブは最初に登録された接続情報で投入されるため、
+他の接続情報が登録されていない専用の DB を使う。
+
+使い方（backend ディレクトリで実行）:
+    python -m benchmarks.bench_cluster --jobs 2000 --log-requests 2000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+SAMPLE_GJF = """%Mem=4GB
+%NProcShared=8
+# B3LYP/6-31G(d) Opt Freq
+
+bench molecule {index}
+
+0 1
+C   0.000000   0.000000   0.000000
+H   0.629118   0.629118   0.629118
+H  -0.629118  -0.629118   0.629118
+H  -0.629118   0.629118  -0.629118
+H   0.629118  -0.629118  -0.629118
+
+"""
+
+SAMPLE_XYZ = """5
+
+C   0.000000   0.000000   0.000000
+H   0.629118   0.629118   0.629118
+H  -0.629118  -0.629118   0.629118
+H  -0.629118   0.629118  -0.629118
+H   0.629118  -0.629118  -0.629118
+"""
+
+
+def configure_environment(args):
+    """アプリの import 前に、ベンチマーク向けの間隔・上限を設定する（既存の値は優先）"""
+    os.environ.setdefault("SECRET_KEY", "bench-secret")
+    os.environ.setdefault("SUPABASE_URL", "http://localhost")
+    os.environ.setdefault("SUPABASE_ANON_KEY", "bench")
+    if "FERNET_KEY" not in os.environ:
+        from cryptography.fernet import Fernet
+
+        os.environ["FERNET_KEY"] = Fernet.generate_key().decode()
+    os.environ.setdefault("SUBMIT_MAX_IN_FLIGHT_PER_HOST", str(args.jobs))
+    os.environ.setdefault("SUBMIT_MAX_IN_FLIGHT_PER_USER", str(args.jobs))
+    os.environ.setdefault("SUBMIT_DISPATCH_INTERVAL", "1")
+    os.environ.setdefault("STATUS_POLL_INTERVAL", "2")
+    os.environ.setdefault("STATUS_POLL_MIN_INTERVAL", "2")
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def gather_limited(concurrency: int, coros):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(coro):
+        async with semaphore:
+            return await coro
+
+    return await asyncio.gather(*(run(c) for c in coros))
+
+
+async def setup(client, cluster, args, local_dir: str) -> int:
+    """ユーザー・接続情報・バンドル・分子・ジョブを API 経由で作成し、バンドルIDを返す"""
+    username = f"bench_{int(time.time())}"
+    password = "bench-password"
+    response = await client.post(
+        "/users/",
+        json={
+            "username": username,
+            "password": password,
+            "local_base_dir": local_dir,
+            "remote_base_dir": cluster.remote_base_dir,
+        },
+    )
+    response.raise_for_status()
+    response = await client.post(
+        "/auth/login", data={"username": username, "password": password}
+    )
+    response.raise_for_status()
+    client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+
+    response = await client.post(
+        "/credentials/",
+        json={
+            "host": cluster.host,
+            "port": cluster.port,
+            "username": args.cluster_user,
+            "auth_method": "password",
+            "password": args.cluster_password,
+        },
+    )
+    response.raise_for_status()
+
+    response = await client.post("/bundles/", json={"name": "bench"})
+    response.raise_for_status()
+    bundle_id = response.json()["id"]
+
+    async def create_job(index: int):
+        gjf_path = os.path.join(local_dir, f"mol_{index}.gjf")
+        with open(gjf_path, "w") as f:
+            f.write(SAMPLE_GJF.format(index=index))
+        response = await client.post(
+            "/molecules/",
+            json={
+                "name": f"mol_{index}",
+                "charge": 0,
+                "multiplicity": 1,
+                "structure_xyz": SAMPLE_XYZ,
+                "bundle_id": bundle_id,
+            },
+        )
+        response.raise_for_status()
+        response = await client.post(
+            "/jobs/",
+            json={
+                "molecule_id": response.json()["id"],
+                "gjf_path": gjf_path,
+                "job_type": "Opt",
+            },
+        )
+        response.raise_for_status()
+
+    await gather_limited(args.concurrency, (create_job(i) for i in range(args.jobs)))
+    return bundle_id
+
+
+async def wait_for_jobs(client, predicate, timeout: float) -> list[dict]:
+    deadline = time.perf_counter() + timeout
+    while True:
+        response = await client.get("/jobs/")
+        response.raise_for_status()
+        jobs = response.json()
+        if all(predicate(job) for job in jobs) or time.perf_counter() > deadline:
+            return jobs
+        await asyncio.sleep(0.5)
+
+
+async def measure_log_latency(client, jobs: list[dict], args) -> tuple[list[float], int]:
+    latencies: list[float] = []
+    errors = 0
+
+    async def fetch(job_id: int):
+        nonlocal errors
+        start = time.perf_counter()
+        response = await client.get(f"/jobs/{job_id}/log")
+        elapsed = time.perf_counter() - start
+        if response.status_code == 200:
+            latencies.append(elapsed)
+        else:
+            errors += 1
+
+    rng = random.Random(args.seed)
+    targets = [rng.choice(jobs)["id"] for _ in range(args.log_requests)] if jobs else []
+    await gather_limited(args.concurrency, (fetch(job_id) for job_id in targets))
+    return latencies, errors
+
+
+async def run_benchmark(args):
+    import httpx
+
+    from app.main import app
+    from app.services.ssh_pool import ssh_pool
+    from benchmarks.fake_cluster import FakeCluster
+
+    cluster = FakeCluster(
+        username=args.cluster_user,
+        password=args.cluster_password,
+        tick=args.tick,
+        queue_delay=args.queue_delay,
+        run_time=tuple(args.run_time),
+        slots=args.slots,
+        fail_rate=args.fail_rate,
+        seed=args.seed,
+    )
+    with cluster, tempfile.TemporaryDirectory(prefix="bench-local-") as local_dir:
+        await app.router.startup()
+        try:
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://bench", timeout=None
+            ) as client:
+                print(f"setting up {args.jobs} jobs ...")
+                bundle_id = await setup(client, cluster, args, local_dir)
+
+                start = time.perf_counter()
+                response = await client.post(f"/bundles/{bundle_id}/submit")
+                response.raise_for_status()
+                jobs = await wait_for_jobs(
+                    client, lambda job: job["remote_job_id"], args.timeout
+                )
+                submit_elapsed = time.perf_counter() - start
+                submitted = sum(1 for job in jobs if job["remote_job_id"])
+
+                # キュー待ちを抜けてログが出始めるのを待ってから計測する
+                await wait_for_jobs(
+                    client,
+                    lambda job: job["status"] != "queued",
+                    args.queue_delay * 3 + args.tick * 2,
+                )
+                jobs = [
+                    job
+                    for job in (await client.get("/jobs/")).json()
+                    if job["status"] in ("running", "done", "error")
+                ]
+                latencies, errors = await measure_log_latency(client, jobs, args)
+        finally:
+            await app.router.shutdown()
+
+        print(
+            f"submission: {submitted}/{args.jobs} jobs in {submit_elapsed:.2f}s "
+            f"({submitted / submit_elapsed:.1f} jobs/s)"
+        )
+        print(
+            f"log endpoint: {len(latencies)} ok / {errors} errors, "
+            f"p50 {percentile(latencies, 50) * 1000:.1f} ms, "
+            f"p99 {percentile(latencies, 99) * 1000:.1f} ms, "
+            f"mean {statistics.fmean(latencies) * 1000 if latencies else float('nan'):.1f} ms"
+        )
+        print(
+            f"ssh connections: {ssh_pool.connections_opened} opened by app, "
+            f"{cluster.server.connections_accepted} accepted by fake cluster"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--jobs", type=int, default=1000)
+    parser.add_argument("--log-requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--cluster-user", default="bench")
+    parser.add_argument("--cluster-password", default="bench")
+    parser.add_argument("--tick", type=float, default=1.0)
+    parser.add_argument("--queue-delay", type=float, default=2.0)
+    parser.add_argument("--run-time", type=float, nargs=2, default=(30.0, 120.0))
+    parser.add_argument("--slots", type=int, default=256)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    configure_environment(args)
+    asyncio.run(run_benchmark(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""配座の重複判定（一括 Kabsch の総当たり RMSD）の計測（DB 不要）
+
+基準構造を摂動した配座群を作り、その一部を回転・並進しただけの複製（さらに一部は
+原子の並びも入れ替える）にして、重複判定の時間と検出数を測る。
+
+使い方（backend ディレクトリで実行）:
+    python -m benchmarks.bench_conformer_dedup --conformers 3000 --atoms 100
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from app.utils.conformers import find_duplicate_conformers, pairwise_rmsd
+
+
+def random_rotations(rng: np.random.Generator, count: int) -> np.ndarray:
+    q, r = np.linalg.qr(rng.normal(size=(count, 3, 3)))
+    q *= np.sign(np.diagonal(r, axis1=1, axis2=2))[:, None, :]
+    q[np.linalg.det(q) < 0, :, 0] *= -1
+    return q
+
+
+def synthetic_conformers(count: int, atoms: int, duplicate_ratio: float, permuted_ratio: float, seed: int):
+    rng = np.random.default_rng(seed)
+    numbers = rng.choice([1, 6, 7, 8], size=atoms).astype(np.uint8)
+    base = rng.uniform(-5, 5, size=(atoms, 3))
+    unique = max(1, int(count * (1 - duplicate_ratio)))
+    distinct = base + rng.normal(scale=0.6, size=(unique, atoms, 3))
+    sources = np.concatenate([np.arange(unique), rng.integers(0, unique, count - unique)])
+    coordinates = distinct[sources] + rng.normal(scale=0.005, size=(count, atoms, 3))
+    coordinates = coordinates @ random_rotations(rng, count) + rng.uniform(-3, 3, size=(count, 1, 3))
+
+    conformers = []
+    for i in range(count):
+        if i >= unique and rng.random() < permuted_ratio:
+            order = rng.permutation(atoms)
+            conformers.append((0, 1, (numbers[order], coordinates[i][order])))
+        else:
+            conformers.append((0, 1, (numbers, coordinates[i])))
+    return conformers, count - unique
+
+
+def check_against_svd(conformers, samples: int = 50):
+    """解析的な特異値の RMSD が SVD による Kabsch と一致するか"""
+    a = np.stack([conformers[i][2][1] for i in range(samples)])
+    a = a - a.mean(axis=1, keepdims=True)
+    fast = pairwise_rmsd(a, a)
+    h = np.einsum("ink,jnl->ijkl", a, a)
+    s = np.linalg.svd(h, compute_uv=False)
+    s[..., 2] *= np.sign(np.linalg.det(h))
+    norms = (a * a).sum(axis=(1, 2))
+    msd = (norms[:, None] + norms[None, :] - 2 * s.sum(axis=-1)) / a.shape[1]
+    error = np.abs(fast - np.sqrt(np.maximum(msd, 0))).max()
+    assert error < 1e-5, f"SVD との差が大きすぎます: {error}"
+    return error
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--conformers", type=int, default=3000)
+    parser.add_argument("--atoms", type=int, default=100)
+    parser.add_argument("--duplicates", type=float, default=0.3, help="複製の割合")
+    parser.add_argument("--permuted", type=float, default=0.2, help="複製のうち原子の並びを入れ替える割合")
+    parser.add_argument("--threshold", type=float, default=0.125)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    conformers, planted = synthetic_conformers(
+        args.conformers, args.atoms, args.duplicates, args.permuted, args.seed
+    )
+    error = check_against_svd(conformers)
+
+    start = time.perf_counter()
+    matches = find_duplicate_conformers(conformers, args.threshold)
+    elapsed = time.perf_counter() - start
+
+    found = sum(match is not None for match in matches)
+    count = len(conformers)
+    print(f"max |RMSD - SVD Kabsch|: {error:.2e} Å")
+    print(
+        f"dedup: {count} conformers x {args.atoms} atoms in {elapsed:.2f}s "
+        f"({count * (count - 1) / 2 / elapsed / 1e6:.1f}M pairs/s upper bound)"
+    )
+    print(f"duplicates: {found} found / {planted} planted (threshold {args.threshold} Å)")
+
+
+if __name__ == "__main__":
+    main()
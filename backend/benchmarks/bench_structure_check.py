@@ -0,0 +1,72 @@
+"""構造の検査（セルリストによる近接原子の探索）の計測（DB 不要）
+
+原子数を変えた大きな構造1つと、小さな構造をアップロード1回分まとめて検査する時間を測る。
+近接する組は総当たりの結果と照合する。
+
+使い方（backend ディレクトリで実行）:
+    python -m benchmarks.bench_structure_check --atoms 10000 --files 5000 --file-atoms 60
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from app.services.structure_validation import check_many
+from app.utils.structure_check import check_structure, neighbor_pairs
+
+
+def lattice_structure(atoms: int, rng: np.random.Generator) -> tuple[np.ndarray, np.ndarray]:
+    """1.5 Å 間隔の格子を揺らした構造（有機分子程度の原子密度）"""
+    side = int(np.ceil(atoms ** (1 / 3)))
+    grid = np.stack(np.meshgrid(*[np.arange(side)] * 3, indexing="ij"), axis=-1).reshape(-1, 3)
+    coordinates = grid[:atoms] * 1.5 + rng.normal(scale=0.05, size=(atoms, 3))
+    numbers = rng.choice([1, 6, 7, 8], size=atoms).astype(np.uint8)
+    return numbers, coordinates
+
+
+def check_against_brute_force(coordinates: np.ndarray, cutoff: float):
+    i, j, _ = neighbor_pairs(coordinates, cutoff)
+    diff = coordinates[:, None, :] - coordinates[None, :, :]
+    close = np.triu(np.sqrt((diff * diff).sum(axis=2)) <= cutoff, 1)
+    expected = set(zip(*np.nonzero(close)))
+    assert set(zip(i.tolist(), j.tolist())) == {(int(a), int(b)) for a, b in expected}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--atoms", type=int, default=10000)
+    parser.add_argument("--files", type=int, default=5000)
+    parser.add_argument("--file-atoms", type=int, default=60)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = np.random.default_rng(args.seed)
+
+    check_against_brute_force(lattice_structure(1500, rng)[1], 2.0)
+
+    numbers, coordinates = lattice_structure(args.atoms, rng)
+    multiplicity = 1 + int(numbers.sum()) % 2
+    start = time.perf_counter()
+    check = check_structure(numbers, coordinates, 0, multiplicity)
+    elapsed = time.perf_counter() - start
+    print(
+        f"single structure: {args.atoms} atoms in {elapsed * 1e3:.1f} ms "
+        f"({check.n_bonds} bonds, {check.n_fragments} fragments, {len(check.errors)} errors)"
+    )
+
+    structures = []
+    for _ in range(args.files):
+        numbers, coordinates = lattice_structure(args.file_atoms, rng)
+        structures.append((numbers, coordinates, 0, 1 + int(numbers.sum()) % 2))
+    start = time.perf_counter()
+    checks = check_many(structures)
+    elapsed = time.perf_counter() - start
+    print(
+        f"batch: {args.files} structures x {args.file_atoms} atoms in {elapsed:.2f}s "
+        f"({args.files / elapsed:.0f} structures/s, "
+        f"{sum(bool(c.errors) for c in checks if c)} with errors)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""多数の小さな .gjf ファイル転送のベンチマーク（SFTP 逐次 put vs tar ストリーム）
+
+使い方（backend ディレクトリで実行）:
+    python -m benchmarks.bench_transfer --host localhost --port 2222 \
+        --username user --password pass --remote-dir /tmp/qcc-bench --files 2000
+"""
+
+import argparse
+import os
+import posixpath
+import tempfile
+import time
+
+from app.models import ServerCredential
+from app.models.server_credential import AuthMethod
+from app.services.job_execution import JobExecutionController
+from app.services.ssh_pool import ssh_pool
+from app.utils.encryption import encrypt_text
+
+SAMPLE_GJF = """%Mem=4GB
+%NProcShared=8
+# B3LYP/6-31G(d) Opt Freq
+
+conformer {index}
+
+0 1
+C   0.000000   0.000000   0.000000
+H   0.629118   0.629118   0.629118
+H  -0.629118  -0.629118   0.629118
+H  -0.629118   0.629118  -0.629118
+H   0.629118  -0.629118  -0.629118
+
+"""
+
+
+def build_credential(args) -> ServerCredential:
+    credential = ServerCredential(
+        id=-1,
+        host=args.host,
+        port=args.port,
+        username=args.username,
+        auth_method=AuthMethod.ssh_key if args.key_file else AuthMethod.password,
+    )
+    if args.key_file:
+        with open(args.key_file) as f:
+            credential.ssh_key_encrypted = encrypt_text(f.read())  # type: ignore
+    else:
+        credential.password_encrypted = encrypt_text(args.password)  # type: ignore
+    return credential
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=22)
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--password")
+    parser.add_argument("--key-file")
+    parser.add_argument("--remote-dir", required=True)
+    parser.add_argument("--files", type=int, default=1000)
+    args = parser.parse_args()
+
+    controller = JobExecutionController(build_credential(args))
+    with tempfile.TemporaryDirectory() as tmp:
+        local_paths = []
+        for i in range(args.files):
+            path = os.path.join(tmp, f"{i}.gjf")
+            with open(path, "w") as f:
+                f.write(SAMPLE_GJF.format(index=i))
+            local_paths.append(path)
+
+        for mode, upload in (
+            ("sftp", controller.upload_files_sftp),
+            ("tar", controller.upload_files_tar),
+        ):
+            entries = [
+                (path, posixpath.join(args.remote_dir, mode, f"job_{i}"))
+                for i, path in enumerate(local_paths)
+            ]
+            start = time.perf_counter()
+            upload(entries, "input.gjf")
+            elapsed = time.perf_counter() - start
+            print(
+                f"{mode:>4}: {args.files} files in {elapsed:.2f}s "
+                f"({args.files / elapsed:.0f} files/s)"
+            )
+    ssh_pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+from .cluster import FakeCluster
+from .scheduler import FakeScheduler
+from .server import FakeSSHServer
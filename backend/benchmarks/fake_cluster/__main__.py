@@ -0,0 +1,55 @@
+"""偽クラスタを単体で起動する（ネットワーク不要、localhost のみで待ち受け）
+
+使い方（backend ディレクトリで実行）:
+    python -m benchmarks.fake_cluster --root /tmp/fake-cluster --port 2222 \
+        --queue-delay 5 --run-time 20 60 --slots 64 --fail-rate 0.05
+"""
+
+import argparse
+import logging
+import time
+
+from .cluster import FakeCluster
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--root", help="作業ディレクトリ（省略時は一時ディレクトリ）")
+    parser.add_argument("--port", type=int, default=2222)
+    parser.add_argument("--username", default="bench")
+    parser.add_argument("--password", default="bench")
+    parser.add_argument("--tick", type=float, default=1.0)
+    parser.add_argument("--queue-delay", type=float, default=5.0)
+    parser.add_argument("--run-time", type=float, nargs=2, default=(20.0, 60.0))
+    parser.add_argument("--slots", type=int, default=64)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    cluster = FakeCluster(
+        args.root,
+        username=args.username,
+        password=args.password,
+        port=args.port,
+        tick=args.tick,
+        queue_delay=args.queue_delay,
+        run_time=tuple(args.run_time),
+        slots=args.slots,
+        fail_rate=args.fail_rate,
+        seed=args.seed,
+    )
+    with cluster:
+        print(
+            f"fake cluster listening on {cluster.host}:{cluster.port} "
+            f"(user={args.username}, remote_base_dir={cluster.remote_base_dir})"
+        )
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import os
+import tempfile
+
+from .scheduler import FakeScheduler
+from .server import FakeSSHServer
+
+
+class FakeCluster:
+    """偽 SSH/SFTP サーバと偽スケジューラをまとめて起動する
+
+    root 以下に home（remote_base_dir として使う）と state（スケジューラの状態）を作る。
+    root を省略すると一時ディレクトリを使い、stop() で削除する。
+    """
+
+    def __init__(
+        self,
+        root: str | None = None,
+        username: str = "bench",
+        password: str = "bench",
+        port: int = 0,
+        **scheduler_options,
+    ):
+        self._tmp = tempfile.TemporaryDirectory(prefix="fake-cluster-") if root is None else None
+        self.root = os.path.abspath(root or self._tmp.name)  # type: ignore
+        self.home = os.path.join(self.root, "home")
+        self.state_dir = os.path.join(self.root, "state")
+        os.makedirs(self.home, exist_ok=True)
+        self.scheduler = FakeScheduler(self.state_dir, **scheduler_options)
+        self.server = FakeSSHServer(
+            self.home, self.state_dir, username=username, password=password, port=port
+        )
+
+    @property
+    def host(self) -> str:
+        return self.server.host
+
+    @property
+    def port(self) -> int:
+        return self.server.port
+
+    @property
+    def remote_base_dir(self) -> str:
+        return os.path.join(self.home, "jobs")
+
+    def start(self) -> "FakeCluster":
+        self.scheduler.start()
+        self.server.start()
+        return self
+
+    def stop(self):
+        self.server.stop()
+        self.scheduler.stop()
+        if self._tmp is not None:
+            self._tmp.cleanup()
+
+    def __enter__(self) -> "FakeCluster":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,298 @@
+"""偽クラスタのスケジューラ本体
+
+qsubg16 / qdel（bin/ 以下のシェルスクリプト）はジョブ投入・削除を spool ファイルへ
+追記するだけで、このスケジューラがそれを取り込み、待ち時間・実行・完了を
+シミュレートする。状態は tick ごとに state.json へ書き出し、qstat はそれを読む。
+"""
+
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from dataclasses import asdict, dataclass
+
+logger = logging.getLogger(__name__)
+
+STATE_FILENAME = "state.json"
+SPOOL_FILENAME = "spool"
+QDEL_FILENAME = "qdel"
+LOCK_FILENAME = "lock"
+QDEL_EXIT_STATUS = 271  # PBS で qdel されたジョブの終了コード
+
+_NPROC_RE = re.compile(r"^%nprocshared\s*=\s*(\d+)", re.IGNORECASE | re.MULTILINE)
+_MEM_RE = re.compile(r"^%mem\s*=\s*(\d+)\s*([kmgt]?[bw])?", re.IGNORECASE | re.MULTILINE)
+# 単位省略時は words（8 バイト）
+_MEM_UNITS_KB = {
+    "b": 1 / 1024, "w": 8 / 1024,
+    "kb": 1, "mb": 1024, "gb": 1024**2, "tb": 1024**3,
+    "kw": 8, "mw": 8 * 1024, "gw": 8 * 1024**2, "tw": 8 * 1024**3,
+}
+_SIMULATION_FIELDS = ("eligible_at", "run_time", "will_fail", "energy", "steps", "route")
+
+GAUSSIAN_HEADER = """ Entering Gaussian System, Link 0=g16
+ Input={input}
+ Output={log}
+ Initial command:
+ /g16/l1.exe "/scratch/Gau-{job_id}.inp" -scrdir="/scratch/"
+ Entering Link 1 = /g16/l1.exe PID=     {job_id}.
+
+ Copyright (c) 1988-2019, Gaussian, Inc.  All Rights Reserved.
+
+ ******************************************
+ Gaussian 16:  ES64L-G16RevC.01  3-Jul-2019
+ ******************************************
+ {route}
+ ----------------------------------------------------------------------
+"""
+
+SCF_BLOCK = """ SCF Done:  E(RB3LYP) =  {energy:.9f}     A.U. after   {cycles:2d} cycles
+            NFock= {cycles:2d}  Conv=0.{conv:02d}D-08     -V/T= 2.0093
+         Item               Value     Threshold  Converged?
+ Maximum Force            {force:.6f}     0.000450     {converged}
+ RMS     Force            {rms_force:.6f}     0.000300     {converged}
+"""
+
+NORMAL_TERMINATION = " Normal termination of Gaussian 16 at {date}.\n"
+ERROR_TERMINATION = " Error termination via Lnk1e in /g16/l9999.exe at {date}.\n"
+
+
+@dataclass
+class FakeJob:
+    id: int
+    name: str
+    workdir: str
+    state: str = "Q"
+    queue: str = "gaussian"
+    exit_status: int | None = None
+    ncpus: int = 1
+    mem_limit_kb: int | None = None
+    qtime: int = 0
+    start_time: int | None = None
+    comp_time: int | None = None
+    walltime: int = 0
+    cput: int = 0
+    mem_kb: int = 0
+    # シミュレーション用（qstat には出さない）
+    eligible_at: float = 0.0
+    run_time: float = 0.0
+    will_fail: bool = False
+    energy: float = 0.0
+    steps: int = 0
+    route: str = "#p"
+
+    @property
+    def log_path(self) -> str:
+        return os.path.join(self.workdir, os.path.splitext(self.name)[0] + ".log")
+
+    @property
+    def input_path(self) -> str:
+        return os.path.join(self.workdir, self.name)
+
+
+def _read_resources(input_path: str) -> tuple[int, int | None, str]:
+    """入力ファイルの Link0 から (コア数, メモリ上限 KB, ルート行) を読む"""
+    try:
+        with open(input_path, errors="replace") as f:
+            text = f.read(65536)
+    except OSError:
+        return 1, None, "#p"
+    nproc = _NPROC_RE.search(text)
+    mem = _MEM_RE.search(text)
+    route = next(
+        (line.strip() for line in text.splitlines() if line.lstrip().startswith("#")),
+        "#p",
+    )
+    mem_kb = None
+    if mem:
+        mem_kb = int(int(mem.group(1)) * _MEM_UNITS_KB[(mem.group(2) or "w").lower()])
+    return int(nproc.group(1)) if nproc else 1, mem_kb, route
+
+
+def _read_new_lines(path: str, offset: int) -> tuple[list[str], int]:
+    """offset 以降の完結した行だけを読み、次回の offset を返す"""
+    try:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+    except FileNotFoundError:
+        return [], offset
+    end = data.rfind(b"\n") + 1
+    return data[:end].decode(errors="replace").splitlines(), offset + end
+
+
+class FakeScheduler:
+    """待ち時間・同時実行枠・実行時間・失敗率を指定して PBS 風の挙動を再現する"""
+
+    def __init__(
+        self,
+        state_dir: str,
+        tick: float = 1.0,
+        queue_delay: float = 5.0,
+        run_time: tuple[float, float] = (20.0, 60.0),
+        slots: int = 64,
+        fail_rate: float = 0.0,
+        keep_completed: float = 600.0,
+        seed: int | None = None,
+    ):
+        self.state_dir = state_dir
+        self.tick_interval = tick
+        self.queue_delay = queue_delay
+        self.run_time = run_time
+        self.slots = slots
+        self.fail_rate = fail_rate
+        self.keep_completed = keep_completed
+        self.jobs: dict[int, FakeJob] = {}
+        self._random = random.Random(seed)
+        self._spool_offset = 0
+        self._qdel_offset = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        os.makedirs(state_dir, exist_ok=True)
+        for name in (SPOOL_FILENAME, QDEL_FILENAME, LOCK_FILENAME):
+            open(os.path.join(state_dir, name), "a").close()
+        self._write_state()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.state_dir, name)
+
+    def _ingest_submissions(self, now: float):
+        lines, self._spool_offset = _read_new_lines(
+            self._path(SPOOL_FILENAME), self._spool_offset
+        )
+        for line in lines:
+            job_id, workdir, name, submitted = line.split("\t")
+            job = FakeJob(
+                id=int(job_id),
+                name=name,
+                workdir=workdir,
+                qtime=int(submitted),
+                eligible_at=now + self._random.expovariate(1 / self.queue_delay)
+                if self.queue_delay > 0
+                else now,
+                run_time=self._random.uniform(*self.run_time),
+                will_fail=self._random.random() < self.fail_rate,
+                energy=-self._random.uniform(40, 2000),
+            )
+            job.ncpus, job.mem_limit_kb, job.route = _read_resources(job.input_path)
+            self.jobs[job.id] = job
+
+    def _ingest_deletions(self, now: float):
+        lines, self._qdel_offset = _read_new_lines(
+            self._path(QDEL_FILENAME), self._qdel_offset
+        )
+        for line in lines:
+            job = self.jobs.get(int(line.strip() or 0))
+            if job is not None and job.state != "C":
+                self._complete(job, now, QDEL_EXIT_STATUS, termination=None)
+
+    def _start(self, job: FakeJob, now: float):
+        job.state = "R"
+        job.start_time = int(now)
+        with open(job.log_path, "w") as f:
+            f.write(
+                GAUSSIAN_HEADER.format(
+                    input=job.input_path,
+                    log=job.log_path,
+                    job_id=job.id,
+                    route=job.route,
+                )
+            )
+
+    def _advance(self, job: FakeJob, now: float):
+        elapsed = now - (job.start_time or now)
+        job.walltime = int(elapsed)
+        job.cput = int(elapsed * job.ncpus * self._random.uniform(0.7, 0.95))
+        limit = job.mem_limit_kb or 1024**2
+        job.mem_kb = max(job.mem_kb, int(limit * self._random.uniform(0.2, 0.8)))
+        job.steps += 1
+        job.energy -= self._random.uniform(0, 0.01) / job.steps
+        force = 0.05 / job.steps
+        with open(job.log_path, "a") as f:
+            f.write(
+                SCF_BLOCK.format(
+                    energy=job.energy,
+                    cycles=self._random.randint(8, 20),
+                    conv=self._random.randint(10, 99),
+                    force=force,
+                    rms_force=force / 2,
+                    converged="YES" if force < 0.00045 else "NO ",
+                )
+            )
+
+    def _complete(self, job: FakeJob, now: float, exit_status: int, termination: str | None):
+        date = time.strftime("%a %b %d %H:%M:%S %Y", time.localtime(now))
+        if termination is not None and os.path.exists(job.log_path):
+            with open(job.log_path, "a") as f:
+                f.write(termination.format(date=date))
+            # 出力取得の動作確認用に小さなチェックポイントファイルも作る
+            chk_path = os.path.splitext(job.log_path)[0] + ".chk"
+            with open(chk_path, "wb") as f:
+                f.write(os.urandom(4096))
+        job.state = "C"
+        job.exit_status = exit_status
+        job.comp_time = int(now)
+
+    def step(self, now: float | None = None):
+        """spool の取り込みと状態遷移を1回分進め、state.json を書き出す"""
+        now = time.time() if now is None else now
+        self._ingest_submissions(now)
+        self._ingest_deletions(now)
+
+        running = sum(1 for job in self.jobs.values() if job.state == "R")
+        for job in sorted(self.jobs.values(), key=lambda j: j.id):
+            if job.state == "Q" and running < self.slots and now >= job.eligible_at:
+                self._start(job, now)
+                running += 1
+            elif job.state == "R":
+                self._advance(job, now)
+                if now - (job.start_time or now) >= job.run_time:
+                    if job.will_fail:
+                        self._complete(job, now, 1, ERROR_TERMINATION)
+                    else:
+                        self._complete(job, now, 0, NORMAL_TERMINATION)
+                    running -= 1
+
+        expired = [
+            job.id
+            for job in self.jobs.values()
+            if job.state == "C" and now - (job.comp_time or now) > self.keep_completed
+        ]
+        for job_id in expired:
+            del self.jobs[job_id]
+        self._write_state()
+
+    def _write_state(self):
+        state = {
+            "spool_offset": self._spool_offset,
+            "jobs": [
+                {
+                    key: value
+                    for key, value in asdict(job).items()
+                    if key not in _SIMULATION_FIELDS
+                }
+                for job in self.jobs.values()
+            ],
+        }
+        tmp_path = self._path(STATE_FILENAME + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self._path(STATE_FILENAME))
+
+    def _loop(self):
+        while not self._stop.wait(self.tick_interval):
+            try:
+                self.step()
+            except Exception as e:
+                logger.error(f"偽スケジューラでエラーが発生しました: {e}")
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name="fake-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
@@ -0,0 +1,282 @@
+"""偽クラスタの SSH/SFTP サーバ（paramiko）
+
+exec 要求は bin/ の偽 qsubg16・qstat・qdel を PATH の先頭に置いた /bin/sh で
+ローカル実行し、SFTP はローカルファイルシステムをそのまま公開する。
+認証は指定したユーザー名に対してパスワードまたは任意の公開鍵を受け付ける。
+"""
+
+import logging
+import os
+import socket
+import subprocess
+import threading
+
+import paramiko
+
+logger = logging.getLogger(__name__)
+
+BIN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bin")
+_COPY_CHUNK_SIZE = 32768
+
+
+class _LocalSFTPHandle(paramiko.SFTPHandle):
+    def stat(self):
+        try:
+            return paramiko.SFTPAttributes.from_stat(os.fstat(self.readfile.fileno()))
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+    def chattr(self, attr):
+        try:
+            paramiko.SFTPServer.set_file_attr(self.filename, attr)
+            return paramiko.SFTP_OK
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+
+class LocalSFTPServer(paramiko.SFTPServerInterface):
+    """ローカルファイルシステムをパスそのままで公開する SFTP サーバ"""
+
+    def list_folder(self, path):
+        try:
+            entries = []
+            for name in os.listdir(path):
+                attr = paramiko.SFTPAttributes.from_stat(
+                    os.lstat(os.path.join(path, name))
+                )
+                attr.filename = name
+                entries.append(attr)
+            return entries
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+    def stat(self, path):
+        try:
+            return paramiko.SFTPAttributes.from_stat(os.stat(path))
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+    def lstat(self, path):
+        try:
+            return paramiko.SFTPAttributes.from_stat(os.lstat(path))
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+    def open(self, path, flags, attr):
+        try:
+            mode = getattr(attr, "st_mode", None)
+            fd = os.open(path, flags, mode if mode is not None else 0o644)
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+        if flags & os.O_WRONLY:
+            fmode = "ab" if flags & os.O_APPEND else "wb"
+        elif flags & os.O_RDWR:
+            fmode = "a+b" if flags & os.O_APPEND else "r+b"
+        else:
+            fmode = "rb"
+        f = os.fdopen(fd, fmode)
+        handle = _LocalSFTPHandle(flags)
+        handle.filename = path
+        handle.readfile = f
+        handle.writefile = f
+        return handle
+
+    def remove(self, path):
+        try:
+            os.remove(path)
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+        return paramiko.SFTP_OK
+
+    def rename(self, oldpath, newpath):
+        try:
+            os.rename(oldpath, newpath)
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+        return paramiko.SFTP_OK
+
+    def posix_rename(self, oldpath, newpath):
+        return self.rename(oldpath, newpath)
+
+    def mkdir(self, path, attr):
+        try:
+            os.mkdir(path)
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+        return paramiko.SFTP_OK
+
+    def rmdir(self, path):
+        try:
+            os.rmdir(path)
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+        return paramiko.SFTP_OK
+
+    def chattr(self, path, attr):
+        try:
+            paramiko.SFTPServer.set_file_attr(path, attr)
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+        return paramiko.SFTP_OK
+
+
+def _run_command(channel: paramiko.Channel, command: str, env: dict, cwd: str):
+    """コマンドを実行し、チャネルと標準入出力を相互にコピーする"""
+    proc = subprocess.Popen(
+        ["/bin/sh", "-c", command],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        env=env,
+        cwd=cwd,
+    )
+
+    def pump_stdin():
+        try:
+            while data := channel.recv(_COPY_CHUNK_SIZE):
+                proc.stdin.write(data)  # type: ignore
+        except (OSError, EOFError):
+            pass  # プロセスが先に終了した
+        finally:
+            try:
+                proc.stdin.close()  # type: ignore
+            except OSError:
+                pass
+
+    def pump_output(src, send):
+        try:
+            while chunk := src.read1(_COPY_CHUNK_SIZE):
+                send(chunk)
+        except OSError:
+            pass
+
+    threading.Thread(target=pump_stdin, daemon=True).start()
+    writers = [
+        threading.Thread(target=pump_output, args=(proc.stdout, channel.sendall)),
+        threading.Thread(target=pump_output, args=(proc.stderr, channel.sendall_stderr)),
+    ]
+    for writer in writers:
+        writer.start()
+    exit_status = proc.wait()
+    for writer in writers:
+        writer.join()
+    try:
+        channel.send_exit_status(exit_status)
+    finally:
+        channel.close()
+
+
+class _ServerInterface(paramiko.ServerInterface):
+    def __init__(self, cluster: "FakeSSHServer"):
+        self.cluster = cluster
+
+    def get_allowed_auths(self, username):
+        return "password,publickey"
+
+    def check_auth_password(self, username, password):
+        if username == self.cluster.username and password == self.cluster.password:
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def check_auth_publickey(self, username, key):
+        if username == self.cluster.username:
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def check_channel_request(self, kind, chanid):
+        if kind == "session":
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_exec_request(self, channel, command):
+        threading.Thread(
+            target=_run_command,
+            args=(channel, command.decode(), self.cluster.command_env(), self.cluster.home),
+            daemon=True,
+        ).start()
+        return True
+
+
+class FakeSSHServer:
+    """localhost で待ち受け、接続ごとに paramiko の Transport を起動する"""
+
+    def __init__(
+        self,
+        home: str,
+        state_dir: str,
+        username: str = "bench",
+        password: str = "bench",
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.home = home
+        self.state_dir = state_dir
+        self.username = username
+        self.password = password
+        self.host_key = paramiko.RSAKey.generate(2048)
+        self.connections_accepted = 0
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind((host, port))
+        self.host, self.port = self._socket.getsockname()
+        self._transports: list[paramiko.Transport] = []
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def command_env(self) -> dict:
+        env = dict(os.environ)
+        env.update(
+            PATH=BIN_DIR + os.pathsep + env.get("PATH", "/usr/bin:/bin"),
+            HOME=self.home,
+            USER=self.username,
+            FAKE_CLUSTER_STATE=self.state_dir,
+        )
+        return env
+
+    def _serve(self, sock: socket.socket):
+        transport = paramiko.Transport(sock)
+        transport.add_server_key(self.host_key)
+        transport.set_subsystem_handler("sftp", paramiko.SFTPServer, LocalSFTPServer)
+        self._transports.append(transport)
+        try:
+            transport.start_server(server=_ServerInterface(self))
+        except (paramiko.SSHException, EOFError) as e:
+            logger.warning(f"SSH ネゴシエーションに失敗しました: {e}")
+            return
+        # 受理済みチャネルを取り出しておかないと Transport 内に溜まり続ける。
+        # 取り出したチャネルは参照を持ち続ける（手放すと Channel.__del__ が
+        # exec・sftp の要求が届く前に閉じてしまう）。閉じたものから捨てる
+        channels: list[paramiko.Channel] = []
+        while transport.is_active() and not self._stop.is_set():
+            channel = transport.accept(timeout=1)
+            channels = [c for c in channels if not c.closed]
+            if channel is not None:
+                channels.append(channel)
+
+    def _accept_loop(self):
+        while not self._stop.is_set():
+            try:
+                sock, _ = self._socket.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            self.connections_accepted += 1
+            threading.Thread(target=self._serve, args=(sock,), daemon=True).start()
+
+    def start(self):
+        # start() から戻った直後の接続が拒否されないよう、スレッドを起こす前に待ち受けを始める
+        self._socket.listen(128)
+        self._socket.settimeout(1)
+        self._thread = threading.Thread(
+            target=self._accept_loop, name="fake-sshd", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._socket.close()
+        for transport in self._transports:
+            transport.close()
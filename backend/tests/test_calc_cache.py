@@ -0,0 +1,170 @@
+from sqlalchemy import select
+
+from app.crud.job_result import copy_job_result
+from app.models import Job, JobBundle, JobResult, Molecule, SubmissionQueueEntry, User
+from app.models.job import JobStatus
+from app.services.calc_cache import CalcCache, gjf_calc_key, normalized_route
+
+WATER = "O 0.0 0.0 0.1173\nH 0.0 0.7572 -0.4692\nH 0.0 -0.7572 -0.4692"
+WATER_REORDERED = "H 0.0 -0.7572 -0.4692\nO 0.0 0.0 0.1173\nH 0.0 0.7572 -0.4692"
+
+
+def _gjf(route: str, atoms: str, charge_multiplicity: str = "0 1") -> str:
+    return f"%chk=water.chk\n{route}\n\nwater\n\n{charge_multiplicity}\n{atoms}\n\n"
+
+
+def test_normalized_route_ignores_case_order_and_output_keywords():
+    assert normalized_route("#p B3LYP/6-31G(d) Opt Freq SCF=(Tight,XQC)", "") == normalized_route(
+        "# b3lyp/6-31g(d) freq scf=(xqc,tight) opt test", ""
+    )
+
+
+def test_normalized_route_keeps_calculation_options():
+    assert normalized_route("# B3LYP/6-31G(d) opt", "") != normalized_route(
+        "# B3LYP/6-31G(d) opt=tight", ""
+    )
+    assert normalized_route("# B3LYP/6-31G(d)", "") != normalized_route("# HF/6-31G(d)", "")
+
+
+def test_normalized_route_skips_checkpoint_geometry():
+    assert normalized_route("# B3LYP/6-31G(d) opt geom=check guess=read", "") is None
+
+
+def test_gjf_calc_key_ignores_atom_order_and_link0():
+    key = gjf_calc_key(_gjf("# B3LYP/6-31G(d) opt", WATER))
+    assert key is not None
+    assert key == gjf_calc_key(
+        _gjf("# B3LYP/6-31G(d) opt", WATER_REORDERED).replace("%chk=water.chk\n", "%mem=4GB\n")
+    )
+
+
+def test_gjf_calc_key_depends_on_charge_and_multiplicity():
+    assert gjf_calc_key(_gjf("# B3LYP/6-31G(d) opt", WATER)) != gjf_calc_key(
+        _gjf("# B3LYP/6-31G(d) opt", WATER, "1 2")
+    )
+
+
+def test_gjf_calc_key_skips_multi_step_inputs():
+    step = _gjf("# B3LYP/6-31G(d) opt", WATER)
+    assert gjf_calc_key(step + "--Link1--\n" + step) is None
+
+
+async def _cached_pair(session):
+    """正常終了した元ジョブと、その結果を引き継いだジョブ"""
+    user = User(
+        username="tester", hashed_password="x", local_base_dir="/l", remote_base_dir="/r"
+    )
+    bundle = JobBundle(name="bundle", user=user)
+    molecule = Molecule(name="water", charge=0, multiplicity=1, job_bundle=bundle)
+    source = Job(
+        molecule=molecule,
+        gjf_path="/l/1.gjf",
+        job_type="opt",
+        status=JobStatus.done,
+        calc_key="k",
+        log_path="/r/job_1/input.log",
+        remote_job_id="201",
+    )
+    session.add(source)
+    await session.flush()
+    source_result = JobResult(
+        job_id=source.id,
+        molecule_id=molecule.id,
+        bundle_id=bundle.id,
+        final_energy=-76.0,
+        termination="normal",
+    )
+    dependent = Job(
+        molecule=molecule,
+        gjf_path="/l/2.gjf",
+        job_type="opt",
+        status=JobStatus.done,
+        calc_key="k",
+        cached_from_job_id=source.id,
+        log_path=source.log_path,
+    )
+    session.add_all([source_result, dependent])
+    await session.flush()
+    session.add(copy_job_result(source_result, dependent.id, molecule.id, bundle.id))
+    await session.commit()
+    return source, dependent
+
+
+async def _result_of(session, job: Job) -> JobResult | None:
+    return await session.scalar(select(JobResult).where(JobResult.job_id == job.id))
+
+
+async def _entry_of(session, job: Job) -> SubmissionQueueEntry | None:
+    return await session.scalar(
+        select(SubmissionQueueEntry).where(SubmissionQueueEntry.job_id == job.id)
+    )
+
+
+def test_invalidated_dependents_are_enqueued(run_async_db):
+    async def scenario(session):
+        source, dependent = await _cached_pair(session)
+
+        assert await CalcCache().invalidate_sources(session, [source.id]) == 1
+        await session.commit()
+
+        assert dependent.status == JobStatus.queued
+        assert dependent.cached_from_job_id is None
+        assert await _result_of(session, dependent) is None
+        assert await _entry_of(session, dependent) is not None
+
+    run_async_db(scenario)
+
+
+def test_dependents_wait_for_relaunched_job(run_async_db):
+    async def scenario(session):
+        cache = CalcCache()
+        source, dependent = await _cached_pair(session)
+        relaunched = Job(
+            molecule_id=source.molecule_id,
+            gjf_path=source.gjf_path,
+            job_type="opt",
+            calc_key="k",
+            parent_job_id=source.id,
+            log_path="/r/job_3/input.log",
+        )
+        session.add(relaunched)
+        await session.flush()
+
+        await cache.invalidate_sources(session, [source.id], replacement=relaunched)
+        await session.commit()
+        assert dependent.status == JobStatus.queued
+        assert dependent.cached_from_job_id == relaunched.id
+        assert await _entry_of(session, dependent) is None
+
+        result = JobResult(
+            job_id=relaunched.id,
+            molecule_id=relaunched.molecule_id,
+            bundle_id=(await session.get(Molecule, relaunched.molecule_id)).bundle_id,
+            final_energy=-76.1,
+            termination="normal",
+        )
+        session.add(result)
+        await session.flush()
+        assert await cache.refresh_dependents(session, relaunched.id, result) == 1
+        await session.commit()
+
+        assert dependent.status == JobStatus.done
+        assert dependent.log_path == relaunched.log_path
+        assert (await _result_of(session, dependent)).final_energy == -76.1
+
+    run_async_db(scenario)
+
+
+def test_failed_source_result_enqueues_dependents(run_async_db):
+    async def scenario(session):
+        source, dependent = await _cached_pair(session)
+        failed = await _result_of(session, source)
+        failed.termination = "error"
+
+        await CalcCache().refresh_dependents(session, source.id, failed)
+        await session.commit()
+
+        assert dependent.status == JobStatus.queued
+        assert await _entry_of(session, dependent) is not None
+
+    run_async_db(scenario)
@@ -0,0 +1,82 @@
+import base64
+
+import numpy as np
+import pydantic
+import pytest
+
+from app.schemas.molecule import MoleculeCreate
+from app.utils.elements import GHOST_ATOM, GHOST_OFFSET
+from app.utils.geometry import (
+    decode_geometry,
+    encode_geometry,
+    format_xyz,
+    parse_xyz_text,
+    real_atom_mask,
+)
+from app.utils.gjf_parser import parse_gjf_file
+from app.utils.structure_check import check_structure
+from app.utils.validators import validate_structure_bin
+
+WATER_WITH_GHOSTS = """\
+O      0.00000000     0.00000000     0.11730000
+H      0.00000000     0.75720000    -0.46920000
+H      0.00000000    -0.75720000    -0.46920000
+H-Bq   3.00000000     0.00000000     0.00000000
+Bq     0.00000000     0.00000000     2.00000000
+X      0.00000000     0.00000000    -2.00000000"""
+
+
+def test_geometry_round_trip():
+    numbers = np.array([8, 1, 1], dtype=np.uint8)
+    coordinates = np.array([[0.0, 0.0, 0.1173], [0.0, 0.7572, -0.4692], [0.0, -0.7572, -0.4692]])
+
+    decoded_numbers, decoded_coordinates = decode_geometry(encode_geometry(numbers, coordinates))
+
+    assert decoded_numbers.tolist() == [8, 1, 1]
+    np.testing.assert_array_equal(decoded_coordinates, coordinates)
+
+
+def test_decode_rejects_truncated_blob():
+    blob = encode_geometry([1, 1], [[0.0, 0.0, 0.0], [0.0, 0.0, 0.74]])
+    with pytest.raises(ValueError):
+        decode_geometry(blob[:-1])
+
+
+def test_ghost_and_dummy_atoms_keep_distinct_codes():
+    numbers, coordinates = parse_xyz_text(WATER_WITH_GHOSTS)  # type: ignore
+
+    assert numbers.tolist() == [8, 1, 1, GHOST_OFFSET + 1, GHOST_ATOM, 0]
+    assert real_atom_mask(numbers).tolist() == [True, True, True, False, False, False]
+
+    decoded = decode_geometry(encode_geometry(numbers, coordinates))
+    symbols = [line.split()[0] for line in format_xyz(*decoded).splitlines()]
+    assert symbols == ["O", "H", "H", "H-Bq", "Bq", "X"]
+
+
+def test_gjf_parser_reads_element_ghosts():
+    gjf = parse_gjf_file(f"# HF/STO-3G counterpoise=2\n\nwater\n\n0 1\n{WATER_WITH_GHOSTS}\n\n")
+    atoms = gjf.first.molecule.atoms  # type: ignore
+
+    assert [atom.atomic_number for atom in atoms] == [8, 1, 1, GHOST_OFFSET + 1, GHOST_ATOM, 0]
+    assert atoms[3].symbol == "H-Bq"
+
+
+def test_mm_atom_type_is_not_a_ghost():
+    numbers, _ = parse_xyz_text("C-CA--0.1 0.0 0.0 0.0\nH-HA-0.1 0.0 0.0 1.09")  # type: ignore
+    assert numbers.tolist() == [6, 1]
+
+
+def test_ghost_atoms_do_not_count_electrons():
+    numbers, coordinates = parse_xyz_text(WATER_WITH_GHOSTS)  # type: ignore
+
+    check = check_structure(numbers, coordinates, charge=0, multiplicity=1)
+
+    assert check.errors == []
+
+
+def test_invalid_structure_bin_is_a_field_error():
+    with pytest.raises(ValueError):
+        validate_structure_bin(base64.b64encode(b"QCG1").decode())
+    with pytest.raises(pydantic.ValidationError) as error:
+        MoleculeCreate(name="water", charge=0, multiplicity=1, structure_bin="!!", bundle_id=1)
+    assert error.value.errors()[0]["loc"] == ("structure_bin",)
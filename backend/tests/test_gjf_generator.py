@@ -0,0 +1,57 @@
+from sqlalchemy import select
+
+from app.models import Job, JobBundle, Molecule, SubmissionQueueEntry, User
+from app.models.job import JobStatus
+from app.models.submission_queue import SubmissionState
+from app.schemas.calc_settings import CalcSettings
+from app.services.gjf_generator import (
+    MoleculeInput,
+    compile_template,
+    generate_bundle_inputs,
+    input_key,
+)
+
+WATER = "O 0.0 0.0 0.1173\nH 0.0 0.7572 -0.4692\nH 0.0 -0.7572 -0.4692"
+
+
+def test_input_key_includes_position_only_for_index_titles():
+    molecule = MoleculeInput(1, "water", 0, 1, None, WATER)
+    by_name = compile_template(CalcSettings())
+    by_index = compile_template(CalcSettings(title="{index} {name}"))
+
+    assert input_key(by_name, molecule, 0) == input_key(by_name, molecule, 5)
+    assert input_key(by_index, molecule, 0) != input_key(by_index, molecule, 5)
+
+
+def test_regenerated_input_replaces_pending_submission(run_async_db, tmp_path):
+    async def scenario(session):
+        user = User(
+            username="tester",
+            hashed_password="x",
+            local_base_dir=str(tmp_path),
+            remote_base_dir="/r",
+        )
+        bundle = JobBundle(name="bundle", user=user, calc_settings={"method": "HF"})
+        molecule = Molecule(
+            name="water", charge=0, multiplicity=1, structure_xyz=WATER, job_bundle=bundle
+        )
+        session.add(molecule)
+        await session.commit()
+        (old,) = (await generate_bundle_inputs(session, bundle, user, use_cache=False)).written
+        session.add(SubmissionQueueEntry(job_id=old.id, user_id=user.id))
+        await session.commit()
+
+        bundle.calc_settings = {"method": "B3LYP"}
+        outcome = await generate_bundle_inputs(session, bundle, user, use_cache=False)
+
+        (new,) = outcome.written
+        assert new.id != old.id
+        assert outcome.created == 1
+        assert old.status == JobStatus.cancelled
+        entry = await session.scalar(select(SubmissionQueueEntry))
+        assert (entry.job_id, entry.state) == (old.id, SubmissionState.cancelled)
+        with open(new.gjf_path) as f:
+            assert "B3LYP" in f.read()
+        assert len((await session.scalars(select(Job))).all()) == 2
+
+    run_async_db(scenario)
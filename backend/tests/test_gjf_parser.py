@@ -0,0 +1,65 @@
+import pytest
+
+from app.utils.gjf_parser import GJFParseError, parse_gjf_file, parse_route
+
+HEADER = "%chk=a.chk\n# HF/STO-3G opt\n\ntitle\n\n0 1\n"
+
+
+def test_parse_route_method_basis():
+    route = parse_route("#p B3LYP/6-31G(d) opt=(calcfc,ts) freq")
+    assert route.print_level == "p"
+    assert route.method == "B3LYP"
+    assert route.basis == "6-31G(d)"
+    assert route.options["opt"] == ["calcfc", "ts"]
+    assert route.job_types == ["opt", "freq"]
+
+
+def test_parse_route_oniom():
+    route = parse_route("# ONIOM(B3LYP/6-31G(d):UFF) opt")
+    assert route.method == "ONIOM(B3LYP/6-31G(d):UFF)"
+    assert route.basis is None
+    assert route.options["oniom"] == []
+    assert route.job_types == ["opt"]
+
+
+def test_parse_route_oniom_with_options():
+    route = parse_route("# ONIOM(B3LYP/6-31G(d) : UFF)=EmbedCharge freq")
+    assert route.method == "ONIOM(B3LYP/6-31G(d) : UFF)"
+    assert route.options["oniom"] == ["EmbedCharge"]
+    assert route.job_types == ["freq"]
+
+
+def test_parse_route_slash_inside_parentheses():
+    route = parse_route("# opt=(modredundant,maxcycles=50) HF/STO-3G")
+    assert route.method == "HF"
+    assert route.basis == "STO-3G"
+    assert route.options["opt"] == ["modredundant", "maxcycles=50"]
+
+
+def test_parse_route_results_are_not_shared():
+    first = parse_route("# B3LYP/6-31G(d) opt")
+    first.options["opt"].append("tight")
+    assert parse_route("# B3LYP/6-31G(d) opt").options["opt"] == []
+
+
+def test_geometry_error_reports_its_own_line():
+    with pytest.raises(GJFParseError) as error:
+        parse_gjf_file(HEADER + "C 0 0 0\n! comment\nH 0 0 1.0\nH x 0 1.0\n\n")
+    assert error.value.line_no == 10
+
+
+def test_zmatrix_variables_and_constants_sections():
+    gjf = parse_gjf_file(
+        HEADER
+        + "C\nH 1 r1\nH 1 r1 2 a1\nVariables:\nr1 1.0D0\n\na1 109.5\n\n"
+    )
+    molecule = gjf.first.molecule
+    assert molecule.variables == {"r1": 1.0}
+    assert molecule.constants == {"a1": 109.5}
+    assert molecule.lines[-3:] == ["r1 1.0D0", "", "a1 109.5"]
+
+
+def test_undefined_zmatrix_variable_reports_atom_line():
+    with pytest.raises(GJFParseError) as error:
+        parse_gjf_file(HEADER + "C\nH 1 r1\nH 1 r9 2 a1\nVariables:\nr1 1.0\na1 1\n\n")
+    assert error.value.line_no == 9
@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+from sqlalchemy import select
+
+from app.models import Job, JobResourceSample, SubmissionQueueEntry
+from app.models.job import JobStatus
+from app.models.server_credential import AuthMethod, ServerCredential
+
+
+def test_delete_queued_job_removes_queue_entry(db, make_job):
+    job = make_job()
+    db.add(SubmissionQueueEntry(job=job, user_id=job.molecule.job_bundle.user_id))
+    db.commit()
+
+    db.delete(job)
+    db.commit()
+
+    assert db.scalars(select(Job)).all() == []
+    assert db.scalars(select(SubmissionQueueEntry)).all() == []
+
+
+def test_delete_error_job_without_queue_entry(db, make_job):
+    job = make_job(status=JobStatus.error)
+    db.commit()
+
+    db.delete(job)
+    db.commit()
+
+    assert db.scalars(select(Job)).all() == []
+
+
+def test_delete_job_removes_resource_samples(db, make_job):
+    job = make_job(remote_job_id="101")
+    db.add(JobResourceSample(job=job, walltime_s=60, mem_kb=1024))
+    db.commit()
+
+    db.delete(job)
+    db.commit()
+
+    assert db.scalars(select(JobResourceSample)).all() == []
+
+
+def test_delete_credential_keeps_finished_jobs(db, make_job):
+    credential = ServerCredential(
+        host="cluster", port=22, username="tester", auth_method=AuthMethod.password
+    )
+    job = make_job(status=JobStatus.done, remote_job_id="102", server_credential=credential)
+    db.commit()
+
+    db.delete(credential)
+    db.commit()
+    db.refresh(job)
+
+    assert job.server_credential_id is None
+
+
+def test_delete_credential_refused_while_jobs_are_on_the_cluster():
+    aiosqlite = pytest.importorskip("aiosqlite")  # noqa: F841
+    from fastapi import HTTPException
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+    from app.crud.server_credential import delete_credential
+    from app.models import Base, Job, JobBundle, Molecule, User
+
+    async def scenario():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            user = User(
+                username="tester", hashed_password="x", local_base_dir="/l", remote_base_dir="/r"
+            )
+            molecule = Molecule(
+                name="water", charge=0, multiplicity=1, job_bundle=JobBundle(name="b", user=user)
+            )
+            credential = ServerCredential(
+                host="cluster", port=22, username="tester", auth_method=AuthMethod.password
+            )
+            job = Job(
+                molecule=molecule,
+                gjf_path="/l/input.gjf",
+                job_type="opt",
+                status=JobStatus.running,
+                remote_job_id="103",
+                server_credential=credential,
+            )
+            session.add(job)
+            await session.commit()
+            with pytest.raises(HTTPException) as error:
+                await delete_credential(session, credential)
+            assert error.value.status_code == 400
+        await engine.dispose()
+
+    asyncio.run(scenario())
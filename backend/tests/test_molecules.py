@@ -0,0 +1,119 @@
+import os
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from app.models import Base, JobBundle, Molecule, User
+from app.utils.geometry import decode_geometry
+
+WATER_ZMATRIX = """\
+%chk=water.chk
+# B3LYP/6-31G(d) opt
+
+water
+
+0 1
+O
+H 1 0.96
+H 1 0.96 2 104.5
+
+"""
+
+CLASHING = """\
+# B3LYP/6-31G(d) opt
+
+clash
+
+0 1
+O 0.0 0.0 0.0
+H 0.0 0.0 0.1
+H 0.0 0.9 0.0
+
+"""
+
+
+@pytest.fixture
+def client(tmp_path):
+    """アプリ全体（app.main）に、ファイルの SQLite とログイン済みのユーザーを差し込んだクライアント"""
+    for module in ("supabase", "passlib", "jose", "aiosqlite"):
+        pytest.importorskip(module)
+    os.environ.setdefault("SUPABASE_URL", "http://localhost")
+    os.environ.setdefault("SUPABASE_ANON_KEY", "test.test.test")
+    from fastapi.testclient import TestClient
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from sqlalchemy.pool import NullPool
+
+    from app.dependencies import get_current_user, get_db
+    from app.main import app
+
+    path = tmp_path / "test.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with Session(engine, expire_on_commit=False) as session:
+        user = User(
+            username="tester", hashed_password="x", local_base_dir="/l", remote_base_dir="/r"
+        )
+        session.add(JobBundle(name="bundle", user=user))
+        session.commit()
+    # TestClient はリクエストごとにイベントループが変わりうるので接続を使い回さない
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+
+    async def override_db():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_db
+    app.dependency_overrides[get_current_user] = lambda: user
+    # with を使わずにバックグラウンドタスク（startup イベント）を起動しない
+    yield TestClient(app), engine
+    app.dependency_overrides.clear()
+    engine.dispose()
+
+
+def test_upload_gjf_converts_checks_and_stores_structures(client):
+    http, engine = client
+
+    response = http.post(
+        "/bundles/1/upload-gjf",
+        files=[
+            ("files", ("water.gjf", WATER_ZMATRIX.encode())),
+            ("files", ("clash.gjf", CLASHING.encode())),
+        ],
+    )
+
+    assert response.status_code == 200
+    water, clash = response.json()
+    assert water["status"] == "success"
+    assert water["check"]["errors"] == []
+    assert clash["status"] == "error"
+    assert clash["check"]["clashes"]
+    with Session(engine) as session:
+        molecules = session.scalars(select(Molecule)).all()
+    assert [molecule.name for molecule in molecules] == ["water.gjf"]
+    numbers, coordinates = decode_geometry(molecules[0].structure_bin)
+    assert numbers.tolist() == [8, 1, 1]
+    assert abs(((coordinates[1] - coordinates[0]) ** 2).sum() ** 0.5 - 0.96) < 1e-6
+
+
+def test_upload_gjf_marks_duplicate_conformers(client):
+    http, _ = client
+    files = [
+        ("files", ("a.gjf", WATER_ZMATRIX.encode())),
+        ("files", ("b.gjf", WATER_ZMATRIX.encode())),
+    ]
+
+    response = http.post("/bundles/1/upload-gjf", params={"dedup": "mark"}, files=files)
+
+    assert response.status_code == 200
+    assert [result["duplicate_of"] for result in response.json()] == [None, "a.gjf"]
+
+
+def test_upload_gjf_requires_own_bundle(client):
+    http, _ = client
+
+    response = http.post(
+        "/bundles/2/upload-gjf", files=[("files", ("water.gjf", WATER_ZMATRIX.encode()))]
+    )
+
+    assert response.status_code == 404
@@ -0,0 +1,84 @@
+import asyncio
+from datetime import datetime, timezone
+
+from app.services.job_execution import JobExecutionController
+from app.services.job_monitor import poll_host_state, qstat_record_to_job_status
+from app.services.resource_usage import sample_from_record
+from app.utils.qstat_parser import iter_qstat_xml, parse_qstat_xml
+
+QSTAT_X = """\
+<Data>
+<Job><Job_Id>101.pbs01</Job_Id><Job_Name>water.gjf</Job_Name><job_state>C</job_state>\
+<queue>gaussian</queue><exec_host>node01/0-7</exec_host><exit_status>271</exit_status>\
+<Resource_List><nodes>1:ppn=8</nodes><mem>16gb</mem><walltime>24:00:00</walltime></Resource_List>\
+<resources_used><cput>07:59:30</cput><mem>2097152kb</mem><vmem>4gb</vmem>\
+<walltime>01:00:05</walltime></resources_used>\
+<qtime>1700000000</qtime><start_time>1700000060</start_time><comp_time>1700003665</comp_time></Job>
+<Job><Job_Id>102.pbs01</Job_Id><Job_Name>benzene.gjf</Job_Name><job_state>Q</job_state>\
+<queue>gaussian</queue><Resource_List><ncpus>4</ncpus></Resource_List>\
+<qtime>1700000100</qtime></Job>
+</Data>
+"""
+
+
+def test_parse_qstat_xml_reads_state_limits_and_usage():
+    records = parse_qstat_xml(QSTAT_X)
+
+    assert list(records) == ["101", "102"]
+    done = records["101"]
+    assert (done.state, done.exit_status, done.ncpus) == ("C", 271, 8)
+    assert (done.walltime_used, done.cput_used) == (3605, 28770)
+    assert (done.mem_used_kb, done.vmem_used_kb) == (2097152, 4 * 1024**2)
+    assert done.mem_limit_kb == 16 * 1024**2
+    assert done.walltime_limit == 24 * 3600
+    assert (done.start_time, done.comp_time) == (1700000060, 1700003665)
+    queued = records["102"]
+    assert (queued.ncpus, queued.walltime_used, queued.exit_status) == (4, None, None)
+
+
+def test_iter_qstat_xml_accepts_arbitrary_chunks():
+    chunks = [QSTAT_X[i : i + 7].encode() for i in range(0, len(QSTAT_X), 7)]
+    assert [record.short_id for record in iter_qstat_xml(chunks)] == ["101", "102"]
+
+
+def test_parse_qstat_xml_empty_output():
+    assert parse_qstat_xml("") == {}
+    assert parse_qstat_xml("\n") == {}
+
+
+def test_qstat_record_to_job_status():
+    records = parse_qstat_xml(QSTAT_X)
+
+    assert qstat_record_to_job_status(records["101"]) == "error"
+    assert qstat_record_to_job_status(records["102"]) == "queued"
+    # 一覧から消えたジョブは完了扱い（終了状態はログで判定する）
+    assert qstat_record_to_job_status(None) == "done"
+
+
+def test_sample_from_record_skips_jobs_that_have_not_started():
+    records = parse_qstat_xml(QSTAT_X)
+    sampled_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    sample = sample_from_record(1, records["101"], sampled_at)
+
+    assert sample is not None
+    assert (sample["walltime_s"], sample["mem_kb"], sample["ncpus"]) == (3605, 2097152, 8)
+    assert sample_from_record(2, records["102"], sampled_at) is None
+
+
+def test_poll_host_state_reads_fake_cluster_qstat(tmp_path, fake_cluster):
+    cluster, credential = fake_cluster
+    gjf = tmp_path / "h2.gjf"
+    gjf.write_text("# HF/STO-3G\n\nh2\n\n0 1\nH 0 0 0\nH 0 0 0.74\n\n")
+    (submitted,) = JobExecutionController(credential).submit_jobs(
+        [(str(gjf), f"{cluster.remote_base_dir}/bundle_1/job_1")]
+    )
+
+    records, remote_now, entries = asyncio.run(
+        poll_host_state(credential, [cluster.remote_base_dir])
+    )
+
+    record = records[submitted.remote_job_id.split(".")[0]]
+    assert record.state in ("Q", "R", "C")
+    assert qstat_record_to_job_status(record) in ("queued", "running", "done")
+    assert remote_now is not None
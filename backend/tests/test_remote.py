@@ -0,0 +1,40 @@
+import asyncio
+import os
+import threading
+
+import pytest
+
+from app.services import remote
+
+
+def test_offload_keeps_host_slot_until_timed_out_call_finishes(monkeypatch):
+    monkeypatch.setattr(remote, "REMOTE_MAX_PER_HOST", 1)
+    release = threading.Event()
+
+    async def scenario():
+        with pytest.raises(remote.RemoteTimeoutError):
+            await remote.offload("slow-host", release.wait, timeout=0.05)
+        # 1本目のスレッドはまだ動いているので、2本目は枠が空くまで始まらない
+        second = asyncio.ensure_future(remote.offload("slow-host", lambda: "done", timeout=5))
+        await asyncio.sleep(0.1)
+        assert not second.done()
+        release.set()
+        return await second
+
+    try:
+        assert asyncio.run(scenario()) == "done"
+    finally:
+        release.set()
+        remote._host_semaphores.pop("slow-host", None)
+
+
+def test_tail_quotes_remote_path(fake_cluster):
+    cluster, credential = fake_cluster
+    directory = os.path.join(cluster.remote_base_dir, "job 1; echo injected")
+    os.makedirs(directory)
+    with open(os.path.join(directory, "input.log"), "w") as f:
+        f.write("line 1\nline 2\n Normal termination of Gaussian 16\n")
+
+    tail = asyncio.run(remote.tail(credential, os.path.join(directory, "input.log"), lines=1))
+
+    assert tail == " Normal termination of Gaussian 16\n"
@@ -0,0 +1,68 @@
+import os
+
+from app.services.host_load import HostCapacity, HostLoad, assign_hosts, place_jobs
+from app.services.job_execution import JobExecutionController
+
+
+def _host(credential_id: int, free_slots: int, queue_depth: int = 0) -> HostCapacity:
+    return HostCapacity(credential_id, free_slots, HostLoad(queue_depth=queue_depth))
+
+
+def test_assign_hosts_prefers_less_loaded_host():
+    hosts = [_host(1, 10, queue_depth=50), _host(2, 10)]
+    assert assign_hosts(3, hosts) == [2, 2, 2]
+
+
+def test_assign_hosts_stops_when_slots_run_out():
+    assert assign_hosts(5, [_host(1, 2), _host(2, 1)]) == [1, 2, 1]
+
+
+def test_place_jobs_keeps_retries_on_their_first_host():
+    # ホスト 1 のほうが混んでいても、一度ホスト 1 へ投げたジョブはホスト 1 へ再投入する
+    hosts = [_host(1, 5, queue_depth=100), _host(2, 5)]
+    assert place_jobs([1, None, 1, None], hosts) == [1, 2, 1, 2]
+
+
+def test_place_jobs_waits_when_pinned_host_is_full():
+    hosts = [_host(1, 0), _host(2, 5)]
+    assert place_jobs([1, None], hosts) == [None, 2]
+
+
+def test_place_jobs_counts_pinned_jobs_against_free_slots():
+    hosts = [_host(1, 1), _host(2, 0)]
+    assert place_jobs([None, 1], hosts) == [None, 1]
+
+
+def _write_inputs(tmp_path, cluster, count: int) -> list[tuple[str, str]]:
+    entries = []
+    for i in range(count):
+        gjf = tmp_path / f"{i}.gjf"
+        gjf.write_text("# HF/STO-3G\n\nh2\n\n0 1\nH 0 0 0\nH 0 0 0.74\n\n")
+        entries.append((str(gjf), os.path.join(cluster.remote_base_dir, f"bundle_1/job_{i}")))
+    return entries
+
+
+def test_bulk_submit_reports_each_job_as_qsub_returns(tmp_path, fake_cluster):
+    cluster, credential = fake_cluster
+    entries = _write_inputs(tmp_path, cluster, 3)
+
+    returned = []
+    results = JobExecutionController(credential).submit_jobs(
+        entries, on_result=lambda result: returned.append(result.remote_dir)
+    )
+
+    assert all(result.remote_job_id for result in results)
+    assert returned == [remote_dir for _, remote_dir in entries]
+
+
+def test_bulk_submit_retry_does_not_submit_twice(tmp_path, fake_cluster):
+    cluster, credential = fake_cluster
+    entries = _write_inputs(tmp_path, cluster, 3)
+
+    first = JobExecutionController(credential).submit_jobs(entries)
+    # 結果を受け取れなかった体で同じディレクトリへもう一度投入する
+    retry = JobExecutionController(credential).submit_jobs(entries)
+
+    assert [r.remote_job_id for r in retry] == [r.remote_job_id for r in first]
+    with open(os.path.join(cluster.state_dir, "seq")) as f:
+        assert int(f.read()) == len(entries)
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from app.utils.gjf_parser import parse_gjf_file
+from app.utils.zmatrix import BOHR_TO_ANGSTROM, cartesian_geometries, geometry_from_text
+
+WATER = "O\nH 1 0.96\nH 1 0.96 2 104.5"
+
+HYDROGEN_PEROXIDE = """\
+O
+O 1 roo
+H 1 roh 2 aooh
+H 2 roh 1 aooh 3 dihedral
+
+roo=1.45
+roh=0.97
+aooh=100.0
+dihedral=120.0"""
+
+
+def _distance(coordinates: np.ndarray, i: int, j: int) -> float:
+    return float(np.linalg.norm(coordinates[i] - coordinates[j]))
+
+
+def _angle(coordinates: np.ndarray, i: int, j: int, k: int) -> float:
+    u, v = coordinates[i] - coordinates[j], coordinates[k] - coordinates[j]
+    return float(np.degrees(np.arccos(u @ v / np.linalg.norm(u) / np.linalg.norm(v))))
+
+
+def _dihedral(coordinates: np.ndarray, i: int, j: int, k: int, m: int) -> float:
+    b0 = coordinates[i] - coordinates[j]
+    b1 = coordinates[k] - coordinates[j]
+    b2 = coordinates[m] - coordinates[k]
+    b1 /= np.linalg.norm(b1)
+    v = b0 - (b0 @ b1) * b1
+    w = b2 - (b2 @ b1) * b1
+    return float(np.degrees(np.arctan2(np.cross(b1, v) @ w, v @ w)))
+
+
+def _geometries(*contents: str):
+    steps = [parse_gjf_file(content).first for content in contents]
+    return cartesian_geometries([(step.molecule, step.route) for step in steps])
+
+
+def _gjf(atoms: str, route: str = "# HF/STO-3G") -> str:
+    return f"{route}\n\ntitle\n\n0 1\n{atoms}\n\n"
+
+
+def test_geometry_from_text_converts_zmatrix():
+    numbers, coordinates = geometry_from_text(WATER)  # type: ignore
+
+    assert numbers.tolist() == [8, 1, 1]
+    assert _distance(coordinates, 0, 1) == pytest.approx(0.96)
+    assert _distance(coordinates, 0, 2) == pytest.approx(0.96)
+    assert _angle(coordinates, 1, 0, 2) == pytest.approx(104.5)
+
+
+def test_zmatrix_variables_and_dihedral():
+    ((numbers, coordinates),) = _geometries(_gjf(HYDROGEN_PEROXIDE))
+
+    assert numbers.tolist() == [8, 8, 1, 1]
+    assert _distance(coordinates, 0, 1) == pytest.approx(1.45)
+    assert _distance(coordinates, 1, 3) == pytest.approx(0.97)
+    assert _angle(coordinates, 0, 1, 3) == pytest.approx(100.0)
+    assert abs(_dihedral(coordinates, 2, 0, 1, 3)) == pytest.approx(120.0)
+
+
+def test_zmatrix_units_bohr_and_radians():
+    ((_, coordinates),) = _geometries(
+        _gjf("O\nH 1 1.8\nH 1 1.8 2 1.8", "# HF/STO-3G units=(au,rad)")
+    )
+
+    assert _distance(coordinates, 0, 1) == pytest.approx(1.8 * BOHR_TO_ANGSTROM)
+    assert _angle(coordinates, 1, 0, 2) == pytest.approx(np.degrees(1.8))
+
+
+def test_batched_conversion_keeps_input_order():
+    cartesian = "O 0.0 0.0 0.1173\nH 0.0 0.7572 -0.4692\nH 0.0 -0.7572 -0.4692"
+    stretched = WATER.replace("0.96", "1.10")
+
+    geometries = _geometries(_gjf(WATER), _gjf(cartesian), _gjf(stretched))
+
+    assert _distance(geometries[0][1], 0, 1) == pytest.approx(0.96)
+    np.testing.assert_allclose(geometries[1][1][1], [0.0, 0.7572, -0.4692])
+    assert _distance(geometries[2][1], 0, 1) == pytest.approx(1.10)
+
+
+def test_geometry_from_text_rejects_unreadable_text():
+    assert geometry_from_text("not a molecule\n1 2 3") is None
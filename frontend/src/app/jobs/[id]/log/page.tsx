@@ -5,9 +5,20 @@ import { useParams } from "next/navigation";
 import Layout from "@/components/Layout";
 import ProtectedRoute from "@/components/ProtectedRoute";
 import { apiClient } from "@/lib/api";
-import { JobLog } from "@/types";
+import { JobLog, JobLogStreamEvent } from "@/types";
 import Link from "next/link";
 
+// 画面に保持するログの最大文字数
+const MAX_LOG_CHARS = 200_000;
+
+const SYSTEM_STATUS_CODES: Record<string, string> = {
+  queued: "Q",
+  running: "R",
+  done: "C",
+  error: "C",
+  cancelled: "C",
+};
+
 export default function JobLogPage() {
   const params = useParams();
   const jobId = parseInt(params.id as string);
@@ -22,14 +33,51 @@ export default function JobLogPage() {
     }
   }, [jobId]);
 
+  // 自動更新 ON の間はサーバーからのログ配信 (SSE) を購読する
   useEffect(() => {
-    let interval: NodeJS.Timeout;
-    if (autoRefresh) {
-      interval = setInterval(fetchJobLog, 5000); // 5秒ごとに更新
-    }
-    return () => {
-      if (interval) clearInterval(interval);
-    };
+    if (!autoRefresh || !jobId) return;
+    const controller = new AbortController();
+    apiClient
+      .streamJobLog(
+        jobId,
+        (event: JobLogStreamEvent) => {
+          setJobLog((prev) => {
+            if (!prev) return prev;
+            switch (event.event) {
+              case "log":
+                return {
+                  ...prev,
+                  log_content: (prev.log_content + event.data.content).slice(
+                    -MAX_LOG_CHARS
+                  ),
+                  next_offset: event.data.next_offset,
+                };
+              case "status":
+                return {
+                  ...prev,
+                  system_status: SYSTEM_STATUS_CODES[event.data.status] ?? "?",
+                };
+              case "end":
+                return {
+                  ...prev,
+                  is_complete: true,
+                  system_status: SYSTEM_STATUS_CODES[event.data.status] ?? "?",
+                };
+            }
+          });
+        },
+        controller.signal,
+        jobLog?.next_offset
+      )
+      .catch((error) => {
+        if (!controller.signal.aborted) {
+          console.error("ログ配信の購読に失敗しました:", error);
+        }
+      })
+      .finally(() => {
+        if (!controller.signal.aborted) setAutoRefresh(false);
+      });
+    return () => controller.abort();
   }, [autoRefresh, jobId]);
 
   const fetchJobLog = async () => {
@@ -202,7 +250,7 @@ export default function JobLogPage() {
             <div className="px-4 py-5 sm:p-6">
               <div className="flex justify-between items-center mb-4">
                 <h3 className="text-lg leading-6 font-medium text-gray-900">
-                  ログ内容 (末尾30行)
+                  ログ内容
                 </h3>
                 <div className="text-sm text-gray-500">
                   最終更新: {new Date().toLocaleString("ja-JP")}
@@ -14,6 +14,7 @@ import {
   JobCreate,
   JobUpdate,
   JobLog,
+  JobLogStreamEvent,
   ServerCredential,
   ServerCredentialCreate,
   ServerCredentialUpdate,
@@ -227,6 +228,51 @@ class ApiClient {
     return this.request(`/jobs/${id}/log`);
   }
 
+  // ログを Server-Sent Events で購読（Authorization ヘッダが必要なため fetch で読む）
+  async streamJobLog(
+    id: number,
+    onEvent: (event: JobLogStreamEvent) => void,
+    signal: AbortSignal,
+    sinceOffset?: number
+  ): Promise<void> {
+    const headers: HeadersInit = {};
+    if (this.token) {
+      headers.Authorization = `Bearer ${this.token}`;
+    }
+    const query = sinceOffset !== undefined ? `?since_offset=${sinceOffset}` : "";
+    const response = await fetch(`${API_BASE_URL}/jobs/${id}/log/stream${query}`, {
+      headers,
+      signal,
+    });
+    if (!response.ok || !response.body) {
+      const error = await response.json().catch(() => ({}));
+      throw new Error(error.detail || `HTTP ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      let boundary;
+      while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+        const raw = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+        let event = "message";
+        let data = "";
+        for (const line of raw.split("\n")) {
+          if (line.startsWith("event: ")) event = line.slice(7);
+          else if (line.startsWith("data: ")) data += line.slice(6);
+        }
+        if (data) {
+          onEvent({ event, data: JSON.parse(data) } as JobLogStreamEvent);
+        }
+      }
+    }
+  }
+
   // Server Credential endpoints
   async createServerCredential(
     data: ServerCredentialCreate
@@ -1,17 +1,70 @@
+// JobBundle.calc_settings（バックエンドの CalcSettings）
+export interface CalcSettings {
+  job_type?: string;
+  method?: string;
+  basis?: string;
+  route_keywords?: string[];
+  print_level?: "" | "p" | "n" | "t";
+  route?: string | null;
+  mem?: string | null;
+  nprocshared?: number | null;
+  auto_resources?: boolean; // mem・nprocshared が未指定なら推定値で埋める
+  checkpoint?: boolean;
+  link0?: Record<string, string>;
+  title?: string;
+  additional_input?: string[];
+  overrides?: Record<string, Partial<Omit<CalcSettings, "overrides">>>;
+}
+
 export interface JobBundle {
   id: number;
   name: string;
   user_id: number;
   created_at: string;
-  calc_settings?: Record<string, any>;
+  calc_settings?: CalcSettings;
 }
 
 export interface JobBundleCreate {
   name: string;
-  calc_settings?: Record<string, any>;
+  calc_settings?: CalcSettings;
 }
 
 export interface JobBundleUpdate {
   name?: string;
-  calc_settings?: Record<string, any>;
+  calc_settings?: CalcSettings;
+}
+
+export interface InputGenerationResult {
+  generated: number;
+  unchanged: number;
+  created_jobs: number;
+  enqueued: number;
+  cached: number; // 計算済みの結果を引き継いで完了にした数
+  failed: { job_id: number; error: string }[]; // submit=true で投入しなかったジョブ（構造のエラー）
+}
+
+export interface DedupResult {
+  molecules: number;
+  duplicates: number; // 重複とした分子の数（入力の生成・投入の対象外）
+  representatives: number;
+  threshold: number; // Å
+}
+
+export interface ResourceEstimate {
+  model_key: string;
+  samples: number;
+  confidence: number; // 0〜1
+  usable: boolean;
+  nprocshared: number;
+  walltime_s: number;
+  walltime_low_s: number; // 80% 区間
+  walltime_high_s: number;
+  mem_mb: number | null;
+  mem_observed_mb: number | null;
+}
+
+export interface MoleculeResourceEstimate {
+  molecule_id: number;
+  name: string;
+  estimate: ResourceEstimate | null;
 }
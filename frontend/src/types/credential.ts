@@ -9,6 +9,7 @@ export interface ServerCredential {
   port: number;
   username: string;
   auth_method: AuthMethod;
+  max_jobs?: number;
   created_at: string;
 }
 
@@ -19,6 +20,7 @@ export interface ServerCredentialCreate {
   auth_method: AuthMethod;
   password?: string;
   ssh_key?: string;
+  max_jobs?: number;
 }
 
 export interface ServerCredentialUpdate {
@@ -28,4 +30,5 @@ export interface ServerCredentialUpdate {
   auth_method?: AuthMethod;
   password?: string;
   ssh_key?: string;
+  max_jobs?: number;
 }
@@ -4,5 +4,6 @@ export * from "./credential";
 export * from "./job";
 export * from "./molecule";
 export * from "./notification";
+export * from "./result";
 export * from "./upload";
 export * from "./user";
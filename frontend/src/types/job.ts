@@ -16,6 +16,10 @@ export interface Job {
   submitted_at: string;
   remote_job_id?: string;
   parent_job_id?: number;
+  server_credential_id?: number;
+  calc_key?: string;
+  cached_from_job_id?: number; // 計算キャッシュで結果を引き継いだ元ジョブ
+  estimated_walltime_s?: number; // リソース推定による walltime
 }
 
 export interface JobCreate {
@@ -35,4 +39,19 @@ export interface JobLog {
   system_status: string;
   job_id: number;
   remote_job_id?: string;
+  offset?: number | null;
+  next_offset: number;
+  log_size: number;
+  files?: string[];
 }
+
+export type JobLogStreamEvent =
+  | {
+      event: "log";
+      data: { content: string; offset: number; next_offset: number };
+    }
+  | { event: "status"; data: { status: JobStatus } }
+  | {
+      event: "end";
+      data: { termination: "normal" | "error"; status: JobStatus };
+    };
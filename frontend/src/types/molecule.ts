@@ -3,16 +3,22 @@ export interface Molecule {
   name: string;
   charge: number;
   multiplicity: number;
-  structure_xyz: string;
+  structure_xyz: string | null;
+  // 原子番号 uint8 + 座標 float64 (N,3) のバイナリを base64 にしたもの（?format=binary|both）
+  structure_bin?: string | null;
   bundle_id: number;
   latest_job_id?: string;
+  // 配座の重複判定で同じとみなした代表の分子と RMSD [Å]（入力の生成・投入の対象外）
+  duplicate_of_id?: number | null;
+  duplicate_rmsd?: number | null;
 }
 
 export interface MoleculeCreate {
   name: string;
   charge: number;
   multiplicity: number;
-  structure_xyz: string;
+  structure_xyz?: string;
+  structure_bin?: string;
   bundle_id: number;
 }
 
@@ -21,4 +27,5 @@ export interface MoleculeUpdate {
   charge?: number;
   multiplicity?: number;
   structure_xyz?: string;
+  structure_bin?: string;
 }
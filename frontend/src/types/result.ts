@@ -0,0 +1,55 @@
+// GET /results の並べ替え・検索に使えるスカラー値
+export type ResultColumn =
+  | "final_energy"
+  | "zpe"
+  | "enthalpy"
+  | "gibbs_free_energy"
+  | "homo"
+  | "lumo"
+  | "dipole_moment"
+  | "imaginary_frequencies"
+  | "walltime_s";
+
+export interface ResultArrayInfo {
+  name: string;
+  dtype: string;
+  shape: number[];
+}
+
+export interface ResultArray extends ResultArrayInfo {
+  data: unknown[];
+}
+
+// エネルギーは Hartree、双極子モーメントは Debye
+export interface JobResult {
+  job_id: number;
+  molecule_id: number;
+  bundle_id: number;
+  final_energy: number | null;
+  zpe: number | null;
+  enthalpy: number | null;
+  gibbs_free_energy: number | null;
+  homo: number | null;
+  lumo: number | null;
+  dipole_moment: number | null;
+  imaginary_frequencies: number | null;
+  walltime_s: number | null;
+  n_atoms: number | null;
+  optimization_converged: boolean;
+  termination: "normal" | "error" | null;
+  error_link: string | null;
+  parsed_at: string;
+  arrays: ResultArrayInfo[];
+}
+
+export interface ResultQuery {
+  bundle_id?: number[];
+  molecule_id?: number;
+  has_imaginary?: boolean;
+  termination?: "normal" | "error";
+  order_by?: ResultColumn;
+  descending?: boolean;
+  best_per_molecule?: boolean;
+  limit?: number;
+  offset?: number;
+}
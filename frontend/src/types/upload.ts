@@ -3,6 +3,27 @@ export interface GJFUploadResult {
   charge: number;
   multiplicity: number;
   structure_xyz: string;
-  status: string;
+  status: string; // success | error | duplicate
   error_message?: string;
+  duplicate_of?: string; // 同じ配座とみなした分子の名前
+  duplicate_rmsd?: number;
+  check?: StructureCheckResult;
 }
+
+export interface StructureClash {
+  i: number; // 原子の番号（0 始まり）
+  j: number;
+  distance: number; // Å
+}
+
+// 構造の検査結果。errors があれば投入しても失敗する
+export interface StructureCheckResult {
+  n_atoms: number;
+  n_bonds: number;
+  n_fragments: number;
+  clashes: StructureClash[];
+  errors: string[];
+  warnings: string[];
+}
+
+export type DedupMode = "off" | "mark" | "skip";